@@ -13,6 +13,7 @@ from html import unescape
 from typing import Dict
 from typing import List
 from typing import Optional
+from typing import Union
 from urllib.parse import parse_qsl
 
 from pytube import Caption
@@ -21,17 +22,35 @@ from pytube import extract
 from pytube import request
 from pytube import Stream
 from pytube import StreamQuery
+from pytube.cache import ExtractionCache
+from pytube.cache import url_expiry
 from pytube.exceptions import VideoUnavailable
 from pytube.extract import apply_descrambler
 from pytube.extract import apply_signature
 from pytube.extract import get_ytplayer_config
-from pytube.helpers import install_proxy
 from pytube.monostate import Monostate
 from pytube.monostate import OnComplete
 from pytube.monostate import OnProgress
+from pytube.progress import OnProgressEvent
+from pytube.proxy import ProxyPool
 
 logger = logging.getLogger(__name__)
 
+# Manifest keys used to build :class:`Stream <Stream>` instances.
+_STREAM_KEYS = frozenset(
+    (
+        "url",
+        "itag",
+        "type",
+        "quality",
+        "bitrate",
+        "is_otf",
+        "init",
+        "index",
+        "clen",
+    )
+)
+
 
 class YouTube:
     """Core developer interface for pytube."""
@@ -42,7 +61,9 @@ class YouTube:
         defer_prefetch_init: bool = False,
         on_progress_callback: Optional[OnProgress] = None,
         on_complete_callback: Optional[OnComplete] = None,
-        proxies: Dict[str, str] = None,
+        proxies: Union[Dict[str, str], ProxyPool, None] = None,
+        cache: Optional[ExtractionCache] = None,
+        lean: bool = False,
     ):
         """Construct a :class:`YouTube <YouTube>`.
 
@@ -56,6 +77,16 @@ class YouTube:
         :param func on_complete_callback:
             (Optional) User defined callback function for stream download
             complete events.
+        :param proxies:
+            (Optional) A :class:`ProxyPool <pytube.proxy.ProxyPool>`, or a
+            dict of proxy urls by scheme, for the requests of this video and
+            its streams.
+        :param ExtractionCache cache:
+            (Optional) Persistent cache of extracted video data. On a hit the
+            object is built without any network requests.
+        :param bool lean:
+            (Optional) Drop the raw html, js and video info once the streams
+            are built, see :meth:`compact`.
 
         """
         self.js: Optional[str] = None  # js fetched by js_url
@@ -83,6 +114,7 @@ class YouTube:
         self.age_restricted: Optional[bool] = None
 
         self.fmt_streams: List[Stream] = []
+        self._stream_query: Optional[StreamQuery] = None
 
         # video_id part of /watch?v=<video_id>
         self.video_id = extract.video_id(url)
@@ -90,17 +122,26 @@ class YouTube:
         self.watch_url = f"https://youtube.com/watch?v={self.video_id}"
         self.embed_url = f"https://www.youtube.com/embed/{self.video_id}"
 
+        if isinstance(proxies, dict):
+            proxies = ProxyPool.from_dict(proxies) if proxies else None
+        self.proxies: Optional[ProxyPool] = proxies
+
         # Shared between all instances of `Stream` (Borg pattern).
         self.stream_monostate = Monostate(
-            on_progress=on_progress_callback, on_complete=on_complete_callback
+            on_progress=on_progress_callback,
+            on_complete=on_complete_callback,
+            proxies=self.proxies,
+            video_id=self.video_id,
         )
 
-        if proxies:
-            install_proxy(proxies)
+        self.cache = cache
+        self.lean = lean
 
         if not defer_prefetch_init:
-            self.prefetch()
-            self.descramble()
+            if not self.load_from_cache():
+                self.prefetch()
+                self.descramble()
+                self.save_to_cache()
 
     def descramble(self) -> None:
         """Descramble the stream data and build Stream instances.
@@ -148,9 +189,11 @@ class YouTube:
 
             if not self.js:
                 if not self.embed_html:
-                    self.embed_html = request.get(url=self.embed_url)
+                    self.embed_html = request.get(
+                        url=self.embed_url, proxies=self.proxies
+                    )
                 self.js_url = extract.js_url(self.embed_html)
-                self.js = request.get(self.js_url)
+                self.js = request.get(self.js_url, proxies=self.proxies)
 
             apply_signature(self.player_config_args, fmt, self.js)
 
@@ -165,18 +208,44 @@ class YouTube:
         self.stream_monostate.title = self.title
         self.stream_monostate.duration = self.length
 
+        if self.lean:
+            self.compact()
+
         logger.info("init finished successfully")
 
-    def prefetch(self) -> None:
+    def compact(self) -> None:
+        """Release the raw data that extraction was done from.
+
+        Keeps only what :meth:`extraction_state` keeps: the signed stream
+        manifests, the caption track list and the video details. The watch
+        and embed html, the base.js and the video info are dropped, which
+        takes the object from megabytes down to a few kilobytes.
+
+        :rtype: None
+        """
+        self.load_extraction_state(self.extraction_state())
+        self.watch_html = None
+        self.embed_html = None
+        self.js = None
+        self.vid_info_raw = None
+        self.vid_info = None
+
+    def prefetch(self, fetch_js: bool = True) -> None:
         """Eagerly download all necessary data.
 
         Eagerly executes all necessary network requests so all other
         operations don't does need to make calls outside of the interpreter
         which blocks for long periods of time.
 
+        :param bool fetch_js:
+            (Optional) Also fetch the base.js of the player; without it only
+            its url is known, and :meth:`descramble` fetches it if ``js`` is
+            not set by then.
         :rtype: None
         """
-        self.watch_html = request.get(url=self.watch_url)
+        self.watch_html = request.get(
+            url=self.watch_url, proxies=self.proxies
+        )
         if self.watch_html is None:
             raise VideoUnavailable(video_id=self.video_id)
         self.age_restricted = extract.is_age_restricted(self.watch_html)
@@ -189,7 +258,9 @@ class YouTube:
 
         if self.age_restricted:
             if not self.embed_html:
-                self.embed_html = request.get(url=self.embed_url)
+                self.embed_html = request.get(
+                    url=self.embed_url, proxies=self.proxies
+                )
             self.vid_info_url = extract.video_info_url_age_restricted(
                 self.video_id, self.watch_url
             )
@@ -198,10 +269,130 @@ class YouTube:
                 video_id=self.video_id, watch_url=self.watch_url
             )
 
-        self.vid_info_raw = request.get(self.vid_info_url)
+        self.vid_info_raw = request.get(
+            self.vid_info_url, proxies=self.proxies
+        )
         if not self.age_restricted:
             self.js_url = extract.js_url(self.watch_html)
-            self.js = request.get(self.js_url)
+            if fetch_js:
+                self.js = request.get(self.js_url, proxies=self.proxies)
+
+    @property
+    def stream_maps(self) -> List[str]:
+        """Keys of the descrambled stream manifests in ``player_config_args``.
+
+        :rtype: List[str]
+        """
+        return [
+            fmt
+            for fmt in ("url_encoded_fmt_stream_map", "adaptive_fmts")
+            if isinstance(self.player_config_args.get(fmt), list)
+        ]
+
+    def extraction_state(self) -> Dict:
+        """Get the descrambled data needed to rebuild this object offline.
+
+        Only the signed stream manifests, the caption track list and the
+        video details are kept; raw html and js are left out.
+
+        :rtype: dict
+        """
+        config_args = {
+            key: self.player_config_args[key]
+            for key in ("title", "length_seconds")
+            if key in self.player_config_args
+        }
+        for fmt in self.stream_maps:
+            config_args[fmt] = [
+                {k: v for k, v in stream.items() if k in _STREAM_KEYS}
+                for stream in self.player_config_args[fmt]
+            ]
+
+        player_response = {
+            "videoDetails": self.player_response.get("videoDetails", {}),
+        }
+        caption_tracks = (
+            self.player_response.get("captions", {})
+            .get("playerCaptionsTracklistRenderer", {})
+            .get("captionTracks")
+        )
+        if caption_tracks:
+            player_response["captions"] = {
+                "playerCaptionsTracklistRenderer": {
+                    "captionTracks": caption_tracks
+                }
+            }
+
+        state = {
+            "video_id": self.video_id,
+            "js_url": self.js_url,
+            "age_restricted": self.age_restricted,
+            "player_config_args": config_args,
+            "player_response": player_response,
+        }
+        if not player_response["videoDetails"].get("shortDescription"):
+            state["description"] = self.description
+        return state
+
+    def load_extraction_state(self, state: Dict) -> None:
+        """Rebuild this object from :meth:`extraction_state` output.
+
+        :param dict state:
+            The extraction state of this video.
+        :rtype: None
+        """
+        self.js_url = state["js_url"]
+        self.age_restricted = state["age_restricted"]
+        self.player_config_args = state["player_config_args"]
+        self.player_response = state["player_response"]
+        if state.get("description"):
+            self.player_response.setdefault("videoDetails", {})[
+                "shortDescription"
+            ] = state["description"]
+
+        self.fmt_streams = []
+        self._stream_query = None
+        for fmt in self.stream_maps:
+            self.initialize_stream_objects(fmt)
+        self.stream_monostate.title = self.title
+        self.stream_monostate.duration = self.length
+
+    def load_from_cache(self) -> bool:
+        """Initialize from the extraction cache, if one is configured.
+
+        Only entries deciphered with the most recently seen player version
+        are used, so a player rollout invalidates the older entries as soon
+        as one fresh extraction has stored data for the new player.
+
+        :rtype: bool
+        :returns:
+            Whether a usable cache entry was found.
+        """
+        if self.cache is None:
+            return False
+        state = self.cache.get(self.video_id, self.cache.player_version())
+        if state is None:
+            return False
+        self.load_extraction_state(state)
+        return True
+
+    def save_to_cache(self) -> None:
+        """Store the extraction state in the cache, if one is configured.
+
+        The entry expires together with the earliest expiring stream url.
+
+        :rtype: None
+        """
+        if self.cache is None or self.js_url is None:
+            return
+        expiries = [url_expiry(s.url) for s in self.fmt_streams]
+        known = [e for e in expiries if e is not None]
+        self.cache.put(
+            self.video_id,
+            extract.player_version(self.js_url),
+            self.extraction_state(),
+            expires=min(known) if known else None,
+        )
 
     def initialize_stream_objects(self, fmt: str) -> None:
         """Convert manifest data to instances of :class:`Stream <Stream>`.
@@ -225,6 +416,7 @@ class YouTube:
                 monostate=self.stream_monostate,
             )
             self.fmt_streams.append(video)
+        self._stream_query = None
 
     @property
     def caption_tracks(self) -> List[Caption]:
@@ -237,7 +429,7 @@ class YouTube:
             .get("playerCaptionsTracklistRenderer", {})
             .get("captionTracks", [])
         )
-        return [Caption(track) for track in raw_tracks]
+        return [Caption(track, self.proxies) for track in raw_tracks]
 
     @property
     def captions(self) -> CaptionQuery:
@@ -251,9 +443,16 @@ class YouTube:
     def streams(self) -> StreamQuery:
         """Interface to query both adaptive (DASH) and progressive streams.
 
+        The query, and the indexes it builds, are kept until the streams
+        change.
+
         :rtype: :class:`StreamQuery <StreamQuery>`.
         """
-        return StreamQuery(self.fmt_streams)
+        if self._stream_query is None or len(self._stream_query) != len(
+            self.fmt_streams
+        ):
+            self._stream_query = StreamQuery(self.fmt_streams)
+        return self._stream_query
 
     @property
     def thumbnail_url(self) -> str:
@@ -354,6 +553,27 @@ class YouTube:
         """
         self.stream_monostate.on_progress = func
 
+    def register_on_progress_event_callback(
+        self, func: OnProgressEvent, interval: float = 0.1
+    ):
+        """Register a download progress event handler post initialization.
+
+        Unlike the progress callback, which runs for every chunk received,
+        the handler gets a :class:`ProgressEvent <pytube.progress.ProgressEvent>`
+        at most once per ``interval`` seconds, and one when the download
+        finishes.
+
+        :param callable func:
+            A callback function that takes a ``ProgressEvent``.
+        :param float interval:
+            Seconds between events.
+
+        :rtype: None
+
+        """
+        self.stream_monostate.on_progress_event = func
+        self.stream_monostate.progress_interval = interval
+
     def register_on_complete_callback(self, func: OnComplete):
         """Register a download complete callback function post initialization.
 
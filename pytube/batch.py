@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+This module extracts many videos at once, using every core.
+
+Extraction has two halves: fetching the watch page and video info, which
+waits on the network, and descrambling them, which is CPU bound (regular
+expressions over the html, large JSON documents, the signature cipher). On
+threads the second half is serialized by the GIL, so :func:`extract` fetches
+on a thread pool and descrambles on a process pool.
+
+Worker processes are kept for the whole batch. Each one keeps the base.js of
+the players it used last, and with it the compiled ciphers, so a player is
+fetched and compiled once per process instead of once per video. Results are
+:mod:`snapshots <pytube.snapshot>`, a few kilobytes each, and are yielded as
+soon as they are ready rather than in input order.
+"""
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from threading import Lock
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+
+from pytube import request
+from pytube import snapshot
+from pytube.__main__ import YouTube
+from pytube.cipher import CIPHER_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# base.js of the most recently used players by url, in each worker process;
+# as many as there are compiled ciphers for them.
+_players: "OrderedDict[str, str]" = OrderedDict()
+_players_lock = Lock()
+
+
+class BatchResult(NamedTuple):
+    """The outcome of extracting one video."""
+
+    url: str
+    #: The :mod:`snapshot <pytube.snapshot>` of the video, ``None`` if
+    #: extraction failed.
+    snapshot: Optional[bytes]
+    #: Description of the error, ``None`` if extraction succeeded.
+    error: Optional[str]
+
+    def youtube(self, **kwargs: Any) -> YouTube:
+        """Rebuild the :class:`YouTube <pytube.YouTube>` object.
+
+        :param kwargs:
+            Extra keyword arguments for the :class:`YouTube
+            <pytube.YouTube>` constructor, such as progress callbacks.
+        :rtype: YouTube
+        """
+        if self.snapshot is None:
+            raise ValueError(f"{self.url} was not extracted: {self.error}")
+        return snapshot.loads(self.snapshot, **kwargs)
+
+
+class _Page(NamedTuple):
+    """What the network half of extraction hands to the CPU half."""
+
+    url: str
+    watch_html: str
+    vid_info_raw: str
+    embed_html: Optional[str]
+    age_restricted: bool
+    js_url: Optional[str]
+
+
+def extract(
+    urls: Iterable[str],
+    threads: int = 16,
+    processes: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[BatchResult]:
+    """Extract videos, yielding the results in completion order.
+
+    Failures are reported in the results instead of being raised, so one
+    unavailable video does not end the batch.
+
+    :param urls:
+        The watch urls; they are consumed as the batch progresses, so a
+        generator of millions of urls is fine.
+    :param int threads:
+        (Optional) Number of pages fetched at the same time.
+    :param int processes:
+        (Optional) Number of worker processes, by default one per core.
+    :param int max_pending:
+        (Optional) Number of videos in flight, fetching or descrambling;
+        bounds memory use. Defaults to twice the threads and processes.
+    :param executor:
+        (Optional) Executor to descramble on instead of a new process pool,
+        e.g.: one shared by several batches.
+    :rtype: Iterator[BatchResult]
+    """
+    processes = processes or os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * (threads + processes)
+    url_iter = iter(urls)
+    fetching: Dict[Future, str] = {}
+    descrambling: Dict[Future, str] = {}
+
+    own_executor = executor is None
+    pool = executor or ProcessPoolExecutor(max_workers=processes)
+    fetcher = ThreadPoolExecutor(max_workers=threads)
+    try:
+
+        def fill() -> None:
+            while len(fetching) + len(descrambling) < max_pending:
+                url = next(url_iter, None)
+                if url is None:
+                    return
+                fetching[fetcher.submit(_fetch, url)] = url
+
+        fill()
+        while fetching or descrambling:
+            done, _ = wait(
+                list(fetching) + list(descrambling),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                if future in fetching:
+                    url = fetching.pop(future)
+                    try:
+                        page = future.result()
+                    except Exception as e:  # pylint: disable=W0703
+                        yield _failed(url, e)
+                        continue
+                    descrambling[pool.submit(_descramble, page)] = url
+                else:
+                    url = descrambling.pop(future)
+                    try:
+                        yield future.result()
+                    except Exception as e:  # pylint: disable=W0703
+                        # e.g.: the worker process died.
+                        yield _failed(url, e)
+            fill()
+    finally:
+        for future in list(fetching) + list(descrambling):
+            future.cancel()
+        fetcher.shutdown()
+        if own_executor:
+            pool.shutdown()
+
+
+def _failed(url: str, error: BaseException) -> BatchResult:
+    logger.debug("extraction of %s failed: %r", url, error)
+    return BatchResult(url, None, f"{type(error).__name__}: {error}")
+
+
+def _fetch(url: str) -> _Page:
+    """Run the network half of extraction, on a thread."""
+    youtube = YouTube(url, defer_prefetch_init=True)
+    # base.js is fetched by the worker processes, once per player.
+    youtube.prefetch(fetch_js=False)
+    return _Page(
+        url=url,
+        watch_html=youtube.watch_html,  # type: ignore
+        vid_info_raw=youtube.vid_info_raw,  # type: ignore
+        embed_html=youtube.embed_html,
+        age_restricted=bool(youtube.age_restricted),
+        js_url=youtube.js_url,
+    )
+
+
+def _descramble(page: _Page) -> BatchResult:
+    """Run the CPU half of extraction, in a worker process."""
+    try:
+        youtube = YouTube(page.url, defer_prefetch_init=True)
+        youtube.watch_html = page.watch_html
+        youtube.vid_info_raw = page.vid_info_raw
+        youtube.embed_html = page.embed_html
+        youtube.age_restricted = page.age_restricted
+        youtube.js_url = page.js_url
+        if page.js_url:
+            youtube.js = _player_js(page.js_url)
+        youtube.descramble()
+        return BatchResult(page.url, snapshot.dumps(youtube), None)
+    except Exception as e:  # pylint: disable=W0703
+        # Exceptions are not always picklable, their description is.
+        return _failed(page.url, e)
+
+
+def _player_js(js_url: str) -> str:
+    """Get the base.js of a player, fetching it once per process.
+
+    The same string is returned on every call, which keeps the lookups of
+    :func:`get_cipher <pytube.cipher.get_cipher>` cheap.
+    """
+    with _players_lock:
+        js = _players.get(js_url)
+        if js is not None:
+            _players.move_to_end(js_url)
+            return js
+    js = request.get(js_url)
+    with _players_lock:
+        js = _players.setdefault(js_url, js)
+        _players.move_to_end(js_url)
+        while len(_players) > CIPHER_CACHE_SIZE:
+            _players.popitem(last=False)
+    return js
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+This module implements a persistent cache for extracted video data.
+
+Building a :class:`YouTube <YouTube>` object requires fetching the watch page,
+the video info and the player's base.js, then descrambling the stream
+manifests. The result of that work is only valid until the signed stream urls
+expire, but within that window it can be reused by any process on the host.
+
+The cache is a single SQLite database keyed by ``video_id`` and player
+version. SQLite takes care of locking, so one database can be shared between
+threads and worker processes.
+
+The database also remembers the most recently seen player version. Once a
+fresh extraction picks up a new player, entries deciphered with an older one
+are no longer served.
+"""
+import json
+import logging
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from typing import Any
+from typing import Dict
+from typing import Optional
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extraction (
+    video_id TEXT NOT NULL,
+    player_version TEXT NOT NULL,
+    expires INTEGER NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (video_id, player_version)
+)
+"""
+
+_PLAYER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS player (
+    version TEXT PRIMARY KEY,
+    seen REAL NOT NULL
+)
+"""
+
+
+def default_cache_path() -> str:
+    """Get the default location of the extraction cache database.
+
+    :rtype: str
+    :returns:
+        Path inside ``$XDG_CACHE_HOME`` (or ``~/.cache``).
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "pytube", "extraction.sqlite3")
+
+
+def url_expiry(url: str) -> Optional[int]:
+    """Get the ``expire`` timestamp of a signed stream url.
+
+    :param str url:
+        A signed stream url.
+    :rtype: int or None
+    :returns:
+        Unix timestamp after which the url stops working, if present.
+    """
+    try:
+        return int(parse_qs(urlparse(url).query)["expire"][0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+class ExtractionCache:
+    """Size-bounded, expiring on-disk cache of extracted video data."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_ttl: int = 6 * 60 * 60,
+        expiry_margin: int = 5 * 60,
+    ):
+        """Construct an :class:`ExtractionCache <ExtractionCache>`.
+
+        :param str path:
+            (optional) Location of the SQLite database. Defaults to
+            :func:`default_cache_path`.
+        :param int max_bytes:
+            Upper bound for the total size of stored entries. The least
+            recently used entries are evicted once it is exceeded.
+        :param int max_ttl:
+            Maximum number of seconds an entry is kept, even if the stream
+            urls it contains are valid for longer.
+        :param int expiry_margin:
+            Number of seconds before the stream urls expire at which an entry
+            is considered stale.
+        """
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+        self.expiry_margin = expiry_margin
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute(_PLAYER_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # autocommit mode, transactions are opened explicitly for writes.
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def get(
+        self, video_id: str, player_version: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Look up the extracted data of a video.
+
+        :param str video_id:
+            A YouTube video identifier.
+        :param str player_version:
+            (optional) Only accept entries extracted with this player version.
+        :rtype: dict or None
+        :returns:
+            The stored extraction state, or None on a cache miss.
+        """
+        now = time.time()
+        query = "SELECT rowid, data FROM extraction WHERE video_id = ?"
+        params: list = [video_id]
+        if player_version is not None:
+            query += " AND player_version = ?"
+            params.append(player_version)
+        query += " AND expires > ? ORDER BY accessed DESC LIMIT 1"
+        params.append(int(now))
+
+        with closing(self._connect()) as conn:
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                logger.debug("extraction cache miss for %s", video_id)
+                return None
+            rowid, data = row
+            conn.execute(
+                "UPDATE extraction SET accessed = ? WHERE rowid = ?",
+                (now, rowid),
+            )
+        logger.debug("extraction cache hit for %s", video_id)
+        return json.loads(zlib.decompress(data).decode("utf-8"))
+
+    def player_version(self) -> Optional[str]:
+        """Get the most recently seen player version.
+
+        :rtype: str or None
+        :returns:
+            Version of the player used by the newest stored extraction, or
+            None if nothing was stored yet.
+        """
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT version FROM player ORDER BY seen DESC LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self,
+        video_id: str,
+        player_version: str,
+        state: Dict[str, Any],
+        expires: Optional[int] = None,
+    ) -> None:
+        """Store the extracted data of a video.
+
+        :param str video_id:
+            A YouTube video identifier.
+        :param str player_version:
+            Version of the player the stream urls were deciphered with.
+        :param dict state:
+            JSON serializable extraction state.
+        :param int expires:
+            (optional) Unix timestamp at which the stream urls expire.
+        """
+        now = time.time()
+        deadline = int(now) + self.max_ttl
+        if expires is not None:
+            deadline = min(deadline, expires - self.expiry_margin)
+        if deadline <= now:
+            logger.debug("not caching %s, stream urls expire too soon", video_id)
+            return
+
+        data = zlib.compress(json.dumps(state).encode("utf-8"))
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extraction "
+                    "(video_id, player_version, expires, accessed, size, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (video_id, player_version, deadline, now, len(data), data),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO player (version, seen) "
+                    "VALUES (?, ?)",
+                    (player_version, now),
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM extraction WHERE expires <= ?", (int(now),))
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM extraction"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT rowid, size FROM extraction ORDER BY accessed"
+        ).fetchall()
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM extraction WHERE rowid = ?", (rowid,))
+            total -= size
+            logger.debug("evicted extraction cache entry %s", rowid)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache.
+
+        :rtype: None
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("DELETE FROM extraction")
+            conn.execute("DELETE FROM player")
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM extraction WHERE expires > ?",
+                (int(time.time()),),
+            ).fetchone()
+        return count
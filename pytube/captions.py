@@ -10,17 +10,23 @@ from typing import Optional
 from pytube import request
 from pytube.helpers import safe_filename
 from pytube.helpers import target_directory
+from pytube.proxy import ProxyPool
 
 
 class Caption:
     """Container for caption tracks."""
 
-    def __init__(self, caption_track: Dict):
+    def __init__(
+        self, caption_track: Dict, proxies: Optional[ProxyPool] = None
+    ):
         """Construct a :class:`Caption <Caption>`.
 
         :param dict caption_track:
             Caption track data extracted from ``watch_html``.
+        :param ProxyPool proxies:
+            (Optional) Proxies to download the captions through.
         """
+        self.proxies = proxies
         self.url = caption_track.get("baseUrl")
         self.name = caption_track["name"]["simpleText"]
         self.code = caption_track["languageCode"]
@@ -28,7 +34,7 @@ class Caption:
     @property
     def xml_captions(self) -> str:
         """Download the xml caption tracks."""
-        return request.get(self.url)
+        return request.get(self.url, proxies=self.proxies)
 
     def generate_srt_captions(self) -> str:
         """Generate "SubRip Subtitle" captions.
@@ -12,23 +12,48 @@ This module is responsible for (1) finding and extracting those "transform
 functions" (2) maps them to Python equivalents and (3) taking the ciphered
 signature and decoding it.
 
+Media urls also carry an ``n`` parameter which must be transformed by another
+player function, otherwise the download is throttled. That function is too
+irregular to map onto Python equivalents, so it is evaluated with
+:mod:`pytube.jsinterp` instead.
+
 """
 import logging
 import re
+import threading
+from collections import OrderedDict
 from itertools import chain
 from typing import Any
 from typing import Callable
 from typing import Dict
 from typing import List
+from typing import Match
+from typing import NamedTuple
 from typing import Optional
+from typing import Pattern
 from typing import Tuple
 
 from pytube.exceptions import RegexMatchError
 from pytube.helpers import cache
 from pytube.helpers import regex_search
+from pytube.helpers import SingleFlight
+from pytube.jsinterp import find_function_code
+from pytube.jsinterp import JSFunction
+from pytube.jsinterp import JSInterpreter
+from pytube.jsinterp import JSInterpreterError
+from pytube.jsinterp import JSThrow
 
 logger = logging.getLogger(__name__)
 
+# Number of players whose compiled :class:`Cipher <Cipher>` is kept around.
+CIPHER_CACHE_SIZE = 8
+# Number of transformed ``n`` parameters kept by each cipher.
+N_CACHE_SIZE = 256
+
+_ciphers: "OrderedDict[str, Cipher]" = OrderedDict()
+_ciphers_lock = threading.Lock()
+_cipher_flight = SingleFlight()
+
 
 class Cipher:
     def __init__(self, js: str):
@@ -37,6 +62,64 @@ class Cipher:
         self.transform_map = get_transform_map(js, var)
         self.js_func_regex = re.compile(r"\w+\.(\w+)\(\w,(\d+)\)")
 
+        # The throttling function is only compiled once a url needs it.
+        self._js = js
+        self._throttling_function: Optional[JSFunction] = None
+        self._throttling_function_loaded = False
+        self._throttling_lock = threading.Lock()
+        self._n_cache: "OrderedDict[str, str]" = OrderedDict()
+
+    @property
+    def throttling_function(self) -> Optional[JSFunction]:
+        """The compiled ``n`` parameter transform, if the player has one.
+
+        :rtype: JSFunction or None
+        """
+        with self._throttling_lock:
+            if not self._throttling_function_loaded:
+                try:
+                    code = get_throttling_function_code(self._js)
+                    self._throttling_function = JSInterpreter().function(code)
+                except (RegexMatchError, JSInterpreterError) as e:
+                    logger.debug("no usable throttling function: %s", e)
+                self._throttling_function_loaded = True
+                self._js = None  # type: ignore
+        return self._throttling_function
+
+    def calculate_n(self, n: str) -> str:
+        """Transform the ``n`` (throttling) url parameter.
+
+        :param str n:
+            The ``n`` parameter of a media url.
+        :rtype: str
+        :returns:
+            The transformed parameter, or the original one if the player has
+            no throttling function or evaluating it failed.
+        """
+        with self._throttling_lock:
+            result = self._n_cache.get(n)
+            if result is not None:
+                self._n_cache.move_to_end(n)
+                return result
+        function = self.throttling_function
+        if function is None:
+            return n
+        with self._throttling_lock:
+            try:
+                result = function(n)
+            except (JSInterpreterError, JSThrow) as e:
+                logger.warning("throttling function failed: %s", e)
+                return n
+            if not isinstance(result, str) or result.startswith(
+                "enhanced_except"
+            ):
+                logger.warning("throttling function rejected n=%s", n)
+                return n
+            self._n_cache[n] = result
+            while len(self._n_cache) > N_CACHE_SIZE:
+                self._n_cache.popitem(last=False)
+        return result
+
     def get_signature(self, ciphered_signature: str) -> str:
         """Decipher the signature.
 
@@ -96,42 +179,250 @@ class Cipher:
         return fn_name, int(fn_arg)
 
 
+def get_cipher(js: str) -> Cipher:
+    """Get the :class:`Cipher <Cipher>` for a player, building it only once.
+
+    Compiled ciphers are cached for the most recently used players, and
+    concurrent requests for the same player share a single construction.
+
+    :param str js:
+        The contents of the base.js asset file.
+    :rtype: Cipher
+    """
+    with _ciphers_lock:
+        cipher = _ciphers.get(js)
+        if cipher is not None:
+            _ciphers.move_to_end(js)
+            return cipher
+    return _cipher_flight.do(js, _build_cipher, js)
+
+
+def _build_cipher(js: str) -> Cipher:
+    cipher = Cipher(js=js)
+    with _ciphers_lock:
+        _ciphers[js] = cipher
+        while len(_ciphers) > CIPHER_CACHE_SIZE:
+            _ciphers.popitem(last=False)
+    return cipher
+
+
+class _FunctionPattern(NamedTuple):
+    """A pattern of the signature function bank.
+
+    The regex only runs on a window around each occurrence of ``literal``
+    (``before`` characters ahead of it, ``after`` characters past it) instead
+    of over the whole base.js. An ``after`` of ``None`` extends the window to
+    the end of the file.
+    """
+
+    regex: Pattern
+    literal: str
+    before: int
+    after: Optional[int]
+
+
+def _search_window(pattern: _FunctionPattern, js: str) -> Optional[Match]:
+    literal = pattern.literal
+    offset = js.find(literal)
+    while offset != -1:
+        end = len(js)
+        if pattern.after is not None:
+            end = min(end, offset + len(literal) + pattern.after)
+        match = pattern.regex.search(js, max(0, offset - pattern.before), end)
+        if match:
+            return match
+        offset = js.find(literal, offset + 1)
+    return None
+
+
+_INITIAL_FUNCTION_PATTERNS = tuple(
+    _FunctionPattern(re.compile(pattern), literal, before, after)
+    for pattern, literal, before, after in (
+        (
+            r"\b[cs]\s*&&\s*[adf]\.set\([^,]+\s*,\s*encodeURIComponent\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
+            "encodeURIComponent",
+            128,
+            64,
+        ),
+        (
+            r"\b[a-zA-Z0-9]+\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*encodeURIComponent\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
+            "encodeURIComponent",
+            128,
+            64,
+        ),
+        (
+            r'(?:\b|[^a-zA-Z0-9$])(?P<sig>[a-zA-Z0-9$]{2})\s*=\s*function\(\s*a\s*\)\s*{\s*a\s*=\s*a\.split\(\s*""\s*\)',  # noqa: E501
+            ".split(",
+            64,
+            16,
+        ),
+        (
+            r'(?P<sig>[a-zA-Z0-9$]+)\s*=\s*function\(\s*a\s*\)\s*{\s*a\s*=\s*a\.split\(\s*""\s*\)',  # noqa: E501
+            ".split(",
+            64,
+            16,
+        ),
+        (
+            r'(["\'])signature\1\s*,\s*(?P<sig>[a-zA-Z0-9$]+)\(',
+            "signature",
+            1,
+            64,
+        ),
+        (r"\.sig\|\|(?P<sig>[a-zA-Z0-9$]+)\(", ".sig||", 0, 64),
+        (
+            r"yt\.akamaized\.net/\)\s*\|\|\s*.*?\s*[cs]\s*&&\s*[adf]\.set\([^,]+\s*,\s*(?:encodeURIComponent\s*\()?\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
+            "yt.akamaized.net/)",
+            0,
+            None,
+        ),
+        (
+            r"\b[cs]\s*&&\s*[adf]\.set\([^,]+\s*,\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
+            ".set(",
+            64,
+            128,
+        ),
+        (
+            r"\b[a-zA-Z0-9]+\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
+            ".set(",
+            64,
+            128,
+        ),
+        (
+            r"\bc\s*&&\s*a\.set\([^,]+\s*,\s*\([^)]*\)\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
+            ".set(",
+            64,
+            128,
+        ),
+        (
+            r"\bc\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*\([^)]*\)\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
+            ".set(",
+            64,
+            128,
+        ),
+    )
+)
+
+# Index of the pattern that matched, keyed by the hash of the player, so a
+# player whose cipher was evicted from the cache is matched in one attempt.
+_initial_function_winners: "OrderedDict[int, int]" = OrderedDict()
+
+
 def get_initial_function_name(js: str) -> str:
     """Extract the name of the function responsible for computing the signature.
+
+    The patterns only run on small windows around literal substrings they
+    require, with the pattern that matched this player before tried first.
+    If no window matches, every pattern is run over the whole file.
+
     :param str js:
         The contents of the base.js asset file.
     :rtype: str
     :returns:
        Function name from regex match
     """
-
-    function_patterns = [
-        r"\b[cs]\s*&&\s*[adf]\.set\([^,]+\s*,\s*encodeURIComponent\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-        r"\b[a-zA-Z0-9]+\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*encodeURIComponent\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-        r'(?:\b|[^a-zA-Z0-9$])(?P<sig>[a-zA-Z0-9$]{2})\s*=\s*function\(\s*a\s*\)\s*{\s*a\s*=\s*a\.split\(\s*""\s*\)', # noqa: E501
-        r'(?P<sig>[a-zA-Z0-9$]+)\s*=\s*function\(\s*a\s*\)\s*{\s*a\s*=\s*a\.split\(\s*""\s*\)',  # noqa: E501
-        r'(["\'])signature\1\s*,\s*(?P<sig>[a-zA-Z0-9$]+)\(',
-        r"\.sig\|\|(?P<sig>[a-zA-Z0-9$]+)\(",
-        r"yt\.akamaized\.net/\)\s*\|\|\s*.*?\s*[cs]\s*&&\s*[adf]\.set\([^,]+\s*,\s*(?:encodeURIComponent\s*\()?\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-        r"\b[cs]\s*&&\s*[adf]\.set\([^,]+\s*,\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-        r"\b[a-zA-Z0-9]+\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-        r"\bc\s*&&\s*a\.set\([^,]+\s*,\s*\([^)]*\)\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-        r"\bc\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*\([^)]*\)\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-        r"\bc\s*&&\s*[a-zA-Z0-9]+\.set\([^,]+\s*,\s*\([^)]*\)\s*\(\s*(?P<sig>[a-zA-Z0-9$]+)\(",  # noqa: E501
-    ]
     logger.debug("finding initial function name")
-    for pattern in function_patterns:
-        regex = re.compile(pattern)
-        function_match = regex.search(js)
+    player = hash(js)
+    order = list(range(len(_INITIAL_FUNCTION_PATTERNS)))
+    winner = _initial_function_winners.get(player)
+    if winner is not None:
+        order.insert(0, order.pop(winner))
+    for i in order:
+        function_match = _search_window(_INITIAL_FUNCTION_PATTERNS[i], js)
+        if function_match:
+            logger.debug(
+                "finished regex search, matched: %s",
+                _INITIAL_FUNCTION_PATTERNS[i].regex.pattern,
+            )
+            with _ciphers_lock:
+                _initial_function_winners[player] = i
+                _initial_function_winners.move_to_end(player)
+                while len(_initial_function_winners) > 4 * CIPHER_CACHE_SIZE:
+                    _initial_function_winners.popitem(last=False)
+            return function_match.group("sig")
+
+    for pattern in _INITIAL_FUNCTION_PATTERNS:
+        function_match = pattern.regex.search(js)
         if function_match:
-            logger.debug("finished regex search, matched: %s", pattern)
-            return function_match.group(1)
+            logger.debug(
+                "finished full regex search, matched: %s", pattern.regex.pattern
+            )
+            return function_match.group("sig")
 
     raise RegexMatchError(
         caller="get_initial_function_name", pattern="multiple"
     )
 
 
+_THROTTLING_FUNCTION_PATTERNS = (
+    _FunctionPattern(
+        re.compile(
+            r'\.get\("n"\)\)&&\(b=(?P<sig>[a-zA-Z0-9$]+)(?:\[(?P<idx>\d+)\])?'
+            r"\([a-zA-Z0-9]\)"
+        ),
+        '.get("n"))&&(b=',
+        0,
+        64,
+    ),
+    _FunctionPattern(
+        re.compile(
+            r"b=String\.fromCharCode\(110\),c=a\.get\(b\)\)&&\(c="
+            r"(?P<sig>[a-zA-Z0-9$]+)(?:\[(?P<idx>\d+)\])?\([a-zA-Z0-9]\)"
+        ),
+        "String.fromCharCode(110),c=a.get(b))&&(c=",
+        2,
+        64,
+    ),
+)
+
+
+def get_throttling_function_name(js: str) -> str:
+    """Extract the name of the function that computes the ``n`` parameter.
+
+    :param str js:
+        The contents of the base.js asset file.
+    :rtype: str
+    :returns:
+        The name of the function, resolving array lookups such as
+        ``Xma[0]`` to the function stored in the array.
+    """
+    logger.debug("finding throttling function name")
+    for pattern in _THROTTLING_FUNCTION_PATTERNS:
+        function_match = _search_window(pattern, js)
+        if not function_match:
+            continue
+        logger.debug(
+            "finished regex search, matched: %s", pattern.regex.pattern
+        )
+        name, idx = function_match.group("sig", "idx")
+        if idx is None:
+            return name
+        array = regex_search(
+            r"var %s\s*=\s*\[(.+?)\];" % re.escape(name), js, group=1
+        )
+        return array.split(",")[int(idx)].strip()
+
+    raise RegexMatchError(
+        caller="get_throttling_function_name", pattern="multiple"
+    )
+
+
+def get_throttling_function_code(js: str) -> str:
+    """Extract the source of the ``n`` parameter function.
+
+    :param str js:
+        The contents of the base.js asset file.
+    :rtype: str
+    :returns:
+        The function as a JavaScript function expression.
+    """
+    return find_function_code(js, get_throttling_function_name(js))
+
+
+_TRANSFORM_PLAN_REGEX = re.compile(
+    r"=function\(\w\){[a-z=\.\(\"\)]*;(.*);(?:.+)}"
+)
+
+
 def get_transform_plan(js: str) -> List[str]:
     """Extract the "transform plan".
 
@@ -152,10 +443,25 @@ def get_transform_plan(js: str) -> List[str]:
     'DE.VR(a,3)',
     'DE.kT(a,21)']
     """
-    name = re.escape(get_initial_function_name(js))
-    pattern = f"{name}" + r"=function\(\w\){[a-z=\.\(\"\)]*;(.*);(?:.+)}"
+    name = get_initial_function_name(js)
     logger.debug("getting transform plan")
-    return regex_search(pattern, js, group=1).split(";")
+    # Only the definition of the function is matched, so look for it with
+    # ``str.find`` and run the regex on that line alone.
+    definition = name + "=function("
+    offset = js.find(definition)
+    while offset != -1:
+        end = js.find("\n", offset)
+        plan_match = _TRANSFORM_PLAN_REGEX.match(
+            js, offset + len(name), len(js) if end == -1 else end
+        )
+        if plan_match:
+            return plan_match.group(1).split(";")
+        offset = js.find(definition, offset + 1)
+
+    raise RegexMatchError(
+        caller="get_transform_plan",
+        pattern=re.escape(name) + _TRANSFORM_PLAN_REGEX.pattern,
+    )
 
 
 def get_transform_object(js: str, var: str) -> List[str]:
@@ -180,14 +486,18 @@ def get_transform_object(js: str, var: str) -> List[str]:
     'kT:function(a,b){var c=a[0];a[0]=a[b%a.length];a[b]=c}']
 
     """
-    pattern = r"var %s={(.*?)};" % re.escape(var)
     logger.debug("getting transform object")
-    regex = re.compile(pattern, flags=re.DOTALL)
-    transform_match = regex.search(js)
-    if not transform_match:
-        raise RegexMatchError(caller="get_transform_object", pattern=pattern)
+    # Equivalent to matching r"var %s={(.*?)};" with re.DOTALL.
+    start = js.find("var %s={" % var)
+    end = js.find("};", start)
+    if start == -1 or end == -1:
+        raise RegexMatchError(
+            caller="get_transform_object",
+            pattern=r"var %s={(.*?)};" % re.escape(var),
+        )
 
-    return transform_match.group(1).replace("\n", " ").split(", ")
+    body = js[start + len(var) + 6 : end]
+    return body.replace("\n", " ").split(", ")
 
 
 def get_transform_map(js: str, var: str) -> Dict:
@@ -268,6 +578,28 @@ def swap(arr: List, b: int):
     return list(chain([arr[r]], arr[1:r], [arr[0]], arr[r + 1 :]))
 
 
+_TRANSFORM_FUNCTIONS = (
+    # function(a){a.reverse()}
+    (re.compile(r"{\w\.reverse\(\)}"), reverse),
+    # function(a,b){a.splice(0,b)}
+    (re.compile(r"{\w\.splice\(0,\w\)}"), splice),
+    # function(a,b){var c=a[0];a[0]=a[b%a.length];a[b]=c}
+    (
+        re.compile(
+            r"{var\s\w=\w\[0\];\w\[0\]=\w\[\w\%\w.length\];\w\[\w\]=\w}"
+        ),
+        swap,
+    ),
+    # function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}
+    (
+        re.compile(
+            r"{var\s\w=\w\[0\];\w\[0\]=\w\[\w\%\w.length\];\w\[\w\%\w.length\]=\w}"  # noqa: E501
+        ),
+        swap,
+    ),
+)
+
+
 def map_functions(js_func: str) -> Callable:
     """For a given JavaScript transform function, return the Python equivalent.
 
@@ -275,21 +607,7 @@ def map_functions(js_func: str) -> Callable:
         The JavaScript version of the transform function.
 
     """
-    mapper = (
-        # function(a){a.reverse()}
-        (r"{\w\.reverse\(\)}", reverse),
-        # function(a,b){a.splice(0,b)}
-        (r"{\w\.splice\(0,\w\)}", splice),
-        # function(a,b){var c=a[0];a[0]=a[b%a.length];a[b]=c}
-        (r"{var\s\w=\w\[0\];\w\[0\]=\w\[\w\%\w.length\];\w\[\w\]=\w}", swap),
-        # function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}
-        (
-            r"{var\s\w=\w\[0\];\w\[0\]=\w\[\w\%\w.length\];\w\[\w\%\w.length\]=\w}",
-            swap,
-        ),
-    )
-
-    for pattern, fn in mapper:
-        if re.search(pattern, js_func):
+    for regex, fn in _TRANSFORM_FUNCTIONS:
+        if regex.search(js_func):
             return fn
     raise RegexMatchError(caller="map_functions", pattern="multiple")
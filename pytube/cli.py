@@ -10,17 +10,31 @@ import os
 import shutil
 import subprocess  # nosec
 import sys
+import threading
+from typing import Callable
+from typing import Iterable
 from typing import List
 from typing import Optional
+from typing import Sequence
+from typing import Tuple
 
 from pytube import __version__
+from pytube import Caption
 from pytube import CaptionQuery
+from pytube import jobs
+from pytube import mux
 from pytube import Playlist
+from pytube import request
 from pytube import Stream
 from pytube import YouTube
+from pytube.exceptions import DownloadCancelled
 from pytube.exceptions import PytubeError
+from pytube.helpers import run_concurrently
 from pytube.helpers import safe_filename
 from pytube.helpers import setup_logger
+from pytube.jobs import JobQueue
+from pytube.progress import ProgressEvent
+from pytube.progress import ProgressReporter
 
 
 def main():
@@ -36,7 +50,25 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    if "/playlist" in args.url:
+    if args.queue:
+        if args.resolution or args.audio or args.ffmpeg:
+            # Queued jobs download streams by itag.
+            parser.error(
+                "--queue only takes --itag, not --resolution, --audio or "
+                "--ffmpeg"
+            )
+        if (
+            args.list
+            or args.build_playback_report
+            or hasattr(args, "caption_code")
+        ):
+            # Queued jobs only download streams, nothing is fetched upfront.
+            parser.error(
+                "--queue can't be combined with --list, --caption-code or "
+                "--build-playback-report"
+            )
+        queue_downloads(args)
+    elif "/playlist" in args.url:
         print("Loading playlist...")
         playlist = Playlist(args.url)
         if not args.target:
@@ -62,7 +94,9 @@ def _perform_args_on_youtube(
         build_playback_report(youtube)
     if args.itag:
         download_by_itag(youtube=youtube, itag=args.itag, target=args.target)
-    if hasattr(args, "caption_code"):
+    # Captions of a ffmpeg download are fetched along with its streams.
+    caption_code = getattr(args, "caption_code", None) if args.ffmpeg else None
+    if hasattr(args, "caption_code") and not caption_code:
         download_caption(
             youtube=youtube, lang_code=args.caption_code, target=args.target
         )
@@ -76,7 +110,10 @@ def _perform_args_on_youtube(
         )
     if args.ffmpeg:
         ffmpeg_process(
-            youtube=youtube, resolution=args.ffmpeg, target=args.target
+            youtube=youtube,
+            resolution=args.ffmpeg,
+            target=args.target,
+            caption_code=caption_code,
         )
 
 
@@ -160,10 +197,75 @@ def _parse_args(
             "Runs the command line program ffmpeg to combine the audio and video"
         ),
     )
+    parser.add_argument(
+        "--queue",
+        metavar="DATABASE",
+        help=(
+            "Add the video, or the videos of the playlist, to a persistent "
+            "download queue and work it. Interrupted jobs resume and "
+            "finished jobs are skipped when run again. Streams are chosen "
+            "with --itag, the highest resolution by default"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="The number of queued jobs downloaded at the same time",
+    )
+    parser.add_argument(
+        "--priority",
+        type=int,
+        default=0,
+        help="The priority of the queued jobs, higher ones run first",
+    )
 
     return parser.parse_args(args)
 
 
+def queue_downloads(args: argparse.Namespace) -> None:
+    """Add the url to a download queue, then work the queue.
+
+    :param args:
+        The parsed command line arguments.
+    """
+    if "/playlist" in args.url:
+        print("Loading playlist...")
+        playlist = Playlist(args.url)
+        if not args.target:
+            args.target = safe_filename(playlist.title())
+        urls = playlist.video_urls
+    else:
+        urls = [args.url]
+
+    with JobQueue(args.queue) as queue:
+        for url in urls:
+            queue.add(
+                url,
+                itags=[args.itag] if args.itag else [],
+                target=args.target,
+                priority=args.priority,
+            )
+        counts = queue.counts()
+        print(
+            f"{counts[jobs.PENDING]} jobs to download, "
+            f"{counts[jobs.DONE]} done before"
+        )
+        try:
+            queue.work(workers=args.workers)
+        except KeyboardInterrupt:
+            print("Stopped, run again to resume")
+            raise
+        for job in queue.jobs():
+            if job.state == jobs.DONE and job.throughput:
+                print(
+                    f"{job.url} | {job.bytes // 1048576} MB in "
+                    f"{job.run_time:.1f}s | {job.throughput / 1048576:.2f} MB/s"
+                )
+            elif job.state == jobs.FAILED:
+                print(f"{job.url} | failed: {job.error}")
+
+
 def build_playback_report(youtube: YouTube) -> None:
     """Serialize the request data to json for offline debugging.
 
@@ -232,6 +334,10 @@ def on_progress(
     display_progress_bar(bytes_received, filesize)
 
 
+def on_progress_event(event: ProgressEvent) -> None:
+    display_progress_bar(event.bytes_done, event.total or event.bytes_done or 1)
+
+
 def _download(
     stream: Stream,
     target: Optional[str] = None,
@@ -248,6 +354,81 @@ def _download(
     sys.stdout.write("\n")
 
 
+def _download_concurrently(
+    downloads: List[Tuple[Stream, str]],
+    target: str,
+    tasks: Sequence[Callable[[threading.Event], object]] = (),
+) -> List[str]:
+    """Download several streams at the same time.
+
+    If one of the downloads fails, the others are stopped and every partial
+    file is removed.
+
+    :param downloads:
+        The streams to download, with the filename (stem only) of each.
+    :param str target:
+        Target directory for download.
+    :param tasks:
+        (Optional) Other tasks to run at the same time, e.g.: fetching the
+        captions, see :func:`run_concurrently
+        <pytube.helpers.run_concurrently>`.
+    :rtype: List[str]
+    :returns:
+        The paths of the downloaded files, in order.
+    """
+    # A single progress bar for all the streams.
+    progress = ProgressReporter(
+        on_progress_event, total=sum(stream.filesize for stream, _ in downloads)
+    )
+    for stream, filename in downloads:
+        filesize_megabytes = stream.filesize // 1048576
+        print(f"{filename} | {filesize_megabytes} MB")
+
+    def download_task(stream: Stream, filename: str):
+        def task(cancel: threading.Event) -> str:
+            file_path = stream.get_file_path(
+                filename=filename, output_path=target
+            )
+            chunks: Optional[Iterable[bytes]] = None
+            created = False
+            try:
+                with open(file_path, "wb") as fh:
+                    created = True
+                    if stream.is_otf:
+                        chunks = request.seq_stream(
+                            stream.url, proxies=stream.proxies
+                        )
+                    else:
+                        chunks = request.stream(
+                            stream.url, proxies=stream.proxies
+                        )
+                    for chunk in chunks:
+                        if cancel.is_set():
+                            raise DownloadCancelled()
+                        fh.write(chunk)
+                        progress.update(len(chunk))
+            except BaseException:
+                # Release the connection now rather than once collected.
+                getattr(chunks, "close", lambda: None)()
+                # The failure may have come before the file was created.
+                if created and os.path.exists(file_path):
+                    os.unlink(file_path)
+                raise
+            return file_path
+
+        return task
+
+    try:
+        results = run_concurrently(
+            [download_task(stream, name) for stream, name in downloads]
+            + list(tasks)
+        )
+        progress.finish()
+        return results[: len(downloads)]
+    finally:
+        sys.stdout.write("\n")
+
+
 def _unique_name(base: str, subtype: str, media_type: str, target: str) -> str:
     """
     Given a base name, the file format, and the target directory, will generate
@@ -271,7 +452,10 @@ def _unique_name(base: str, subtype: str, media_type: str, target: str) -> str:
 
 
 def ffmpeg_process(
-    youtube: YouTube, resolution: str, target: Optional[str] = None
+    youtube: YouTube,
+    resolution: str,
+    target: Optional[str] = None,
+    caption_code: Optional[str] = None,
 ) -> None:
     """
     Decides the correct video stream to download, then calls _ffmpeg_downloader.
@@ -282,8 +466,10 @@ def ffmpeg_process(
         YouTube video resolution.
     :param str target:
         Target directory for download
+    :param str caption_code:
+        (Optional) Language code of a caption to download with the streams.
     """
-    youtube.register_on_progress_callback(on_progress)
+    youtube.register_on_progress_event_callback(on_progress_event)
     target = target or os.getcwd()
 
     if resolution == "best":
@@ -323,27 +509,66 @@ def ffmpeg_process(
     if not audio_stream:
         print("Could not find an audio only stream")
         sys.exit()
+    caption = None
+    if caption_code:
+        try:
+            caption = youtube.captions[caption_code]
+        except KeyError:
+            print(f"Unable to find caption with code: {caption_code}")
+            _print_available_captions(youtube.captions)
     _ffmpeg_downloader(
-        audio_stream=audio_stream, video_stream=video_stream, target=target
+        audio_stream=audio_stream,
+        video_stream=video_stream,
+        target=target,
+        caption=caption,
     )
 
 
 def _ffmpeg_downloader(
-    audio_stream: Stream, video_stream: Stream, target: str
+    audio_stream: Stream,
+    video_stream: Stream,
+    target: str,
+    caption: Optional[Caption] = None,
 ) -> None:
     """
     Given a YouTube Stream object, finds the correct audio stream, downloads them both
-    giving them a unique name, them uses ffmpeg to create a new file with the audio
+    at the same time giving them a unique name, them uses ffmpeg to create a new file with the audio
     and video from the previously downloaded files. Then deletes the original adaptive
     streams, leaving the combination.
 
+    Where named pipes are available, both streams are instead fed to ffmpeg
+    while they download and no intermediate files are written.
+
     :param Stream audio_stream:
         A valid Stream object representing the audio to download
     :param Stream video_stream:
         A valid Stream object representing the video to download
     :param Path target:
         A valid Path object
+    :param Caption caption:
+        (Optional) A caption to download at the same time as the streams
     """
+    final_path = os.path.join(
+        target, f"{safe_filename(video_stream.title)}.{video_stream.subtype}"
+    )
+    tasks = []
+    if caption is not None:
+        tasks.append(_caption_task(caption, video_stream.title, target))
+    if mux.supported():
+        print("Loading video and audio...")
+        run_concurrently(
+            [
+                lambda cancel: mux.mux_streams(
+                    video_stream=video_stream,
+                    audio_stream=audio_stream,
+                    output_path=final_path,
+                )
+            ]
+            + tasks
+        )
+        sys.stdout.write("\n")
+        return
+
     video_unique_name = _unique_name(
         safe_filename(video_stream.title),
         video_stream.subtype,
@@ -356,18 +581,11 @@ def _ffmpeg_downloader(
         "audio",
         target=target,
     )
-    _download(stream=video_stream, target=target, filename=video_unique_name)
-    print("Loading audio...")
-    _download(stream=audio_stream, target=target, filename=audio_unique_name)
-
-    video_path = os.path.join(
-        target, f"{video_unique_name}.{video_stream.subtype}"
-    )
-    audio_path = os.path.join(
-        target, f"{audio_unique_name}.{audio_stream.subtype}"
-    )
-    final_path = os.path.join(
-        target, f"{safe_filename(video_stream.title)}.{video_stream.subtype}"
+    print("Loading video and audio...")
+    video_path, audio_path = _download_concurrently(
+        [(video_stream, video_unique_name), (audio_stream, audio_unique_name)],
+        target=target,
+        tasks=tasks,
     )
 
     subprocess.run(  # nosec
@@ -386,6 +604,22 @@ def _ffmpeg_downloader(
     os.unlink(audio_path)
 
 
+def _caption_task(
+    caption: Caption, title: str, target: str
+) -> Callable[[threading.Event], str]:
+    """Make a task of :func:`run_concurrently
+    <pytube.helpers.run_concurrently>` downloading a caption."""
+
+    def task(cancel: threading.Event) -> str:
+        if cancel.is_set():
+            raise DownloadCancelled()
+        path = caption.download(title=title, output_path=target)
+        print(f"Saved caption file to: {path}")
+        return path
+
+    return task
+
+
 def download_by_itag(
     youtube: YouTube, itag: int, target: Optional[str] = None
 ) -> None:
@@ -405,7 +639,7 @@ def download_by_itag(
         display_streams(youtube)
         sys.exit()
 
-    youtube.register_on_progress_callback(on_progress)
+    youtube.register_on_progress_event_callback(on_progress_event)
 
     try:
         _download(stream, target=target)
@@ -433,7 +667,7 @@ def download_by_resolution(
         display_streams(youtube)
         sys.exit()
 
-    youtube.register_on_progress_callback(on_progress)
+    youtube.register_on_progress_event_callback(on_progress_event)
 
     try:
         _download(stream, target=target)
@@ -512,7 +746,7 @@ def download_audio(
         display_streams(youtube)
         sys.exit()
 
-    youtube.register_on_progress_callback(on_progress)
+    youtube.register_on_progress_event_callback(on_progress_event)
 
     try:
         _download(audio, target=target)
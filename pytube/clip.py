@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+"""
+This module cuts clips out of adaptive streams without downloading them.
+
+Adaptive (DASH) streams are split into independently decodable segments and
+come with a segment index: a ``sidx`` box for mp4 and a ``Cues`` element for
+webm. The manifest gives the byte ranges of the initialization data
+(``initRange``) and of the index (``indexRange``), so a clip only needs
+those two small ranges plus the media segments overlapping the wanted time
+span, fetched in parallel.
+
+Segments start on keyframes, so the clip is rounded out to the segment
+boundaries around [start, start + duration]; trimming to the exact frame
+requires re-encoding. :func:`download_clip` returns where the clip really
+starts, which is needed to line it up with other tracks or captions.
+
+Progressive mp4 streams have no segments; they are clipped sample by sample
+from their ``moov`` index, see :mod:`pytube.mp4`.
+"""
+import logging
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from pytube import mp4
+from pytube import request
+from pytube import Stream
+from pytube.exceptions import ClipError
+from pytube.exceptions import DownloadCancelled
+
+logger = logging.getLogger(__name__)
+
+# EBML element ids used by the webm index.
+_EBML_SEGMENT = 0x18538067
+_EBML_SEEK_HEAD = 0x114D9B74
+_EBML_INFO = 0x1549A966
+_EBML_TIMECODE_SCALE = 0x2AD7B1
+_EBML_DURATION = 0x4489
+_EBML_CUES = 0x1C53BB6B
+_EBML_CUE_POINT = 0xBB
+_EBML_CUE_TIME = 0xB3
+_EBML_CUE_TRACK_POSITIONS = 0xB7
+_EBML_CUE_CLUSTER_POSITION = 0xF1
+_EBML_VOID = 0xEC
+
+
+class Segment(NamedTuple):
+    """A media segment of an adaptive stream."""
+
+    #: First byte of the segment.
+    start: int
+    #: Last byte of the segment (inclusive).
+    end: int
+    #: Presentation time of the segment, in seconds.
+    time: float
+    #: Length of the segment in seconds, ``None`` if unknown.
+    duration: Optional[float]
+
+
+def supported(stream: Stream) -> bool:
+    """Check whether clips can be cut from a stream without downloading it.
+
+    :param Stream stream:
+        The stream to check.
+    :rtype: bool
+    """
+    if stream.is_progressive:
+        return stream.subtype == "mp4"
+    return (
+        stream.is_adaptive
+        and stream.subtype in ("mp4", "webm")
+        and stream.init_range is not None
+        and stream.index_range is not None
+    )
+
+
+def download_clip(
+    stream: Stream,
+    start: float,
+    duration: float,
+    output_path: str,
+    max_workers: int = 4,
+    cancel: Optional[Event] = None,
+) -> Tuple[str, float]:
+    """Download the part of a stream covering a time span.
+
+    :param Stream stream:
+        An adaptive or progressive mp4 stream, see :func:`supported`.
+    :param float start:
+        Start of the clip in seconds.
+    :param float duration:
+        Length of the clip in seconds.
+    :param str output_path:
+        Path of the clip file.
+    :param int max_workers:
+        (Optional) Number of segments fetched at the same time.
+    :param cancel:
+        (Optional) Event that stops the download when set.
+    :rtype: Tuple[str, float]
+    :returns:
+        Path to the clip, and the time in seconds at which it starts in the
+        stream, at or before ``start``.
+    """
+    if not supported(stream):
+        raise ClipError(f"itag={stream.itag} has no segment index")
+    if stream.is_progressive:
+        return mp4.download_clip(
+            stream.url,
+            start,
+            duration,
+            output_path,
+            max_workers,
+            cancel,
+            stream.proxies,
+        )
+
+    init_start, init_end = stream.init_range
+    index_start, index_end = stream.index_range
+    # The index directly follows the initialization data; fetch them at once.
+    head = request.get_range(
+        stream.url, init_start, index_end, stream.proxies
+    )
+    init = head[: init_end - init_start + 1]
+    index = head[index_start - init_start:]
+
+    if stream.subtype == "mp4":
+        segments = parse_sidx(index, index_start)
+    else:
+        content_length = stream.content_length or stream.filesize
+        init, segments = parse_cues(init, index, content_length)
+
+    wanted = select_segments(segments, start, start + duration)
+    if not wanted:
+        raise ClipError(f"{start}s is past the end of itag={stream.itag}")
+    logger.debug(
+        "clipping itag=%s: %d segments, %d bytes",
+        stream.itag,
+        len(wanted),
+        sum(segment.end - segment.start + 1 for segment in wanted),
+    )
+
+    def fetch(segment: Segment) -> bytes:
+        if cancel is not None and cancel.is_set():
+            raise DownloadCancelled()
+        return request.get_range(
+            stream.url, segment.start, segment.end, stream.proxies
+        )
+
+    try:
+        with open(output_path, "wb") as fh, ThreadPoolExecutor(
+            max_workers=max_workers
+        ) as executor:
+            fh.write(init)
+            # map() yields in submission order, so segments land in sequence.
+            for data in executor.map(fetch, wanted):
+                fh.write(data)
+    except BaseException:
+        if cancel is not None:
+            cancel.set()
+        # A clip missing its last segments would still look playable.
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        raise
+    return output_path, wanted[0].time
+
+
+def select_segments(
+    segments: List[Segment], start: float, end: float
+) -> List[Segment]:
+    """Pick the segments that overlap the time span [start, end].
+
+    :param list segments:
+        Segments in presentation order.
+    :param float start:
+        Start of the span in seconds.
+    :param float end:
+        End of the span in seconds.
+    :rtype: List[Segment]
+    """
+    return [
+        segment
+        for segment in segments
+        if segment.time < end
+        and (
+            segment.duration is None
+            or segment.time + segment.duration > start
+        )
+    ]
+
+
+def parse_sidx(data: bytes, offset: int) -> List[Segment]:
+    """Read the segments of an mp4 stream from its ``sidx`` box.
+
+    :param bytes data:
+        The bytes of the index range, starting with the ``sidx`` box.
+    :param int offset:
+        Position of the ``sidx`` box in the file.
+    :rtype: List[Segment]
+    """
+    try:
+        box_size, box_type = struct.unpack_from(">I4s", data)
+        header_size = 8
+        if box_size == 1:
+            (box_size,) = struct.unpack_from(">Q", data, 8)
+            header_size = 16
+        if box_type != b"sidx":
+            raise ClipError(f"expected a sidx box, found {box_type!r}")
+
+        pos = header_size
+        version = data[pos]
+        pos += 8  # version, flags and reference_ID
+        (timescale,) = struct.unpack_from(">I", data, pos)
+        pos += 4
+        if version == 0:
+            earliest, first_offset = struct.unpack_from(">II", data, pos)
+            pos += 8
+        else:
+            earliest, first_offset = struct.unpack_from(">QQ", data, pos)
+            pos += 16
+        (count,) = struct.unpack_from(">2xH", data, pos)
+        pos += 4
+
+        # Offsets are relative to the first byte after the sidx box.
+        start = offset + box_size + first_offset
+        time = earliest
+        segments = []
+        for ref_size, ref_duration, _ in struct.iter_unpack(
+            ">III", data[pos: pos + 12 * count]
+        ):
+            if ref_size >> 31:
+                raise ClipError("hierarchical sidx boxes are not supported")
+            size = ref_size & 0x7FFFFFFF
+            segments.append(
+                Segment(
+                    start=start,
+                    end=start + size - 1,
+                    time=time / timescale,
+                    duration=ref_duration / timescale,
+                )
+            )
+            start += size
+            time += ref_duration
+    except (struct.error, IndexError, ZeroDivisionError) as e:
+        raise ClipError("malformed sidx box") from e
+    return segments
+
+
+def parse_cues(
+    init: bytes, index: bytes, content_length: int
+) -> Tuple[bytes, List[Segment]]:
+    """Read the segments (clusters) of a webm stream from its ``Cues``.
+
+    :param bytes init:
+        The bytes of the initialization range.
+    :param bytes index:
+        The bytes of the index range, starting with the ``Cues`` element.
+    :param int content_length:
+        Size of the whole file, which ends the last cluster.
+    :rtype: Tuple[bytes, List[Segment]]
+    :returns:
+        The initialization data, rewritten to head a clip, and the segments.
+    """
+    try:
+        segment_start = None
+        scale = 1000000
+        total: Optional[float] = None
+        for element_id, start, end in _elements(init, 0, len(init)):
+            if element_id == _EBML_SEGMENT:
+                segment_start = start
+                break
+        if segment_start is None:
+            raise ClipError("no Segment element in the initialization range")
+        for element_id, start, end in _elements(init, segment_start, len(init)):
+            if element_id == _EBML_INFO:
+                for child_id, child_start, child_end in _elements(
+                    init, start, end
+                ):
+                    value = init[child_start:child_end]
+                    if child_id == _EBML_TIMECODE_SCALE:
+                        scale = int.from_bytes(value, "big")
+                    elif child_id == _EBML_DURATION:
+                        fmt = ">f" if len(value) == 4 else ">d"
+                        (total,) = struct.unpack(fmt, value)
+
+        cues = []
+        for element_id, start, end in _elements(index, 0, len(index)):
+            if element_id != _EBML_CUES:
+                continue
+            for point_id, point_start, point_end in _elements(index, start, end):
+                if point_id != _EBML_CUE_POINT:
+                    continue
+                time = position = None
+                for child_id, child_start, child_end in _elements(
+                    index, point_start, point_end
+                ):
+                    if child_id == _EBML_CUE_TIME:
+                        time = _uint(index, child_start, child_end)
+                    elif child_id == _EBML_CUE_TRACK_POSITIONS:
+                        for pos_id, pos_start, pos_end in _elements(
+                            index, child_start, child_end
+                        ):
+                            if pos_id == _EBML_CUE_CLUSTER_POSITION:
+                                position = _uint(index, pos_start, pos_end)
+                if time is not None and position is not None:
+                    cues.append((time, position))
+    except (struct.error, IndexError) as e:
+        raise ClipError("malformed webm index") from e
+    if not cues:
+        raise ClipError("no cue points in the index range")
+
+    # Several tracks may point at the same cluster.
+    cues = sorted(dict((position, time) for time, position in cues).items())
+    seconds = scale / 1e9
+    segments = []
+    for i, (position, time) in enumerate(cues):
+        if i + 1 < len(cues):
+            next_position, next_time = cues[i + 1]
+            end = segment_start + next_position - 1
+            duration: Optional[float] = (next_time - time) * seconds
+        else:
+            end = content_length - 1
+            duration = None if total is None else (total - time) * seconds
+        segments.append(
+            Segment(
+                start=segment_start + position,
+                end=end,
+                time=time * seconds,
+                duration=duration,
+            )
+        )
+    return _clip_header(init), segments
+
+
+def _clip_header(init: bytes) -> bytes:
+    """Adapt the webm initialization data to a file holding a clip.
+
+    The Segment size of the original file no longer applies, so it is marked
+    unknown, and the SeekHead (which points at the Cues that the clip does
+    not carry) is blanked out with a Void element of the same length.
+    """
+    header = bytearray(init)
+    for element_id, element_start, start, _ in _walk(init, 0, len(init)):
+        if element_id != _EBML_SEGMENT:
+            continue
+        # The size sits right before the data, "all ones" means unknown.
+        size_pos = element_start + _vint_length(init[element_start])
+        size_length = start - size_pos
+        header[size_pos] = 0xFF >> (size_length - 1)
+        header[size_pos + 1: start] = b"\xff" * (size_length - 1)
+        for child_id, child_start, _, child_end in _walk(
+            init, start, len(init)
+        ):
+            if child_id == _EBML_SEEK_HEAD:
+                length = child_end - child_start
+                void = bytes([_EBML_VOID, 0x01]) + (length - 9).to_bytes(
+                    7, "big"
+                )
+                header[child_start:child_end] = void.ljust(length, b"\x00")
+        break
+    return bytes(header)
+
+
+def _vint_length(first: int) -> int:
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ClipError("invalid EBML variable length integer")
+    return length
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool) -> Tuple[int, int]:
+    length = _vint_length(data[pos])
+    value = data[pos] if keep_marker else data[pos] & (0xFF >> length)
+    for byte in data[pos + 1: pos + length]:
+        value = value << 8 | byte
+    if pos + length > len(data):
+        raise IndexError(pos + length)
+    return value, length
+
+
+def _walk(
+    data: bytes, pos: int, end: int
+) -> Iterator[Tuple[int, int, int, int]]:
+    """Iterate over the EBML elements in data[pos:end].
+
+    Yields ``(element id, element start, data start, data end)``. Iteration
+    stops at the first element whose header is cut off by ``end``; elements
+    with an unknown size extend to ``end``.
+    """
+    while pos < end:
+        try:
+            element_id, id_length = _read_vint(data, pos, keep_marker=True)
+            size, size_length = _read_vint(data, pos + id_length, False)
+        except IndexError:
+            return
+        data_start = pos + id_length + size_length
+        if size == (1 << (7 * size_length)) - 1:  # unknown size
+            data_end = end
+        else:
+            data_end = min(data_start + size, end)
+        yield element_id, pos, data_start, data_end
+        pos = data_end
+
+
+def _elements(data: bytes, pos: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """Iterate over ``(element id, data start, data end)`` in data[pos:end]."""
+    for element_id, _, data_start, data_end in _walk(data, pos, end):
+        yield element_id, data_start, data_end
+
+
+def _uint(data: bytes, start: int, end: int) -> int:
+    return int.from_bytes(data[start:end], "big")
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+This module holds the state of a single download.
+
+The callbacks registered on a :class:`YouTube <pytube.YouTube>` object are
+shared by all of its streams. A :class:`DownloadContext` instead carries its
+own callbacks, counters, cancellation event and result, so any number of
+downloads, of one video or of many, can run at the same time without
+reporting into each other.
+
+A :class:`DownloadToken` lets the caller cancel, pause and resume a download,
+and give it a deadline. Downloads check their token between chunks and before
+each range request, so a download stops, or pauses holding no more than the
+current connection, within one chunk.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from concurrent.futures import Future
+from typing import Any
+from typing import Callable
+from typing import Optional
+
+from pytube.exceptions import DeadlineExceeded
+from pytube.exceptions import DownloadCancelled
+from pytube.integrity import FileDigest
+from pytube.integrity import RangeDigest
+from pytube.integrity import StreamHasher
+from pytube.progress import OnProgressEvent
+from pytube.store import MediaStore
+
+logger = logging.getLogger(__name__)
+
+# Seconds a paused download sleeps between checks of its cancel event, which
+# may be shared with and set by others.
+_PAUSE_POLL = 0.1
+# Added to the path of a download while it is written, and to that of the
+# journal of a kept partial download.
+PARTIAL_SUFFIX = ".part"
+JOURNAL_SUFFIX = ".pytube.json"
+
+
+class DownloadToken:
+    """Cancels, pauses and times out a download."""
+
+    def __init__(
+        self,
+        cancel: Optional[threading.Event] = None,
+        timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param cancel:
+            (Optional) Event that cancels the download when set, e.g.: one
+            shared by several downloads.
+        :param float timeout:
+            (Optional) Seconds the download may take, pauses included,
+            counted from now; see :meth:`start_deadline`.
+        :param clock:
+            (Optional) Monotonic clock, in seconds.
+        """
+        self.cancelled = cancel if cancel is not None else threading.Event()
+        self.timeout = timeout
+        self._clock = clock
+        #: Clock time the download must be done by, ``None`` for no limit.
+        self.deadline: Optional[float] = None
+        self.start_deadline()
+        self._running = threading.Event()
+        self._running.set()
+
+    def start_deadline(self) -> None:
+        """Count the timeout from now, e.g.: when a queued download starts
+        rather than when it was created."""
+        if self.timeout is not None:
+            self.deadline = self._clock() + self.timeout
+
+    def cancel(self) -> None:
+        """Ask the download to stop; it raises
+        :class:`DownloadCancelled <pytube.exceptions.DownloadCancelled>`."""
+        self.cancelled.set()
+        # Wakes up a paused download.
+        self._running.set()
+
+    def pause(self) -> None:
+        """Hold the download at its next check until :meth:`resume`."""
+        self._running.clear()
+
+    def resume(self) -> None:
+        """Continue a paused download."""
+        self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        """Whether the download is paused."""
+        return not self._running.is_set()
+
+    def check(self) -> None:
+        """Raise if the download must stop, block while it is paused.
+
+        :raises DownloadCancelled:
+            If the download was cancelled.
+        :raises DeadlineExceeded:
+            If the deadline passed, while paused too.
+        """
+        while True:
+            if self.cancelled.is_set():
+                raise DownloadCancelled()
+            timeout = _PAUSE_POLL
+            if self.deadline is not None:
+                remaining = self.deadline - self._clock()
+                if remaining <= 0:
+                    raise DeadlineExceeded()
+                timeout = min(timeout, remaining)
+            if self._running.is_set() or self._running.wait(timeout):
+                if self.cancelled.is_set():
+                    raise DownloadCancelled()
+                return
+
+
+class DownloadContext(DownloadToken):
+    """A download of a stream to a file, see
+    :meth:`Stream.download_context <pytube.Stream.download_context>`."""
+
+    def __init__(
+        self,
+        stream: Any,
+        file_path: str,
+        skip_existing: bool = True,
+        write_behind: bool = False,
+        on_progress: Optional[Callable[[Any, bytes, int], None]] = None,
+        on_progress_event: Optional[OnProgressEvent] = None,
+        on_complete: Optional[Callable[[Any, Optional[str]], None]] = None,
+        progress_interval: float = 0.1,
+        cancel: Optional[threading.Event] = None,
+        timeout: Optional[float] = None,
+        keep_partial: bool = False,
+        store: Optional[MediaStore] = None,
+        checksum: Optional[str] = None,
+    ):
+        """
+        :param Stream stream:
+            The stream to download.
+        :param str file_path:
+            Path of the file to write.
+        :param bool skip_existing:
+            (Optional) Skip the download if the file is already complete.
+        :param bool write_behind:
+            (Optional) Write to disk from a separate thread.
+        :param on_progress:
+            (Optional) Called for every chunk with the stream, the chunk and
+            the bytes remaining.
+        :param on_progress_event:
+            (Optional) Called with coalesced progress events.
+        :param on_complete:
+            (Optional) Called with the stream and the file path when the
+            download finished.
+        :param float progress_interval:
+            (Optional) Seconds between progress events.
+        :param cancel:
+            (Optional) Event that cancels the download when set, e.g.: one
+            shared by several downloads.
+        :param float timeout:
+            (Optional) Seconds the download may take, pauses included,
+            counted from when it starts to run.
+        :param bool keep_partial:
+            (Optional) Keep the partial file of a cancelled or failed
+            download, with a journal next to it, so the next download to the
+            same path continues where it stopped; by default it is removed.
+        :param MediaStore store:
+            (Optional) Store to link the file from if it holds the stream,
+            and to add the downloaded file to otherwise.
+        :param str checksum:
+            (Optional) Hash algorithm to hash the file with as it is
+            written, see :func:`new_hash <pytube.integrity.new_hash>`; the
+            size of the file is verified too.
+        """
+        super().__init__(cancel=cancel, timeout=timeout)
+        self.stream = stream
+        self.file_path = file_path
+        self.skip_existing = skip_existing
+        self.write_behind = write_behind
+        self.on_progress = on_progress
+        self.on_progress_event = on_progress_event
+        self.on_complete = on_complete
+        self.progress_interval = progress_interval
+        self.keep_partial = keep_partial
+        self.store = store
+        self.checksum = checksum
+        #: Hashes the file as it is written, if a checksum was asked for.
+        self.hasher = None if checksum is None else StreamHasher(checksum)
+        #: The digests of the file, once it is downloaded.
+        self.digest: Optional[FileDigest] = None
+        #: Resolves to the file path, or to the error that ended the download.
+        self.future: "Future[str]" = Future()
+        #: Bytes of the file received so far, including those kept from an
+        #: earlier attempt.
+        self.bytes_done = 0
+        #: Bytes kept from an earlier attempt, where the download resumed.
+        self.resumed_from = 0
+        #: Expected size in bytes, known once the download started.
+        self.total: Optional[int] = None
+
+    def run(self) -> str:
+        """Download in the calling thread.
+
+        :rtype: str
+        :returns:
+            Path to the downloaded file.
+        """
+        # Time spent waiting for an executor or a worker does not count.
+        self.start_deadline()
+        try:
+            file_path = self.stream._download(self)  # pylint: disable=W0212
+        except BaseException as e:
+            self.future.set_exception(e)
+            raise
+        self.future.set_result(file_path)
+        return file_path
+
+    def start(self, executor: Optional[Executor] = None) -> "DownloadContext":
+        """Download in the background.
+
+        :param executor:
+            (Optional) Executor to run the download on; by default it runs
+            on a thread of its own.
+        :rtype: DownloadContext
+        :returns:
+            This context, to wait on with :meth:`result`.
+        """
+        if executor is not None:
+            executor.submit(self._run_in_background)
+        else:
+            threading.Thread(
+                target=self._run_in_background,
+                name=f"pytube-download-{self.stream.itag}",
+                daemon=True,
+            ).start()
+        return self
+
+    def done(self) -> bool:
+        """Check whether the download finished, successfully or not."""
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        """Wait for the download to finish.
+
+        :param float timeout:
+            (Optional) Seconds to wait.
+        :rtype: str
+        :returns:
+            Path to the downloaded file.
+        """
+        return self.future.result(timeout)
+
+    def _run_in_background(self) -> None:
+        try:
+            self.run()
+        except BaseException as e:  # pylint: disable=W0703
+            # Kept in the future for whoever waits on the result.
+            logger.debug("download of itag=%s failed: %r", self.stream.itag, e)
+
+    @property
+    def partial_path(self) -> str:
+        """Path the file is written to until it is complete.
+
+        Finished downloads replace the file at :attr:`file_path`, instead
+        of writing over it: it may be a link to a file of a
+        :class:`MediaStore <pytube.store.MediaStore>`.
+        """
+        return self.file_path + PARTIAL_SUFFIX
+
+    @property
+    def journal_path(self) -> str:
+        """Path of the journal of a kept partial download."""
+        return self.file_path + JOURNAL_SUFFIX
+
+    def write_journal(self) -> None:
+        """Record how much of the file was downloaded, and the digests of
+        the ranges that are complete."""
+        journal = {
+            "itag": self.stream.itag,
+            "total": self.total,
+            "bytes_done": self.bytes_done,
+        }
+        if self.hasher is not None:
+            journal["algorithm"] = self.hasher.algorithm
+            journal["ranges"] = [list(r) for r in self.hasher.ranges]
+        with open(self.journal_path, "w") as fh:
+            json.dump(journal, fh)
+
+    def read_journal(self) -> int:
+        """Get the offset to resume a kept partial download at.
+
+        :rtype: int
+        :returns:
+            Number of bytes already in the file, 0 if there is no usable
+            journal for this stream and size, or if the file does not match
+            the digests in the journal.
+        """
+        try:
+            with open(self.journal_path) as fh:
+                journal = json.load(fh)
+            size = os.stat(self.partial_path).st_size
+        except (OSError, ValueError):
+            return 0
+        if (
+            journal.get("itag") != self.stream.itag
+            or journal.get("total") != self.total
+            or not isinstance(journal.get("bytes_done"), int)
+        ):
+            return 0
+        # The file may have grown past the journal before writes stopped.
+        offset = min(journal["bytes_done"], size)
+        if self.hasher is not None and offset:
+            # The digest of the whole file needs the kept part too.
+            self.hasher.update_from_file(self.partial_path, offset)
+            if not self._matches_journal(journal):
+                logger.warning(
+                    "%s does not match its journal, starting over",
+                    self.partial_path,
+                )
+                self.hasher = StreamHasher(
+                    self.hasher.algorithm, self.hasher.range_size
+                )
+                return 0
+        return offset
+
+    def _matches_journal(self, journal: dict) -> bool:
+        assert self.hasher is not None
+        if journal.get("algorithm") != self.hasher.algorithm:
+            # Nothing to compare with.
+            return True
+        try:
+            kept = [RangeDigest(*r) for r in journal.get("ranges", [])]
+        except TypeError:
+            return False
+        hashed = set(self.hasher.ranges)
+        return all(r in hashed for r in kept if r.end < self.hasher.size)
+
+    def remove_journal(self) -> None:
+        """Remove the journal, if any."""
+        if os.path.exists(self.journal_path):
+            os.unlink(self.journal_path)
@@ -17,8 +17,8 @@ from pytube import request
 from pytube import YouTube
 from pytube.helpers import cache
 from pytube.helpers import deprecated
-from pytube.helpers import install_proxy
 from pytube.helpers import uniqueify
+from pytube.proxy import ProxyPool
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +26,29 @@ logger = logging.getLogger(__name__)
 class Playlist(Sequence):
     """Load a YouTube playlist with URL or ID"""
 
-    def __init__(self, url: str, proxies: Optional[Dict[str, str]] = None):
-        if proxies:
-            install_proxy(proxies)
+    def __init__(
+        self,
+        url: str,
+        proxies: Union[Dict[str, str], ProxyPool, None] = None,
+        lean: bool = False,
+    ):
+        """Construct a :class:`Playlist <Playlist>`.
+
+        :param str url:
+            A playlist url, or just the playlist id.
+        :param proxies:
+            (Optional) A :class:`ProxyPool <pytube.proxy.ProxyPool>`, or a
+            dict of proxy urls by scheme, for the requests of the playlist
+            and its videos.
+        :param bool lean:
+            (Optional) Yield :class:`YouTube <YouTube>` objects that release
+            their raw html and js once extracted, see
+            :meth:`YouTube.compact <pytube.YouTube.compact>`.
+        """
+        self.lean = lean
+        if isinstance(proxies, dict):
+            proxies = ProxyPool.from_dict(proxies) if proxies else None
+        self.proxies: Optional[ProxyPool] = proxies
 
         try:
             self.playlist_id: str = parse_qs(url.split("?")[1])["list"][0]
@@ -38,7 +58,7 @@ class Playlist(Sequence):
         self.playlist_url = (
             f"https://www.youtube.com/playlist?list={self.playlist_id}"
         )
-        self.html = request.get(self.playlist_url)
+        self.html = request.get(self.playlist_url, proxies=self.proxies)
 
         # Needs testing with non-English
         self.last_update: Optional[date] = None
@@ -108,7 +128,9 @@ class Playlist(Sequence):
             logger.debug("load more url: %s", load_more_url)
             # requesting the next page of videos with the url generated from the
             # previous page
-            req = request.get(load_more_url, extra_headers=headers)
+            req = request.get(
+                load_more_url, extra_headers=headers, proxies=self.proxies
+            )
             # extract up to 100 songs from the page loaded
             # returns another continuation if more videos are available
             videos_urls, continuation = self._extract_videos(req)
@@ -249,7 +271,10 @@ class Playlist(Sequence):
 
         :Yields: YouTube
         """
-        yield from (YouTube(url) for url in self.video_urls)
+        yield from (
+            YouTube(url, proxies=self.proxies, lean=self.lean)
+            for url in self.video_urls
+        )
 
     def __getitem__(self, i: Union[slice, int]) -> Union[str, List[str]]:
         return self.video_urls[i]
@@ -326,7 +351,7 @@ class Playlist(Sequence):
         prefix_gen = self._path_num_prefix_generator(reverse_numbering)
 
         for link in self.video_urls:
-            youtube = YouTube(link)
+            youtube = YouTube(link, lean=True)
             dl_stream = (
                 youtube.streams.get_by_resolution(resolution=resolution)
                 or youtube.streams.get_lowest_resolution()
@@ -25,14 +25,21 @@ import math
 import os
 import shutil
 import sys
+import threading
 from functools import wraps
 from pprint import pformat
+from typing import Tuple
 
 import time
 
 import pysrt
 
+from pytube import clip
+from pytube import mux
+from pytube import request
 from pytube import YouTube
+from pytube.exceptions import DownloadCancelled
+from pytube.helpers import run_concurrently
 import subprocess
 from pathlib import Path
 import logging
@@ -81,40 +88,62 @@ def downloader(*args: tuple):
 
         logging.info("DOWNLOADING:")
         video_path, audio_path, subtitle_path, video_fps = [None] * 4
+        if (not target_stream.includes_audio_track and not arguments['--duration']
+                and not arguments['--start'] and mux.supported()):
+            logging.info("streaming video and audio into ffmpeg......")
+            audio_target = streams.filter(only_audio=True).first()
+            subtitle_path = download_captions(yt, lang=arguments['--lang'])
+            final_path = stream_mux(target_stream, audio_target, subtitle_path,
+                                    target_stream.fps)
+            cleanup_files(subtitle_path=subtitle_path)
+            logging.info(f"Final output file: {final_path}")
+            continue
+
+        # video, audio and captions are fetched at the same time; if one of
+        # them fails the others are stopped
+        tasks = []
         if not target_stream.includes_audio_track:
-            logging.info("downloading video first......")
-            video_path = download_file(target_stream, duration=arguments['--duration'],
-                                       start=arguments['--start'])
-            video_fps = target_stream.fps
-
-            logging.info("downloading audio as well!")
+            logging.info("downloading video and audio at the same time......")
             audio_target = streams.filter(only_audio=True).first()
-            audio_path = download_file(audio_target, duration=arguments['--duration'],
-                                       start=arguments['--start'])
+            tasks.append(download_task(target_stream, arguments))
+            tasks.append(download_task(audio_target, arguments))
+            video_fps = target_stream.fps
 
         else:
             logging.info(f"downloading {target_stream.type} ONLY")
-            if target_stream.type == 'video':
-                video_path = download_file(target_stream,
-                                           duration=arguments['--duration'],
-                                           start=arguments['--start'])
-                video_fps = target_stream.fps
-
-            elif target_stream.type == 'audio':
-                audio_target = target_stream
-                audio_path = download_file(audio_target, duration=arguments['--duration'],
-                                           start=arguments['--start'])
+            if target_stream.type in ('video', 'audio'):
+                tasks.append(download_task(target_stream, arguments))
+                if target_stream.type == 'video':
+                    video_fps = target_stream.fps
 
             else:
                 logging.critical(
                     f"unexpected file type: {target_stream.type}")
                 return 1
 
-        # need to retime the captions if I'm to use them in shorter videos
+        # the captions are retimed once the video is in, clips may start
+        # before --start
         if not target_stream.type == 'audio':
-            subtitle_path = download_captions(yt, lang=arguments['--lang'],
-                                              duration=arguments['--duration'],
-                                              start=arguments['--start'])
+            tasks.append(lambda cancel: download_captions(
+                yt, lang=arguments['--lang']))
+
+        results = run_concurrently(tasks)
+        audio_start = video_start = 0.0
+        if not target_stream.includes_audio_track:
+            video, audio, subtitle_path = results
+            (video_path, video_start), (audio_path, audio_start) = video, audio
+        elif target_stream.type == 'video':
+            (video_path, video_start), subtitle_path = results
+        else:
+            (audio_path, audio_start), = results
+
+        # need to retime the captions if I'm to use them in shorter videos
+        if subtitle_path and (arguments['--start'] or arguments['--duration']):
+            end = None
+            if arguments['--duration']:
+                end = (float(strp_time(arguments['--start'] or '0'))
+                       + float(strp_time(arguments['--duration'])))
+            subtitle_path = retime_captions(subtitle_path, video_start, end)
 
         # In the event only audio, create HQ mp3 or aac file
         if target_stream.type == 'audio':
@@ -128,7 +157,10 @@ def downloader(*args: tuple):
                 final_path = mux_files(audio_path)
 
         else:
-            final_path = mux_files(audio_path, video_path, subtitle_path, video_fps)
+            # the clips are rounded to their own keyframes; line the audio
+            # up with the video
+            final_path = mux_files(audio_path, video_path, subtitle_path,
+                                   video_fps, audio_start - video_start)
         cleanup_files(audio_path, video_path, subtitle_path)
         logging.info(f"Final output file: {final_path}")
 
@@ -237,9 +269,18 @@ def get_itag(args: dict) -> int:
     return itag
 
 
-def download_file(download_target, duration: str = None, start: int = 0) -> Path:
+def download_task(download_target, args: dict):
+    '''wrap download_file for run_concurrently, which passes the cancel event'''
+    return lambda cancel: download_file(download_target, duration=args['--duration'],
+                                        start=args['--start'], cancel=cancel)
+
+
+def download_file(download_target, duration: str = None, start: int = 0,
+                  cancel: threading.Event = None) -> Tuple[Path, float]:
     '''download stream given a download_target (a stream object either audio or video,
     captions are handled separately).
+    Returns the file path and where the file starts in the stream, in seconds;
+    clips cut without ffmpeg start on the keyframe at or before start.
     Note that ffmpeg already has a HH:MM:SS.ms specification limited to 2 digits for
     HH, MM and SS'''
     logging.debug(f"current directory: {Path.cwd()}")
@@ -251,6 +292,29 @@ def download_file(download_target, duration: str = None, start: int = 0) -> Path
         start = '0'
     download_path = Path(f"{download_path.stem}-{download_target.type}{download_path.suffix}")
     logging.debug(f"Targeting destination: {download_path}")
+    if duration and clip.supported(download_target):
+        # fetch only the segments covering the clip, using the stream's index
+        logging.debug(f"attempting to clip {duration} seconds of file")
+        _, clip_start = clip.download_clip(download_target,
+                                           start=float(strp_time(start)),
+                                           duration=float(strp_time(duration)),
+                                           output_path=str(download_path),
+                                           cancel=cancel)
+        logging.info(f"Final {download_target.type} file: {download_path} "
+                     f"starting at {clip_start}s")
+        return download_path, clip_start
+    if download_target.is_otf and not duration:
+        # aria2c splits downloads with range requests, OTF streams are only
+        # served as numbered segments
+        logging.debug("downloading OTF stream segment by segment")
+        with open(download_path, 'wb') as fh:
+            for chunk in request.seq_stream(download_target.url,
+                                            proxies=download_target.proxies):
+                if cancel is not None and cancel.is_set():
+                    raise DownloadCancelled()
+                fh.write(chunk)
+        logging.info(f"Final {download_target.type} file: {download_path}")
+        return download_path, 0.0
     if duration:
         # download the file with ffmpeg
         # -ss : start point to download in HH:MM:SS.MILLISECONDS format if needed
@@ -288,9 +352,28 @@ def download_file(download_target, duration: str = None, start: int = 0) -> Path
                f'{download_target.url}')
 
     logging.debug(f"Command to be run: {cmd}")
-    subprocess.run(cmd, shell=False, check=True)
+    run_command(cmd, cancel)
     logging.info(f"Final {download_target.type} file: {download_path}")
-    return download_path
+    return download_path, float(strp_time(start)) if duration else 0.0
+
+
+def run_command(cmd: tuple, cancel: threading.Event = None) -> None:
+    '''run a command, killing it if cancel is set before it finishes'''
+    if cancel is None:
+        subprocess.run(cmd, shell=False, check=True)
+        return
+    with subprocess.Popen(cmd, shell=False) as process:
+        while True:
+            try:
+                returncode = process.wait(timeout=0.1)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel.is_set():
+                    logging.info(f"cancelling: {cmd[0]}")
+                    process.kill()
+                    raise DownloadCancelled()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
 
 
 def download_captions(yt: YouTube, lang: str = 'English',
@@ -322,23 +405,31 @@ def download_captions(yt: YouTube, lang: str = 'English',
 
     # retime the subtitles
     if start or duration:
-        logging.info(f'retiming subtitles {subt_fp}')
-        subs = pysrt.open(subt_fp)
-        if start:
-            start = float(strp_time(start))
-            subs.shift(seconds=-math.trunc(start),
-                       milliseconds=-math.trunc((start % 1) * 1000))
-        part = subs.slice(starts_after={'milliseconds': -1})
-        if duration:
-            duration = float(strp_time(duration))
-            part = part.slice(ends_before={'seconds'     : math.trunc(duration),
-                                           'milliseconds': math.trunc(
-                                               (duration % 1) * 1000)})
-        if len(part) < 1:
-            logging.info(f'No valid subtitles left, removing {subt_fp} file')
-            os.remove(subt_fp)
-            return None
-        part.save(subt_fp)
+        start = float(strp_time(start)) if start else 0.0
+        end = start + float(strp_time(duration)) if duration else None
+        return retime_captions(subt_fp, start, end)
+    return subt_fp
+
+
+def retime_captions(subt_fp: Path, start: float, end: float = None) -> Path:
+    '''shift the subtitles to a file starting at start seconds, dropping those
+    outside [start, end]'''
+    logging.info(f'retiming subtitles {subt_fp}')
+    subs = pysrt.open(subt_fp)
+    if start:
+        subs.shift(seconds=-math.trunc(start),
+                   milliseconds=-math.trunc((start % 1) * 1000))
+    part = subs.slice(starts_after={'milliseconds': -1})
+    if end is not None:
+        duration = end - start
+        part = part.slice(ends_before={'seconds'     : math.trunc(duration),
+                                       'milliseconds': math.trunc(
+                                           (duration % 1) * 1000)})
+    if len(part) < 1:
+        logging.info(f'No valid subtitles left, removing {subt_fp} file')
+        os.remove(subt_fp)
+        return None
+    part.save(subt_fp)
     return subt_fp
 
 
@@ -355,11 +446,14 @@ def strp_time(time_str: str) -> str:
 
 
 def mux_files(audio_path: Path, video_path: Path = None,
-              subt_path: Path = None, video_fps: str = None) -> Path:
-    '''mux file streams supplied'''
+              subt_path: Path = None, video_fps: str = None,
+              audio_offset: float = 0.0) -> Path:
+    '''mux file streams supplied, the audio starting audio_offset seconds
+    after the video'''
     logging.info("attempting to mix audio and video")
     # -y: global ie overwrite without asking
     # -i: input file
+    # -itsoffset: delay the timestamps of the next input by seconds
     # -r: set frame rate in fps
     # -filter:a create filtergraph
     # -c:a copy means copy audio streams
@@ -378,6 +472,8 @@ def mux_files(audio_path: Path, video_path: Path = None,
 
     # Using '.mkv' to handle subtitles for time being
     final_path = Path(f'{final_path.stem}-output.mkv')
+    audio_offset_text = (('-itsoffset', f'{audio_offset:.3f}')
+                         if audio_path and video_path and audio_offset else ())
     audio_path_text = ('-i', f'{audio_path}') if audio_path else ()
     video_path_text = ('-i', f'{video_path}') if video_path else ()
     subt_path = () if subt_path is None else ('-i', f'{subt_path}')
@@ -388,6 +484,7 @@ def mux_files(audio_path: Path, video_path: Path = None,
 
     cmd = ('ffmpeg',
            '-y',
+           *audio_offset_text,
            *audio_path_text,
            *video_path_text,
            *subt_path,
@@ -403,6 +500,27 @@ def mux_files(audio_path: Path, video_path: Path = None,
     return final_path
 
 
+def stream_mux(video_target, audio_target, subt_path: Path = None,
+               video_fps: str = None) -> Path:
+    '''download and mux the video and audio streams in one pass, without
+    writing them to disk first'''
+    logging.info("attempting to stream audio and video into ffmpeg")
+    final_path = Path(f'{Path(video_target.default_filename).stem}-output.mkv')
+    if final_path.is_file():
+        logging.error(f"{final_path} already exists! Will overwrite...")
+    subt_path_text = () if subt_path is None else (f'{subt_path}',)
+    subt_extension = ('-c:s', 'srt') if subt_path else ()
+    video_fps_text = ('-r', f'{video_fps}') if video_fps else ()
+    mux.mux_streams(video_target, audio_target, f'{final_path}',
+                    inputs=subt_path_text,
+                    output_args=(*video_fps_text,
+                                 '-c:a', 'copy',
+                                 '-c:v', 'copy',
+                                 *subt_extension))
+    logging.info(f"Final muxed file: {final_path}")
+    return final_path
+
+
 def cleanup_files(audio_path: Path = None, video_path: Path = None, subtitle_path: Path = None, ) -> None:
     '''cleanup file paths supplied'''
     logging.info("CLEANUP:")
@@ -60,3 +60,27 @@ class VideoUnavailable(PytubeError):
 
 class HTMLParseError(PytubeError):
     """HTML could not be parsed"""
+
+
+class MuxError(PytubeError):
+    """ffmpeg failed to mux the streams."""
+
+
+class ClipError(PytubeError):
+    """A clip could not be cut from the stream."""
+
+
+class ManifestError(PytubeError):
+    """A live stream manifest could not be read."""
+
+
+class DownloadCancelled(PytubeError):
+    """The download was cancelled before it finished."""
+
+
+class DeadlineExceeded(DownloadCancelled):
+    """The download did not finish before its deadline."""
+
+
+class IntegrityError(PytubeError):
+    """A download does not have the expected size or digest."""
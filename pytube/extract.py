@@ -10,6 +10,7 @@ from urllib.parse import quote, parse_qs, unquote, parse_qsl
 from urllib.parse import urlencode
 
 from pytube.cipher import Cipher
+from pytube.cipher import get_cipher
 from pytube.exceptions import RegexMatchError, HTMLParseError, LiveStreamError
 from pytube.helpers import regex_search
 
@@ -146,6 +147,26 @@ def js_url(html: str) -> str:
     return "https://youtube.com" + base_js
 
 
+def player_version(js_url: str) -> str:
+    """Get the version of the player from the base JavaScript url.
+
+    **Example**:
+
+    player_version('https://youtube.com/yts/jsbin/player_ias-vflWQEEag/en_US/base.js')
+    -> 'player_ias-vflWQEEag'
+
+    :param str js_url:
+        The url of the base.js asset file.
+    :rtype: str
+    :returns:
+        The player version, or the full url if it cannot be determined.
+    """
+    try:
+        return regex_search(r"/(?:s/player|jsbin)/([\w.-]+)/", js_url, group=1)
+    except RegexMatchError:
+        return js_url
+
+
 def mime_type_codec(mime_type_codec: str) -> Tuple[str, List[str]]:
     """Parse the type data.
 
@@ -226,7 +247,7 @@ def apply_signature(config_args: Dict, fmt: str, js: str) -> None:
         The contents of the base.js asset file.
 
     """
-    cipher = Cipher(js=js)
+    cipher = get_cipher(js)
     stream_manifest = config_args[fmt]
 
     for i, stream in enumerate(stream_manifest):
@@ -248,6 +269,7 @@ def apply_signature(config_args: Dict, fmt: str, js: str) -> None:
             # which case there's no real magic to download them and we can skip
             # the whole signature descrambling entirely.
             logger.debug("signature found, skip decipher")
+            stream_manifest[i]["url"] = apply_throttling(url, cipher)
             continue
 
         signature = cipher.get_signature(ciphered_signature=stream["s"])
@@ -256,7 +278,61 @@ def apply_signature(config_args: Dict, fmt: str, js: str) -> None:
             "finished descrambling signature for itag=%s", stream["itag"]
         )
         # 403 forbidden fix
-        stream_manifest[i]["url"] = url + "&sig=" + signature
+        stream_manifest[i]["url"] = apply_throttling(
+            url + "&sig=" + signature, cipher
+        )
+
+
+def apply_throttling(url: str, cipher: Cipher) -> str:
+    """Replace the ``n`` url parameter with its transformed value.
+
+    Without the transform, YouTube throttles the download bandwidth.
+
+    :param str url:
+        A media stream url.
+    :param Cipher cipher:
+        The cipher of the player the url was issued for.
+    :rtype: str
+    """
+    match = re.search(r"([?&])n=([^&]+)", url)
+    if not match:
+        return url
+    n = unquote(match.group(2))
+    transformed = cipher.calculate_n(n)
+    if transformed == n:
+        return url
+    logger.debug("transformed n parameter %s -> %s", n, transformed)
+    return (
+        url[: match.start()]
+        + f"{match.group(1)}n={quote(transformed, safe='')}"
+        + url[match.end() :]
+    )
+
+
+def _byte_range(byte_range: Optional[Dict]) -> Optional[str]:
+    """Format a ``{"start": ..., "end": ...}`` range like the legacy
+    ``init``/``index`` manifest values (e.g.: "0-740")."""
+    if not byte_range:
+        return None
+    return f"{byte_range['start']}-{byte_range['end']}"
+
+
+def live_manifest_urls(player_response: Dict) -> Dict[str, str]:
+    """Get the manifest urls of a live stream.
+
+    :param dict player_response:
+        The ``player_response`` of the video.
+    :rtype: dict
+    :returns:
+        The HLS (``"hls"``) and DASH (``"dash"``) manifest urls the video
+        has, if any.
+    """
+    streaming_data = player_response.get("streamingData", {})
+    urls = {
+        "hls": streaming_data.get("hlsManifestUrl"),
+        "dash": streaming_data.get("dashManifestUrl"),
+    }
+    return {kind: url for kind, url in urls.items() if url}
 
 
 def apply_descrambler(stream_data: Dict, key: str) -> None:
@@ -301,6 +377,9 @@ def apply_descrambler(stream_data: Dict, key: str) -> None:
                     "itag": format_item["itag"],
                     "bitrate": format_item.get("bitrate"),
                     "is_otf": (format_item.get("type") == otf_type),
+                    "init": _byte_range(format_item.get("initRange")),
+                    "index": _byte_range(format_item.get("indexRange")),
+                    "clen": format_item.get("contentLength"),
                 }
                 for format_item in formats
             ]
@@ -318,6 +397,9 @@ def apply_descrambler(stream_data: Dict, key: str) -> None:
                     "itag": format_item["itag"],
                     "bitrate": format_item.get("bitrate"),
                     "is_otf": (format_item.get("type") == otf_type),
+                    "init": _byte_range(format_item.get("initRange")),
+                    "index": _byte_range(format_item.get("indexRange")),
+                    "clen": format_item.get("contentLength"),
                 }
                 for i, format_item in enumerate(formats)
             ]
@@ -0,0 +1,457 @@
+# -*- coding: utf-8 -*-
+"""
+This module implements a local caching gateway for stream downloads.
+
+Processes on one host that download the same streams (different clips of a
+popular video, retries, several output formats) each fetch the same bytes
+from the CDN. A :class:`RangeGateway` is a small HTTP server they can all
+route their requests through instead: it splits the requested byte ranges
+into fixed-size blocks, keeps the blocks on disk and serves any overlapping
+request from them. Concurrent requests for a block that is not cached yet
+share a single upstream fetch.
+
+Blocks are keyed by the ``id`` and ``itag`` parameters of the stream url
+rather than by the url, which changes with every extraction (signature,
+expiry), so a stream stays cached across extractions. Only media urls
+(``videoplayback`` urls with those parameters) go through the gateway;
+watch pages, video info, base.js and captions change and expire, so
+:class:`GatewayClient` sends them straight upstream.
+
+Run a gateway for the host with ``python -m pytube.gateway`` and pass a
+:class:`GatewayClient` as the ``proxies`` of :class:`YouTube
+<pytube.YouTube>` (or of the request functions) in each process.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import threading
+from http.client import HTTPResponse
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from urllib import parse
+from urllib.error import HTTPError
+from urllib.error import URLError
+from urllib.request import Request
+from urllib.request import urlopen
+
+from pytube import request
+from pytube.helpers import SingleFlight
+from pytube.proxy import ProxyPool
+
+logger = logging.getLogger(__name__)
+
+_RANGE = re.compile(r"bytes=(\d+)-(\d*)$")
+# Headers of the original request that are not passed on to the gateway.
+_HOP_HEADERS = frozenset(("Host", "Connection", "Proxy-Connection"))
+
+
+def is_media_url(url: str) -> bool:
+    """Check whether a url is that of a media stream, which the gateway
+    caches.
+
+    :param str url:
+        The url.
+    :rtype: bool
+    """
+    parts = parse.urlsplit(url)
+    query = parse.parse_qs(parts.query)
+    return (
+        parts.path.endswith("/videoplayback")
+        and "id" in query
+        and "itag" in query
+    )
+
+
+class RangeCache:
+    """Blocks of remote files, stored on disk."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        block_size: int = 1048576,
+        max_bytes: Optional[int] = None,
+        proxies: Optional[ProxyPool] = None,
+    ):
+        """
+        :param str cache_dir:
+            Directory of the cache, created if it does not exist.
+        :param int block_size:
+            (Optional) Size of the blocks fetched and stored.
+        :param int max_bytes:
+            (Optional) Size of the cache, beyond which the least recently
+            used blocks are removed; unlimited by default.
+        :param ProxyPool proxies:
+            (Optional) Proxies for the upstream requests.
+        """
+        self.cache_dir = cache_dir
+        self.block_size = block_size
+        self.max_bytes = max_bytes
+        self.proxies = proxies
+        os.makedirs(cache_dir, exist_ok=True)
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._bytes = sum(size for _, _, size in self._blocks())
+        #: Upstream requests made, for monitoring.
+        self.fetches = 0
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Get the cache key of a stream url.
+
+        :param str url:
+            The stream url.
+        :rtype: str
+        :raises ValueError:
+            If the url is not a media url, see :func:`is_media_url`.
+        """
+        if not is_media_url(url):
+            raise ValueError(f"not a media url: {url}")
+        query = dict(parse.parse_qsl(parse.urlsplit(url).query))
+        name = f"{query['id']}/{query['itag']}"
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()  # nosec
+
+    def size(self, url: str) -> int:
+        """Get the size of a remote file, fetching its first block if needed.
+
+        :param str url:
+            The file url.
+        :rtype: int
+        """
+        size = self._read_size(self.key(url))
+        if size is None:
+            self.block(url, 0)
+            size = self._read_size(self.key(url))
+        if size is None:
+            # No Content-Range, and the first block is full.
+            size = int(request.head(url, self.proxies)["content-length"])
+            self._write_size(self.key(url), size)
+        return size
+
+    def read(self, url: str, start: int, end: int) -> Iterator[bytes]:
+        """Read a byte range of a remote file, block by block.
+
+        :param str url:
+            The file url.
+        :param int start:
+            First byte of the range.
+        :param int end:
+            Last byte of the range (inclusive), within the file.
+        :rtype: Iterator[bytes]
+        """
+        for index in range(
+            start // self.block_size, end // self.block_size + 1
+        ):
+            offset = index * self.block_size
+            data = self.block(url, index)
+            yield data[max(start - offset, 0): end - offset + 1]
+
+    def block(self, url: str, index: int) -> bytes:
+        """Get a block of a remote file, from disk or from upstream.
+
+        :param str url:
+            The file url.
+        :param int index:
+            The number of the block.
+        :rtype: bytes
+        """
+        key = self.key(url)
+        data = self._read_block(key, index)
+        if data is not None:
+            return data
+        return self._flight.do((key, index), self._fetch, url, key, index)
+
+    def _read_block(self, key: str, index: int) -> Optional[bytes]:
+        path = self._block_path(key, index)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+            # Recently used blocks are evicted last.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def _fetch(self, url: str, key: str, index: int) -> bytes:
+        # Another fetch of the block may have finished since we looked.
+        data = self._read_block(key, index)
+        if data is not None:
+            return data
+        start = index * self.block_size
+        end = start + self.block_size - 1
+        data, size = request.get_range_and_size(
+            url, start, end, self.proxies
+        )
+        with self._lock:
+            self.fetches += 1
+        if len(data) > self.block_size:
+            # The server ignored the range and sent the whole file.
+            size = len(data)
+            data = data[start: end + 1]
+        elif size is None and len(data) < self.block_size:
+            size = start + len(data)
+        os.makedirs(os.path.join(self.cache_dir, key), exist_ok=True)
+        if size is not None:
+            self._write_size(key, size)
+        self._write(self._block_path(key, index), data)
+        self._evict(len(data))
+        return data
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Readers never see a partially written file.
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as fh:
+            fh.write(data)
+        os.replace(temp_path, path)
+
+    def _write_size(self, key: str, size: int) -> None:
+        path = os.path.join(self.cache_dir, key, "size")
+        self._write(path, str(size).encode())
+
+    def _read_size(self, key: str) -> Optional[int]:
+        try:
+            with open(os.path.join(self.cache_dir, key, "size")) as fh:
+                return int(fh.read())
+        except (OSError, ValueError):
+            return None
+
+    def _block_path(self, key: str, index: int) -> str:
+        # The cache outlives the gateway, which may be restarted with
+        # another block size; blocks of other sizes are never read.
+        return os.path.join(
+            self.cache_dir, key, f"{self.block_size}-{index}.block"
+        )
+
+    def _blocks(self) -> Iterator[Tuple[float, str, int]]:
+        for directory in os.scandir(self.cache_dir):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith(".block"):
+                    stat = entry.stat()
+                    yield stat.st_mtime, entry.path, stat.st_size
+
+    def _evict(self, added: int) -> None:
+        with self._lock:
+            self._bytes += added
+            if self.max_bytes is None or self._bytes <= self.max_bytes:
+                return
+            for _, path, size in sorted(self._blocks()):
+                if self._bytes <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+                self._bytes -= size
+
+
+class RangeGateway:
+    """An HTTP server answering range requests from a :class:`RangeCache`.
+
+    A request for ``/range?url=<stream url>`` is answered with the bytes of
+    the stream, honouring its ``Range`` header.
+    """
+
+    def __init__(
+        self,
+        cache: RangeCache,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """
+        :param RangeCache cache:
+            The cache to serve from.
+        :param str host:
+            (Optional) Address to listen on.
+        :param int port:
+            (Optional) Port to listen on; by default a free one is picked.
+        """
+        self.cache = cache
+        self.server = ThreadingHTTPServer((host, port), _handler(cache))
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """The url of the gateway."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client(self) -> "GatewayClient":
+        """Get a client routing requests through this gateway.
+
+        :rtype: GatewayClient
+        """
+        return GatewayClient(self.url)
+
+    def start(self) -> "RangeGateway":
+        """Serve on a background thread.
+
+        :rtype: RangeGateway
+        """
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            args=(0.1,),
+            name="pytube-gateway",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until :meth:`shutdown`."""
+        self.server.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop serving and close the socket."""
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread.join()
+        self.server.server_close()
+
+    def __enter__(self) -> "RangeGateway":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+
+class GatewayClient:
+    """Sends requests through a :class:`RangeGateway`.
+
+    It can be passed anywhere a :class:`ProxyPool <pytube.proxy.ProxyPool>`
+    is accepted.
+    """
+
+    def __init__(self, gateway_url: str):
+        """
+        :param str gateway_url:
+            The url of the gateway, e.g.: ``http://127.0.0.1:8642``.
+        """
+        self.gateway_url = gateway_url.rstrip("/")
+
+    def open(self, request: Request) -> HTTPResponse:
+        """Send a request through the gateway if it is for media, straight
+        upstream otherwise.
+
+        :param request:
+            The request to the original url.
+        :rtype: HTTPResponse
+        """
+        if not is_media_url(request.full_url):
+            return urlopen(request)  # nosec
+        headers = {
+            k: v for k, v in request.header_items() if k not in _HOP_HEADERS
+        }
+        query = parse.urlencode({"url": request.full_url})
+        return urlopen(  # nosec
+            Request(
+                f"{self.gateway_url}/range?{query}",
+                headers=headers,
+                method=request.get_method(),
+            )
+        )
+
+
+def _handler(cache: RangeCache):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            self._serve(body=True)
+
+        def do_HEAD(self) -> None:
+            self._serve(body=False)
+
+        def _serve(self, body: bool) -> None:
+            parts = parse.urlsplit(self.path)
+            url = dict(parse.parse_qsl(parts.query)).get("url")
+            if parts.path != "/range" or not url:
+                self.send_error(404)
+                return
+            if not is_media_url(url):
+                # Pages change and expire; they must not be cached.
+                self.send_error(400, "not a media url")
+                return
+            try:
+                size = cache.size(url)
+            except HTTPError as e:
+                self.send_error(e.code)
+                return
+            except (URLError, OSError) as e:
+                logger.warning("upstream request for %s failed: %s", url, e)
+                self.send_error(502)
+                return
+
+            start, end = 0, size - 1
+            headers: Dict[str, str] = {}
+            range_header = self.headers.get("Range")
+            if range_header:
+                match = _RANGE.match(range_header.strip())
+                if not match or int(match.group(1)) >= size:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+                headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            self.send_response(206 if range_header else 200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            if not body:
+                return
+            try:
+                for data in cache.read(url, start, end):
+                    self.wfile.write(data)
+            except (URLError, OSError) as e:
+                # Too late for an error status; drop the connection.
+                logger.warning("serving %s failed: %s", url, e)
+                self.close_connection = True
+
+        def log_message(self, format, *args):  # pylint: disable=W0622
+            logger.debug("gateway: " + format, *args)
+
+    return Handler
+
+
+def main() -> None:
+    """Run a caching gateway until interrupted."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("cache_dir", help="Directory of the cache")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument(
+        "--block-size", type=int, default=1048576, help="Bytes per block"
+    )
+    parser.add_argument(
+        "--max-bytes", type=int, help="Size of the cache, unlimited if unset"
+    )
+    args = parser.parse_args()
+    gateway = RangeGateway(
+        RangeCache(args.cache_dir, args.block_size, args.max_bytes),
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Serving on {gateway.url}")
+    try:
+        gateway.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        gateway.server.server_close()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
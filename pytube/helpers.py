@@ -4,12 +4,17 @@ import functools
 import logging
 import os
 import re
+import threading
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from typing import Any
 from typing import Callable
 from typing import Dict
+from typing import Hashable
 from typing import List
 from typing import Optional
+from typing import Sequence
 from typing import TypeVar
 from urllib import request
 
@@ -174,3 +179,99 @@ def uniqueify(duped_list: List) -> List:
         seen[item] = True
         result.append(item)
     return result
+
+
+class _Call:
+    """An in-flight :class:`SingleFlight <SingleFlight>` call."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key.
+
+    While a call for a key is in flight, every other caller asking for the
+    same key waits for it and receives its result (or exception) instead of
+    repeating the work. Results are not kept after the call finishes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(
+        self, key: Hashable, func: Callable[..., GenericType], *args, **kwargs
+    ) -> GenericType:
+        """Call ``func(*args, **kwargs)`` unless a call for ``key`` is running.
+
+        :param key:
+            Identifies calls that produce the same result.
+        :param callable func:
+            The function to execute.
+        :returns:
+            The result of the (possibly shared) call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            logger.debug("joining in-flight call for %s", key)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+def run_concurrently(
+    tasks: Sequence[Callable[[threading.Event], GenericType]]
+) -> List[GenericType]:
+    """Run tasks on their own threads and wait for all of them.
+
+    Every task receives the same :class:`threading.Event`, which is set as
+    soon as one of the tasks fails. Tasks are expected to check it regularly
+    (e.g.: for every chunk downloaded) and give up once it is set, so that a
+    failure does not leave the other transfers running to completion.
+
+    :param tasks:
+        Callables taking the cancel event.
+    :rtype: list
+    :returns:
+        The results of the tasks, in order.
+    :raises:
+        The exception of the first task that failed.
+    """
+    cancel = threading.Event()
+    errors: List[BaseException] = []
+
+    def run(task):
+        try:
+            return task(cancel)
+        except BaseException as e:
+            if not cancel.is_set():
+                errors.append(e)
+                cancel.set()
+            raise
+
+    with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+        futures = [executor.submit(run, task) for task in tasks]
+        wait(futures)
+    if errors:
+        raise errors[0]
+    return [future.result() for future in futures]
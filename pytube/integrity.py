@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+This module checks downloads as they are written.
+
+Checksumming a finished download means reading the whole file back from
+disk. A :class:`StreamHasher` instead hashes the chunks as they arrive, so
+the digest costs no extra read. Besides the digest of the whole file it
+keeps one digest per range of ``range_size`` bytes, the size of the range
+requests of :func:`request.stream <pytube.request.stream>`: a kept partial
+download records the digests of the ranges it finished in its journal, and
+resuming it checks the kept bytes against them.
+
+Digests are written to a sidecar file next to the download, and can be
+checked again later with :func:`verify`.
+
+SHA-256 (or any algorithm of :mod:`hashlib`) is always available. The much
+faster xxHash algorithms (``xxh64``, ``xxh3_64``, ``xxh3_128``, ...) need
+the ``xxhash`` package.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from pytube.exceptions import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# Added to the path of a download to get the path of its digests.
+DIGEST_SUFFIX = ".digest.json"
+# Same as the range requests of request.stream.
+RANGE_SIZE = 9437184
+# Bytes read at a time when hashing a file.
+_READ_SIZE = 1048576
+
+
+def new_hash(algorithm: str) -> Any:
+    """Get a hash object, with ``update`` and ``hexdigest`` methods.
+
+    :param str algorithm:
+        Name of a :mod:`hashlib` algorithm, e.g.: ``sha256``, or of an
+        xxHash algorithm, e.g.: ``xxh3_64``.
+    :raises ValueError:
+        If the algorithm is not available.
+    """
+    if algorithm.startswith("xxh"):
+        try:
+            import xxhash  # pylint: disable=C0415
+        except ImportError:
+            raise ValueError(
+                f"{algorithm} needs the xxhash package: pip install xxhash"
+            )
+        if not hasattr(xxhash, algorithm):
+            raise ValueError(f"unknown xxhash algorithm {algorithm}")
+        return getattr(xxhash, algorithm)()
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"unknown hash algorithm {algorithm}")
+
+
+class RangeDigest(NamedTuple):
+    """The digest of a range of a file."""
+
+    start: int
+    #: Last byte of the range (inclusive).
+    end: int
+    digest: str
+
+
+class FileDigest(NamedTuple):
+    """The digests of a file."""
+
+    algorithm: str
+    size: int
+    #: Digest of the whole file.
+    digest: str
+    range_size: int
+    ranges: List[RangeDigest]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the digests as a JSON serializable dict.
+
+        :rtype: dict
+        """
+        digest = self._asdict()
+        digest["ranges"] = [list(r) for r in self.ranges]
+        return digest
+
+    @classmethod
+    def from_dict(cls, digest: Dict[str, Any]) -> "FileDigest":
+        """Read digests from a dict of :meth:`to_dict`.
+
+        :param dict digest:
+            The digests.
+        :rtype: FileDigest
+        """
+        return cls(
+            algorithm=digest["algorithm"],
+            size=digest["size"],
+            digest=digest["digest"],
+            range_size=digest["range_size"],
+            ranges=[RangeDigest(*r) for r in digest["ranges"]],
+        )
+
+
+class StreamHasher:
+    """Hashes a file, and each of its ranges, as it is written."""
+
+    def __init__(
+        self, algorithm: str = "sha256", range_size: int = RANGE_SIZE
+    ):
+        """
+        :param str algorithm:
+            (Optional) The hash algorithm, see :func:`new_hash`.
+        :param int range_size:
+            (Optional) Size of the ranges hashed separately.
+        """
+        self.algorithm = algorithm
+        self.range_size = range_size
+        self._file = new_hash(algorithm)
+        self._range = new_hash(algorithm)
+        #: Bytes hashed so far.
+        self.size = 0
+        #: Digests of the complete ranges so far.
+        self.ranges: List[RangeDigest] = []
+
+    def update(self, data: bytes) -> None:
+        """Hash the next bytes of the file."""
+        self._file.update(data)
+        view = memoryview(data)
+        while view:
+            # Chunks do not always line up with the ranges.
+            room = self.range_size - self.size % self.range_size
+            part = view[:room]
+            self._range.update(part)
+            self.size += len(part)
+            view = view[room:]
+            if self.size % self.range_size == 0:
+                self._end_range()
+
+    def update_from_file(self, file_path: str, size: int) -> None:
+        """Hash the first bytes of a file, e.g.: the kept part of a resumed
+        download.
+
+        :param str file_path:
+            The file.
+        :param int size:
+            Number of bytes to hash.
+        """
+        with open(file_path, "rb") as fh:
+            while size > 0:
+                data = fh.read(min(size, _READ_SIZE))
+                if not data:
+                    raise IntegrityError(f"{file_path} is too short")
+                size -= len(data)
+                self.update(data)
+
+    def result(self) -> FileDigest:
+        """Get the digests of everything hashed.
+
+        :rtype: FileDigest
+        """
+        ranges = list(self.ranges)
+        if self.size % self.range_size:
+            # The last range is short.
+            ranges.append(
+                RangeDigest(
+                    self.size - self.size % self.range_size,
+                    self.size - 1,
+                    self._range.hexdigest(),
+                )
+            )
+        return FileDigest(
+            algorithm=self.algorithm,
+            size=self.size,
+            digest=self._file.hexdigest(),
+            range_size=self.range_size,
+            ranges=ranges,
+        )
+
+    def _end_range(self) -> None:
+        self.ranges.append(
+            RangeDigest(
+                self.size - self.range_size,
+                self.size - 1,
+                self._range.hexdigest(),
+            )
+        )
+        self._range = new_hash(self.algorithm)
+
+
+def hash_file(
+    file_path: str, algorithm: str = "sha256", range_size: int = RANGE_SIZE
+) -> FileDigest:
+    """Hash a file on disk.
+
+    :param str file_path:
+        The file.
+    :param str algorithm:
+        (Optional) The hash algorithm, see :func:`new_hash`.
+    :param int range_size:
+        (Optional) Size of the ranges hashed separately.
+    :rtype: FileDigest
+    """
+    hasher = StreamHasher(algorithm, range_size)
+    hasher.update_from_file(file_path, os.stat(file_path).st_size)
+    return hasher.result()
+
+
+def sidecar_path(file_path: str) -> str:
+    """Get the path of the digests of a file.
+
+    :param str file_path:
+        The file.
+    :rtype: str
+    """
+    return file_path + DIGEST_SUFFIX
+
+
+def write_digest(file_path: str, digest: FileDigest) -> None:
+    """Write the digests of a file next to it.
+
+    :param str file_path:
+        The file.
+    :param FileDigest digest:
+        Its digests.
+    """
+    with open(sidecar_path(file_path), "w") as fh:
+        json.dump(digest.to_dict(), fh)
+
+
+def read_digest(file_path: str) -> Optional[FileDigest]:
+    """Read the digests written next to a file.
+
+    :param str file_path:
+        The file.
+    :rtype: FileDigest or None
+    :returns:
+        The digests, ``None`` if there are none or they cannot be read.
+    """
+    try:
+        with open(sidecar_path(file_path)) as fh:
+            return FileDigest.from_dict(json.load(fh))
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def verify(file_path: str, digest: Optional[FileDigest] = None) -> FileDigest:
+    """Check a file against its digests.
+
+    :param str file_path:
+        The file.
+    :param FileDigest digest:
+        (Optional) The expected digests; by default those written next to
+        the file.
+    :rtype: FileDigest
+    :returns:
+        The expected digests.
+    :raises IntegrityError:
+        If the file does not match, or there are no digests to check.
+    """
+    if digest is None:
+        digest = read_digest(file_path)
+    if digest is None:
+        raise IntegrityError(f"{file_path} has no digests")
+    size = os.stat(file_path).st_size
+    if size != digest.size:
+        raise IntegrityError(
+            f"{file_path} has {size} bytes, expected {digest.size}"
+        )
+    actual = hash_file(file_path, digest.algorithm, digest.range_size)
+    if actual.digest != digest.digest:
+        bad = [
+            f"{r.start}-{r.end}"
+            for r, expected in zip(actual.ranges, digest.ranges)
+            if r.digest != expected.digest
+        ]
+        raise IntegrityError(
+            f"{file_path} does not match its {digest.algorithm} digest "
+            f"(ranges {', '.join(bad) or 'unknown'})"
+        )
+    return digest
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 """This module contains a lookup table of YouTube's itag values."""
+from itertools import chain
 from typing import Dict
+from typing import NamedTuple
+from typing import Optional
 
 ITAGS = {
     5: ("240p", "64kbps"),
@@ -92,36 +95,83 @@ ITAGS = {
     328: (None, None),
 }
 
-HDR = [330, 331, 332, 333, 334, 335, 336, 337]
-_60FPS = [298, 299, 302, 303, 308, 315] + HDR
-_3D = [82, 83, 84, 85, 100, 101, 102]
-LIVE = [91, 92, 93, 94, 95, 96, 132, 151]
-DASH_MP4_VIDEO = [133, 134, 135, 136, 137, 138, 160, 212, 264, 266, 298, 299]
-DASH_MP4_AUDIO = [139, 140, 141, 256, 258, 325, 328]
-DASH_WEBM_VIDEO = [
-    167,
-    168,
-    169,
-    170,
-    218,
-    219,
-    278,
-    242,
-    243,
-    244,
-    245,
-    246,
-    247,
-    248,
-    271,
-    272,
-    302,
-    303,
-    308,
-    313,
-    315,
-]
-DASH_WEBM_AUDIO = [171, 172, 249, 250, 251]
+HDR = frozenset([330, 331, 332, 333, 334, 335, 336, 337])
+_60FPS = frozenset([298, 299, 302, 303, 308, 315]) | HDR
+_3D = frozenset([82, 83, 84, 85, 100, 101, 102])
+LIVE = frozenset([91, 92, 93, 94, 95, 96, 132, 151])
+DASH_MP4_VIDEO = frozenset(
+    [133, 134, 135, 136, 137, 138, 160, 212, 264, 266, 298, 299]
+)
+DASH_MP4_AUDIO = frozenset([139, 140, 141, 256, 258, 325, 328])
+DASH_WEBM_VIDEO = frozenset(
+    [
+        167,
+        168,
+        169,
+        170,
+        218,
+        219,
+        278,
+        242,
+        243,
+        244,
+        245,
+        246,
+        247,
+        248,
+        271,
+        272,
+        302,
+        303,
+        308,
+        313,
+        315,
+    ]
+)
+DASH_WEBM_AUDIO = frozenset([171, 172, 249, 250, 251])
+_DASH = DASH_MP4_VIDEO | DASH_MP4_AUDIO | DASH_WEBM_VIDEO | DASH_WEBM_AUDIO
+
+
+class FormatProfile(NamedTuple):
+    """Format information for an itag, shared by all streams of the itag."""
+
+    resolution: Optional[str]
+    abr: Optional[str]
+    is_live: bool
+    is_3d: bool
+    is_hdr: bool
+    fps: int
+    is_dash: bool
+
+
+def _build_profile(itag: int) -> FormatProfile:
+    res, bitrate = ITAGS.get(itag, (None, None))
+    return FormatProfile(
+        resolution=res,
+        abr=bitrate,
+        is_live=itag in LIVE,
+        is_3d=itag in _3D,
+        is_hdr=itag in HDR,
+        fps=60 if itag in _60FPS else 30,
+        is_dash=itag in _DASH,
+    )
+
+
+_PROFILES: Dict[int, FormatProfile] = {
+    itag: _build_profile(itag)
+    for itag in chain(ITAGS, _60FPS, _3D, LIVE, _DASH)
+}
+_UNKNOWN_PROFILE = _build_profile(-1)
+
+
+def format_profile(itag: int) -> FormatProfile:
+    """Get the shared format information for a given itag.
+
+    :param int itag:
+        YouTube format identifier code.
+    :rtype: FormatProfile
+    """
+    return _PROFILES.get(int(itag), _UNKNOWN_PROFILE)
 
 
 def get_format_profile(itag: int) -> Dict:
@@ -130,20 +180,4 @@ def get_format_profile(itag: int) -> Dict:
     :param str itag:
         YouTube format identifier code.
     """
-    itag = int(itag)
-    if itag in ITAGS:
-        res, bitrate = ITAGS[itag]
-    else:
-        res, bitrate = None, None
-    return {
-        "resolution": res,
-        "abr": bitrate,
-        "is_live": itag in LIVE,
-        "is_3d": itag in _3D,
-        "is_hdr": itag in HDR,
-        "fps": 60 if itag in _60FPS else 30,
-        "is_dash": itag in DASH_MP4_VIDEO
-        or itag in DASH_MP4_AUDIO
-        or itag in DASH_WEBM_VIDEO
-        or itag in DASH_WEBM_AUDIO,
-    }
+    return dict(format_profile(itag)._asdict())
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+This module implements a persistent, prioritized download queue.
+
+Jobs (a video url, the itags to download and a target directory) are kept in
+an SQLite database along with their priority, state and number of attempts,
+so a queue survives the process that works it. Jobs that were running when
+the process died are queued again when the database is opened; since
+downloads keep their partial files, they continue where they stopped. Jobs
+that are done are never downloaded twice.
+
+Workers are threads that claim the pending job with the highest priority,
+run it and record how long it waited, how long it ran and how many bytes it
+downloaded.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+
+from pytube import YouTube
+from pytube.exceptions import DownloadCancelled
+from pytube.exceptions import PytubeError
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    itags TEXT NOT NULL,
+    target TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    UNIQUE (url, itags, target)
+)
+"""
+_COLUMNS = (
+    "id, url, itags, target, priority, state, attempts, error, bytes, "
+    "created, started, finished"
+)
+
+
+class Job(NamedTuple):
+    """A download in the queue."""
+
+    id: int
+    url: str
+    #: The itags to download; empty for the highest resolution progressive
+    #: stream.
+    itags: List[int]
+    #: Target directory, ``None`` for the current working directory.
+    target: Optional[str]
+    #: Jobs with a higher priority run first.
+    priority: int
+    state: str
+    attempts: int
+    #: The error of the last failed attempt.
+    error: Optional[str]
+    #: Bytes downloaded by the last attempt.
+    bytes: int
+    #: Unix times the job was added, last started and finished.
+    created: float
+    started: Optional[float]
+    finished: Optional[float]
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        """Seconds between adding the job and its last start."""
+        if self.started is None:
+            return None
+        return self.started - self.created
+
+    @property
+    def run_time(self) -> Optional[float]:
+        """Seconds the last attempt took."""
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Bytes per second of the last attempt."""
+        run_time = self.run_time
+        if not run_time:
+            return None
+        return self.bytes / run_time
+
+
+#: Runs a job, given the event that stops the queue, and returns the number
+#: of bytes it downloaded.
+Handler = Callable[[Job, threading.Event], int]
+
+
+def download(job: Job, stop: threading.Event) -> int:
+    """Download the streams of a job, the default handler of the queue.
+
+    Streams already on disk are skipped, and partial files of an earlier
+    attempt are continued.
+
+    :param Job job:
+        The job.
+    :param stop:
+        Event that cancels the download when set.
+    :rtype: int
+    :returns:
+        Number of bytes downloaded.
+    """
+    youtube = YouTube(job.url)
+    if job.itags:
+        streams = [youtube.streams.get_by_itag(itag) for itag in job.itags]
+    else:
+        streams = [youtube.streams.get_highest_resolution()]
+    if None in streams:
+        raise PytubeError(f"{job.url} has none of the streams of job {job.id}")
+
+    downloaded = 0
+    for stream in streams:
+        context = stream.download_context(  # type: ignore
+            output_path=job.target, keep_partial=True, cancel=stop
+        )
+        context.run()
+        # Bytes kept from an earlier attempt were not downloaded this time.
+        downloaded += context.bytes_done - context.resumed_from
+    return downloaded
+
+
+class JobQueue:
+    """A download queue stored in an SQLite database.
+
+    The queue may be used from several threads, but only one process should
+    work a database at a time: opening it queues the jobs left running
+    again.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        """
+        :param str path:
+            Path of the database, created if it does not exist.
+        :param int max_attempts:
+            (Optional) Number of times a job is tried before it fails.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        # Transactions are begun explicitly.
+        self._db = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(_SCHEMA)
+        recovered = self.recover()
+        if recovered:
+            logger.info("%d interrupted jobs are queued again", recovered)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._db.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def add(
+        self,
+        url: str,
+        itags: Sequence[int] = (),
+        target: Optional[str] = None,
+        priority: int = 0,
+    ) -> int:
+        """Queue a download.
+
+        Adding a job that is already queued raises its priority if the new
+        one is higher; a job that failed is queued again, one that is done
+        is left alone.
+
+        :param str url:
+            The video url.
+        :param itags:
+            (Optional) The itags to download, by default the highest
+            resolution progressive stream.
+        :param str target:
+            (Optional) Target directory.
+        :param int priority:
+            (Optional) Jobs with a higher priority run first.
+        :rtype: int
+        :returns:
+            The id of the job.
+        """
+        key = (url, json.dumps(list(itags)), target or "")
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute(
+                "INSERT OR IGNORE INTO jobs (url, itags, target, priority, "
+                "created) VALUES (?, ?, ?, ?, ?)",
+                key + (priority, time.time()),
+            )
+            job_id, state = self._db.execute(
+                "SELECT id, state FROM jobs "
+                "WHERE url = ? AND itags = ? AND target = ?",
+                key,
+            ).fetchone()
+            if state == FAILED:
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, attempts = 0, error = NULL "
+                    "WHERE id = ?",
+                    (PENDING, job_id),
+                )
+            if state != DONE:
+                self._db.execute(
+                    "UPDATE jobs SET priority = MAX(priority, ?) WHERE id = ?",
+                    (priority, job_id),
+                )
+        return job_id
+
+    def claim(self) -> Optional[Job]:
+        """Start the pending job with the highest priority.
+
+        :rtype: Job or None
+        :returns:
+            The job, ``None`` if no job is pending.
+        """
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE state = ? "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (PENDING,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, "
+                "started = ?, finished = NULL, bytes = 0 WHERE id = ?",
+                (RUNNING, time.time(), row[0]),
+            )
+            return self._get(row[0])
+
+    def complete(self, job_id: int, size: int = 0) -> None:
+        """Mark a job as done.
+
+        :param int job_id:
+            The job.
+        :param int size:
+            (Optional) Bytes downloaded.
+        """
+        self._update(
+            "UPDATE jobs SET state = ?, bytes = ?, finished = ?, error = NULL "
+            "WHERE id = ?",
+            (DONE, size, time.time(), job_id),
+        )
+
+    def fail(self, job_id: int, error: str) -> None:
+        """Record a failed attempt; the job is queued again until it ran out
+        of attempts.
+
+        :param int job_id:
+            The job.
+        :param str error:
+            Description of the error.
+        """
+        self._update(
+            "UPDATE jobs SET state = CASE WHEN attempts < ? THEN ? ELSE ? END,"
+            " error = ?, finished = ? WHERE id = ?",
+            (self.max_attempts, PENDING, FAILED, error, time.time(), job_id),
+        )
+
+    def release(self, job_id: int) -> None:
+        """Queue a running job again without counting the attempt.
+
+        :param int job_id:
+            The job.
+        """
+        self._update(
+            "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0) "
+            "WHERE id = ? AND state = ?",
+            (PENDING, job_id, RUNNING),
+        )
+
+    def recover(self) -> int:
+        """Queue the jobs left running by a process that died.
+
+        :rtype: int
+        :returns:
+            The number of jobs queued again.
+        """
+        return self._update(
+            "UPDATE jobs SET state = ?, attempts = MAX(attempts - 1, 0) "
+            "WHERE state = ?",
+            (PENDING, RUNNING),
+        )
+
+    def jobs(self, state: Optional[str] = None) -> List[Job]:
+        """Get the jobs, in the order they were added.
+
+        :param str state:
+            (Optional) Only get jobs in this state.
+        :rtype: List[Job]
+        """
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        parameters: tuple = ()
+        if state is not None:
+            query += " WHERE state = ?"
+            parameters = (state,)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY id", parameters)
+            return [self._job(row) for row in rows.fetchall()]
+
+    def counts(self) -> Dict[str, int]:
+        """Get the number of jobs in each state.
+
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            ).fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def work(
+        self,
+        handler: Handler = download,
+        workers: int = 4,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """Run the pending jobs until none is left.
+
+        :param handler:
+            (Optional) Runs a job, see :func:`download`.
+        :param int workers:
+            (Optional) Number of jobs run at the same time.
+        :param stop:
+            (Optional) Event that stops the queue when set; the running jobs
+            are cancelled and stay queued.
+        """
+        stop = stop if stop is not None else threading.Event()
+
+        def worker() -> None:
+            while not stop.is_set():
+                job = self.claim()
+                if job is None:
+                    return
+                self._run(job, handler, stop)
+
+        threads = [
+            threading.Thread(
+                target=worker, name=f"pytube-jobs-{n}", daemon=True
+            )
+            for n in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except BaseException:
+            # e.g.: KeyboardInterrupt; let the workers put their jobs back.
+            stop.set()
+            for thread in threads:
+                thread.join()
+            raise
+
+    def _run(self, job: Job, handler: Handler, stop: threading.Event) -> None:
+        logger.info("job %d: %s (attempt %d)", job.id, job.url, job.attempts)
+        try:
+            size = handler(job, stop)
+        except DownloadCancelled:
+            if stop.is_set():
+                self.release(job.id)
+                return
+            self.fail(job.id, "cancelled")
+        except Exception as e:  # pylint: disable=W0703
+            logger.warning("job %d failed: %s", job.id, e)
+            self.fail(job.id, repr(e))
+        else:
+            self.complete(job.id, size)
+            with self._lock:
+                done = self._get(job.id)
+            logger.info(
+                "job %d done: %d bytes in %.1fs (%.0f B/s), waited %.1fs",
+                job.id,
+                done.bytes,
+                done.run_time or 0.0,
+                done.throughput or 0.0,
+                done.wait_time or 0.0,
+            )
+
+    def _get(self, job_id: int) -> Job:
+        row = self._db.execute(
+            f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._job(row)
+
+    def _update(self, query: str, parameters: tuple) -> int:
+        with self._lock, self._db:
+            return self._db.execute(query, parameters).rowcount
+
+    @staticmethod
+    def _job(row: tuple) -> Job:
+        values = list(row)
+        values[2] = json.loads(values[2])
+        values[3] = values[3] or None
+        return Job(*values)
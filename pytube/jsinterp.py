@@ -0,0 +1,1518 @@
+# -*- coding: utf-8 -*-
+"""
+This module implements a small, sandboxed interpreter for a subset of
+JavaScript.
+
+YouTube's player protects some url parameters (such as the ``n`` throttling
+parameter) with functions that are too irregular to map onto a fixed set of
+Python transforms, the way :mod:`pytube.cipher` does for the signature.
+Instead, the function source is extracted from base.js and evaluated here.
+
+Only the features those functions need are supported: functions and
+closures, ``var`` declarations, arrays, strings, numbers, the usual
+operators, ``if``/``for``/``while``/``switch``/``try`` statements and a
+whitelist of built-in methods. Evaluation has no access to Python objects and
+is bounded by a step budget, so hostile or broken code cannot run away.
+"""
+import math
+import re
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from pytube.exceptions import ExtractError
+
+
+class JSInterpreterError(ExtractError):
+    """JavaScript could not be parsed or evaluated."""
+
+
+class JSThrow(Exception):
+    """A JavaScript exception, catchable by ``try``/``catch``."""
+
+    def __init__(self, value: Any):
+        super().__init__(value)
+        self.value = value
+
+
+class _Undefined:
+    """The JavaScript ``undefined`` value."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __repr__(self) -> str:
+        return "undefined"
+
+    def __bool__(self) -> bool:
+        return False
+
+
+UNDEFINED = _Undefined()
+# JavaScript ``null`` is represented by ``None``.
+NULL = None
+
+
+class JSRegExp:
+    """A regular expression literal (kept as an opaque value)."""
+
+    def __init__(self, pattern: str, flags: str):
+        self.pattern = pattern
+        self.flags = flags
+
+    def __repr__(self) -> str:
+        return f"/{self.pattern}/{self.flags}"
+
+
+class _Return(Exception):
+    def __init__(self, value: Any):
+        super().__init__()
+        self.value = value
+
+
+class _Break(Exception):
+    pass
+
+
+class _Continue(Exception):
+    pass
+
+
+_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+    |(?P<num>0[xX][0-9a-fA-F]+|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<id>[a-zA-Z_$][\w$]*)
+    |(?P<str>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    |(?P<punct>>>>=|===|!==|>>>|<<=|>>=|\*\*|&&|\|\||==|!=|<=|>=|\+\+|--
+        |\+=|-=|\*=|/=|%=|&=|\|=|\^=|<<|>>|[{}()\[\];,.<>+\-*/%&|^!~?:=])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_REGEX_LITERAL = re.compile(r"/((?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+)/([a-z]*)")
+_ESCAPES = {
+    "n": "\n",
+    "t": "\t",
+    "r": "\r",
+    "b": "\b",
+    "f": "\f",
+    "v": "\v",
+    "0": "\0",
+}
+# a "/" following these tokens starts a regex literal rather than a division
+_REGEX_KEYWORDS = frozenset(("return", "typeof", "case", "in", "void", "throw"))
+
+Token = Tuple[str, Any]
+
+
+def _unescape(literal: str) -> str:
+    out = []
+    i = 0
+    while i < len(literal):
+        ch = literal[i]
+        if ch != "\\":
+            out.append(ch)
+            i += 1
+            continue
+        nxt = literal[i + 1]
+        if nxt == "x":
+            out.append(chr(int(literal[i + 2 : i + 4], 16)))
+            i += 4
+        elif nxt == "u":
+            out.append(chr(int(literal[i + 2 : i + 6], 16)))
+            i += 6
+        elif nxt == "\n":
+            i += 2
+        else:
+            out.append(_ESCAPES.get(nxt, nxt))
+            i += 2
+    return "".join(out)
+
+
+def _iter_tokens(code: str, pos: int = 0) -> Iterator[Tuple[str, Any, int]]:
+    prev: Optional[Tuple[str, Any]] = None
+    while pos < len(code):
+        if code[pos] == "/" and not code.startswith(("//", "/*"), pos):
+            regex_allowed = (
+                prev is None
+                or (prev[0] == "punct" and prev[1] not in (")", "]", "}"))
+                or (prev[0] == "id" and prev[1] in _REGEX_KEYWORDS)
+            )
+            if regex_allowed:
+                match = _REGEX_LITERAL.match(code, pos)
+                if not match:
+                    raise JSInterpreterError(f"invalid regex at {pos}")
+                pos = match.end()
+                prev = ("regex", match.groups())
+                yield prev[0], prev[1], pos
+                continue
+        match = _TOKEN_REGEX.match(code, pos)
+        if not match:
+            raise JSInterpreterError(f"unexpected character at {pos}")
+        kind = match.lastgroup
+        value: Any = match.group(kind)
+        pos = match.end()
+        if kind == "space":
+            continue
+        if kind == "num":
+            if value[:2] in ("0x", "0X"):
+                value = int(value, 16)
+            elif "." in value or "e" in value or "E" in value:
+                value = float(value)
+            else:
+                value = int(value)
+        elif kind == "str":
+            value = _unescape(value[1:-1])
+        prev = (kind, value)
+        yield kind, value, pos
+
+
+def tokenize(code: str) -> List[Token]:
+    """Split JavaScript source into tokens.
+
+    :param str code:
+        JavaScript source code.
+    :rtype: list
+    :returns:
+        ``(type, value)`` tuples, terminated by an ``("eof", None)`` token.
+    """
+    tokens: List[Token] = [(kind, value) for kind, value, _ in _iter_tokens(code)]
+    tokens.append(("eof", None))
+    return tokens
+
+
+_BINARY_PRECEDENCE = {
+    "||": 1,
+    "&&": 2,
+    "|": 3,
+    "^": 4,
+    "&": 5,
+    "==": 6,
+    "!=": 6,
+    "===": 6,
+    "!==": 6,
+    "<": 7,
+    ">": 7,
+    "<=": 7,
+    ">=": 7,
+    "<<": 8,
+    ">>": 8,
+    ">>>": 8,
+    "+": 9,
+    "-": 9,
+    "*": 10,
+    "/": 10,
+    "%": 10,
+    "**": 11,
+}
+_ASSIGN_OPS = frozenset(
+    ("=", "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=", "<<=", ">>=")
+)
+_UNARY_OPS = frozenset(("!", "-", "+", "~", "typeof", "void"))
+
+
+class _Parser:
+    """Recursive descent parser producing a tuple based syntax tree."""
+
+    def __init__(self, code: str):
+        self.tokens = tokenize(code)
+        self.pos = 0
+        # names declared with ``var`` in each enclosing function
+        self.var_scopes: List[Set[str]] = [set()]
+
+    def peek(self, offset: int = 0) -> Token:
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self) -> Token:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def at(self, value: str) -> bool:
+        kind, tok = self.peek()
+        return kind in ("punct", "id") and tok == value
+
+    def accept(self, value: str) -> bool:
+        if self.at(value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, value: str) -> None:
+        if not self.accept(value):
+            raise JSInterpreterError(
+                f"expected {value!r}, got {self.peek()[1]!r}"
+            )
+
+    def identifier(self) -> str:
+        kind, value = self.next()
+        if kind != "id":
+            raise JSInterpreterError(f"expected identifier, got {value!r}")
+        return value
+
+    # statements
+
+    def program(self) -> List:
+        body = []
+        while self.peek()[0] != "eof":
+            body.append(self.statement())
+        return body
+
+    def end_statement(self) -> None:
+        # semicolons are optional before "}", at the end of input and
+        # between statements minified onto one line
+        self.accept(";")
+
+    def block(self) -> List:
+        self.expect("{")
+        body = []
+        while not self.accept("}"):
+            body.append(self.statement())
+        return body
+
+    def statement(self) -> Tuple:
+        kind, value = self.peek()
+        if kind == "punct":
+            if value == "{":
+                return ("block", self.block())
+            if value == ";":
+                self.next()
+                return ("empty",)
+        if kind == "id":
+            handler = getattr(self, f"statement_{value}", None)
+            if handler is not None:
+                self.next()
+                return handler()
+        expr = self.expression()
+        self.end_statement()
+        return ("expr", expr)
+
+    def declarations(self) -> Tuple:
+        decls = []
+        while True:
+            name = self.identifier()
+            self.var_scopes[-1].add(name)
+            init = self.assignment() if self.accept("=") else None
+            decls.append((name, init))
+            if not self.accept(","):
+                return ("var", decls)
+
+    def statement_var(self) -> Tuple:
+        stmt = self.declarations()
+        self.end_statement()
+        return stmt
+
+    statement_let = statement_var
+    statement_const = statement_var
+
+    def statement_if(self) -> Tuple:
+        self.expect("(")
+        test = self.expression()
+        self.expect(")")
+        consequent = self.statement()
+        alternate = self.statement() if self.accept("else") else None
+        return ("if", test, consequent, alternate)
+
+    def statement_for(self) -> Tuple:
+        self.expect("(")
+        init: Optional[Tuple] = None
+        if self.accept("var") or self.accept("let") or self.accept("const"):
+            init = self.declarations()
+        elif not self.at(";"):
+            init = ("expr", self.expression())
+        if self.at("in") or self.at("of"):
+            raise JSInterpreterError("for-in/for-of loops are not supported")
+        self.expect(";")
+        test = None if self.at(";") else self.expression()
+        self.expect(";")
+        update = None if self.at(")") else self.expression()
+        self.expect(")")
+        return ("for", init, test, update, self.statement())
+
+    def statement_while(self) -> Tuple:
+        self.expect("(")
+        test = self.expression()
+        self.expect(")")
+        return ("for", None, test, None, self.statement())
+
+    def statement_do(self) -> Tuple:
+        body = self.statement()
+        self.expect("while")
+        self.expect("(")
+        test = self.expression()
+        self.expect(")")
+        self.end_statement()
+        return ("dowhile", body, test)
+
+    def statement_return(self) -> Tuple:
+        value = None
+        if not (self.at(";") or self.at("}") or self.peek()[0] == "eof"):
+            value = self.expression()
+        self.end_statement()
+        return ("return", value)
+
+    def statement_break(self) -> Tuple:
+        self.end_statement()
+        return ("break",)
+
+    def statement_continue(self) -> Tuple:
+        self.end_statement()
+        return ("continue",)
+
+    def statement_throw(self) -> Tuple:
+        value = self.expression()
+        self.end_statement()
+        return ("throw", value)
+
+    def statement_try(self) -> Tuple:
+        body = self.block()
+        param = handler = finalizer = None
+        if self.accept("catch"):
+            if self.accept("("):
+                param = self.identifier()
+                self.expect(")")
+            handler = self.block()
+        if self.accept("finally"):
+            finalizer = self.block()
+        return ("try", body, param, handler, finalizer)
+
+    def statement_switch(self) -> Tuple:
+        self.expect("(")
+        discriminant = self.expression()
+        self.expect(")")
+        self.expect("{")
+        cases = []
+        while not self.accept("}"):
+            if self.accept("default"):
+                test = None
+            else:
+                self.expect("case")
+                test = self.expression()
+            self.expect(":")
+            body = []
+            while not (self.at("case") or self.at("default") or self.at("}")):
+                body.append(self.statement())
+            cases.append((test, body))
+        return ("switch", discriminant, cases)
+
+    def statement_function(self) -> Tuple:
+        name = self.identifier()
+        self.var_scopes[-1].add(name)
+        return ("funcdecl", name, self.function_body(name))
+
+    # expressions
+
+    def expression(self) -> Tuple:
+        expr = self.assignment()
+        if not self.at(","):
+            return expr
+        exprs = [expr]
+        while self.accept(","):
+            exprs.append(self.assignment())
+        return ("seq", exprs)
+
+    def assignment(self) -> Tuple:
+        target = self.conditional()
+        kind, value = self.peek()
+        if kind == "punct" and value in _ASSIGN_OPS:
+            if target[0] not in ("name", "index"):
+                raise JSInterpreterError("invalid assignment target")
+            self.next()
+            return ("assign", value, target, self.assignment())
+        return target
+
+    def conditional(self) -> Tuple:
+        test = self.binary(1)
+        if not self.accept("?"):
+            return test
+        consequent = self.assignment()
+        self.expect(":")
+        return ("cond", test, consequent, self.assignment())
+
+    def binary(self, min_precedence: int) -> Tuple:
+        left = self.unary()
+        while True:
+            kind, op = self.peek()
+            precedence = _BINARY_PRECEDENCE.get(op) if kind == "punct" else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.next()
+            # ``**`` is right associative
+            right = self.binary(
+                precedence if op == "**" else precedence + 1
+            )
+            node = "logical" if op in ("&&", "||") else "binary"
+            left = (node, op, left, right)
+
+    def unary(self) -> Tuple:
+        kind, value = self.peek()
+        if kind in ("punct", "id") and value in _UNARY_OPS:
+            self.next()
+            return ("unary", value, self.unary())
+        if kind == "punct" and value in ("++", "--"):
+            self.next()
+            return ("update", value, True, self.unary())
+        expr = self.postfix()
+        if self.at("**"):
+            self.next()
+            return ("binary", "**", expr, self.unary())
+        return expr
+
+    def postfix(self) -> Tuple:
+        expr = self.call_member()
+        kind, value = self.peek()
+        if kind == "punct" and value in ("++", "--"):
+            self.next()
+            return ("update", value, False, expr)
+        return expr
+
+    def arguments(self) -> List:
+        args = []
+        while not self.accept(")"):
+            args.append(self.assignment())
+            if not self.at(")"):
+                self.expect(",")
+        return args
+
+    def call_member(self) -> Tuple:
+        if self.accept("new"):
+            callee = self.primary()
+            while self.at(".") or self.at("["):
+                callee = self.member(callee)
+            args = self.arguments() if self.accept("(") else []
+            expr = ("new", callee, args)
+        else:
+            expr = self.primary()
+        while True:
+            if self.at(".") or self.at("["):
+                expr = self.member(expr)
+            elif self.accept("("):
+                expr = ("call", expr, self.arguments())
+            else:
+                return expr
+
+    def member(self, obj: Tuple) -> Tuple:
+        if self.accept("."):
+            return ("index", obj, ("const", self.identifier()))
+        self.expect("[")
+        key = self.expression()
+        self.expect("]")
+        return ("index", obj, key)
+
+    def function_body(self, name: Optional[str]) -> Tuple:
+        self.expect("(")
+        params = []
+        while not self.accept(")"):
+            params.append(self.identifier())
+            if not self.at(")"):
+                self.expect(",")
+        self.var_scopes.append(set())
+        body = self.block()
+        var_names = self.var_scopes.pop()
+        return ("func", name, params, body, frozenset(var_names))
+
+    def primary(self) -> Tuple:
+        kind, value = self.next()
+        if kind in ("num", "str"):
+            return ("const", value)
+        if kind == "regex":
+            return ("regex", value[0], value[1])
+        if kind == "punct":
+            if value == "(":
+                expr = self.expression()
+                self.expect(")")
+                return expr
+            if value == "[":
+                elements = []
+                while not self.accept("]"):
+                    if self.at(","):
+                        elements.append(("const", UNDEFINED))
+                    else:
+                        elements.append(self.assignment())
+                    if not self.at("]"):
+                        self.expect(",")
+                return ("array", elements)
+            if value == "{":
+                props = []
+                while not self.accept("}"):
+                    key_kind, key = self.next()
+                    if key_kind not in ("id", "str", "num"):
+                        raise JSInterpreterError(f"invalid property {key!r}")
+                    self.expect(":")
+                    props.append((_to_key(key), self.assignment()))
+                    if not self.at("}"):
+                        self.expect(",")
+                return ("object", props)
+        if kind == "id":
+            if value == "function":
+                name = self.identifier() if self.peek()[0] == "id" else None
+                return self.function_body(name)
+            if value in _LITERALS:
+                return ("const", _LITERALS[value])
+            return ("name", value)
+        raise JSInterpreterError(f"unexpected token {value!r}")
+
+
+_LITERALS = {
+    "true": True,
+    "false": False,
+    "null": NULL,
+    "undefined": UNDEFINED,
+    "NaN": math.nan,
+    "Infinity": math.inf,
+}
+
+
+# type conversions
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def to_number(value: Any) -> Any:
+    """Convert a value to a JavaScript number."""
+    if _is_number(value):
+        return value
+    if isinstance(value, bool):
+        return int(value)
+    if value is NULL:
+        return 0
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return 0
+        try:
+            if value[:2] in ("0x", "0X"):
+                return int(value, 16)
+            number = float(value)
+        except ValueError:
+            return math.nan
+        return int(number) if number.is_integer() and "." not in value else number
+    if isinstance(value, list):
+        return to_number(to_string(value))
+    return math.nan
+
+
+def _number_to_string(value: Any) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    if value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    return repr(value)
+
+
+def to_string(value: Any) -> str:
+    """Convert a value to a JavaScript string."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if _is_number(value):
+        return _number_to_string(value)
+    if value is NULL:
+        return "null"
+    if value is UNDEFINED:
+        return "undefined"
+    if isinstance(value, list):
+        return ",".join(
+            "" if v is NULL or v is UNDEFINED else to_string(v) for v in value
+        )
+    if isinstance(value, JSFunction):
+        return f"function {value.name or ''}() {{ [code] }}"
+    if isinstance(value, JSRegExp):
+        return repr(value)
+    return "[object Object]"
+
+
+def to_boolean(value: Any) -> bool:
+    """Convert a value to a JavaScript boolean."""
+    if _is_number(value):
+        return not (value == 0 or math.isnan(value))
+    if isinstance(value, str):
+        return value != ""
+    return value is not NULL and value is not UNDEFINED and value is not False
+
+
+def to_int32(value: Any) -> int:
+    """Convert a value to a signed 32-bit integer."""
+    number = to_number(value)
+    if isinstance(number, float):
+        if math.isnan(number) or math.isinf(number):
+            return 0
+        number = int(number)
+    number &= 0xFFFFFFFF
+    return number - 0x100000000 if number & 0x80000000 else number
+
+
+def _to_key(value: Any) -> Any:
+    if _is_number(value):
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value if isinstance(value, int) else to_string(value)
+    if isinstance(value, str) and value.isdigit() and value == str(int(value)):
+        return int(value)
+    return to_string(value)
+
+
+def _to_primitive(value: Any) -> Any:
+    if isinstance(value, (list, dict, JSFunction, JSRegExp)):
+        return to_string(value)
+    return value
+
+
+def typeof(value: Any) -> str:
+    """Get the JavaScript ``typeof`` of a value."""
+    if value is UNDEFINED:
+        return "undefined"
+    if isinstance(value, bool):
+        return "boolean"
+    if _is_number(value):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, (JSFunction, _Builtin)):
+        return "function"
+    return "object"
+
+
+def strict_equals(a: Any, b: Any) -> bool:
+    """JavaScript ``===``."""
+    if _is_number(a) and _is_number(b):
+        return a == b
+    if isinstance(a, (list, dict, JSFunction, JSRegExp)):
+        return a is b
+    return type(a) is type(b) and a == b
+
+
+def loose_equals(a: Any, b: Any) -> bool:
+    """JavaScript ``==``."""
+    if (a is NULL or a is UNDEFINED) and (b is NULL or b is UNDEFINED):
+        return True
+    if a is NULL or a is UNDEFINED or b is NULL or b is UNDEFINED:
+        return False
+    if type(a) is type(b) or (_is_number(a) and _is_number(b)):
+        return strict_equals(a, b)
+    a, b = _to_primitive(a), _to_primitive(b)
+    if isinstance(a, str) and isinstance(b, str):
+        return a == b
+    return to_number(a) == to_number(b)
+
+
+def _remainder(a: Any, b: Any) -> Any:
+    a, b = to_number(a), to_number(b)
+    if isinstance(a, int) and isinstance(b, int):
+        if b == 0:
+            return math.nan
+        result = abs(a) % abs(b)
+        return -result if a < 0 else result
+    if b == 0 or math.isnan(a) or math.isnan(b) or math.isinf(a):
+        return math.nan
+    return math.fmod(a, b)
+
+
+def _divide(a: Any, b: Any) -> Any:
+    a, b = to_number(a), to_number(b)
+    if b == 0:
+        if a == 0 or math.isnan(a):
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1, b)
+    if isinstance(a, int) and isinstance(b, int) and a % b == 0:
+        return a // b
+    return a / b
+
+
+def _add(a: Any, b: Any) -> Any:
+    a, b = _to_primitive(a), _to_primitive(b)
+    if isinstance(a, str) or isinstance(b, str):
+        return to_string(a) + to_string(b)
+    return to_number(a) + to_number(b)
+
+
+def _compare(op: str, a: Any, b: Any) -> bool:
+    a, b = _to_primitive(a), _to_primitive(b)
+    if not (isinstance(a, str) and isinstance(b, str)):
+        a, b = to_number(a), to_number(b)
+        if math.isnan(a) or math.isnan(b):
+            return False
+    if op == "<":
+        return a < b
+    if op == ">":
+        return a > b
+    if op == "<=":
+        return a <= b
+    return a >= b
+
+
+_BINARY_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "+": _add,
+    "-": lambda a, b: to_number(a) - to_number(b),
+    "*": lambda a, b: to_number(a) * to_number(b),
+    "/": _divide,
+    "%": _remainder,
+    "**": lambda a, b: to_number(a) ** to_number(b),
+    "&": lambda a, b: to_int32(to_int32(a) & to_int32(b)),
+    "|": lambda a, b: to_int32(to_int32(a) | to_int32(b)),
+    "^": lambda a, b: to_int32(to_int32(a) ^ to_int32(b)),
+    "<<": lambda a, b: to_int32(to_int32(a) << (to_int32(b) & 31)),
+    ">>": lambda a, b: to_int32(a) >> (to_int32(b) & 31),
+    ">>>": lambda a, b: (to_int32(a) & 0xFFFFFFFF) >> (to_int32(b) & 31),
+    "==": loose_equals,
+    "!=": lambda a, b: not loose_equals(a, b),
+    "===": strict_equals,
+    "!==": lambda a, b: not strict_equals(a, b),
+    "<": lambda a, b: _compare("<", a, b),
+    ">": lambda a, b: _compare(">", a, b),
+    "<=": lambda a, b: _compare("<=", a, b),
+    ">=": lambda a, b: _compare(">=", a, b),
+}
+
+
+class _Scope:
+    __slots__ = ("vars", "parent")
+
+    def __init__(self, parent: Optional["_Scope"] = None):
+        self.vars: Dict[str, Any] = {}
+        self.parent = parent
+
+    def find(self, name: str) -> Optional["_Scope"]:
+        scope: Optional[_Scope] = self
+        while scope is not None:
+            if name in scope.vars:
+                return scope
+            scope = scope.parent
+        return None
+
+
+class JSFunction:
+    """A JavaScript function defined in interpreted code."""
+
+    def __init__(
+        self, interpreter: "JSInterpreter", node: Tuple, scope: _Scope
+    ):
+        _, self.name, self.params, self.body, self.var_names = node
+        self.interpreter = interpreter
+        self.scope = scope
+
+    def __call__(self, *args: Any) -> Any:
+        return self.interpreter.call(self, list(args))
+
+    def __repr__(self) -> str:
+        return f"<JSFunction {self.name or 'anonymous'}>"
+
+
+class _Builtin:
+    """A whitelisted built-in function."""
+
+    def __init__(self, name: str, func: Callable, this: Any = UNDEFINED):
+        self.name = name
+        self.func = func
+        self.this = this
+
+    def __call__(self, *args: Any) -> Any:
+        return self.func(self.this, *args)
+
+
+def _to_integer(value: Any, default: int = 0) -> int:
+    if value is UNDEFINED:
+        return default
+    number = to_number(value)
+    if isinstance(number, float):
+        if math.isnan(number):
+            return 0
+        if math.isinf(number):
+            return 2 ** 53 if number > 0 else -(2 ** 53)
+        return int(number)
+    return number
+
+
+def _arg(args: Tuple, index: int) -> Any:
+    return args[index] if len(args) > index else UNDEFINED
+
+
+def _relative_index(value: Any, length: int, default: int) -> int:
+    if value is UNDEFINED:
+        return default
+    number = to_number(value)
+    if isinstance(number, float):
+        if math.isnan(number):
+            return 0
+        if math.isinf(number):
+            return length if number > 0 else 0
+        number = int(number)
+    if number < 0:
+        return max(length + number, 0)
+    return min(number, length)
+
+
+def _splice(arr: List, *args: Any) -> List:
+    start = _relative_index(_arg(args, 0), len(arr), 0)
+    if len(args) < 2:
+        count = len(arr) - start
+    else:
+        count = min(max(_to_integer(args[1]), 0), len(arr) - start)
+    removed = arr[start : start + count]
+    arr[start : start + count] = list(args[2:])
+    return removed
+
+
+def _slice(seq: Any, *args: Any) -> Any:
+    start = _relative_index(_arg(args, 0), len(seq), 0)
+    end = _relative_index(_arg(args, 1), len(seq), len(seq))
+    return seq[start:end]
+
+
+def _substring(s: str, *args: Any) -> str:
+    start = min(max(_to_integer(_arg(args, 0)), 0), len(s))
+    end = min(max(_to_integer(_arg(args, 1), len(s)), 0), len(s))
+    if start > end:
+        start, end = end, start
+    return s[start:end]
+
+
+def _index_of(seq: Any, *args: Any) -> int:
+    needle = _arg(args, 0)
+    start = _relative_index(_arg(args, 1), len(seq), 0)
+    if isinstance(seq, str):
+        return seq.find(to_string(needle), start)
+    for i in range(start, len(seq)):
+        if strict_equals(seq[i], needle):
+            return i
+    return -1
+
+
+def _split(string: str, *args: Any) -> List[str]:
+    separator = _arg(args, 0)
+    if separator is UNDEFINED:
+        parts = [string]
+    elif isinstance(separator, JSRegExp):
+        parts = re.split(separator.pattern, string)
+    elif separator == "":
+        parts = list(string)
+    else:
+        parts = string.split(to_string(separator))
+    limit = _arg(args, 1)
+    return parts if limit is UNDEFINED else parts[: _to_integer(limit)]
+
+
+def _char_code_at(string: str, *args: Any) -> Any:
+    index = _to_integer(_arg(args, 0))
+    if 0 <= index < len(string):
+        return ord(string[index])
+    return math.nan
+
+
+def _char_at(string: str, *args: Any) -> str:
+    index = _to_integer(_arg(args, 0))
+    return string[index] if 0 <= index < len(string) else ""
+
+
+def _unshift(arr: List, *args: Any) -> int:
+    arr[0:0] = args
+    return len(arr)
+
+
+def _push(arr: List, *args: Any) -> int:
+    arr.extend(args)
+    return len(arr)
+
+
+def _pop(arr: List) -> Any:
+    return arr.pop() if arr else UNDEFINED
+
+
+def _shift(arr: List) -> Any:
+    return arr.pop(0) if arr else UNDEFINED
+
+
+def _reverse(arr: List) -> List:
+    arr.reverse()
+    return arr
+
+
+def _join(arr: List, *args: Any) -> str:
+    separator = _arg(args, 0)
+    separator = "," if separator is UNDEFINED else to_string(separator)
+    return separator.join(
+        "" if v is NULL or v is UNDEFINED else to_string(v) for v in arr
+    )
+
+
+def _concat(seq: Any, *args: Any) -> Any:
+    if isinstance(seq, str):
+        return seq + "".join(to_string(a) for a in args)
+    result = list(seq)
+    for arg in args:
+        if isinstance(arg, list):
+            result.extend(arg)
+        else:
+            result.append(arg)
+    return result
+
+
+def _for_each(arr: List, callback: Callable, *_: Any) -> Any:
+    for i, value in enumerate(list(arr)):
+        callback(value, i, arr)
+    return UNDEFINED
+
+
+def _map(arr: List, callback: Callable, *_: Any) -> List:
+    return [callback(value, i, arr) for i, value in enumerate(list(arr))]
+
+
+def _filter(arr: List, callback: Callable, *_: Any) -> List:
+    return [
+        value
+        for i, value in enumerate(list(arr))
+        if to_boolean(callback(value, i, arr))
+    ]
+
+
+def _replace(string: str, pattern: Any, replacement: Any) -> str:
+    replacement = to_string(replacement)
+    if isinstance(pattern, JSRegExp):
+        count = 0 if "g" in pattern.flags else 1
+        return re.sub(
+            pattern.pattern, lambda _: replacement, string, count=count
+        )
+    return string.replace(to_string(pattern), replacement, 1)
+
+
+_ARRAY_METHODS: Dict[str, Callable] = {
+    "push": _push,
+    "pop": _pop,
+    "shift": _shift,
+    "unshift": _unshift,
+    "splice": _splice,
+    "slice": _slice,
+    "reverse": _reverse,
+    "join": _join,
+    "concat": _concat,
+    "indexOf": _index_of,
+    "includes": lambda arr, *args: _index_of(arr, *args) != -1,
+    "forEach": _for_each,
+    "map": _map,
+    "filter": _filter,
+    "toString": lambda arr: to_string(arr),
+}
+_STRING_METHODS: Dict[str, Callable] = {
+    "split": _split,
+    "charAt": _char_at,
+    "charCodeAt": _char_code_at,
+    "indexOf": _index_of,
+    "includes": lambda s, *args: _index_of(s, *args) != -1,
+    "slice": _slice,
+    "substring": _substring,
+    "concat": _concat,
+    "replace": _replace,
+    "toLowerCase": lambda s: s.lower(),
+    "toUpperCase": lambda s: s.upper(),
+    "toString": lambda s: s,
+}
+
+
+def _math_function(func: Callable) -> Callable:
+    def wrapper(_, *args):
+        return func(*(to_number(a) for a in args))
+
+    return wrapper
+
+
+_GLOBALS: Dict[str, Dict[str, Any]] = {
+    "String": {
+        "fromCharCode": lambda _, *codes: "".join(
+            chr(to_int32(c) & 0xFFFF) for c in codes
+        ),
+    },
+    "Math": {
+        "abs": _math_function(abs),
+        "floor": _math_function(math.floor),
+        "ceil": _math_function(math.ceil),
+        "round": _math_function(lambda x: math.floor(x + 0.5)),
+        "max": _math_function(lambda *a: max(a) if a else -math.inf),
+        "min": _math_function(lambda *a: min(a) if a else math.inf),
+        "pow": _math_function(lambda a, b: a ** b),
+        "sqrt": _math_function(math.sqrt),
+    },
+}
+
+
+class JSInterpreter:
+    """Evaluate a subset of JavaScript in a sandbox."""
+
+    def __init__(self, max_steps: int = 2_000_000, max_depth: int = 64):
+        """Construct a :class:`JSInterpreter <JSInterpreter>`.
+
+        :param int max_steps:
+            Maximum number of expressions evaluated per top level call.
+        :param int max_depth:
+            Maximum function call depth.
+        """
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.steps = 0
+        self.depth = 0
+        self.global_scope = _Scope()
+        self.global_scope.vars["this"] = UNDEFINED
+        for name, members in _GLOBALS.items():
+            self.global_scope.vars[name] = {
+                key: _Builtin(f"{name}.{key}", func)
+                for key, func in members.items()
+            }
+
+    def function(self, code: str) -> JSFunction:
+        """Compile a function expression.
+
+        :param str code:
+            Source of a function, e.g. ``function(a){return a}``.
+        :rtype: JSFunction
+        """
+        parser = _Parser(code)
+        node = parser.primary()
+        if node[0] != "func" or parser.peek()[0] != "eof":
+            raise JSInterpreterError("code is not a single function")
+        return JSFunction(self, node, self.global_scope)
+
+    def evaluate(self, code: str) -> Any:
+        """Run a program and get the value of its last expression statement.
+
+        :param str code:
+            JavaScript source code.
+        """
+        parser = _Parser(code)
+        body = parser.program()
+        for name in parser.var_scopes[0]:
+            self.global_scope.vars.setdefault(name, UNDEFINED)
+        self.steps = 0
+        result = UNDEFINED
+        self._hoist(body, self.global_scope)
+        self.depth += 1
+        try:
+            for stmt in body:
+                if stmt[0] == "expr":
+                    result = self.eval(stmt[1], self.global_scope)
+                else:
+                    self.exec(stmt, self.global_scope)
+        finally:
+            self.depth -= 1
+        return result
+
+    def call(self, func: Any, args: List, this: Any = UNDEFINED) -> Any:
+        """Call a function.
+
+        :param func:
+            A :class:`JSFunction <JSFunction>` or built-in.
+        :param list args:
+            Arguments to pass.
+        :param this:
+            (optional) Value of ``this`` inside the function.
+        """
+        if isinstance(func, _Builtin):
+            try:
+                return func(*args)
+            except (
+                TypeError, ValueError, IndexError, OverflowError, re.error
+            ) as e:
+                # re.error: a pattern of the player that Python rejects.
+                raise JSThrow(f"TypeError: {func.name}: {e}")
+        if not isinstance(func, JSFunction):
+            raise JSThrow(f"TypeError: {to_string(func)} is not a function")
+
+        top_level = self.depth == 0
+        if top_level:
+            self.steps = 0
+        if self.depth >= self.max_depth:
+            raise JSInterpreterError("maximum call depth exceeded")
+
+        scope = _Scope(func.scope)
+        scope.vars["this"] = this
+        for name in func.var_names:
+            scope.vars[name] = UNDEFINED
+        for i, name in enumerate(func.params):
+            scope.vars[name] = args[i] if i < len(args) else UNDEFINED
+        if func.name and func.name not in scope.vars:
+            scope.vars[func.name] = func
+        self._hoist(func.body, scope)
+
+        self.depth += 1
+        try:
+            for stmt in func.body:
+                self.exec(stmt, scope)
+        except _Return as ret:
+            return ret.value
+        finally:
+            self.depth -= 1
+        return UNDEFINED
+
+    def _hoist(self, body: List, scope: _Scope) -> None:
+        for stmt in body:
+            if stmt[0] == "funcdecl":
+                scope.vars[stmt[1]] = JSFunction(self, stmt[2], scope)
+
+    # statements
+
+    def exec(self, stmt: Tuple, scope: _Scope) -> None:  # noqa: C901
+        self._step()
+        kind = stmt[0]
+        if kind == "expr":
+            self.eval(stmt[1], scope)
+        elif kind == "var":
+            for name, init in stmt[1]:
+                if init is not None:
+                    self._assign_name(name, self.eval(init, scope), scope)
+        elif kind == "return":
+            value = UNDEFINED if stmt[1] is None else self.eval(stmt[1], scope)
+            raise _Return(value)
+        elif kind == "if":
+            if to_boolean(self.eval(stmt[1], scope)):
+                self.exec(stmt[2], scope)
+            elif stmt[3] is not None:
+                self.exec(stmt[3], scope)
+        elif kind == "block":
+            for child in stmt[1]:
+                self.exec(child, scope)
+        elif kind == "for":
+            self._exec_for(stmt, scope)
+        elif kind == "dowhile":
+            while True:
+                try:
+                    self.exec(stmt[1], scope)
+                except _Break:
+                    break
+                except _Continue:
+                    pass
+                if not to_boolean(self.eval(stmt[2], scope)):
+                    break
+        elif kind == "switch":
+            self._exec_switch(stmt, scope)
+        elif kind == "try":
+            self._exec_try(stmt, scope)
+        elif kind == "throw":
+            raise JSThrow(self.eval(stmt[1], scope))
+        elif kind == "break":
+            raise _Break()
+        elif kind == "continue":
+            raise _Continue()
+        elif kind in ("empty", "funcdecl"):
+            pass
+        else:  # pragma: no cover
+            raise JSInterpreterError(f"unsupported statement {kind}")
+
+    def _exec_for(self, stmt: Tuple, scope: _Scope) -> None:
+        _, init, test, update, body = stmt
+        if init is not None:
+            self.exec(init, scope)
+        while test is None or to_boolean(self.eval(test, scope)):
+            try:
+                self.exec(body, scope)
+            except _Break:
+                break
+            except _Continue:
+                pass
+            if update is not None:
+                self.eval(update, scope)
+
+    def _exec_switch(self, stmt: Tuple, scope: _Scope) -> None:
+        _, discriminant, cases = stmt
+        value = self.eval(discriminant, scope)
+        matched = None
+        for i, (test, _) in enumerate(cases):
+            if test is not None and strict_equals(
+                value, self.eval(test, scope)
+            ):
+                matched = i
+                break
+        if matched is None:
+            matched = next(
+                (i for i, (test, _) in enumerate(cases) if test is None), None
+            )
+        if matched is None:
+            return
+        try:
+            for _, body in cases[matched:]:
+                for child in body:
+                    self.exec(child, scope)
+        except _Break:
+            pass
+
+    def _exec_try(self, stmt: Tuple, scope: _Scope) -> None:
+        _, body, param, handler, finalizer = stmt
+        try:
+            try:
+                for child in body:
+                    self.exec(child, scope)
+            except JSThrow as e:
+                if handler is None:
+                    raise
+                if param is not None:
+                    scope.vars[param] = e.value
+                for child in handler:
+                    self.exec(child, scope)
+        finally:
+            if finalizer is not None:
+                for child in finalizer:
+                    self.exec(child, scope)
+
+    # expressions
+
+    def _step(self) -> None:
+        self.steps += 1
+        if self.steps > self.max_steps:
+            raise JSInterpreterError("step budget exceeded")
+
+    def eval(self, node: Tuple, scope: _Scope) -> Any:  # noqa: C901
+        self._step()
+
+        kind = node[0]
+        if kind == "const":
+            return node[1]
+        if kind == "name":
+            found = scope.find(node[1])
+            if found is None:
+                raise JSThrow(f"ReferenceError: {node[1]} is not defined")
+            return found.vars[node[1]]
+        if kind == "index":
+            obj = self.eval(node[1], scope)
+            return self.get_member(obj, self.eval(node[2], scope))
+        if kind == "call":
+            return self._eval_call(node, scope)
+        if kind == "assign":
+            return self._eval_assign(node, scope)
+        if kind == "binary":
+            left = self.eval(node[2], scope)
+            return _BINARY_OPS[node[1]](left, self.eval(node[3], scope))
+        if kind == "logical":
+            left = self.eval(node[2], scope)
+            if to_boolean(left) == (node[1] == "||"):
+                return left
+            return self.eval(node[3], scope)
+        if kind == "unary":
+            return self._eval_unary(node, scope)
+        if kind == "update":
+            return self._eval_update(node, scope)
+        if kind == "cond":
+            if to_boolean(self.eval(node[1], scope)):
+                return self.eval(node[2], scope)
+            return self.eval(node[3], scope)
+        if kind == "seq":
+            value = UNDEFINED
+            for expr in node[1]:
+                value = self.eval(expr, scope)
+            return value
+        if kind == "array":
+            return [self.eval(e, scope) for e in node[1]]
+        if kind == "object":
+            return {k: self.eval(v, scope) for k, v in node[1]}
+        if kind == "func":
+            return JSFunction(self, node, scope)
+        if kind == "regex":
+            return JSRegExp(node[1], node[2])
+        if kind == "new":
+            raise JSInterpreterError("constructors are not supported")
+        raise JSInterpreterError(f"unsupported expression {kind}")  # pragma: no cover
+
+    def _eval_call(self, node: Tuple, scope: _Scope) -> Any:
+        _, callee, arg_nodes = node
+        if callee[0] == "index":
+            this = self.eval(callee[1], scope)
+            key = self.eval(callee[2], scope)
+            func = self.get_member(this, key)
+            args = [self.eval(a, scope) for a in arg_nodes]
+            if isinstance(this, JSFunction) and key in ("call", "apply"):
+                bound = _arg(args, 0)
+                if key == "call":
+                    return self.call(this, args[1:], bound)
+                extra = _arg(args, 1)
+                extra = list(extra) if isinstance(extra, list) else []
+                return self.call(this, extra, bound)
+            return self.call(func, args, this)
+        func = self.eval(callee, scope)
+        args = [self.eval(a, scope) for a in arg_nodes]
+        return self.call(func, args)
+
+    def _eval_unary(self, node: Tuple, scope: _Scope) -> Any:
+        op = node[1]
+        if op == "typeof" and node[2][0] == "name":
+            found = scope.find(node[2][1])
+            if found is None:
+                return "undefined"
+        value = self.eval(node[2], scope)
+        if op == "!":
+            return not to_boolean(value)
+        if op == "-":
+            number = to_number(value)
+            return -number if number != 0 or isinstance(number, float) else -0.0
+        if op == "+":
+            return to_number(value)
+        if op == "~":
+            return to_int32(~to_int32(value))
+        if op == "typeof":
+            return typeof(value)
+        return UNDEFINED  # void
+
+    def _eval_update(self, node: Tuple, scope: _Scope) -> Any:
+        _, op, prefix, target = node
+        old = to_number(self.eval(target, scope))
+        new = old + 1 if op == "++" else old - 1
+        self._store(target, new, scope)
+        return new if prefix else old
+
+    def _eval_assign(self, node: Tuple, scope: _Scope) -> Any:
+        _, op, target, value_node = node
+        if op == "=":
+            if target[0] == "index":
+                obj = self.eval(target[1], scope)
+                key = self.eval(target[2], scope)
+                value = self.eval(value_node, scope)
+                self.set_member(obj, key, value)
+                return value
+            value = self.eval(value_node, scope)
+            self._assign_name(target[1], value, scope)
+            return value
+
+        if target[0] == "index":
+            obj = self.eval(target[1], scope)
+            key = self.eval(target[2], scope)
+            current = self.get_member(obj, key)
+            value = _BINARY_OPS[op[:-1]](current, self.eval(value_node, scope))
+            self.set_member(obj, key, value)
+            return value
+        current = self.eval(target, scope)
+        value = _BINARY_OPS[op[:-1]](current, self.eval(value_node, scope))
+        self._assign_name(target[1], value, scope)
+        return value
+
+    def _store(self, target: Tuple, value: Any, scope: _Scope) -> None:
+        if target[0] == "index":
+            obj = self.eval(target[1], scope)
+            self.set_member(obj, self.eval(target[2], scope), value)
+        elif target[0] == "name":
+            self._assign_name(target[1], value, scope)
+        else:
+            raise JSInterpreterError("invalid assignment target")
+
+    def _assign_name(self, name: str, value: Any, scope: _Scope) -> None:
+        found = scope.find(name) or self.global_scope
+        found.vars[name] = value
+
+    # member access
+
+    def get_member(self, obj: Any, key: Any) -> Any:
+        """Read ``obj[key]``."""
+        key = _to_key(key)
+        if isinstance(obj, list):
+            if isinstance(key, int):
+                return obj[key] if 0 <= key < len(obj) else UNDEFINED
+            if key == "length":
+                return len(obj)
+            method = _ARRAY_METHODS.get(key)
+            if method is not None:
+                return _Builtin(key, self._wrap_method(method), obj)
+            return UNDEFINED
+        if isinstance(obj, str):
+            if isinstance(key, int):
+                return obj[key] if 0 <= key < len(obj) else UNDEFINED
+            if key == "length":
+                return len(obj)
+            method = _STRING_METHODS.get(key)
+            if method is not None:
+                return _Builtin(key, method, obj)
+            return UNDEFINED
+        if isinstance(obj, dict):
+            return obj.get(key, UNDEFINED)
+        if isinstance(obj, JSFunction):
+            if key == "length":
+                return len(obj.params)
+            return UNDEFINED
+        if obj is NULL or obj is UNDEFINED:
+            raise JSThrow(
+                f"TypeError: cannot read property {key!r} of {to_string(obj)}"
+            )
+        return UNDEFINED
+
+    def _wrap_method(self, method: Callable) -> Callable:
+        # callbacks passed to array methods must run through the interpreter,
+        # with the optional second argument as their ``this``.
+        def wrapper(this, *args):
+            if args and isinstance(args[0], JSFunction):
+                callback, bound = args[0], _arg(args, 1)
+                args = (lambda *a: self.call(callback, list(a), bound),)
+            return method(this, *args)
+
+        return wrapper
+
+    def set_member(self, obj: Any, key: Any, value: Any) -> None:
+        """Perform ``obj[key] = value``."""
+        key = _to_key(key)
+        if isinstance(obj, list):
+            if isinstance(key, int) and key >= 0:
+                if key >= len(obj):
+                    obj.extend([UNDEFINED] * (key - len(obj) + 1))
+                obj[key] = value
+            elif key == "length":
+                length = int(to_number(value))
+                del obj[length:]
+                obj.extend([UNDEFINED] * (length - len(obj)))
+            return
+        if isinstance(obj, dict):
+            obj[key] = value
+            return
+        if obj is NULL or obj is UNDEFINED:
+            raise JSThrow(
+                f"TypeError: cannot set property {key!r} of {to_string(obj)}"
+            )
+        # assignments to properties of primitives are silently ignored
+
+
+def find_function_code(js: str, name: str) -> str:
+    """Extract the source of a named function from JavaScript code.
+
+    Supports both ``name=function(...){...}`` and
+    ``function name(...){...}`` definitions.
+
+    :param str js:
+        JavaScript source code.
+    :param str name:
+        Name of the function.
+    :rtype: str
+    :returns:
+        Source of the function as a function expression.
+    """
+    escaped = re.escape(name)
+    match = re.search(
+        r"(?:(?<![\w$.])%s\s*=\s*function|function\s+%s)\s*(\([^)]*\))"
+        % (escaped, escaped),
+        js,
+    )
+    if not match:
+        raise JSInterpreterError(f"could not find function {name}")
+    start = js.index("{", match.end(1))
+    end = _matching_brace(js, start)
+    return "function" + match.group(1) + js[start : end + 1]
+
+
+def _matching_brace(js: str, start: int) -> int:
+    depth = 0
+    for kind, value, end in _iter_tokens(js, start):
+        if kind != "punct":
+            continue
+        if value == "{":
+            depth += 1
+        elif value == "}":
+            depth -= 1
+            if depth == 0:
+                return end - 1
+    raise JSInterpreterError("unbalanced braces")
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+This module records live streams from their HLS manifest.
+
+The media playlist of a live stream is a sliding window over the most recent
+segments. It is reloaded about once per target duration; segments that are
+new since the last reload are fetched concurrently, a bounded number ahead of
+the one being written, and appended to the output in sequence order. When
+segments leave the window before they could be fetched (the recorder fell
+behind, or the playlist skipped ahead), the missing sequence numbers are
+logged and reported as gaps instead of stopping the recording.
+"""
+import json
+import logging
+import re
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from http.client import HTTPException
+from threading import Event
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from urllib.error import URLError
+from urllib.parse import urljoin
+
+from pytube import extract
+from pytube import request
+from pytube import YouTube
+from pytube.exceptions import ManifestError
+
+logger = logging.getLogger(__name__)
+
+# Segments behind the end of the playlist where a recording starts, as
+# recommended for players by the HLS specification.
+_LIVE_EDGE_SEGMENTS = 3
+# Consecutive failed playlist reloads after which a recording gives up.
+_MAX_RELOAD_FAILURES = 5
+_ATTRIBUTE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class LiveSegment(NamedTuple):
+    """A media segment listed in a live playlist."""
+
+    sequence: int
+    url: str
+    duration: float
+
+
+class Variant(NamedTuple):
+    """A rendition listed in a master playlist."""
+
+    bandwidth: int
+    resolution: Optional[str]
+    url: str
+
+
+class HLSPlaylist(NamedTuple):
+    """An HLS playlist, either a master or a media playlist."""
+
+    target_duration: float
+    segments: List[LiveSegment]
+    variants: List[Variant]
+    #: Initialization section (``#EXT-X-MAP``) preceding the segments.
+    map_url: Optional[str]
+    #: Whether the stream is over (``#EXT-X-ENDLIST``).
+    ended: bool
+
+
+class Recording(NamedTuple):
+    """The outcome of :func:`record`."""
+
+    path: str
+    #: Number of segments written.
+    segments: int
+    #: Seconds of media written.
+    duration: float
+    #: Inclusive ranges of segment sequence numbers that are missing.
+    gaps: List[Tuple[int, int]]
+
+
+def manifest_urls(youtube: YouTube) -> Dict[str, str]:
+    """Get the manifest urls of a live video.
+
+    Building the streams of a live video raises
+    :class:`LiveStreamError <pytube.exceptions.LiveStreamError>`, so create
+    the :class:`YouTube <pytube.YouTube>` object with
+    ``defer_prefetch_init=True``; the watch page is then fetched here.
+
+    :param YouTube youtube:
+        The live video.
+    :rtype: dict
+    :returns:
+        The HLS (``"hls"``) and DASH (``"dash"``) manifest urls.
+    """
+    player_response = youtube.player_response
+    if not player_response:
+        if not youtube.watch_html:
+            youtube.prefetch()
+        config_args = extract.get_ytplayer_config(youtube.watch_html)["args"]
+        player_response = json.loads(config_args["player_response"])
+    return extract.live_manifest_urls(player_response)
+
+
+def parse_m3u8(text: str, base_url: str) -> HLSPlaylist:
+    """Parse an HLS playlist.
+
+    :param str text:
+        The playlist.
+    :param str base_url:
+        Location of the playlist, which relative uris are resolved against.
+    :rtype: HLSPlaylist
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or lines[0] != "#EXTM3U":
+        raise ManifestError(f"{base_url} is not an HLS playlist")
+
+    media_sequence = 0
+    target_duration = 0.0
+    segments: List[LiveSegment] = []
+    variants: List[Variant] = []
+    map_url = None
+    ended = False
+    duration: Optional[float] = None
+    stream_info: Optional[Dict[str, str]] = None
+    try:
+        for line in lines[1:]:
+            tag, _, value = line.partition(":")
+            if tag == "#EXT-X-MEDIA-SEQUENCE":
+                media_sequence = int(value)
+            elif tag == "#EXT-X-TARGETDURATION":
+                target_duration = float(value)
+            elif tag == "#EXTINF":
+                duration = float(value.split(",")[0])
+            elif tag == "#EXT-X-ENDLIST":
+                ended = True
+            elif tag == "#EXT-X-MAP":
+                map_url = urljoin(base_url, _attributes(value)["URI"])
+            elif tag == "#EXT-X-STREAM-INF":
+                stream_info = _attributes(value)
+            elif not line.startswith("#"):
+                url = urljoin(base_url, line)
+                if stream_info is not None:
+                    variants.append(
+                        Variant(
+                            bandwidth=int(stream_info["BANDWIDTH"]),
+                            resolution=stream_info.get("RESOLUTION"),
+                            url=url,
+                        )
+                    )
+                    stream_info = None
+                else:
+                    segments.append(
+                        LiveSegment(
+                            sequence=media_sequence + len(segments),
+                            url=url,
+                            duration=(
+                                target_duration if duration is None
+                                else duration
+                            ),
+                        )
+                    )
+                    duration = None
+    except (KeyError, ValueError) as e:
+        raise ManifestError(f"malformed playlist {base_url}") from e
+    return HLSPlaylist(target_duration, segments, variants, map_url, ended)
+
+
+def _merge(gaps: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge overlapping and adjacent ranges of sequence numbers."""
+    merged: List[Tuple[int, int]] = []
+    for first, last in sorted(gaps):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _attributes(value: str) -> Dict[str, str]:
+    return {
+        key: attribute.strip('"')
+        for key, attribute in _ATTRIBUTE.findall(value)
+    }
+
+
+def fetch_playlist(url: str, max_retries: int = 3) -> HLSPlaylist:
+    """Fetch and parse an HLS playlist.
+
+    :param str url:
+        Location of the playlist.
+    :param int max_retries:
+        (Optional) Number of times a failed request is retried.
+    :rtype: HLSPlaylist
+    """
+    text = request.get_bytes(url, max_retries).decode("utf-8")
+    return parse_m3u8(text, url)
+
+
+def record(
+    manifest_url: str,
+    output_path: str,
+    duration: Optional[float] = None,
+    bandwidth: Optional[int] = None,
+    from_start: bool = False,
+    max_workers: int = 4,
+    lookahead: int = 8,
+    max_retries: int = 3,
+    poll_interval: Optional[float] = None,
+    stop: Optional[Event] = None,
+) -> Recording:
+    """Record a live stream from its HLS manifest.
+
+    :param str manifest_url:
+        The ``hlsManifestUrl`` of the stream, see :func:`manifest_urls`, or
+        the url of one of its media playlists.
+    :param str output_path:
+        Path of the recording.
+    :param float duration:
+        (Optional) Seconds to record; by default the recording runs until
+        the stream ends.
+    :param int bandwidth:
+        (Optional) Highest bandwidth of the rendition to record, in bits per
+        second; by default the best rendition is recorded.
+    :param bool from_start:
+        (Optional) Start with the oldest segment in the playlist instead of
+        near the live edge.
+    :param int max_workers:
+        (Optional) Number of segments fetched at the same time.
+    :param int lookahead:
+        (Optional) Number of segments fetched ahead of the one being
+        written.
+    :param int max_retries:
+        (Optional) Number of times a failed request is retried.
+    :param float poll_interval:
+        (Optional) Seconds between playlist reloads; by default the target
+        duration of the playlist, or half of it when nothing changed.
+    :param stop:
+        (Optional) Event that ends the recording when set.
+    :rtype: Recording
+    """
+    playlist = fetch_playlist(manifest_url, max_retries)
+    media_url = manifest_url
+    if playlist.variants:
+        variants = sorted(playlist.variants)
+        if bandwidth is not None:
+            variants = [v for v in variants if v.bandwidth <= bandwidth] or (
+                variants[:1]
+            )
+        variant = variants[-1]
+        logger.debug(
+            "recording %s rendition (%d bps)",
+            variant.resolution,
+            variant.bandwidth,
+        )
+        media_url = variant.url
+        playlist = fetch_playlist(media_url, max_retries)
+
+    segments_written = 0
+    recorded = 0.0
+    gaps: List[Tuple[int, int]] = []
+    # Segments known from the playlist, not fetched yet / being fetched.
+    waiting: Deque[LiveSegment] = deque()
+    pending: Deque[Tuple[LiveSegment, Future]] = deque()
+    next_sequence: Optional[int] = None
+    reload_failures = 0
+
+    def missing(first: int, last: int) -> None:
+        logger.warning("segments %d-%d are missing", first, last)
+        gaps.append((first, last))
+
+    with open(output_path, "wb") as fh, ThreadPoolExecutor(
+        max_workers=max_workers
+    ) as executor:
+        try:
+            if playlist.map_url:
+                fh.write(request.get_bytes(playlist.map_url, max_retries))
+            while True:
+                if next_sequence is None and playlist.segments:
+                    first = 0 if from_start else max(
+                        len(playlist.segments) - _LIVE_EDGE_SEGMENTS, 0
+                    )
+                    next_sequence = playlist.segments[first].sequence
+                new = [
+                    s for s in playlist.segments
+                    if next_sequence is not None and s.sequence >= next_sequence
+                ]
+                if new:
+                    if new[0].sequence > next_sequence:
+                        missing(next_sequence, new[0].sequence - 1)
+                    next_sequence = new[-1].sequence + 1
+                    waiting.extend(new)
+                if poll_interval is not None:
+                    interval = poll_interval
+                else:
+                    interval = playlist.target_duration / (1 if new else 2)
+                reload_at = time.monotonic() + interval
+
+                # Write segments as they arrive until the playlist is due.
+                while True:
+                    while waiting and len(pending) < lookahead:
+                        segment = waiting.popleft()
+                        future = executor.submit(
+                            request.get_bytes, segment.url, max_retries
+                        )
+                        pending.append((segment, future))
+                    stopped = stop is not None and stop.is_set()
+                    while pending and pending[0][1].done() and not stopped:
+                        segment, future = pending.popleft()
+                        try:
+                            data = future.result()
+                        except (URLError, HTTPException, ConnectionError) as e:
+                            logger.debug("segment %d: %s", segment.sequence, e)
+                            missing(segment.sequence, segment.sequence)
+                            continue
+                        fh.write(data)
+                        segments_written += 1
+                        recorded += segment.duration
+                        if duration is not None and recorded >= duration:
+                            break
+                    if (
+                        (duration is not None and recorded >= duration)
+                        or stopped
+                        or (playlist.ended and not pending and not waiting)
+                    ):
+                        return Recording(
+                            output_path,
+                            segments_written,
+                            recorded,
+                            _merge(gaps),
+                        )
+                    remaining = reload_at - time.monotonic()
+                    if remaining <= 0 and not playlist.ended:
+                        break
+                    if pending:
+                        wait([pending[0][1]], timeout=max(remaining, 0.01))
+                    else:
+                        time.sleep(max(remaining, 0))
+                try:
+                    playlist = fetch_playlist(media_url, max_retries)
+                    reload_failures = 0
+                except (URLError, HTTPException, ConnectionError) as e:
+                    # Keep the current playlist and try again next time.
+                    reload_failures += 1
+                    if reload_failures >= _MAX_RELOAD_FAILURES:
+                        raise
+                    logger.warning("reloading the playlist failed: %s", e)
+        finally:
+            for _, future in pending:
+                future.cancel()
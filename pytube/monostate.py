@@ -4,6 +4,9 @@ from typing import Optional
 
 from typing_extensions import Protocol
 
+from pytube.progress import OnProgressEvent
+from pytube.proxy import ProxyPool
+
 
 class OnProgress(Protocol):
     def __call__(
@@ -48,8 +51,16 @@ class Monostate:
         on_complete: Optional[OnComplete],
         title: Optional[str] = None,
         duration: Optional[int] = None,
+        on_progress_event: Optional[OnProgressEvent] = None,
+        progress_interval: float = 0.1,
+        proxies: Optional[ProxyPool] = None,
+        video_id: Optional[str] = None,
     ):
         self.on_progress = on_progress
         self.on_complete = on_complete
         self.title = title
         self.duration = duration
+        self.on_progress_event = on_progress_event
+        self.progress_interval = progress_interval
+        self.proxies = proxies
+        self.video_id = video_id
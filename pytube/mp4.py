@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+"""
+This module cuts clips out of progressive mp4 streams without downloading
+them.
+
+A progressive mp4 keeps its index in the ``moov`` box: for every track, the
+sample tables give the size, duration and file offset of each sample. Only
+``moov`` is fetched; the samples of the requested time window are then read
+from ``mdat`` with range requests and written out with new sample tables
+whose offsets and timestamps are rebased onto the clip.
+
+The clip starts at the video keyframe at or before the requested start.
+"""
+import logging
+import os
+import struct
+from bisect import bisect_left
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+from itertools import groupby
+from itertools import repeat
+from threading import Event
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pytube import request
+from pytube.exceptions import ClipError
+from pytube.exceptions import DownloadCancelled
+from pytube.proxy import ProxyPool
+
+logger = logging.getLogger(__name__)
+
+# Boxes that hold other boxes (and nothing else) on the way to the sample
+# tables.
+_CONTAINERS = frozenset((b"moov", b"trak", b"mdia", b"minf", b"stbl"))
+
+# Bytes read at the start of the file looking for ``moov``.
+_PROBE_SIZE = 65536
+# Samples closer than this are fetched in one request, skipping the gap.
+_MAX_GAP = 65536
+# Upper bound of a single range request.
+_RANGE_SIZE = 1048576
+
+
+class Box:
+    """An mp4 box, either a container of boxes or a leaf holding bytes."""
+
+    __slots__ = ("type", "data", "children")
+
+    def __init__(
+        self,
+        box_type: bytes,
+        data: bytes = b"",
+        children: Optional[List["Box"]] = None,
+    ):
+        self.type = box_type
+        self.data = data
+        self.children = children
+
+    def find(self, *path: bytes) -> Optional["Box"]:
+        """Find the first descendant box along a path of box types."""
+        box: Optional[Box] = self
+        for box_type in path:
+            box = next(
+                (c for c in box.children or () if c.type == box_type), None
+            )
+            if box is None:
+                return None
+        return box
+
+    def findall(self, box_type: bytes) -> List["Box"]:
+        """Find the child boxes of a type."""
+        return [c for c in self.children or () if c.type == box_type]
+
+    def serialize(self) -> bytes:
+        """Encode the box, header included."""
+        if self.children is not None:
+            payload = b"".join(c.serialize() for c in self.children)
+        else:
+            payload = self.data
+        size = 8 + len(payload)
+        if size > 0xFFFFFFFF:
+            return struct.pack(">I4sQ", 1, self.type, size + 8) + payload
+        return struct.pack(">I4s", size, self.type) + payload
+
+
+def parse_boxes(data: bytes, pos: int = 0, end: Optional[int] = None) -> List[Box]:
+    """Parse the boxes in data[pos:end], descending into containers.
+
+    :param bytes data:
+        Raw mp4 bytes.
+    :rtype: List[Box]
+    """
+    end = len(data) if end is None else end
+    boxes = []
+    for box_type, start, stop in _box_headers(data, pos, end):
+        if stop > end:
+            raise ClipError(f"{box_type!r} box is truncated")
+        if box_type in _CONTAINERS:
+            boxes.append(Box(box_type, children=parse_boxes(data, start, stop)))
+        else:
+            boxes.append(Box(box_type, data=bytes(data[start:stop])))
+    return boxes
+
+
+def _box_headers(data: bytes, pos: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Iterate over ``(box type, payload start, box end)`` in data[pos:end]."""
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", data, pos + 8)
+            header = 16
+        elif size == 0:  # extends to the end of the file
+            size = end - pos
+        if size < header:
+            raise ClipError(f"invalid size for {box_type!r} box")
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+class _Track:
+    """Sample tables of a track, expanded to one entry per sample."""
+
+    def __init__(self, trak: Box):
+        self.trak = trak
+        mdhd = trak.find(b"mdia", b"mdhd").data
+        if mdhd[0] == 1:
+            (self.timescale,) = struct.unpack_from(">I", mdhd, 20)
+        else:
+            (self.timescale,) = struct.unpack_from(">I", mdhd, 12)
+        self.handler = trak.find(b"mdia", b"hdlr").data[8:12]
+        stbl = trak.find(b"mdia", b"minf", b"stbl")
+        if stbl is None:
+            raise ClipError("track without sample tables")
+        tables = {c.type: c.data for c in stbl.children}
+
+        self.durations: List[int] = []
+        for count, delta in _entries(tables[b"stts"], ">II"):
+            self.durations.extend(repeat(delta, count))
+        self.times = [0, *accumulate(self.durations)]
+
+        self.ctts_version = 0
+        self.composition: Optional[List[int]] = None
+        if b"ctts" in tables:
+            self.ctts_version = tables[b"ctts"][0]
+            fmt = ">Ii" if self.ctts_version else ">II"
+            self.composition = []
+            for count, offset in _entries(tables[b"ctts"], fmt):
+                self.composition.extend(repeat(offset, count))
+
+        # Sample numbers are 1-based in the file, 0-based here.
+        self.sync: Optional[List[int]] = None
+        if b"stss" in tables:
+            self.sync = [n - 1 for (n,) in _entries(tables[b"stss"], ">I")]
+
+        sample_size, count = struct.unpack_from(">II", tables[b"stsz"], 4)
+        self.constant_size = sample_size
+        if sample_size:
+            self.sizes = [sample_size] * count
+        else:
+            self.sizes = [
+                n for (n,) in struct.iter_unpack(
+                    ">I", tables[b"stsz"][12: 12 + 4 * count]
+                )
+            ]
+
+        if b"co64" in tables:
+            chunks = [n for (n,) in _entries(tables[b"co64"], ">Q")]
+        else:
+            chunks = [n for (n,) in _entries(tables[b"stco"], ">I")]
+        stsc = list(_entries(tables[b"stsc"], ">III"))
+        self.offsets: List[int] = []
+        self.descriptions: List[int] = []
+        sample = 0
+        for i, (first, per_chunk, description) in enumerate(stsc):
+            last = stsc[i + 1][0] - 1 if i + 1 < len(stsc) else len(chunks)
+            for chunk in range(first - 1, last):
+                offset = chunks[chunk]
+                for size in self.sizes[sample: sample + per_chunk]:
+                    self.offsets.append(offset)
+                    self.descriptions.append(description)
+                    offset += size
+                sample += per_chunk
+        if len(self.offsets) != len(self.sizes):
+            raise ClipError("sample tables disagree on the sample count")
+
+    @property
+    def duration(self) -> float:
+        """Length of the track in seconds."""
+        return self.times[-1] / self.timescale
+
+    def window(self, start: float, end: float) -> Tuple[int, int]:
+        """Sample indexes [first, last) decoded within [start, end) seconds."""
+        first = bisect_left(self.times, start * self.timescale, 0, len(self.sizes))
+        last = bisect_left(self.times, end * self.timescale, 0, len(self.sizes))
+        return first, max(last, first)
+
+    def keyframe_before(self, start: float) -> int:
+        """Index of the last sync sample at or before ``start`` seconds."""
+        sample = max(bisect_right(self.times, start * self.timescale) - 1, 0)
+        sample = min(sample, len(self.sizes) - 1)
+        if self.sync is None:
+            return sample
+        i = bisect_right(self.sync, sample) - 1
+        return self.sync[max(i, 0)]
+
+
+def _entries(data: bytes, fmt: str) -> Iterator[tuple]:
+    """Iterate over the entries of a full box with a 32-bit entry count."""
+    (count,) = struct.unpack_from(">I", data, 4)
+    size = struct.calcsize(fmt)
+    return struct.iter_unpack(fmt, data[8: 8 + size * count])
+
+
+def _run_lengths(values: List[int]) -> List[Tuple[int, int]]:
+    return [(len(list(group)), value) for value, group in groupby(values)]
+
+
+def _full_box(box_type: bytes, body: bytes, version: int = 0) -> Box:
+    return Box(box_type, data=struct.pack(">B3x", version) + body)
+
+
+def _table(box_type: bytes, fmt: str, rows: List[tuple], version: int = 0) -> Box:
+    body = struct.pack(">I", len(rows)) + b"".join(
+        struct.pack(fmt, *row) for row in rows
+    )
+    return _full_box(box_type, body, version)
+
+
+def _set_duration(box: Box, duration: int, v0_pos: int, v1_pos: int) -> None:
+    data = bytearray(box.data)
+    if data[0] == 1:
+        struct.pack_into(">Q", data, v1_pos, duration)
+    else:
+        struct.pack_into(">I", data, v0_pos, min(duration, 0xFFFFFFFF))
+    box.data = bytes(data)
+
+
+def _movie_timescale(moov: Box) -> int:
+    mvhd = moov.find(b"mvhd").data
+    return struct.unpack_from(">I", mvhd, 20 if mvhd[0] == 1 else 12)[0]
+
+
+def fetch_moov(
+    url: str, proxies: Optional[ProxyPool] = None
+) -> Tuple[bytes, Box]:
+    """Fetch the ``ftyp`` and ``moov`` boxes of a remote mp4 file.
+
+    :param str url:
+        Location of the mp4 file.
+    :param ProxyPool proxies:
+        (Optional) Proxies to send the requests through.
+    :rtype: Tuple[bytes, Box]
+    :returns:
+        The raw ``ftyp`` box and the parsed ``moov`` box.
+    """
+    probe = request.get_range(url, 0, _PROBE_SIZE - 1, proxies)
+    ftyp = b""
+    pos = 0
+    while True:
+        header = probe[pos: pos + 16]
+        if len(header) < 16 and len(probe) == _PROBE_SIZE:
+            header = request.get_range(url, pos, pos + 15, proxies)
+        if len(header) < 8:
+            raise ClipError("no moov box in the file")
+        size, box_type = struct.unpack_from(">I4s", header)
+        if size == 1:
+            (size,) = struct.unpack_from(">Q", header, 8)
+        if size < 8:
+            # The last box (size 0) runs to the end of the file.
+            raise ClipError("no moov box in the file")
+        if box_type in (b"ftyp", b"moov"):
+            if pos + size <= len(probe):
+                data = probe[pos: pos + size]
+            else:
+                data = request.get_range(url, pos, pos + size - 1, proxies)
+            if box_type == b"ftyp":
+                ftyp = data
+            else:
+                return ftyp, parse_boxes(data)[0]
+        pos += size
+
+
+def download_clip(
+    url: str,
+    start: float,
+    duration: float,
+    output_path: str,
+    max_workers: int = 4,
+    cancel: Optional[Event] = None,
+    proxies: Optional[ProxyPool] = None,
+) -> Tuple[str, float]:
+    """Download a time window of a progressive mp4 file as a playable mp4.
+
+    :param str url:
+        Location of the mp4 file.
+    :param float start:
+        Start of the clip in seconds.
+    :param float duration:
+        Length of the clip in seconds.
+    :param str output_path:
+        Path of the clip file.
+    :param int max_workers:
+        (Optional) Number of ranges fetched at the same time.
+    :param cancel:
+        (Optional) Event that stops the download when set.
+    :param ProxyPool proxies:
+        (Optional) Proxies to spread the range requests over.
+    :rtype: Tuple[str, float]
+    :returns:
+        Path to the clip, and the time in seconds of the keyframe it starts
+        on.
+    """
+    ftyp, moov = fetch_moov(url, proxies)
+    try:
+        tracks = [_Track(trak) for trak in moov.findall(b"trak")]
+    except (KeyError, AttributeError, struct.error) as e:
+        raise ClipError("malformed moov box") from e
+    if not tracks:
+        raise ClipError("no tracks in the moov box")
+
+    # Start every track at the keyframe before the start of the clip.
+    video = next((t for t in tracks if t.handler == b"vide"), tracks[0])
+    if start >= video.duration:
+        raise ClipError(f"{start}s is past the end of the video")
+    end = start + duration if duration else video.duration
+    keyframe = video.keyframe_before(start)
+    start = video.times[keyframe] / video.timescale
+    windows = [track.window(start, end) for track in tracks]
+
+    # Keep the original interleaving of the samples in the new mdat.
+    samples = sorted(
+        (track.offsets[i], track.sizes[i], t)
+        for t, (track, (first, last)) in enumerate(zip(tracks, windows))
+        for i in range(first, last)
+    )
+    # Consecutive samples of a track form a chunk: (track, sample count, size)
+    chunks = [
+        (t, len(run), sum(size for _, size, _ in run))
+        for t, run in (
+            (t, list(group)) for t, group in groupby(samples, lambda s: s[2])
+        )
+    ]
+    mdat_size = sum(size for _, size, _ in samples)
+
+    def build_moov(base: int) -> bytes:
+        movie_timescale = _movie_timescale(moov)
+        offsets: Dict[int, List[int]] = {t: [] for t in range(len(tracks))}
+        counts: Dict[int, List[int]] = {t: [] for t in range(len(tracks))}
+        position = base
+        for t, count, size in chunks:
+            offsets[t].append(position)
+            counts[t].append(count)
+            position += size
+        movie_duration = 0
+        children = []
+        traks = iter(enumerate(zip(tracks, windows)))
+        for child in moov.children:
+            if child.type == b"trak":
+                t, (track, (first, last)) = next(traks)
+                trak = _clip_trak(track, first, last, offsets[t], counts[t])
+                seconds = sum(track.durations[first:last]) / track.timescale
+                duration = round(seconds * movie_timescale)
+                _set_duration(trak.find(b"tkhd"), duration, 20, 28)
+                movie_duration = max(movie_duration, duration)
+                children.append(trak)
+            elif child.type == b"mvhd":
+                mvhd = Box(b"mvhd", data=child.data)
+                children.append(mvhd)
+            elif child.type != b"mvex":
+                children.append(child)
+        _set_duration(mvhd, movie_duration, 16, 24)
+        clipped = Box(b"moov", children=children)
+        return clipped.serialize()
+
+    mdat_header = struct.pack(">I4s", 8 + mdat_size, b"mdat")
+    if 8 + mdat_size > 0xFFFFFFFF:
+        mdat_header = struct.pack(">I4sQ", 1, b"mdat", 16 + mdat_size)
+    # Offsets do not change the size of the moov box; measure it first.
+    moov_size = len(build_moov(0))
+    header = ftyp + build_moov(len(ftyp) + moov_size + len(mdat_header))
+
+    ranges: List[List[Tuple[int, int, int]]] = []
+    for sample in samples:
+        offset, size, _ = sample
+        if ranges:
+            first_offset = ranges[-1][0][0]
+            last_offset, last_size, _ = ranges[-1][-1]
+            if (
+                offset <= last_offset + last_size + _MAX_GAP
+                and offset + size - first_offset <= _RANGE_SIZE
+            ):
+                ranges[-1].append(sample)
+                continue
+        ranges.append([sample])
+    logger.debug(
+        "clipping %.3fs-%.3fs: %d samples in %d ranges",
+        start, end, len(samples), len(ranges),
+    )
+
+    def fetch(samples_in_range: List[Tuple[int, int, int]]) -> bytes:
+        if cancel is not None and cancel.is_set():
+            raise DownloadCancelled()
+        first = samples_in_range[0][0]
+        last_offset, last_size, _ = samples_in_range[-1]
+        data = request.get_range(
+            url, first, last_offset + last_size - 1, proxies
+        )
+        return b"".join(
+            data[offset - first: offset - first + size]
+            for offset, size, _ in samples_in_range
+        )
+
+    try:
+        with open(output_path, "wb") as fh, ThreadPoolExecutor(
+            max_workers=max_workers
+        ) as executor:
+            fh.write(header)
+            fh.write(mdat_header)
+            for data in executor.map(fetch, ranges):
+                fh.write(data)
+    except BaseException:
+        if cancel is not None:
+            cancel.set()
+        # The moov box promises samples the file does not hold.
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        raise
+    return output_path, start
+
+
+def _clip_trak(
+    track: _Track,
+    first: int,
+    last: int,
+    chunk_offsets: List[int],
+    chunk_counts: List[int],
+) -> Box:
+    """Rebuild a ``trak`` box for the samples [first, last) of a track.
+
+    ``stbl`` keeps its ``stsd``; other boxes in it (``sdtp``, ``sbgp``...)
+    describe the original samples and are dropped.
+    """
+    stsd = track.trak.find(b"mdia", b"minf", b"stbl", b"stsd")
+    tables = [stsd, _table(b"stts", ">II", _run_lengths(track.durations[first:last]))]
+    if track.composition is not None:
+        tables.append(
+            _table(
+                b"ctts",
+                ">Ii" if track.ctts_version else ">II",
+                _run_lengths(track.composition[first:last]),
+                track.ctts_version,
+            )
+        )
+    if track.sync is not None:
+        lo = bisect_left(track.sync, first)
+        hi = bisect_left(track.sync, last)
+        tables.append(
+            _table(b"stss", ">I", [(n - first + 1,) for n in track.sync[lo:hi]])
+        )
+    if track.constant_size:
+        stsz = struct.pack(">II", track.constant_size, last - first)
+    else:
+        stsz = struct.pack(">II", 0, last - first) + struct.pack(
+            f">{last - first}I", *track.sizes[first:last]
+        )
+    tables.append(_full_box(b"stsz", stsz))
+
+    stsc = []
+    sample = first
+    for chunk, count in enumerate(chunk_counts, start=1):
+        row = (count, track.descriptions[sample])
+        if not stsc or stsc[-1][1:] != row:
+            stsc.append((chunk, *row))
+        sample += count
+    tables.append(_table(b"stsc", ">III", stsc))
+    if chunk_offsets and chunk_offsets[-1] > 0xFFFFFFFF:
+        tables.append(_table(b"co64", ">Q", [(o,) for o in chunk_offsets]))
+    else:
+        tables.append(_table(b"stco", ">I", [(o,) for o in chunk_offsets]))
+
+    def rebuild(box: Box) -> Box:
+        if box.type == b"stbl":
+            return Box(b"stbl", children=tables)
+        if box.children is None:
+            return Box(box.type, data=box.data)
+        # Edit lists refer to the original timeline.
+        return Box(
+            box.type,
+            children=[rebuild(c) for c in box.children if c.type != b"edts"],
+        )
+
+    trak = rebuild(track.trak)
+    mdhd = trak.find(b"mdia", b"mdhd")
+    _set_duration(mdhd, sum(track.durations[first:last]), 16, 24)
+    return trak
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+This module muxes adaptive streams with ffmpeg while they download.
+
+Adaptive (DASH) streams carry the audio and the video separately. Instead of
+downloading both to disk and then running ffmpeg over the files, each stream
+is written into a named pipe (FIFO) that ffmpeg reads as an input, so the
+download and the mux overlap and only the final container is written.
+
+Named pipes are only available on POSIX systems; use :func:`supported` to
+check before calling :func:`mux_streams`.
+"""
+import logging
+import os
+import shutil
+import subprocess  # nosec
+import tempfile
+import threading
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from pytube import request
+from pytube import Stream
+from pytube.exceptions import MuxError
+from pytube.progress import ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+
+def supported(ffmpeg: str = "ffmpeg") -> bool:
+    """Check whether streams can be muxed through pipes on this system.
+
+    :param str ffmpeg:
+        Name or path of the ffmpeg executable.
+    :rtype: bool
+    """
+    return hasattr(os, "mkfifo") and shutil.which(ffmpeg) is not None
+
+
+def mux_streams(
+    video_stream: Stream,
+    audio_stream: Stream,
+    output_path: str,
+    ffmpeg: str = "ffmpeg",
+    inputs: Sequence[str] = (),
+    output_args: Sequence[str] = ("-codec", "copy"),
+) -> str:
+    """Download a video and an audio stream straight into ffmpeg.
+
+    Progress is reported through the streams' ``on_progress`` callbacks,
+    and as progress events over both streams together, through the handler
+    of the video stream. If either download or ffmpeg fails, the other side
+    is stopped and the partial output is removed.
+
+    :param Stream video_stream:
+        The video stream to mux.
+    :param Stream audio_stream:
+        The audio stream to mux.
+    :param str output_path:
+        Path of the muxed file.
+    :param str ffmpeg:
+        Name or path of the ffmpeg executable.
+    :param inputs:
+        (Optional) Extra input files, such as subtitles, added after the
+        video and audio.
+    :param output_args:
+        (Optional) ffmpeg output options, copying all codecs by default.
+    :rtype: str
+    :returns:
+        Path to the muxed file.
+    """
+    with tempfile.TemporaryDirectory(prefix="pytube-mux-") as fifo_dir:
+        fifos = []
+        for name, stream in (("video", video_stream), ("audio", audio_stream)):
+            fifo = os.path.join(fifo_dir, f"{name}.{stream.subtype}")
+            os.mkfifo(fifo, 0o600)
+            fifos.append(fifo)
+
+        cmd = [ffmpeg, "-y", "-loglevel", "error"]
+        for path in (*fifos, *inputs):
+            cmd.extend(["-i", path])
+        cmd.extend([*output_args, output_path])
+        logger.debug("running %s", cmd)
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL)  # nosec
+
+        # A single progress bar for both streams.
+        progress = video_stream.progress_reporter(
+            _size(video_stream) + _size(audio_stream)
+        )
+        errors: List[BaseException] = []
+        feeders = [
+            threading.Thread(
+                target=_feed,
+                args=(stream, fifo, progress, errors),
+                daemon=True,
+            )
+            for stream, fifo in zip((video_stream, audio_stream), fifos)
+        ]
+        for feeder in feeders:
+            feeder.start()
+
+        try:
+            for feeder, fifo in zip(feeders, fifos):
+                while feeder.is_alive():
+                    if errors and process.poll() is None:
+                        process.kill()
+                    if process.poll() is not None:
+                        # A writer still waiting for ffmpeg to open its
+                        # pipe would block forever; open it from this side.
+                        _release(fifo)
+                    feeder.join(0.1)
+            returncode = process.wait()
+        except BaseException:
+            process.kill()
+            for fifo in fifos:
+                _release(fifo)
+            raise
+
+    if errors or returncode != 0:
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        if errors:
+            raise errors[0]
+        raise MuxError(f"ffmpeg exited with status {returncode}")
+    progress.finish()
+    logger.debug("muxed %s", output_path)
+    return output_path
+
+
+def _size(stream: Stream) -> int:
+    """Get the expected size of a stream; OTF streams are only estimated."""
+    return stream.filesize_approx if stream.is_otf else stream.filesize
+
+
+def _feed(
+    stream: Stream,
+    fifo: str,
+    progress: ProgressReporter,
+    errors: List[BaseException],
+) -> None:
+    """Download a stream into the pipe ffmpeg reads it from."""
+    try:
+        with open(fifo, "wb") as fh:
+            bytes_remaining = _size(stream)
+            if stream.is_otf:
+                chunks = request.seq_stream(stream.url, proxies=stream.proxies)
+            else:
+                chunks = request.stream(stream.url, proxies=stream.proxies)
+            for chunk in chunks:
+                bytes_remaining -= len(chunk)
+                stream.on_progress(chunk, fh, bytes_remaining)
+                progress.update(len(chunk), segments=int(stream.is_otf))
+    except BrokenPipeError:
+        # ffmpeg stopped reading; its exit status says whether that is fine.
+        logger.debug("ffmpeg closed the pipe for itag=%s", stream.itag)
+    except BaseException as e:  # pylint: disable=W0703
+        errors.append(e)
+
+
+def _release(fifo: str) -> None:
+    fd: Optional[int] = None
+    try:
+        fd = os.open(fifo, os.O_RDONLY | os.O_NONBLOCK)
+    except OSError:
+        pass
+    finally:
+        if fd is not None:
+            os.close(fd)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+This module reports download progress as coalesced events.
+
+Downloads advance a 4KB chunk at a time; rather than calling back for each
+chunk, a :class:`ProgressReporter` counts the chunks and delivers a
+:class:`ProgressEvent` at most once per time interval (and, optionally,
+once per number of bytes), plus a final event when the download finishes.
+"""
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import NamedTuple
+from typing import Optional
+
+from typing_extensions import Protocol
+
+# Weight of the latest measurement in the smoothed transfer rate.
+_RATE_SMOOTHING = 0.3
+
+
+class ProgressEvent(NamedTuple):
+    """A snapshot of the progress of a download."""
+
+    #: The :class:`Stream <pytube.Stream>` being downloaded, if any.
+    stream: Any
+    #: Bytes received so far.
+    bytes_done: int
+    #: Expected size in bytes, ``None`` if unknown.
+    total: Optional[int]
+    #: Smoothed transfer rate in bytes per second.
+    rate: float
+    #: Estimated seconds left, ``None`` if unknown.
+    eta: Optional[float]
+    #: Seconds since the download started.
+    elapsed: float
+    #: Segments received so far, for segmented (OTF) streams.
+    segments_done: int
+    #: Whether this is the last event of the download.
+    finished: bool
+
+    @property
+    def percent(self) -> Optional[float]:
+        """Progress in percent, ``None`` if the size is unknown."""
+        if not self.total:
+            return None
+        return min(100.0 * self.bytes_done / self.total, 100.0)
+
+
+class OnProgressEvent(Protocol):
+    def __call__(self, event: ProgressEvent) -> None:
+        """On download progress event handler function.
+
+        :param ProgressEvent event:
+            The progress of the download.
+
+        :rtype: None
+        """
+        ...
+
+
+class ProgressReporter:
+    """Turns per-chunk updates into coalesced :class:`ProgressEvent`."""
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[ProgressEvent], None]],
+        total: Optional[int] = None,
+        stream: Any = None,
+        interval: float = 0.1,
+        min_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param callback:
+            Receives the events; without one, updates are only counted.
+        :param int total:
+            (Optional) Expected size of the download in bytes.
+        :param stream:
+            (Optional) The stream being downloaded, passed along in events.
+        :param float interval:
+            (Optional) Seconds between events.
+        :param int min_bytes:
+            (Optional) Also deliver an event whenever this many bytes
+            arrived since the last one.
+        :param clock:
+            (Optional) Monotonic clock, in seconds.
+        """
+        self.callback = callback
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.min_bytes = min_bytes
+        self.bytes_done = 0
+        self.segments_done = 0
+        self._clock = clock
+        self._started = clock()
+        self._last_time = self._started
+        self._last_bytes = 0
+        self._rate: Optional[float] = None
+        self._finished = False
+        # Several downloads may report to one reporter (e.g.: a combined
+        # progress bar for audio and video).
+        self._lock = threading.Lock()
+        # Events are numbered as they are built and delivered in order, one
+        # at a time; an event overtaken by a newer one is dropped.
+        self._delivery_lock = threading.Lock()
+        self._built = 0
+        self._delivered = 0
+
+    def update(self, size: int, segments: int = 0) -> None:
+        """Count received bytes, delivering an event when one is due.
+
+        :param int size:
+            Number of bytes received.
+        :param int segments:
+            (Optional) Number of segments completed.
+        """
+        with self._lock:
+            self.bytes_done += size
+            self.segments_done += segments
+            if self.callback is None or self._finished:
+                return
+            now = self._clock()
+            if now - self._last_time < self.interval and (
+                self.min_bytes is None
+                or self.bytes_done - self._last_bytes < self.min_bytes
+            ):
+                return
+            event = self._event(now, finished=False)
+            self._built += 1
+            number = self._built
+        self._deliver(number, event)
+
+    def finish(self) -> None:
+        """Deliver the final event; later calls do nothing."""
+        with self._lock:
+            if self._finished or self.callback is None:
+                return
+            self._finished = True
+            event = self._event(self._clock(), finished=True)
+            self._built += 1
+            number = self._built
+        self._deliver(number, event)
+
+    def _deliver(self, number: int, event: ProgressEvent) -> None:
+        # Events are built under the lock but delivered outside of it, so
+        # that counting never waits on the callback.
+        with self._delivery_lock:
+            if number < self._delivered:
+                return
+            self._delivered = number
+            self.callback(event)  # type: ignore
+
+    def _event(self, now: float, finished: bool) -> ProgressEvent:
+        elapsed = now - self._started
+        if finished:
+            rate = self.bytes_done / elapsed if elapsed > 0 else 0.0
+        else:
+            window = now - self._last_time
+            if window > 0:
+                latest = (self.bytes_done - self._last_bytes) / window
+                self._rate = latest if self._rate is None else (
+                    _RATE_SMOOTHING * latest
+                    + (1 - _RATE_SMOOTHING) * self._rate
+                )
+            rate = self._rate or 0.0
+        self._last_time = now
+        self._last_bytes = self.bytes_done
+
+        eta: Optional[float] = None
+        if finished:
+            eta = 0.0
+        elif self.total is not None and rate > 0:
+            eta = max(self.total - self.bytes_done, 0) / rate
+        return ProgressEvent(
+            stream=self.stream,
+            bytes_done=self.bytes_done,
+            total=self.total,
+            rate=rate,
+            eta=eta,
+            elapsed=elapsed,
+            segments_done=self.segments_done,
+            finished=finished,
+        )
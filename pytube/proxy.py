@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+This module spreads requests over a pool of proxies.
+
+A :class:`ProxyPool` is handed to the request functions (and to
+:class:`YouTube <pytube.YouTube>` and :class:`Playlist <pytube.Playlist>`,
+which pass it on) instead of installing a global ``urllib`` opener, so
+different videos can use different proxies, and one video can use many.
+
+Proxies are picked by smooth weighted round robin: consecutive requests, such
+as the range requests of one download, go to different proxies in proportion
+to their weights. Each weight is scaled by the health of its proxy, derived
+from the smoothed latency and error rate of the requests it served. A proxy
+that fails several times in a row is benched for a while.
+"""
+import logging
+import threading
+import time
+from http.client import HTTPException
+from http.client import HTTPResponse
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+from urllib.error import HTTPError
+from urllib.error import URLError
+from urllib.request import build_opener
+from urllib.request import ProxyHandler
+from urllib.request import Request
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest request in the smoothed latency and error rate.
+_SMOOTHING = 0.2
+# Benched proxies still get this fraction of their weight once back.
+_MIN_HEALTH = 0.05
+
+
+class Proxy:
+    """A proxy of a :class:`ProxyPool` and its request statistics."""
+
+    def __init__(self, url: Union[str, Dict[str, str]], weight: float = 1.0):
+        """
+        :param url:
+            The proxy url, used for http and https requests, or a dict of
+            proxy urls by scheme, as for ``urllib.request.ProxyHandler``.
+        :param float weight:
+            (Optional) Share of the requests the proxy gets when healthy.
+        """
+        self.proxies = {"http": url, "https": url} if isinstance(
+            url, str
+        ) else dict(url)
+        self.url = url if isinstance(url, str) else (
+            self.proxies.get("https") or self.proxies.get("http", "")
+        )
+        self.weight = weight
+        #: Smoothed seconds until the response headers arrived.
+        self.latency: Optional[float] = None
+        #: Smoothed fraction of failed requests.
+        self.error_rate = 0.0
+        #: Failures since the last success.
+        self.failures = 0
+        #: Clock time the proxy is benched until.
+        self.benched_until = 0.0
+        # Built once; urllib opens a new connection for every request.
+        self.opener = build_opener(ProxyHandler(self.proxies))
+        self._current = 0.0
+
+    def __repr__(self) -> str:
+        return f"<Proxy {self.url} weight={self.weight}>"
+
+    def record(self, latency: Optional[float]) -> None:
+        """Record a request; ``latency`` is ``None`` if it failed."""
+        failed = latency is None
+        self.error_rate += _SMOOTHING * (failed - self.error_rate)
+        if latency is not None:
+            self.failures = 0
+            self.latency = latency if self.latency is None else (
+                self.latency + _SMOOTHING * (latency - self.latency)
+            )
+        else:
+            self.failures += 1
+
+
+class ProxyPool:
+    """A weighted, health-scored rotation of proxies."""
+
+    def __init__(
+        self,
+        proxies: Iterable[Union[str, Tuple[str, float], Proxy]],
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        :param proxies:
+            Proxy urls, ``(url, weight)`` tuples or :class:`Proxy` objects.
+        :param int max_failures:
+            (Optional) Failures in a row after which a proxy is benched.
+        :param float cooldown:
+            (Optional) Seconds a proxy stays benched.
+        :param clock:
+            (Optional) Monotonic clock, in seconds.
+        """
+        self.proxies: List[Proxy] = []
+        for proxy in proxies:
+            if isinstance(proxy, tuple):
+                proxy = Proxy(*proxy)
+            elif not isinstance(proxy, Proxy):
+                proxy = Proxy(proxy)
+            self.proxies.append(proxy)
+        if not self.proxies:
+            raise ValueError("a proxy pool needs at least one proxy")
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, proxies: Dict[str, str]) -> "ProxyPool":
+        """Build a pool of one proxy from a dict of proxy urls by scheme.
+
+        :param dict proxies:
+            e.g.: ``{"http": "http://10.0.0.1:3128"}``
+        :rtype: ProxyPool
+        """
+        return cls([Proxy(proxies)])
+
+    def health(self, proxy: Proxy) -> float:
+        """Score a proxy from 0 to 1 by its error rate and latency.
+
+        The latency is compared with that of the fastest proxy.
+
+        :param Proxy proxy:
+            A proxy of the pool.
+        :rtype: float
+        """
+        health = 1.0 - proxy.error_rate
+        if proxy.latency:
+            fastest = min(
+                p.latency for p in self.proxies if p.latency is not None
+            )
+            health *= fastest / proxy.latency
+        return max(health, _MIN_HEALTH)
+
+    def choose(self) -> Proxy:
+        """Pick the proxy for the next request.
+
+        :rtype: Proxy
+        """
+        with self._lock:
+            now = self._clock()
+            available = [p for p in self.proxies if p.benched_until <= now]
+            if not available:
+                # Everything is benched; try the one that is back first.
+                return min(self.proxies, key=lambda p: p.benched_until)
+            total = 0.0
+            chosen = None
+            for proxy in available:
+                weight = proxy.weight * self.health(proxy)
+                proxy._current += weight  # pylint: disable=W0212
+                total += weight
+                if chosen is None or proxy._current > chosen._current:
+                    chosen = proxy
+            assert chosen is not None
+            chosen._current -= total  # pylint: disable=W0212
+            return chosen
+
+    def open(self, request: Request) -> HTTPResponse:
+        """Send a request through the next proxy.
+
+        :param request:
+            The request.
+        :rtype: HTTPResponse
+        """
+        proxy = self.choose()
+        started = self._clock()
+        try:
+            response = proxy.opener.open(request)  # nosec
+        except (URLError, HTTPException, ConnectionError) as e:
+            # Client errors other than throttling are not the proxy's fault.
+            blame = not (
+                isinstance(e, HTTPError) and e.code < 500 and e.code != 429
+            )
+            self._record(proxy, None if blame else self._clock() - started)
+            raise
+        self._record(proxy, self._clock() - started)
+        return response
+
+    def _record(self, proxy: Proxy, latency: Optional[float]) -> None:
+        with self._lock:
+            proxy.record(latency)
+            if proxy.failures >= self.max_failures:
+                logger.warning(
+                    "benching proxy %s after %d failures",
+                    proxy.url,
+                    proxy.failures,
+                )
+                proxy.benched_until = self._clock() + self.cooldown
+                proxy.failures = 0
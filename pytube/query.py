@@ -2,9 +2,15 @@
 """This module provides a query interface for media streams and captions."""
 from collections.abc import Mapping
 from collections.abc import Sequence
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any
 from typing import Callable
+from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Optional
+from typing import Tuple
 from typing import Union
 
 from pytube import Caption
@@ -12,6 +18,99 @@ from pytube import Stream
 from pytube.helpers import deprecated
 
 
+# Filters on these keys are answered from the indexes of :class:`_StreamIndex
+# <_StreamIndex>`; anything else is an attribute of :class:`Stream <Stream>`.
+_INDEX_KEYS: Dict[str, Callable[[Stream], Any]] = {
+    "only_audio": lambda s: s.includes_audio_track
+    and not s.includes_video_track,
+    "only_video": lambda s: s.includes_video_track
+    and not s.includes_audio_track,
+}
+# Attributes read from the manifest, which are cheap to get for every stream
+# and may be indexed. Others, such as ``filesize``, can take a request per
+# stream and are only read for the streams of a query.
+_STATIC_KEYS = frozenset(
+    (
+        "itag",
+        "mime_type",
+        "type",
+        "subtype",
+        "codecs",
+        "video_codec",
+        "audio_codec",
+        "resolution",
+        "fps",
+        "abr",
+        "bitrate",
+        "content_length",
+        "is_otf",
+        "is_dash",
+        "is_3d",
+        "is_hdr",
+        "is_live",
+        "is_adaptive",
+        "is_progressive",
+        "includes_audio_track",
+        "includes_video_track",
+    )
+)
+
+
+@lru_cache(maxsize=1024)
+def _parse_int(value: str) -> Optional[int]:
+    """Get the integer in a string such as "720p" or "128kbps"."""
+    try:
+        return int("".join(filter(str.isdigit, value)))
+    except ValueError:
+        return None
+
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+
+class _StreamIndex:
+    """Secondary indexes over the streams of one manifest.
+
+    Streams are identified by their position in the manifest and sets of
+    streams are stored as bitmasks of those positions, so combining filters
+    is a bitwise and. Indexes are built on first use of an attribute and are
+    shared by every query derived from the same manifest.
+    """
+
+    def __init__(self, streams: List[Stream]):
+        self.streams = tuple(streams)
+        self._values: Dict[str, Tuple] = {}
+        self._indexes: Dict[str, Dict[Any, int]] = {}
+
+    @staticmethod
+    def indexable(key: str) -> bool:
+        """Check whether an attribute is cheap enough to read for every
+        stream of the manifest."""
+        return key in _INDEX_KEYS or key in _STATIC_KEYS
+
+    def values(self, key: str) -> Tuple:
+        """Get the value of an attribute for each stream, by position."""
+        try:
+            return self._values[key]
+        except KeyError:
+            if not self.indexable(key):
+                raise ValueError(f"{key} cannot be indexed")
+            getter = _INDEX_KEYS.get(key) or attrgetter(key)
+            values = self._values[key] = tuple(map(getter, self.streams))
+            return values
+
+    def lookup(self, key: str, value: Any) -> int:
+        """Get the bitmask of the streams whose ``key`` equals ``value``."""
+        try:
+            index = self._indexes[key]
+        except KeyError:
+            index = self._indexes[key] = {}
+            for position, v in enumerate(self.values(key)):
+                index[v] = index.get(v, 0) | 1 << position
+        return index.get(value, 0)
+
+
 class StreamQuery(Sequence):
     """Interface for querying the available media streams."""
 
@@ -21,8 +120,43 @@ class StreamQuery(Sequence):
         param list fmt_streams:
             list of :class:`Stream <Stream>` instances.
         """
-        self.fmt_streams = fmt_streams
-        self.itag_index = {int(s.itag): s for s in fmt_streams}
+        self._index = _StreamIndex(fmt_streams)
+        self._positions: Tuple[int, ...] = tuple(range(len(fmt_streams)))
+        self._fmt_streams: Optional[List[Stream]] = None
+        self._itag_index: Optional[Dict[int, Stream]] = None
+
+    @classmethod
+    def _view(
+        cls, index: _StreamIndex, positions: Tuple[int, ...]
+    ) -> "StreamQuery":
+        """Create a query over a subset of the streams of an index."""
+        query = cls.__new__(cls)
+        query._index = index
+        query._positions = positions
+        query._fmt_streams = None
+        query._itag_index = None
+        return query
+
+    @property
+    def fmt_streams(self) -> List[Stream]:
+        """The streams matched by this query.
+
+        :rtype: List[Stream]
+        """
+        if self._fmt_streams is None:
+            streams = self._index.streams
+            self._fmt_streams = [streams[p] for p in self._positions]
+        return self._fmt_streams
+
+    @property
+    def itag_index(self) -> Dict[int, Stream]:
+        """The streams matched by this query, by itag.
+
+        :rtype: Dict[int, Stream]
+        """
+        if self._itag_index is None:
+            self._itag_index = {int(s.itag): s for s in self}
+        return self._itag_index
 
     def filter(
         self,
@@ -127,64 +261,107 @@ class StreamQuery(Sequence):
             list or None
 
         """
-        filters = []
+        criteria = []
         if res or resolution:
-            filters.append(lambda s: s.resolution == (res or resolution))
+            criteria.append(("resolution", res or resolution))
 
         if fps:
-            filters.append(lambda s: s.fps == fps)
+            criteria.append(("fps", fps))
 
         if mime_type:
-            filters.append(lambda s: s.mime_type == mime_type)
+            criteria.append(("mime_type", mime_type))
 
         if type:
-            filters.append(lambda s: s.type == type)
+            criteria.append(("type", type))
 
         if subtype or file_extension:
-            filters.append(lambda s: s.subtype == (subtype or file_extension))
+            criteria.append(("subtype", subtype or file_extension))
 
         if abr or bitrate:
-            filters.append(lambda s: s.abr == (abr or bitrate))
+            criteria.append(("abr", abr or bitrate))
 
         if video_codec:
-            filters.append(lambda s: s.video_codec == video_codec)
+            criteria.append(("video_codec", video_codec))
 
         if audio_codec:
-            filters.append(lambda s: s.audio_codec == audio_codec)
+            criteria.append(("audio_codec", audio_codec))
 
         if only_audio:
-            filters.append(
-                lambda s: (
-                    s.includes_audio_track and not s.includes_video_track
-                ),
-            )
+            criteria.append(("only_audio", True))
 
         if only_video:
-            filters.append(
-                lambda s: (
-                    s.includes_video_track and not s.includes_audio_track
-                ),
-            )
+            criteria.append(("only_video", True))
 
         if progressive:
-            filters.append(lambda s: s.is_progressive)
+            criteria.append(("is_progressive", True))
 
         if adaptive:
-            filters.append(lambda s: s.is_adaptive)
-
-        if custom_filter_functions:
-            filters.extend(custom_filter_functions)
+            criteria.append(("is_adaptive", True))
 
         if is_dash is not None:
-            filters.append(lambda s: s.is_dash == is_dash)
+            criteria.append(("is_dash", is_dash))
+
+        return self._view(
+            self._index, self._select(criteria, custom_filter_functions)
+        )
+
+    def _select(
+        self,
+        criteria: List[Tuple[str, Any]],
+        filters: Optional[List[Callable]] = None,
+    ) -> Tuple[int, ...]:
+        """Get the positions of the streams matching all criteria.
+
+        Each ``(key, value)`` criterion is looked up in the index; the
+        smallest sets are intersected first so that the result empties as
+        early as possible. Filter functions, which cannot be indexed, run on
+        what is left.
+        """
+        positions = self._positions
+        if criteria:
+            index = self._index
+            masks = sorted(
+                (index.lookup(key, value) for key, value in criteria),
+                key=_popcount,
+            )
+            mask = masks[0]
+            for other in masks[1:]:
+                if not mask:
+                    break
+                mask &= other
+            positions = tuple(p for p in positions if mask >> p & 1)
+        if filters:
+            streams = self._index.streams
+            positions = tuple(
+                p
+                for p in positions
+                if all(f(streams[p]) for f in filters)
+            )
+        return positions
 
-        return self._filter(filters)
+    def _ordered(
+        self, attribute_name: str, positions: Tuple[int, ...]
+    ) -> List[int]:
+        """Sort positions by an attribute, dropping streams without it.
 
-    def _filter(self, filters: List[Callable]) -> "StreamQuery":
-        fmt_streams = self.fmt_streams
-        for filter_lambda in filters:
-            fmt_streams = filter(filter_lambda, fmt_streams)
-        return StreamQuery(list(fmt_streams))
+        String values such as "720p" are compared by the integer they
+        contain, if they all contain one.
+        """
+        values: Union[Tuple, Dict[int, Any]]
+        if self._index.indexable(attribute_name):
+            values = self._index.values(attribute_name)
+        else:
+            streams = self._index.streams
+            values = {
+                p: getattr(streams[p], attribute_name) for p in positions
+            }
+        has_attribute = [p for p in positions if values[p] is not None]
+        if has_attribute and isinstance(values[has_attribute[0]], str):
+            numbers = {p: _parse_int(values[p]) for p in has_attribute}
+            if None not in numbers.values():
+                return sorted(has_attribute, key=numbers.__getitem__)
+
+        return sorted(has_attribute, key=values.__getitem__)
 
     def order_by(self, attribute_name: str) -> "StreamQuery":
         """Apply a sort order. Filters out stream the do not have the attribute.
@@ -192,33 +369,8 @@ class StreamQuery(Sequence):
         :param str attribute_name:
             The name of the attribute to sort by.
         """
-        has_attribute = [
-            s
-            for s in self.fmt_streams
-            if getattr(s, attribute_name) is not None
-        ]
-        # Check that the attributes have string values.
-        if has_attribute and isinstance(
-            getattr(has_attribute[0], attribute_name), str
-        ):
-            # Try to return a StreamQuery sorted by the integer representations
-            # of the values.
-            try:
-                return StreamQuery(
-                    sorted(
-                        has_attribute,
-                        key=lambda s: int(
-                            "".join(
-                                filter(str.isdigit, getattr(s, attribute_name))
-                            )
-                        ),  # type: ignore  # noqa: E501
-                    )
-                )
-            except ValueError:
-                pass
-
-        return StreamQuery(
-            sorted(has_attribute, key=lambda s: getattr(s, attribute_name))
+        return self._view(
+            self._index, tuple(self._ordered(attribute_name, self._positions))
         )
 
     def desc(self) -> "StreamQuery":
@@ -227,7 +379,7 @@ class StreamQuery(Sequence):
         :rtype: :class:`StreamQuery <StreamQuery>`
 
         """
-        return StreamQuery(self.fmt_streams[::-1])
+        return self._view(self._index, self._positions[::-1])
 
     def asc(self) -> "StreamQuery":
         """Sort streams in ascending order.
@@ -263,9 +415,14 @@ class StreamQuery(Sequence):
             not found.
 
         """
-        return self.filter(
-            progressive=True, subtype="mp4", resolution=resolution
-        ).first()
+        positions = self._select(
+            [
+                ("is_progressive", True),
+                ("subtype", "mp4"),
+                ("resolution", resolution),
+            ]
+        )
+        return self._index.streams[positions[0]] if positions else None
 
     def get_lowest_resolution(self) -> Optional[Stream]:
         """Get lowest resolution stream that is a progressive mp4.
@@ -276,11 +433,11 @@ class StreamQuery(Sequence):
             not found.
 
         """
-        return (
-            self.filter(progressive=True, subtype="mp4")
-            .order_by("resolution")
-            .first()
+        ordered = self._ordered(
+            "resolution",
+            self._select([("is_progressive", True), ("subtype", "mp4")]),
         )
+        return self._index.streams[ordered[0]] if ordered else None
 
     def get_highest_resolution(self) -> Optional[Stream]:
         """Get highest resolution stream that is a progressive video.
@@ -291,7 +448,10 @@ class StreamQuery(Sequence):
             not found.
 
         """
-        return self.filter(progressive=True).order_by("resolution").last()
+        ordered = self._ordered(
+            "resolution", self._select([("is_progressive", True)])
+        )
+        return self._index.streams[ordered[-1]] if ordered else None
 
     def get_audio_only(self, subtype: str = "mp4") -> Optional[Stream]:
         """Get highest bitrate audio stream for given codec (defaults to mp4)
@@ -303,11 +463,10 @@ class StreamQuery(Sequence):
             The :class:`Stream <Stream>` matching the given itag or None if
             not found.
         """
-        return (
-            self.filter(only_audio=True, subtype=subtype)
-            .order_by("abr")
-            .last()
+        ordered = self._ordered(
+            "abr", self._select([("only_audio", True), ("subtype", subtype)])
         )
+        return self._index.streams[ordered[-1]] if ordered else None
 
     def otf(self, is_otf: bool = False) -> "StreamQuery":
         """Filter stream by OTF, useful if some streams have 404 URLs
@@ -316,7 +475,7 @@ class StreamQuery(Sequence):
         :rtype: :class:`StreamQuery <StreamQuery>`
         :returns: A StreamQuery object with otf filtered streams
         """
-        return self._filter([lambda s: s.is_otf == is_otf])
+        return self._view(self._index, self._select([("is_otf", is_otf)]))
 
     def first(self) -> Optional[Stream]:
         """Get the first :class:`Stream <Stream>` in the results.
@@ -328,7 +487,7 @@ class StreamQuery(Sequence):
 
         """
         try:
-            return self.fmt_streams[0]
+            return self._index.streams[self._positions[0]]
         except IndexError:
             return None
 
@@ -342,7 +501,7 @@ class StreamQuery(Sequence):
 
         """
         try:
-            return self.fmt_streams[-1]
+            return self._index.streams[self._positions[-1]]
         except IndexError:
             pass
 
@@ -369,8 +528,11 @@ class StreamQuery(Sequence):
     def __getitem__(self, i: Union[slice, int]):
         return self.fmt_streams[i]
 
+    def __iter__(self) -> Iterator[Stream]:
+        return iter(self.fmt_streams)
+
     def __len__(self) -> int:
-        return len(self.fmt_streams)
+        return len(self._positions)
 
     def __repr__(self) -> str:
         return f"{self.fmt_streams}"
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+This module reads streams in place, without downloading them.
+
+:meth:`Stream.open <pytube.Stream.open>` returns a :class:`RemoteFile`: a
+seekable, read-only file object whose reads are served by range requests.
+Tools that only look at part of a stream (a container header, a thumbnail
+frame, a checksum sample) fetch a few blocks instead of the whole file, and
+can hand the object to anything expecting a binary file, e.g.: wrapped in an
+:class:`io.BufferedReader`.
+
+The blocks read recently are kept in a small cache. A read that carries on
+where the last one stopped also fetches the next few blocks in the same
+request, so sequential reads need few round trips.
+"""
+import io
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.error import HTTPError
+
+from pytube import request
+from pytube.context import DownloadToken
+from pytube.proxy import ProxyPool
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteFile(io.RawIOBase):
+    """A read-only binary file backed by range requests."""
+
+    def __init__(
+        self,
+        url: str,
+        size: Optional[int] = None,
+        block_size: int = 65536,
+        cache_blocks: int = 16,
+        read_ahead: int = 4,
+        proxies: Optional[ProxyPool] = None,
+        token: Optional[DownloadToken] = None,
+    ):
+        """
+        :param str url:
+            The file url.
+        :param int size:
+            (Optional) Size of the file if known, e.g.: from the manifest;
+            otherwise it is learned from the first response.
+        :param int block_size:
+            (Optional) Bytes fetched and cached together.
+        :param int cache_blocks:
+            (Optional) Number of blocks kept in memory.
+        :param int read_ahead:
+            (Optional) Blocks fetched ahead of sequential reads.
+        :param ProxyPool proxies:
+            (Optional) Proxies to send the requests through.
+        :param DownloadToken token:
+            (Optional) Token checked before each request, to cancel, pause
+            or time out the reads.
+        """
+        super().__init__()
+        if cache_blocks <= read_ahead:
+            raise ValueError("the cache must hold more than the read-ahead")
+        self.url = url
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self.read_ahead = read_ahead
+        self.proxies = proxies
+        self.token = token
+        #: Range requests made, for monitoring.
+        self.requests = 0
+        self._size = size
+        self._position = 0
+        # Blocks by index, least recently used first.
+        self._cache: "OrderedDict[int, bytes]" = OrderedDict()
+        # Where the last read stopped.
+        self._read_end: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """Size of the file in bytes."""
+        if self._size is None:
+            self._size = request.filesize(self.url, self.proxies)
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        self._check_open()
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._check_open()
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if position < 0:
+            raise ValueError(f"negative seek position {position}")
+        self._position = position
+        return position
+
+    def readinto(self, buffer) -> int:  # type: ignore
+        self._check_open()
+        view = memoryview(buffer).cast("B")
+        if not len(view):
+            return 0
+        with self._lock:
+            if self._size is not None and self._position >= self._size:
+                return 0
+            first = self._position // self.block_size
+            last = (self._position + len(view) - 1) // self.block_size
+            if self._size is not None:
+                last = min(last, (self._size - 1) // self.block_size)
+            # Large reads are served in parts, which the cache can hold.
+            last = min(last, first + self.cache_blocks - self.read_ahead - 1)
+            self._load(first, last, self._position == self._read_end)
+
+            done = 0
+            for index in range(first, last + 1):
+                block = self._cache.get(index)
+                if block is None:
+                    # Past the end of the file.
+                    break
+                offset = self._position - index * self.block_size
+                part = block[offset: offset + len(view) - done]
+                if not part:
+                    break
+                view[done: done + len(part)] = part
+                done += len(part)
+                self._position += len(part)
+            self._read_end = self._position
+            return done
+
+    def close(self) -> None:
+        self._cache.clear()
+        super().close()
+
+    def _check_open(self) -> None:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
+    def _load(self, first: int, last: int, sequential: bool) -> None:
+        """Make sure blocks ``first`` to ``last`` are cached, if they exist,
+        and the blocks after them too if the read is ``sequential``."""
+        missing = [i for i in range(first, last + 1) if i not in self._cache]
+        for index in range(first, last + 1):
+            if index in self._cache:
+                self._cache.move_to_end(index)
+        if not missing:
+            return
+        start_block = missing[0]
+        end_block = missing[-1] + (self.read_ahead if sequential else 0)
+        if self._size is not None:
+            end_block = min(end_block, (self._size - 1) // self.block_size)
+        while end_block > missing[-1] and end_block in self._cache:
+            # Already read ahead.
+            end_block -= 1
+        self._fetch(start_block, end_block)
+
+    def _fetch(self, first: int, last: int) -> None:
+        if self.token is not None:
+            self.token.check()
+        start = first * self.block_size
+        end = (last + 1) * self.block_size - 1
+        logger.debug("fetching bytes %d-%d of %s", start, end, self.url)
+        try:
+            data, size = request.get_range_and_size(
+                self.url, start, end, self.proxies
+            )
+        except HTTPError as e:
+            # Range Not Satisfiable: read past the end of a file of unknown
+            # size.
+            if e.code != 416:
+                raise
+            return
+        finally:
+            self.requests += 1
+        if len(data) > end - start + 1:
+            # The server ignored the range and sent the whole file.
+            size = len(data)
+            data = data[start: end + 1]
+        elif size is None and len(data) < end - start + 1:
+            size = start + len(data)
+        if size is not None:
+            self._size = size
+        for offset in range(0, len(data), self.block_size):
+            index = first + offset // self.block_size
+            self._cache[index] = data[offset: offset + self.block_size]
+            self._cache.move_to_end(index)
+        while len(self._cache) > self.cache_blocks:
+            self._cache.popitem(last=False)
@@ -1,21 +1,43 @@
 # -*- coding: utf-8 -*-
 """Implements a simple wrapper around urlopen."""
 import logging
-from functools import lru_cache
+import re
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPException
 from http.client import HTTPResponse
+from typing import Callable
 from typing import Dict
 from typing import Iterable
 from typing import Optional
+from typing import Tuple
+from urllib import parse
+from urllib.error import HTTPError
+from urllib.error import URLError
 from urllib.request import Request
 from urllib.request import urlopen
 
+from pytube.exceptions import RegexMatchError
+from pytube.helpers import SingleFlight
+from pytube.proxy import ProxyPool
+
 logger = logging.getLogger(__name__)
 
+# Concurrent identical GET and HEAD requests share one network operation.
+_flight = SingleFlight()
+
+# The header segment of an OTF stream announces how many segments follow.
+_SEGMENT_COUNT = re.compile(rb"Segment-Count: (\d+)")
+# Seconds before the first retry of a failed request, doubled on each retry.
+_RETRY_DELAY = 0.5
+
 
 def _execute_request(
         url: str,
         method: Optional[str] = None,
         headers: Optional[Dict[str, str]] = None,
+        proxies: Optional[ProxyPool] = None,
 ) -> HTTPResponse:
     base_headers = {"User-Agent": "Mozilla/5.0"}
     if headers:
@@ -24,76 +46,285 @@ def _execute_request(
         request = Request(url, headers=base_headers, method=method)
     else:
         raise ValueError("Invalid URL")
+    if proxies is not None:
+        return proxies.open(request)
     return urlopen(request)  # nosec
 
 
-def get(url, extra_headers=None) -> str:
+def get(url, extra_headers=None, proxies=None) -> str:
     """Send an http GET request.
 
     :param str url:
         The URL to perform the GET request for.
     :param dict extra_headers:
         Extra headers to add to the request
+    :param ProxyPool proxies:
+        (Optional) Proxies to send the request through.
     :rtype: str
     :returns:
         UTF-8 encoded string of response
     """
     if extra_headers is None:
         extra_headers = {}
-    return _execute_request(url, headers=extra_headers).read().decode("utf-8")
+    # Responses through other proxies (or a gateway) are not shared.
+    key = ("GET", url, tuple(sorted(extra_headers.items())), id(proxies))
+    return _flight.do(key, _get, url, extra_headers, proxies)
+
+
+def _get(
+        url: str,
+        extra_headers: Dict[str, str],
+        proxies: Optional[ProxyPool] = None,
+) -> str:
+    response = _execute_request(url, headers=extra_headers, proxies=proxies)
+    return response.read().decode("utf-8")
 
 
 def stream(
-        url: str, chunk_size: int = 4096, range_size: int = 9437184
+        url: str,
+        chunk_size: int = 4096,
+        range_size: int = 9437184,
+        start: int = 0,
+        check: Optional[Callable[[], None]] = None,
+        proxies: Optional[ProxyPool] = None,
 ) -> Iterable[bytes]:
     """Read the response in chunks.
     :param str url: The URL to perform the GET request for.
     :param int chunk_size: The size in bytes of each chunk. Defaults to 4KB
     :param int range_size: The size in bytes of each range request. Defaults
     to 9MB
+    :param int start: The offset in bytes to start reading at, e.g.: to
+    resume an interrupted download. Defaults to 0
+    :param check: Called before each range request; it may raise to stop
+    reading, or block to pause it.
+    :param ProxyPool proxies: Proxies to spread the range requests over.
     :rtype: Iterable[bytes]
     """
-    file_size: int = range_size  # fake filesize to start
-    downloaded = 0
-    while downloaded < file_size:
-        stop_pos = min(downloaded + range_size, file_size) - 1
+    file_size: Optional[int] = None
+    downloaded = start
+    while file_size is None or downloaded < file_size:
+        if check is not None:
+            check()
+        stop_pos = downloaded + range_size - 1
+        if file_size is not None:
+            stop_pos = min(stop_pos, file_size - 1)
         range_header = f"bytes={downloaded}-{stop_pos}"
         response = _execute_request(
-            url, method="GET", headers={"Range": range_header}
+            url,
+            method="GET",
+            headers={"Range": range_header},
+            proxies=proxies,
         )
-        if file_size == range_size:
+        if file_size is None:
+            # fake filesize until the server tells the real one
+            file_size = stop_pos + 1
             try:
                 content_range = response.info()["Content-Range"]
                 file_size = int(content_range.split("/")[1])
             except (KeyError, IndexError, ValueError) as e:
                 logger.error(e)
-        while True:
-            chunk = response.read(chunk_size)
-            if not chunk:
-                break
-            downloaded += len(chunk)
-            yield chunk
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                downloaded += len(chunk)
+                yield chunk
+        finally:
+            # Also reached when the reader stops early and closes us.
+            response.close()
     return  # pylint: disable=R1711
 
 
-@lru_cache(maxsize=None)
-def filesize(url: str) -> int:
+def seq_stream(
+        url: str,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        proxies: Optional[ProxyPool] = None,
+) -> Iterable[bytes]:
+    """Read an OTF (on-the-fly) stream segment by segment.
+
+    OTF streams cannot be read with range requests; their content is served
+    as numbered segments (the ``sq`` parameter). Segment 0 holds the file
+    header and the number of segments, the others are fetched concurrently
+    and yielded in order.
+
+    :param str url: The URL of the OTF stream.
+    :param int max_workers: The number of segments fetched at the same time.
+    :param int max_retries: The number of times a failed segment is retried.
+    :param ProxyPool proxies: Proxies to spread the segment requests over.
+    :rtype: Iterable[bytes]
+    """
+    header = get_segment(url, 0, max_retries, proxies)
+    match = _SEGMENT_COUNT.search(header)
+    if not match:
+        raise RegexMatchError(
+            caller="seq_stream", pattern=_SEGMENT_COUNT.pattern
+        )
+    segment_count = int(match.group(1))
+    logger.debug("OTF stream has %d segments", segment_count)
+    yield header
+
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            sq = 1
+            while sq <= segment_count or pending:
+                # Keep a bounded number of segments in flight ahead of the
+                # one being yielded.
+                while sq <= segment_count and len(pending) < 2 * max_workers:
+                    pending.append(
+                        executor.submit(
+                            get_segment, url, sq, max_retries, proxies
+                        )
+                    )
+                    sq += 1
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def get_segment(
+        url: str,
+        sq: int,
+        max_retries: int = 3,
+        proxies: Optional[ProxyPool] = None,
+) -> bytes:
+    """Fetch a numbered segment of an OTF stream, retrying on failure.
+
+    :param str url: The URL of the OTF stream.
+    :param int sq: The segment number.
+    :param int max_retries: The number of times the request is retried.
+    :param ProxyPool proxies: Proxies to send the request through.
+    :rtype: bytes
+    """
+    parts = parse.urlsplit(url)
+    query = [
+        (k, v) for k, v in parse.parse_qsl(parts.query) if k != "sq"
+    ]
+    query.append(("sq", str(sq)))
+    segment_url = parse.urlunsplit(parts._replace(query=parse.urlencode(query)))
+    return get_bytes(segment_url, max_retries, proxies)
+
+
+def get_bytes(
+        url: str, max_retries: int = 0, proxies: Optional[ProxyPool] = None
+) -> bytes:
+    """Fetch a whole file, retrying on transient failures.
+
+    Connection errors, server errors and throttling (429) are retried with
+    an exponential backoff; other client errors are raised at once.
+
+    :param str url: The URL to perform the GET request for.
+    :param int max_retries: The number of times the request is retried.
+    :param ProxyPool proxies: Proxies to send the request through; a retry
+        may go through another one.
+    :rtype: bytes
+    """
+    attempt = 0
+    while True:
+        try:
+            return _execute_request(url, method="GET", proxies=proxies).read()
+        except (URLError, HTTPException, ConnectionError) as e:
+            # Client errors other than throttling will not go away.
+            if isinstance(e, HTTPError) and e.code < 500 and e.code != 429:
+                raise
+            if attempt == max_retries:
+                raise
+            logger.debug("GET %s failed (%s), retrying", url, e)
+            time.sleep(_RETRY_DELAY * 2 ** attempt)
+            attempt += 1
+
+
+def get_range(
+        url: str, start: int, end: int, proxies: Optional[ProxyPool] = None
+) -> bytes:
+    """Fetch a byte range of a file.
+
+    :param str url:
+        The URL to perform the GET request for.
+    :param int start:
+        First byte of the range.
+    :param int end:
+        Last byte of the range (inclusive).
+    :param ProxyPool proxies:
+        (Optional) Proxies to send the request through.
+    :rtype: bytes
+    """
+    response = _execute_request(
+        url,
+        method="GET",
+        headers={"Range": f"bytes={start}-{end}"},
+        proxies=proxies,
+    )
+    return response.read()
+
+
+def get_range_and_size(
+        url: str, start: int, end: int, proxies: Optional[ProxyPool] = None
+) -> Tuple[bytes, Optional[int]]:
+    """Fetch a byte range of a file, and the size of the whole file.
+
+    :param str url:
+        The URL to perform the GET request for.
+    :param int start:
+        First byte of the range.
+    :param int end:
+        Last byte of the range (inclusive).
+    :param ProxyPool proxies:
+        (Optional) Proxies to send the request through.
+    :rtype: Tuple[bytes, Optional[int]]
+    :returns:
+        The bytes, which are fewer than asked for at the end of the file,
+        and the size from the ``Content-Range`` header, if there is one.
+    """
+    response = _execute_request(
+        url,
+        method="GET",
+        headers={"Range": f"bytes={start}-{end}"},
+        proxies=proxies,
+    )
+    size = None
+    content_range = response.info().get("Content-Range")
+    if content_range:
+        try:
+            size = int(content_range.split("/")[1])
+        except (IndexError, ValueError) as e:
+            logger.error(e)
+    return response.read(), size
+
+
+def filesize(url: str, proxies: Optional[ProxyPool] = None) -> int:
     """Fetch size in bytes of file at given URL
 
+    Concurrent requests for the same size share one ``HEAD`` request; the
+    callers keep the size, e.g.: :attr:`Stream.filesize
+    <pytube.Stream.filesize>`.
+
     :param str url: The URL to get the size of
+    :param ProxyPool proxies: Proxies to send the request through
     :returns: int: size in bytes of remote file
     """
-    return int(head(url)["content-length"])
+    return int(head(url, proxies)["content-length"])
 
 
-def head(url: str) -> Dict:
+def head(url: str, proxies: Optional[ProxyPool] = None) -> Dict:
     """Fetch headers returned http GET request.
 
     :param str url:
         The URL to perform the GET request for.
+    :param ProxyPool proxies:
+        (Optional) Proxies to send the request through.
     :rtype: dict
     :returns:
         dictionary of lowercase headers
     """
-    response_headers = _execute_request(url, method="HEAD").info()
+    return _flight.do(("HEAD", url, id(proxies)), _head, url, proxies)
+
+
+def _head(url: str, proxies: Optional[ProxyPool] = None) -> Dict:
+    response_headers = _execute_request(
+        url, method="HEAD", proxies=proxies
+    ).info()
     return {k.lower(): v for k, v in response_headers.items()}
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+This module implements a compact snapshot format for extracted videos.
+
+A snapshot contains the result of extraction (the signed stream manifests,
+the caption track list and the video details) but none of the raw html or
+JavaScript it was derived from. Loading a snapshot rebuilds a usable
+:class:`YouTube <YouTube>` object without any network requests or
+descrambling, which makes it cheap to pass extracted videos between
+processes or queue stages.
+"""
+import json
+import struct
+import zlib
+from typing import Any
+from typing import BinaryIO
+
+from pytube.__main__ import YouTube
+
+MAGIC = b"PYTS"
+VERSION = 1
+
+# magic, format version
+_HEADER = struct.Struct("<4sB")
+
+
+def dumps(youtube: YouTube) -> bytes:
+    """Serialize an extracted :class:`YouTube <YouTube>` object.
+
+    :param YouTube youtube:
+        A descrambled YouTube object.
+    :rtype: bytes
+    :returns:
+        The snapshot.
+    """
+    payload = json.dumps(
+        youtube.extraction_state(), separators=(",", ":")
+    ).encode("utf-8")
+    return _HEADER.pack(MAGIC, VERSION) + zlib.compress(payload)
+
+
+def loads(data: bytes, **kwargs: Any) -> YouTube:
+    """Rebuild a :class:`YouTube <YouTube>` object from a snapshot.
+
+    :param bytes data:
+        A snapshot created by :func:`dumps`.
+    :param kwargs:
+        Extra keyword arguments for the :class:`YouTube <YouTube>`
+        constructor, such as progress callbacks.
+    :rtype: YouTube
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("Invalid snapshot")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Invalid snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version: {version}")
+
+    state = json.loads(zlib.decompress(data[_HEADER.size :]).decode("utf-8"))
+    youtube = YouTube(
+        f"https://youtube.com/watch?v={state['video_id']}",
+        defer_prefetch_init=True,
+        **kwargs,
+    )
+    youtube.load_extraction_state(state)
+    return youtube
+
+
+def dump(youtube: YouTube, fp: BinaryIO) -> None:
+    """Write a snapshot of a :class:`YouTube <YouTube>` object to a file.
+
+    :param YouTube youtube:
+        A descrambled YouTube object.
+    :param fp:
+        A binary file object opened for writing.
+    :rtype: None
+    """
+    fp.write(dumps(youtube))
+
+
+def load(fp: BinaryIO, **kwargs: Any) -> YouTube:
+    """Read a snapshot from a file.
+
+    :param fp:
+        A binary file object opened for reading.
+    :rtype: YouTube
+    """
+    return loads(fp.read(), **kwargs)
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+This module implements a content-addressed store of downloaded media.
+
+Whether :meth:`Stream.download <pytube.Stream.download>` skips a file
+depends on its name, so the same stream saved under another title or prefix
+is downloaded again. A :class:`MediaStore` keeps each stream once, keyed by
+video id, itag and size, and an SQLite index of what it holds, which answers
+without any network request. Downloads given a store are linked from it
+when it has the stream; otherwise the finished file is added to it.
+
+Files leave the store as hard links where possible, which cost no space.
+Across file systems, reflinks (copy-on-write clones) are tried before
+falling back to a copy.
+"""
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# ioctl of Linux cloning a whole file (btrfs, xfs, ...).
+_FICLONE = 0x40049409
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    video_id TEXT NOT NULL,
+    itag INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    added REAL NOT NULL,
+    PRIMARY KEY (video_id, itag, size)
+)
+"""
+
+
+class StoredMedia(NamedTuple):
+    """A stream held by a :class:`MediaStore`."""
+
+    video_id: str
+    itag: int
+    size: int
+    #: Path of the file in the store.
+    path: str
+    #: Unix time the file was added.
+    added: float
+
+
+class MediaStore:
+    """Media files stored once, by video id, itag and size."""
+
+    def __init__(self, root: str):
+        """
+        :param str root:
+            Directory of the store, created if it does not exist.
+        """
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(root, "index.sqlite3"), check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the index."""
+        self._db.close()
+
+    def __enter__(self) -> "MediaStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(
+        self, video_id: str, itag: int, size: Optional[int] = None
+    ) -> Optional[StoredMedia]:
+        """Look a stream up, without any network request.
+
+        :param str video_id:
+            The video id.
+        :param int itag:
+            The itag of the stream.
+        :param int size:
+            (Optional) The size of the stream; any size matches if ``None``.
+        :rtype: StoredMedia or None
+        """
+        query = (
+            "SELECT video_id, itag, size, path, added FROM objects "
+            "WHERE video_id = ? AND itag = ?"
+        )
+        parameters: tuple = (video_id, itag)
+        if size is not None:
+            query += " AND size = ?"
+            parameters += (size,)
+        with self._lock:
+            rows = self._db.execute(
+                query + " ORDER BY added DESC", parameters
+            ).fetchall()
+        for row in rows:
+            media = StoredMedia(*row)
+            if self._intact(media):
+                return media
+            # Removed or truncated behind our back.
+            logger.warning("dropping damaged %s from the store", media.path)
+            self._forget(media)
+        return None
+
+    def has(
+        self, video_id: str, itag: int, size: Optional[int] = None
+    ) -> bool:
+        """Check whether the store holds a stream, see :meth:`get`.
+
+        :rtype: bool
+        """
+        return self.get(video_id, itag, size) is not None
+
+    def add(self, video_id: str, itag: int, file_path: str) -> StoredMedia:
+        """Add a downloaded file to the store.
+
+        The file is linked into the store (copied if it cannot be linked)
+        and stays where it is. If the store already holds the stream, the
+        file is left out.
+
+        :param str video_id:
+            The video id.
+        :param int itag:
+            The itag of the stream.
+        :param str file_path:
+            The file.
+        :rtype: StoredMedia
+        """
+        size = os.stat(file_path).st_size
+        existing = self.get(video_id, itag, size)
+        if existing is not None:
+            return existing
+        _, extension = os.path.splitext(file_path)
+        directory = os.path.join(self.root, "objects", video_id[:2])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{video_id}-{itag}-{size}{extension}")
+        if not _has_size(path, size):
+            # Link under a private name first: the path may be taken by a
+            # damaged object, or by a concurrent download of the stream,
+            # and both may be linked from elsewhere.
+            temp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+            link(file_path, temp_path)
+            os.replace(temp_path, path)
+        media = StoredMedia(video_id, itag, size, path, time.time())
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?)", media
+            )
+        return media
+
+    def materialize(self, media: StoredMedia, output_path: str) -> str:
+        """Make a stored file available at a path.
+
+        :param StoredMedia media:
+            The stored stream.
+        :param str output_path:
+            Where the file is wanted; an existing file there is replaced.
+        :rtype: str
+        :returns:
+            The output path.
+        """
+        if os.path.exists(output_path):
+            if os.path.samefile(media.path, output_path):
+                return output_path
+            os.unlink(output_path)
+        link(media.path, output_path)
+        return output_path
+
+    def media(self) -> List[StoredMedia]:
+        """Get everything in the store, oldest first.
+
+        :rtype: List[StoredMedia]
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT video_id, itag, size, path, added FROM objects "
+                "ORDER BY added"
+            ).fetchall()
+        return [StoredMedia(*row) for row in rows]
+
+    @staticmethod
+    def _intact(media: StoredMedia) -> bool:
+        return _has_size(media.path, media.size)
+
+    def _forget(self, media: StoredMedia) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM objects WHERE video_id = ? AND itag = ? "
+                "AND size = ?",
+                (media.video_id, media.itag, media.size),
+            )
+
+
+def link(source: str, destination: str) -> None:
+    """Create a file with the content of another without copying, if possible.
+
+    Tries a hard link, then a reflink, then falls back to a copy.
+
+    :param str source:
+        The existing file.
+    :param str destination:
+        The path of the new file, which must not exist.
+    :raises FileExistsError:
+        If the destination exists; it is left untouched, since it may be
+        linked from elsewhere.
+    """
+    try:
+        os.link(source, destination)
+        return
+    except FileExistsError:
+        raise
+    except OSError as e:
+        # e.g.: another file system, or links are not supported.
+        logger.debug("cannot hard link %s: %s", source, e)
+    if _reflink(source, destination):
+        return
+    with open(source, "rb") as src, open(destination, "xb") as dst:
+        shutil.copyfileobj(src, dst)
+
+
+def _reflink(source: str, destination: str) -> bool:
+    try:
+        import fcntl  # pylint: disable=C0415
+    except ImportError:  # not on Windows
+        return False
+    with open(source, "rb") as src:
+        # Never truncate an existing file.
+        fd = os.open(destination, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        with open(fd, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+                return True
+            except OSError:
+                pass
+    os.unlink(destination)
+    return False
+
+
+def _has_size(path: str, size: int) -> bool:
+    try:
+        return os.stat(path).st_size == size
+    except OSError:
+        return False
@@ -9,26 +9,111 @@ separately).
 """
 import logging
 import os
+import sys
+import threading
 from datetime import datetime
+from functools import lru_cache
 from typing import BinaryIO
 from typing import Dict
+from typing import NamedTuple
 from typing import Optional
 from typing import Tuple
 from urllib.parse import parse_qs
 
 from pytube import extract
 from pytube import request
+from pytube.context import DownloadContext
+from pytube.context import DownloadToken
+from pytube.exceptions import IntegrityError
+from pytube.exceptions import PytubeError
 from pytube.helpers import safe_filename
 from pytube.helpers import target_directory
-from pytube.itags import get_format_profile
+from pytube.integrity import read_digest
+from pytube.integrity import sidecar_path
+from pytube.integrity import write_digest
+from pytube.itags import format_profile
 from pytube.monostate import Monostate
+from pytube.monostate import OnComplete
+from pytube.monostate import OnProgress
+from pytube.progress import OnProgressEvent
+from pytube.progress import ProgressReporter
+from pytube.proxy import ProxyPool
+from pytube.remote import RemoteFile
+from pytube.store import MediaStore
+from pytube.store import StoredMedia
+from pytube.writer import WriteBehindWriter
 
 logger = logging.getLogger(__name__)
 
 
+class _StreamFormat(NamedTuple):
+    """The parsed ``type`` of a stream, shared by streams of the same type."""
+
+    mime_type: str
+    codecs: Tuple[str, ...]
+    type: str
+    subtype: str
+    video_codec: Optional[str]
+    audio_codec: Optional[str]
+
+
+@lru_cache(maxsize=None)
+def _parse_stream_format(mime_type_codec: str) -> _StreamFormat:
+    # 'video/webm; codecs="vp8, vorbis"' -> 'video/webm', ['vp8', 'vorbis']
+    mime_type, codecs = extract.mime_type_codec(mime_type_codec)
+    codecs = tuple(sys.intern(c) for c in codecs)
+    # 'video/webm' -> 'video', 'webm'
+    type_, subtype = mime_type.split("/")
+
+    # ['vp8', 'vorbis'] -> video_codec: vp8, audio_codec: vorbis. DASH
+    # streams return NoneType for audio/video depending.
+    video = None
+    audio = None
+    if not len(codecs) % 2:
+        video, audio = codecs
+    elif type_ == "video":
+        video = codecs[0]
+    elif type_ == "audio":
+        audio = codecs[0]
+
+    return _StreamFormat(
+        mime_type=sys.intern(mime_type),
+        codecs=codecs,
+        type=sys.intern(type_),
+        subtype=sys.intern(subtype),
+        video_codec=video,
+        audio_codec=audio,
+    )
+
+
+def _parse_byte_range(byte_range: Optional[str]) -> Optional[Tuple[int, int]]:
+    # "0-740" -> (0, 740), both ends inclusive
+    if not byte_range:
+        return None
+    start, end = byte_range.split("-")
+    return int(start), int(end)
+
+
 class Stream:
     """Container for stream manifest data."""
 
+    # Manifests for many videos are kept in memory at once, so streams only
+    # hold what is specific to them. The parsed type and the itag profile
+    # are shared with every other stream of the same type or itag.
+    __slots__ = (
+        "_monostate",
+        "url",
+        "itag",
+        "is_otf",
+        "bitrate",
+        "init_range",
+        "index_range",
+        "content_length",
+        "_filesize",
+        "_format",
+        "_profile",
+    )
+
     def __init__(
         self, stream: Dict, player_config_args: Dict, monostate: Monostate
     ):
@@ -37,8 +122,9 @@ class Stream:
         :param dict stream:
             The unscrambled data extracted from YouTube.
         :param dict player_config_args:
-            The data object containing video media data like title and
-            keywords.
+            Unused. Streams no longer keep a reference to the player
+            configuration; the title and duration they need are in the
+            monostate.
         :param dict monostate:
             Dictionary of data shared across all instances of
             :class:`Stream <Stream>`.
@@ -47,45 +133,134 @@ class Stream:
         # (Borg pattern).
         self._monostate = monostate
 
-        self.url = stream["url"]  # signed download url
+        self.url: str = stream["url"]  # signed download url
         self.itag = int(
             stream["itag"]
         )  # stream format id (youtube nomenclature)
 
         # set type and codec info
-
-        # 'video/webm; codecs="vp8, vorbis"' -> 'video/webm', ['vp8', 'vorbis']
-        self.mime_type, self.codecs = extract.mime_type_codec(stream["type"])
-
-        # 'video/webm' -> 'video', 'webm'
-        self.type, self.subtype = self.mime_type.split("/")
-
-        # ['vp8', 'vorbis'] -> video_codec: vp8, audio_codec: vorbis. DASH
-        # streams return NoneType for audio/video depending.
-        self.video_codec, self.audio_codec = self.parse_codecs()
+        self._format = _parse_stream_format(stream["type"])
 
         self.is_otf: bool = stream["is_otf"]
         self.bitrate: Optional[int] = stream["bitrate"]
 
+        # Byte ranges of the initialization segment and of the segment index
+        # (``sidx`` for mp4, ``Cues`` for webm) of adaptive streams.
+        self.init_range = _parse_byte_range(stream.get("init"))
+        self.index_range = _parse_byte_range(stream.get("index"))
+        self.content_length: Optional[int] = (
+            int(stream["clen"]) if stream.get("clen") else None
+        )
+
         self._filesize: Optional[int] = None  # filesize in bytes
 
         # Additional information about the stream format, such as resolution,
         # frame rate, and whether the stream is live (HLS) or 3D.
-        itag_profile = get_format_profile(self.itag)
-        self.is_dash = itag_profile["is_dash"]
-        self.abr = itag_profile["abr"]  # average bitrate (audio streams only)
-        self.fps = itag_profile[
-            "fps"
-        ]  # frames per second (video streams only)
-        self.resolution = itag_profile[
-            "resolution"
-        ]  # resolution (e.g.: "480p")
-        self.is_3d = itag_profile["is_3d"]
-        self.is_hdr = itag_profile["is_hdr"]
-        self.is_live = itag_profile["is_live"]
-
-        # The player configuration, contains info like the video title.
-        self.player_config_args = player_config_args
+        self._profile = format_profile(self.itag)
+
+    @property
+    def mime_type(self) -> str:
+        """Two-part identifier for the format, e.g.: "video/webm".
+
+        :rtype: str
+        """
+        return self._format.mime_type
+
+    @property
+    def codecs(self) -> Tuple[str, ...]:
+        """The codecs of the stream, e.g.: ("vp8", "vorbis").
+
+        :rtype: tuple
+        """
+        return self._format.codecs
+
+    @property
+    def type(self) -> str:
+        """Type part of the mime type, e.g.: "video".
+
+        :rtype: str
+        """
+        return self._format.type
+
+    @property
+    def subtype(self) -> str:
+        """Sub-type part of the mime type, e.g.: "webm".
+
+        :rtype: str
+        """
+        return self._format.subtype
+
+    @property
+    def video_codec(self) -> Optional[str]:
+        """Video compression format, if the stream has a video track.
+
+        :rtype: str or None
+        """
+        return self._format.video_codec
+
+    @property
+    def audio_codec(self) -> Optional[str]:
+        """Audio compression format, if the stream has an audio track.
+
+        :rtype: str or None
+        """
+        return self._format.audio_codec
+
+    @property
+    def is_dash(self) -> bool:
+        """Whether the itag is a DASH format.
+
+        :rtype: bool
+        """
+        return self._profile.is_dash
+
+    @property
+    def abr(self) -> Optional[str]:
+        """Average bitrate (audio streams only), e.g.: "128kbps".
+
+        :rtype: str or None
+        """
+        return self._profile.abr
+
+    @property
+    def fps(self) -> int:
+        """Frames per second (video streams only).
+
+        :rtype: int
+        """
+        return self._profile.fps
+
+    @property
+    def resolution(self) -> Optional[str]:
+        """Resolution of the video, e.g.: "480p".
+
+        :rtype: str or None
+        """
+        return self._profile.resolution
+
+    @property
+    def is_3d(self) -> bool:
+        """Whether the stream is 3D.
+
+        :rtype: bool
+        """
+        return self._profile.is_3d
+
+    @property
+    def is_hdr(self) -> bool:
+        """Whether the stream is HDR.
+
+        :rtype: bool
+        """
+        return self._profile.is_hdr
+
+    @property
+    def is_live(self) -> bool:
+        """Whether the stream is live (HLS).
+
+        :rtype: bool
+        """
+        return self._profile.is_live
 
     @property
     def is_adaptive(self) -> bool:
@@ -95,7 +270,7 @@ class Stream:
         """
         # if codecs has two elements (e.g.: ['vp8', 'vorbis']): 2 % 2 = 0
         # if codecs has one element (e.g.: ['vp8']) 1 % 2 = 1
-        return bool(len(self.codecs) % 2)
+        return bool(len(self._format.codecs) % 2)
 
     @property
     def is_progressive(self) -> bool:
@@ -134,15 +309,7 @@ class Stream:
             A two element tuple with audio and video codecs.
 
         """
-        video = None
-        audio = None
-        if not self.is_adaptive:
-            video, audio = self.codecs
-        elif self.includes_video_track:
-            video = self.codecs[0]
-        elif self.includes_audio_track:
-            audio = self.codecs[0]
-        return video, audio
+        return self._format.video_codec, self._format.audio_codec
 
     @property
     def filesize(self) -> int:
@@ -153,9 +320,25 @@ class Stream:
             Filesize (in bytes) of the stream.
         """
         if self._filesize is None:
-            self._filesize = request.filesize(self.url)
+            self._filesize = request.filesize(self.url, self.proxies)
         return self._filesize
 
+    @property
+    def video_id(self) -> Optional[str]:
+        """The id of the video the stream belongs to.
+
+        :rtype: str or None
+        """
+        return self._monostate.video_id
+
+    @property
+    def proxies(self) -> Optional[ProxyPool]:
+        """The proxies the stream is downloaded through, if any.
+
+        :rtype: ProxyPool or None
+        """
+        return self._monostate.proxies
+
     @property
     def title(self) -> str:
         """Get title of video
@@ -205,6 +388,11 @@ class Stream:
         filename: Optional[str] = None,
         filename_prefix: Optional[str] = None,
         skip_existing: bool = True,
+        write_behind: bool = False,
+        timeout: Optional[float] = None,
+        keep_partial: bool = False,
+        store: Optional[MediaStore] = None,
+        checksum: Optional[str] = None,
     ) -> str:
         """Write the media stream to disk.
 
@@ -226,38 +414,267 @@ class Stream:
         :param skip_existing:
             (optional) skip existing files, defaults to True
         :type skip_existing: bool
+        :param write_behind:
+            (optional) write to disk from a separate thread, so that slow
+            storage does not hold up the download, defaults to False
+        :type write_behind: bool
+        :param timeout:
+            (optional) seconds the download may take before it raises
+            :class:`DeadlineExceeded <pytube.exceptions.DeadlineExceeded>`
+        :type timeout: float or None
+        :param keep_partial:
+            (optional) keep the file of an interrupted download and
+            continue it on the next call, defaults to False
+        :type keep_partial: bool
+        :param store:
+            (optional) store of media already downloaded; a stream it holds
+            is linked from it instead of downloaded, whatever its filename
+        :type store: MediaStore or None
+        :param checksum:
+            (optional) hash algorithm, such as "sha256" or "xxh3_64", to
+            hash the stream with while it downloads; the digests are written
+            next to the file (see :mod:`pytube.integrity`) and its size is
+            checked against the one in the manifest
+        :type checksum: str or None
         :returns:
             Path to the saved video
         :rtype: str
 
+        """
+        return self.download_context(
+            output_path=output_path,
+            filename=filename,
+            filename_prefix=filename_prefix,
+            skip_existing=skip_existing,
+            write_behind=write_behind,
+            on_progress=self._monostate.on_progress,
+            on_progress_event=self._monostate.on_progress_event,
+            on_complete=self._monostate.on_complete,
+            progress_interval=self._monostate.progress_interval,
+            timeout=timeout,
+            keep_partial=keep_partial,
+            store=store,
+            checksum=checksum,
+        ).run()
+
+    def download_context(
+        self,
+        output_path: Optional[str] = None,
+        filename: Optional[str] = None,
+        filename_prefix: Optional[str] = None,
+        skip_existing: bool = True,
+        write_behind: bool = False,
+        on_progress: Optional[OnProgress] = None,
+        on_progress_event: Optional[OnProgressEvent] = None,
+        on_complete: Optional[OnComplete] = None,
+        progress_interval: float = 0.1,
+        cancel: Optional[threading.Event] = None,
+        timeout: Optional[float] = None,
+        keep_partial: bool = False,
+        store: Optional[MediaStore] = None,
+        checksum: Optional[str] = None,
+    ) -> DownloadContext:
+        """Prepare a download with its own callbacks and state.
+
+        Unlike :meth:`download`, the callbacks registered on the
+        :class:`YouTube <pytube.YouTube>` object are not used, so downloads
+        of several streams can run at the same time, each reporting to its
+        own callbacks. Run the download with
+        :meth:`DownloadContext.run <pytube.context.DownloadContext.run>` or
+        :meth:`DownloadContext.start <pytube.context.DownloadContext.start>`.
+
+        :param output_path:
+            (optional) Output path for writing media file, see
+            :meth:`download`.
+        :type output_path: str or None
+        :param filename:
+            (optional) Output filename (stem only) for writing media file.
+        :type filename: str or None
+        :param filename_prefix:
+            (optional) A string that will be prepended to the filename.
+        :type filename_prefix: str or None
+        :param skip_existing:
+            (optional) skip existing files, defaults to True
+        :type skip_existing: bool
+        :param write_behind:
+            (optional) write to disk from a separate thread, defaults to
+            False
+        :type write_behind: bool
+        :param on_progress:
+            (optional) per-chunk callback taking ``stream``, ``chunk`` and
+            ``bytes_remaining``
+        :param on_progress_event:
+            (optional) handler of coalesced progress events
+        :param on_complete:
+            (optional) callback taking ``stream`` and ``file_path``
+        :param float progress_interval:
+            (optional) seconds between progress events
+        :param cancel:
+            (optional) event cancelling the download when set
+        :param float timeout:
+            (optional) seconds the download may take once it runs, pauses
+            included
+        :param bool keep_partial:
+            (optional) keep the file of an interrupted download, with a
+            journal, to continue it later; not supported for OTF streams
+        :param MediaStore store:
+            (optional) store to link the stream from, or to add it to
+        :param str checksum:
+            (optional) hash algorithm to hash and verify the stream with,
+            see :meth:`download`
+        :rtype: DownloadContext
         """
         file_path = self.get_file_path(
             filename=filename,
             output_path=output_path,
             filename_prefix=filename_prefix,
         )
+        return DownloadContext(
+            self,
+            file_path,
+            skip_existing=skip_existing,
+            write_behind=write_behind,
+            on_progress=on_progress,
+            on_progress_event=on_progress_event,
+            on_complete=on_complete,
+            progress_interval=progress_interval,
+            cancel=cancel,
+            timeout=timeout,
+            keep_partial=keep_partial,
+            store=store,
+            checksum=checksum,
+        )
 
-        if skip_existing and self.exists_at_path(file_path):
+    def _download(self, context: DownloadContext) -> str:
+        """Download the stream as described by a context."""
+        file_path = context.file_path
+        stored = self._stored(context)
+        if stored is not None:
+            logger.debug("linking %s from the store", file_path)
+            context.store.materialize(stored, file_path)  # type: ignore
+            self._complete(context)
+            return file_path
+        if context.skip_existing and self.exists_at_path(file_path):
             logger.debug("file %s already exists, skipping", file_path)
-            self.on_complete(file_path)
+            if context.checksum is not None:
+                digest = read_digest(file_path)
+                if digest is not None and digest.algorithm == context.checksum:
+                    context.digest = digest
+            self._complete(context)
             return file_path
 
-        bytes_remaining = self.filesize
+        # OTF segments cannot be fetched from an offset, so an interrupted
+        # OTF download is never kept.
+        keep_partial = context.keep_partial and not self.is_otf
+        if self.is_otf:
+            # OTF streams have no size until every segment has arrived.
+            context.total = self.filesize_approx
+            chunks = request.seq_stream(self.url, proxies=self.proxies)
+            offset = 0
+        else:
+            context.total = self.filesize
+            if context.checksum is not None:
+                self._check_size(context.total)
+            offset = context.read_journal() if keep_partial else 0
+            chunks = request.stream(
+                self.url,
+                start=offset,
+                check=context.check,
+                proxies=self.proxies,
+            )
+        bytes_remaining = context.total - offset
+        context.bytes_done = context.resumed_from = offset
         logger.debug(
-            "downloading (%s total bytes) file to %s",
-            self.filesize,
+            "downloading (%s total bytes) file to %s, from byte %s",
+            context.total,
             file_path,
+            offset,
         )
 
-        with open(file_path, "wb") as fh:
-            for chunk in request.stream(self.url):
-                # reduce the (bytes) remainder by the length of the chunk.
-                bytes_remaining -= len(chunk)
-                # send to the on_progress callback.
-                self.on_progress(chunk, fh, bytes_remaining)
-        self.on_complete(file_path)
+        reporter = ProgressReporter(
+            context.on_progress_event,
+            total=context.total,
+            stream=self,
+            interval=context.progress_interval,
+        )
+        if offset:
+            reporter.update(offset)
+        # Written aside and moved into place once complete, so a file at
+        # the path, which may be linked from a store, is never written over.
+        partial_path = context.partial_path
+        try:
+            if offset:
+                fh: BinaryIO = open(partial_path, "r+b")
+                fh.truncate(offset)
+                fh.seek(offset)
+            elif context.write_behind:
+                fh = WriteBehindWriter(  # type: ignore
+                    partial_path,
+                    size=None if self.is_otf else bytes_remaining,
+                )
+            else:
+                fh = open(partial_path, "wb")
+            with fh:
+                for chunk in chunks:
+                    context.check()
+                    fh.write(chunk)
+                    if context.hasher is not None:
+                        context.hasher.update(chunk)
+                    context.bytes_done += len(chunk)
+                    # reduce the (bytes) remainder by the length of the chunk.
+                    bytes_remaining = max(bytes_remaining - len(chunk), 0)
+                    if context.on_progress:
+                        context.on_progress(self, chunk, bytes_remaining)
+                    reporter.update(len(chunk), segments=int(self.is_otf))
+            if context.hasher is not None and not self.is_otf:
+                self._check_size(context.bytes_done, "downloaded")
+            os.replace(partial_path, file_path)
+            if context.hasher is not None:
+                context.digest = context.hasher.result()
+                write_digest(file_path, context.digest)
+            elif os.path.exists(sidecar_path(file_path)):
+                # Left by an earlier download of the file.
+                os.unlink(sidecar_path(file_path))
+        except BaseException:
+            # Close the connection, then keep or drop the partial file.
+            getattr(chunks, "close", lambda: None)()
+            if keep_partial and os.path.exists(partial_path):
+                context.write_journal()
+            elif os.path.exists(partial_path):
+                os.unlink(partial_path)
+            raise
+        if keep_partial:
+            context.remove_journal()
+        if context.store is not None and self.video_id:
+            context.store.add(self.video_id, self.itag, file_path)
+        reporter.finish()
+        self._complete(context)
         return file_path
 
+    def _check_size(self, size: int, source: str = "served") -> None:
+        """Compare a size with the one in the manifest, if it has one."""
+        if self.content_length is not None and size != self.content_length:
+            raise IntegrityError(
+                f"itag={self.itag}: {size} bytes {source}, "
+                f"{self.content_length} expected"
+            )
+
+    def _stored(self, context: DownloadContext) -> Optional[StoredMedia]:
+        """Look the stream up in the store of a download, if it has one."""
+        if context.store is None or not self.video_id:
+            return None
+        # The size from the manifest, if any, avoids a request; without it
+        # any size of the stream matches.
+        return context.store.get(
+            self.video_id, self.itag, self.content_length
+        )
+
+    def _complete(self, context: DownloadContext) -> None:
+        logger.debug("download finished")
+        if context.on_complete:
+            logger.debug("calling on_complete callback %s", context.on_complete)
+            context.on_complete(self, context.file_path)
+
     def get_file_path(
         self,
         filename: Optional[str],
@@ -278,9 +695,14 @@ class Stream:
             and os.path.getsize(file_path) == self.filesize
         )
 
-    def stream_to_buffer(self, buffer: BinaryIO) -> None:
+    def stream_to_buffer(
+        self, buffer: BinaryIO, token: Optional[DownloadToken] = None
+    ) -> None:
         """Write the media stream to buffer
 
+        :param token:
+            (optional) token to cancel, pause or time out the download with
+        :type token: DownloadToken or None
         :rtype: io.BytesIO buffer
         """
         bytes_remaining = self.filesize
@@ -288,13 +710,59 @@ class Stream:
             "downloading (%s total bytes) file to buffer", self.filesize,
         )
 
-        for chunk in request.stream(self.url):
-            # reduce the (bytes) remainder by the length of the chunk.
-            bytes_remaining -= len(chunk)
-            # send to the on_progress callback.
-            self.on_progress(chunk, buffer, bytes_remaining)
+        check = token.check if token is not None else None
+        chunks = request.stream(self.url, check=check, proxies=self.proxies)
+        try:
+            for chunk in chunks:
+                if check is not None:
+                    check()
+                # reduce the (bytes) remainder by the length of the chunk.
+                bytes_remaining -= len(chunk)
+                # send to the on_progress callback.
+                self.on_progress(chunk, buffer, bytes_remaining)
+        finally:
+            # Releases the connection when the loop stopped early.
+            getattr(chunks, "close", lambda: None)()
         self.on_complete(None)
 
+    def open(
+        self,
+        block_size: int = 65536,
+        cache_blocks: int = 16,
+        read_ahead: int = 4,
+        token: Optional[DownloadToken] = None,
+    ) -> RemoteFile:
+        """Open the media stream for reading, without downloading it.
+
+        Only the parts that are read are fetched, with range requests, so
+        reading a header or a sample of a large file is cheap.
+
+        :param int block_size:
+            (optional) bytes fetched and cached together
+        :param int cache_blocks:
+            (optional) number of blocks kept in memory
+        :param int read_ahead:
+            (optional) blocks fetched ahead of sequential reads
+        :param token:
+            (optional) token to cancel, pause or time out the reads with
+        :type token: DownloadToken or None
+        :rtype: RemoteFile
+        :returns:
+            A seekable, read-only file object, see :mod:`pytube.remote`.
+        """
+        if self.is_otf:
+            # OTF streams are served in segments, not byte ranges.
+            raise PytubeError(f"itag={self.itag} is OTF and cannot be opened")
+        return RemoteFile(
+            self.url,
+            size=self.content_length or self._filesize,
+            block_size=block_size,
+            cache_blocks=cache_blocks,
+            read_ahead=read_ahead,
+            proxies=self.proxies,
+            token=token,
+        )
+
     def on_progress(
         self, chunk: bytes, file_handler: BinaryIO, bytes_remaining: int
     ):
@@ -318,10 +786,30 @@ class Stream:
 
         """
         file_handler.write(chunk)
-        logger.debug("download remaining: %s", bytes_remaining)
         if self._monostate.on_progress:
             self._monostate.on_progress(self, chunk, bytes_remaining)
 
+    def progress_reporter(
+        self, total: Optional[int] = None
+    ) -> ProgressReporter:
+        """Get a reporter for the progress events of a download.
+
+        Events go to the handler registered with
+        :meth:`YouTube.register_on_progress_event_callback
+        <pytube.YouTube.register_on_progress_event_callback>`; without one,
+        the reporter only counts bytes.
+
+        :param int total:
+            (Optional) Expected size of the download in bytes.
+        :rtype: ProgressReporter
+        """
+        return ProgressReporter(
+            self._monostate.on_progress_event,
+            total=total,
+            stream=self,
+            interval=self._monostate.progress_interval,
+        )
+
     def on_complete(self, file_path: Optional[str]):
         """On download complete handler function.
 
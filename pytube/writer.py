@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+This module writes downloads to disk on a separate thread.
+
+With a plain file object, every chunk read from the network is written on
+the thread that reads the socket, so a slow disk stalls the download. A
+:class:`WriteBehindWriter` copies chunks into a small pool of reusable
+buffers instead; a writer thread drains full buffers with one large write
+each, at offsets aligned to the buffer size. The network side only waits
+when every buffer is queued for writing.
+"""
+import logging
+import os
+import threading
+from queue import Queue
+from typing import Optional
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindWriter:
+    """A write-only file whose writes are done by a background thread."""
+
+    def __init__(
+        self,
+        path: str,
+        size: Optional[int] = None,
+        buffer_size: int = 1048576,
+        buffers: int = 8,
+    ):
+        """Open a file for writing.
+
+        :param str path:
+            Path of the file, truncated if it exists.
+        :param int size:
+            (Optional) Expected size of the file, reserved on disk up front
+            with ``posix_fallocate`` where available.
+        :param int buffer_size:
+            (Optional) Size of each buffer, which is the size of the writes
+            made to the file.
+        :param int buffers:
+            (Optional) Number of buffers, which bounds the memory used.
+        """
+        self.path = path
+        self._fd = os.open(
+            path,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+            0o666,
+        )
+        self._buffer_size = buffer_size
+        self._free: Queue = Queue()
+        for _ in range(buffers):
+            self._free.put(bytearray(buffer_size))
+        self._full: "Queue[Optional[Tuple[bytearray, int]]]" = Queue()
+        self._buffer: bytearray = self._free.get()
+        self._length = 0
+        self._position = 0
+        self._preallocated = bool(size) and self._preallocate(size)
+        self._error: Optional[BaseException] = None
+        self.closed = False
+        self._thread = threading.Thread(
+            target=self._drain, name="pytube-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, data: bytes) -> int:
+        """Queue data to be written.
+
+        :param bytes data:
+            The data.
+        :rtype: int
+        :returns:
+            The number of bytes queued, which is all of them.
+        """
+        self._raise_error()
+        view = memoryview(data)
+        while view:
+            size = min(len(view), self._buffer_size - self._length)
+            self._buffer[self._length: self._length + size] = view[:size]
+            self._length += size
+            view = view[size:]
+            if self._length == self._buffer_size:
+                self._submit()
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        """Get the number of bytes written so far, queued ones included."""
+        return self._position
+
+    def flush(self) -> None:
+        """Write out the queued data and wait until it is written."""
+        if self._length:
+            self._submit()
+        self._full.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Flush the queued data and close the file."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.flush()
+        finally:
+            self._full.put(None)
+            self._thread.join()
+            try:
+                if self._preallocated:
+                    # Drop the reserved space a short download did not use.
+                    os.ftruncate(self._fd, self._position)
+            finally:
+                os.close(self._fd)
+        self._raise_error()
+
+    def __enter__(self) -> "WriteBehindWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if exc_info[0] is None:
+            self.close()
+            return
+        try:
+            self.close()
+        except Exception as e:  # pylint: disable=W0703
+            # The error that ended the block (e.g.: a cancelled download)
+            # is the one to report.
+            logger.debug("error closing %s: %s", self.path, e)
+
+    def _preallocate(self, size: int) -> bool:
+        if not hasattr(os, "posix_fallocate"):
+            return False
+        try:
+            os.posix_fallocate(self._fd, 0, size)
+        except OSError as e:
+            # Not every file system supports it (e.g.: some network mounts).
+            logger.debug("cannot preallocate %s: %s", self.path, e)
+            return False
+        return True
+
+    def _submit(self) -> None:
+        self._full.put((self._buffer, self._length))
+        # Blocks while every buffer waits for the disk.
+        self._buffer = self._free.get()
+        self._length = 0
+
+    def _drain(self) -> None:
+        while True:
+            item = self._full.get()
+            try:
+                if item is None:
+                    return
+                buffer, length = item
+                if self._error is None:
+                    try:
+                        self._write_all(memoryview(buffer)[:length])
+                    except BaseException as e:  # pylint: disable=W0703
+                        self._error = e
+                # After an error buffers are still recycled, so that the
+                # producer never waits for one that will not come back.
+                self._free.put(buffer)
+            finally:
+                self._full.task_done()
+
+    def _write_all(self, data: memoryview) -> None:
+        while data:
+            written = os.write(self._fd, data)
+            data = data[written:]
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise self._error
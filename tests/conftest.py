@@ -8,6 +8,29 @@ import pytest
 
 from pytube import YouTube
 
+# Modelled after the ``n`` parameter functions found in YouTube players.
+N_FUNCTION = (
+    'function(a){var b=a.split(""),c=[-1429624290,function(d,e){e=(e%d.length'
+    "+d.length)%d.length;d.splice(e,1)},1963407427,\"continue\",function(d){"
+    "d.reverse()},-1134580213,null,function(d,e){d.push(e)},function(d,e){e=("
+    "e%d.length+d.length)%d.length;var f=d[0];d[0]=d[e];d[e]=f},b,\"á\","
+    "function(d,e){for(e=(e%d.length+d.length)%d.length;e--;)d.unshift(d.pop("
+    "))},function(d,e){e=(e%d.length+d.length)%d.length;d.splice(-e).reverse("
+    ").forEach(function(f){d.unshift(f)})},/,,[/,913,/](,)}/,function(d,e){"
+    'var f=[],h=(e%d.length+d.length)%d.length;switch(h){case 0:f.push(1);case'
+    ' 1:f.push(2);break;default:f.push(3)}d.push(f.join(""))},function(d,e,f)'
+    "{var h=f.length;d.forEach(function(l,m,n){this.push(n[m]=f[(f.indexOf(l)"
+    "-f.indexOf(this[m])+m+h--)%f.length])},e.split(\"\"))},\"0123456789abcdef"
+    'ghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ-_",function(d,e){e=(e%d.l'
+    "ength+d.length)%d.length;d.splice(0,1,d.splice(e,1,d[0])[0])},function(d"
+    "){for(var e=d.length;e;)d.push(d.splice(--e,1)[0])},-832546235];c[6]=c;"
+    "try{c[4](c[9]),c[8](c[9],c[0]),c[11](c[9],c[2]),c[12](c[9],c[5]),c[1](c"
+    "[9],c[19]),c[17](c[9],4),c[18](c[9]),c[14](c[9],7),c[7](c[6],c[10]),c[15"
+    ']("hello world".split(""),"hello world",c[16]),c[15](c[9],"hello world",'
+    'c[16]),c[11](c[9],-3)}catch(d){return"enhanced_except_"+a}return b.join('
+    '"")}'
+)
+
 
 def load_playback_file(filename):
     """Load a gzip json playback file."""
@@ -37,6 +60,15 @@ def cipher_signature():
     return load_and_init_from_playback_file(filename)
 
 
+@pytest.fixture
+def throttling_js(cipher_signature):
+    """base.js fixture extended with an ``n`` parameter function."""
+    return cipher_signature.js + (
+        ";var Xm$a=[qm$a];qm$a=" + N_FUNCTION + ";"
+        'Tza=function(a){var b;a.C&&(b=a.get("n"))&&(b=Xm$a[0](b),a.set("n",b))};'
+    )
+
+
 @pytest.fixture
 def presigned_video():
     """Youtube instance initialized with video id QRS8MkLhQmM."""
@@ -150,13 +150,17 @@ def test_load_more(youtube, request_get, playlist_html):
     assert len(list(playlist.videos)) == 12
 
 
+@mock.patch("urllib.request.install_opener")
 @mock.patch("pytube.contrib.playlist.request.get")
-@mock.patch("pytube.contrib.playlist.install_proxy", return_value=None)
-def test_proxy(install_proxy, request_get):
+def test_proxy(request_get, install_opener):
     url = "https://www.fakeurl.com/playlist?list=whatever"
     request_get.return_value = ""
-    Playlist(url, proxies={"http": "things"})
-    install_proxy.assert_called_with({"http": "things"})
+    playlist = Playlist(url, proxies={"http": "things"})
+    install_opener.assert_not_called()
+    assert playlist.proxies.proxies[0].proxies == {"http": "things"}
+    request_get.assert_called_with(
+        playlist.playlist_url, proxies=playlist.proxies
+    )
 
 
 @mock.patch("pytube.contrib.playlist.request.get")
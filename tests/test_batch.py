@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from pytube import batch
+from tests.conftest import load_playback_file
+
+
+@pytest.fixture
+def fake_get():
+    pb = load_playback_file("yt-video-9bZkp7q19f0.json.gz")
+    batch._players.clear()
+
+    def get(url, extra_headers=None, proxies=None):
+        if "/watch?" in url:
+            if "unavailable" in url:
+                return None
+            return pb["watch_html"]
+        if "get_video_info" in url:
+            return ""
+        if url.endswith("base.js"):
+            return pb["js"]
+        raise AssertionError(url)
+
+    with mock.patch("pytube.request.get", side_effect=get) as fake:
+        yield fake
+    batch._players.clear()
+
+
+def test_extract(fake_get):
+    urls = [
+        "https://youtube.com/watch?v=9bZkp7q19f0",
+        "https://youtube.com/watch?v=unavailable",
+        "not a url",
+    ]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = {
+            r.url: r
+            for r in batch.extract(urls, threads=2, executor=executor)
+        }
+    assert set(results) == set(urls)
+
+    youtube = results[urls[0]].youtube()
+    assert youtube.video_id == "9bZkp7q19f0"
+    assert youtube.streams.get_by_itag(18) is not None
+    assert results[urls[1]].snapshot is None
+    assert results[urls[1]].error.startswith("VideoUnavailable")
+    assert results[urls[2]].error.startswith("RegexMatchError")
+    with pytest.raises(ValueError):
+        results[urls[2]].youtube()
+
+
+def test_player_is_fetched_once(fake_get):
+    urls = ["https://youtube.com/watch?v=9bZkp7q19f0"] * 3
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        results = list(
+            batch.extract(urls, threads=3, max_pending=2, executor=executor)
+        )
+    assert [r.error for r in results] == [None] * 3
+    js_fetches = [
+        c for c in fake_get.call_args_list
+        if "base.js" in (c[0] + tuple(c[1].values()))[0]
+    ]
+    assert len(js_fetches) == 1
+
+
+def test_player_cache_evicts_least_recently_used():
+    with mock.patch("pytube.request.get", side_effect=lambda url: url), \
+            mock.patch.dict(batch._players, clear=True):
+        for i in range(batch.CIPHER_CACHE_SIZE + 1):
+            batch._player_js(f"https://youtube.com/s/player/{i}/base.js")
+        assert "https://youtube.com/s/player/0/base.js" not in batch._players
+        assert len(batch._players) == batch.CIPHER_CACHE_SIZE
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="worker processes must inherit the mocked network",
+)
+def test_extract_on_processes(fake_get):
+    results = list(
+        batch.extract(
+            ["https://youtube.com/watch?v=9bZkp7q19f0"], threads=1, processes=1
+        )
+    )
+    assert results[0].error is None
+    assert results[0].youtube().title
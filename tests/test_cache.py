@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+import zlib
+from unittest import mock
+
+from pytube import YouTube
+from pytube.cache import ExtractionCache
+from pytube.cache import url_expiry
+
+
+def test_url_expiry():
+    assert url_expiry("https://example.com/videoplayback?expire=1579151525") == (
+        1579151525
+    )
+    assert url_expiry("https://example.com/videoplayback?itag=18") is None
+
+
+def test_put_get(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("9bZkp7q19f0", "player", {"foo": "bar"})
+    assert cache.get("9bZkp7q19f0") == {"foo": "bar"}
+    assert cache.get("9bZkp7q19f0", player_version="player") == {"foo": "bar"}
+    assert cache.get("9bZkp7q19f0", player_version="other") is None
+    assert cache.get("QRS8MkLhQmM") is None
+    assert len(cache) == 1
+
+
+def test_put_expired_urls_are_not_stored(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("9bZkp7q19f0", "player", {"foo": "bar"}, expires=int(time.time()))
+    assert cache.get("9bZkp7q19f0") is None
+
+
+def test_get_expired(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"), max_ttl=10)
+    cache.put("9bZkp7q19f0", "player", {"foo": "bar"})
+    with mock.patch("pytube.cache.time.time", return_value=time.time() + 11):
+        assert cache.get("9bZkp7q19f0") is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("9bZkp7q19f0", "player", {"foo": "bar"})
+    cache.put("QRS8MkLhQmM", "player", {"foo": "baz"})
+    cache.get("9bZkp7q19f0")
+    entry_size = len(zlib.compress(json.dumps({"foo": "bar"}).encode("utf-8")))
+    cache.max_bytes = 2 * entry_size
+    cache.put("irauhITDrsE", "player", {"foo": "qux"})
+    assert len(cache) == 2
+    assert cache.get("QRS8MkLhQmM") is None
+    assert cache.get("9bZkp7q19f0") == {"foo": "bar"}
+
+
+def test_player_version(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.player_version() is None
+    now = time.time()
+    with mock.patch("pytube.cache.time.time", return_value=now):
+        cache.put("9bZkp7q19f0", "old", {"foo": "bar"})
+    with mock.patch("pytube.cache.time.time", return_value=now + 1):
+        cache.put("QRS8MkLhQmM", "new", {"foo": "baz"})
+    assert cache.player_version() == "new"
+
+
+def test_clear(tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("9bZkp7q19f0", "player", {"foo": "bar"})
+    cache.clear()
+    assert len(cache) == 0
+
+
+@mock.patch("pytube.__main__.url_expiry", return_value=None)
+def test_warm_start_without_network(_, cipher_signature, tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    cipher_signature.cache = cache
+    cipher_signature.js_url = (
+        "https://youtube.com/yts/jsbin/player_ias-vflWQEEag/en_US/base.js"
+    )
+    cipher_signature.save_to_cache()
+
+    with mock.patch("pytube.request.urlopen") as urlopen:
+        youtube = YouTube(cipher_signature.watch_url, cache=cache)
+        urlopen.assert_not_called()
+
+    assert youtube.title == cipher_signature.title
+    assert youtube.length == cipher_signature.length
+    assert youtube.description == cipher_signature.description
+    assert [s.url for s in youtube.streams] == [
+        s.url for s in cipher_signature.streams
+    ]
+
+
+@mock.patch("pytube.__main__.url_expiry", return_value=None)
+def test_entries_of_an_older_player_are_ignored(_, cipher_signature, tmp_path):
+    cache = ExtractionCache(str(tmp_path / "cache.sqlite3"))
+    cipher_signature.cache = cache
+    cipher_signature.js_url = (
+        "https://youtube.com/yts/jsbin/player_ias-vflWQEEag/en_US/base.js"
+    )
+    cipher_signature.save_to_cache()
+    later = time.time() + 1
+    with mock.patch("pytube.cache.time.time", return_value=later):
+        cache.put("QRS8MkLhQmM", "newer", {"foo": "bar"})
+
+    youtube = YouTube(
+        cipher_signature.watch_url, cache=cache, defer_prefetch_init=True
+    )
+    with mock.patch.object(youtube, "load_extraction_state") as load:
+        assert not youtube.load_from_cache()
+        load.assert_not_called()
@@ -1,8 +1,11 @@
 # -*- coding: utf-8 -*-
+from unittest import mock
+
 import pytest
 
 from pytube import cipher
 from pytube.exceptions import RegexMatchError
+from tests.conftest import N_FUNCTION
 
 
 def test_map_functions():
@@ -20,6 +23,98 @@ def test_get_transform_object_with_no_match_should_error():
         cipher.get_transform_object("asdf", var="lt")
 
 
+def test_get_initial_function_name(cipher_signature):
+    assert cipher.get_initial_function_name(cipher_signature.js) == "mt"
+
+
+def test_get_initial_function_name_prefers_previous_winner(cipher_signature):
+    js = cipher_signature.js
+    winners = {hash(js): 3}
+    with mock.patch.dict(cipher._initial_function_winners, winners), mock.patch(
+        "pytube.cipher._search_window", wraps=cipher._search_window
+    ) as search_window:
+        assert cipher.get_initial_function_name(js) == "mt"
+    search_window.assert_called_once_with(
+        cipher._INITIAL_FUNCTION_PATTERNS[3], js
+    )
+
+
+def test_get_initial_function_name_full_scan_fallback():
+    # The literal is too far from the rest of the match for its window.
+    js = "c&&a.set(b," + " " * 200 + "encodeURIComponent(xy(a))"
+    assert cipher.get_initial_function_name(js) == "xy"
+
+
+def test_get_transform_plan(cipher_signature):
+    assert cipher.get_transform_plan(cipher_signature.js) == [
+        "lt.eF(a,2)",
+        "lt.dY(a,10)",
+        "lt.dY(a,33)",
+    ]
+
+
+def test_get_transform_object(cipher_signature):
+    assert cipher.get_transform_object(cipher_signature.js, var="lt") == [
+        "pD:function(a){a.reverse()}",
+        "dY:function(a,b){var c=a[0];a[0]=a[b%a.length];a[b%a.length]=c}",
+        "eF:function(a,b){a.splice(0,b)}",
+    ]
+
+
 def test_reverse():
     reversed_array = cipher.reverse([1, 2, 3, 4], None)
     assert reversed_array == [4, 3, 2, 1]
+
+
+def test_get_cipher_is_cached(cipher_signature):
+    first = cipher.get_cipher(cipher_signature.js)
+    assert cipher.get_cipher(cipher_signature.js) is first
+
+
+@mock.patch("pytube.cipher.Cipher")
+def test_get_cipher_evicts_least_recently_used(mock_cipher):
+    with mock.patch.dict(cipher._ciphers, clear=True):
+        for i in range(cipher.CIPHER_CACHE_SIZE + 1):
+            cipher.get_cipher(f"js{i}")
+        assert "js0" not in cipher._ciphers
+        assert len(cipher._ciphers) == cipher.CIPHER_CACHE_SIZE
+
+
+def test_get_throttling_function_name(throttling_js):
+    assert cipher.get_throttling_function_name(throttling_js) == "qm$a"
+
+
+def test_get_throttling_function_name_with_no_match_should_error():
+    with pytest.raises(RegexMatchError):
+        cipher.get_throttling_function_name("asdf")
+
+
+def test_get_throttling_function_code(throttling_js):
+    assert cipher.get_throttling_function_code(throttling_js) == N_FUNCTION
+
+
+def test_calculate_n(throttling_js):
+    c = cipher.Cipher(js=throttling_js)
+    assert c.calculate_n("abcdefghijklmnop") == "4QeKTRYadoxff7ZR"
+    # cached per player
+    assert c._n_cache == {"abcdefghijklmnop": "4QeKTRYadoxff7ZR"}
+
+
+def test_calculate_n_evicts_least_recently_used(throttling_js):
+    c = cipher.Cipher(js=throttling_js)
+    with mock.patch.object(cipher, "N_CACHE_SIZE", 2):
+        for n in ("abcdefghijklmnop", "Xy7_-Kq9zz01ab", "abcdefghijklmnop"):
+            c.calculate_n(n)
+        c.calculate_n("aBcDeFgHiJkLmN")
+    assert list(c._n_cache) == ["abcdefghijklmnop", "aBcDeFgHiJkLmN"]
+
+
+def test_calculate_n_without_throttling_function(cipher_signature):
+    c = cipher.Cipher(js=cipher_signature.js)
+    assert c.throttling_function is None
+    assert c.calculate_n("abcdefghijklmnop") == "abcdefghijklmnop"
+
+
+def test_calculate_n_rejected(throttling_js):
+    c = cipher.Cipher(js=throttling_js.replace("c[6]=c;", "c[6]=c;c[99]();"))
+    assert c.calculate_n("abcdefghijklmnop") == "abcdefghijklmnop"
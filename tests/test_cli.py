@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import argparse
+import threading
 from unittest import mock
 from unittest.mock import MagicMock
 from unittest.mock import patch
@@ -49,7 +50,9 @@ def test_download_when_itag_is_found(youtube, stream):
     ) as wrapped_itag:
         cli.download_by_itag(youtube, 123)
         wrapped_itag.assert_called_with(123)
-    youtube.register_on_progress_callback.assert_called_with(cli.on_progress)
+    youtube.register_on_progress_event_callback.assert_called_with(
+        cli.on_progress_event
+    )
     stream.download.assert_called()
 
 
@@ -338,7 +341,23 @@ def test_perform_args_should_ffmpeg_process(ffmpeg_process, youtube):
     cli._perform_args_on_youtube(youtube, args)
     # Then
     ffmpeg_process.assert_called_with(
-        youtube=youtube, resolution="best", target=None
+        youtube=youtube, resolution="best", target=None, caption_code=None
+    )
+
+
+@mock.patch("pytube.cli.download_caption")
+@mock.patch("pytube.cli.ffmpeg_process")
+def test_perform_args_ffmpeg_with_caption(ffmpeg_process, download_caption):
+    parser = argparse.ArgumentParser()
+    args = parse_args(
+        parser,
+        ["http://youtube.com/watch?v=9bZkp7q19f0", "-f", "best", "-c", "en"],
+    )
+    youtube = MagicMock()
+    cli._perform_args_on_youtube(youtube, args)
+    download_caption.assert_not_called()
+    ffmpeg_process.assert_called_with(
+        youtube=youtube, resolution="best", target=None, caption_code="en"
     )
 
 
@@ -361,7 +380,10 @@ def test_ffmpeg_process_best_should_download(  # noqa: PT019
     cli.ffmpeg_process(youtube, "best", target)
     # Then
     _ffmpeg_downloader.assert_called_with(
-        audio_stream=audio_stream, video_stream=video_stream, target=target
+        audio_stream=audio_stream,
+        video_stream=video_stream,
+        target=target,
+        caption=None,
     )
 
 
@@ -382,7 +404,10 @@ def test_ffmpeg_process_res_should_download(  # noqa: PT019
     cli.ffmpeg_process(youtube, "XYZp", target)
     # Then
     _ffmpeg_downloader.assert_called_with(
-        audio_stream=audio_stream, video_stream=video_stream, target=target
+        audio_stream=audio_stream,
+        video_stream=video_stream,
+        target=target,
+        caption=None,
     )
 
 
@@ -421,7 +446,7 @@ def test_ffmpeg_process_audio_none_should_fallback_download(  # noqa: PT019
     cli.ffmpeg_process(youtube, "best", target)
     # Then
     _ffmpeg_downloader.assert_called_with(
-        audio_stream=stream, video_stream=stream, target=target
+        audio_stream=stream, video_stream=stream, target=target, caption=None
     )
 
 
@@ -448,11 +473,18 @@ def test_ffmpeg_process_audio_fallback_none_should_exit(  # noqa: PT019
     _ffmpeg_downloader.assert_not_called()
 
 
+@mock.patch("pytube.cli.mux.supported", return_value=False)
 @mock.patch("pytube.cli.os.unlink", return_value=None)
 @mock.patch("pytube.cli.subprocess.run", return_value=None)
-@mock.patch("pytube.cli._download", return_value=None)
+@mock.patch(
+    "pytube.cli._download_concurrently",
+    return_value=[
+        "target/video_name.video_subtype",
+        "target/audio_name.audio_subtype",
+    ],
+)
 @mock.patch("pytube.cli._unique_name", return_value=None)
-def test_ffmpeg_downloader(unique_name, download, run, unlink):
+def test_ffmpeg_downloader(unique_name, download, run, unlink, _):
     # Given
     target = "target"
     audio_stream = MagicMock()
@@ -467,7 +499,11 @@ def test_ffmpeg_downloader(unique_name, download, run, unlink):
         audio_stream=audio_stream, video_stream=video_stream, target=target
     )
     # Then
-    download.assert_called()
+    download.assert_called_with(
+        [(video_stream, "video_name"), (audio_stream, "audio_name")],
+        target=target,
+        tasks=[],
+    )
     run.assert_called_with(
         [
             "ffmpeg",
@@ -483,6 +519,130 @@ def test_ffmpeg_downloader(unique_name, download, run, unlink):
     unlink.assert_called()
 
 
+@mock.patch("pytube.cli.display_progress_bar")
+def test_download_concurrently(display_progress_bar, tmp_path):
+    video_stream = MagicMock(url="video", filesize=4, is_otf=False)
+    audio_stream = MagicMock(url="audio", filesize=2, is_otf=False)
+    for stream, name in ((video_stream, "video"), (audio_stream, "audio")):
+        stream.get_file_path.return_value = str(tmp_path / name)
+    content = {"video": [b"vi", b"de"], "audio": [b"au"]}
+
+    with mock.patch(
+        "pytube.cli.request.stream", side_effect=lambda url, **kwargs: content[url]
+    ):
+        paths = cli._download_concurrently(
+            [(video_stream, "video"), (audio_stream, "audio")],
+            target=str(tmp_path),
+        )
+
+    assert paths == [str(tmp_path / "video"), str(tmp_path / "audio")]
+    assert (tmp_path / "video").read_bytes() == b"vide"
+    assert (tmp_path / "audio").read_bytes() == b"au"
+    display_progress_bar.assert_called_with(6, 6)
+
+
+def test_download_concurrently_cancels_on_failure(tmp_path):
+    video_stream = MagicMock(url="video", filesize=4, is_otf=False)
+    audio_stream = MagicMock(url="audio", filesize=2, is_otf=False)
+    for stream, name in ((video_stream, "video"), (audio_stream, "audio")):
+        stream.get_file_path.return_value = str(tmp_path / name)
+    failed = threading.Event()
+
+    closed = []
+
+    def stream_content(url, **kwargs):
+        if url == "audio":
+            yield b"a"
+            failed.set()
+            raise OSError("connection reset")
+        try:
+            while True:
+                yield b"v"
+                failed.wait()
+        finally:
+            closed.append(url)
+
+    with mock.patch("pytube.cli.request.stream", side_effect=stream_content):
+        with pytest.raises(OSError, match="connection reset"):
+            cli._download_concurrently(
+                [(video_stream, "video"), (audio_stream, "audio")],
+                target=str(tmp_path),
+            )
+    assert list(tmp_path.iterdir()) == []
+    # the response of the cancelled download is released right away
+    assert closed == ["video"]
+
+
+def test_download_concurrently_open_fails(tmp_path):
+    stream = MagicMock(url="video", filesize=4, is_otf=False)
+    stream.get_file_path.return_value = str(tmp_path / "video")
+    with mock.patch(
+        "pytube.cli.open", side_effect=PermissionError("denied"), create=True
+    ), mock.patch("pytube.cli.request.stream") as request_stream:
+        with pytest.raises(PermissionError, match="denied"):
+            cli._download_concurrently([(stream, "video")], str(tmp_path))
+    request_stream.assert_not_called()
+
+
+@mock.patch("pytube.cli.safe_filename", return_value="safe_title")
+@mock.patch("pytube.cli.mux.supported", return_value=False)
+@mock.patch("pytube.cli.subprocess.run")
+@mock.patch("pytube.cli._unique_name", side_effect=["video", "audio"])
+def test_ffmpeg_downloader_fetches_captions_concurrently(
+    _, run, __, ___, tmp_path
+):
+    video_stream = MagicMock(
+        url="video", filesize=4, is_otf=False, subtype="mp4", title="title"
+    )
+    audio_stream = MagicMock(url="audio", filesize=2, is_otf=False)
+    for stream, name in ((video_stream, "video"), (audio_stream, "audio")):
+        stream.get_file_path.return_value = str(tmp_path / name)
+    caption = MagicMock()
+    # each fetch waits for the other two: they must run at the same time
+    together = threading.Barrier(3, timeout=5)
+
+    def stream_content(url, **kwargs):
+        together.wait()
+        return [b"xx"]
+
+    caption.download.side_effect = lambda **kwargs: together.wait()
+    with mock.patch(
+        "pytube.cli.request.stream", side_effect=stream_content
+    ), mock.patch("pytube.cli.display_progress_bar"):
+        cli._ffmpeg_downloader(
+            audio_stream=audio_stream,
+            video_stream=video_stream,
+            target=str(tmp_path),
+            caption=caption,
+        )
+    caption.download.assert_called_once_with(
+        title="title", output_path=str(tmp_path)
+    )
+    run.assert_called_once()
+
+
+@mock.patch("pytube.cli.safe_filename", return_value="safe_title")
+@mock.patch("pytube.cli.mux.mux_streams")
+@mock.patch("pytube.cli.mux.supported", return_value=True)
+@mock.patch("pytube.cli._download")
+def test_ffmpeg_downloader_streaming(download, _, mux_streams, __):
+    # Given
+    audio_stream = MagicMock()
+    video_stream = MagicMock()
+    video_stream.subtype = "video_subtype"
+    # When
+    cli._ffmpeg_downloader(
+        audio_stream=audio_stream, video_stream=video_stream, target="target"
+    )
+    # Then
+    download.assert_not_called()
+    mux_streams.assert_called_with(
+        video_stream=video_stream,
+        audio_stream=audio_stream,
+        output_path="target/safe_title.video_subtype",
+    )
+
+
 @mock.patch("pytube.cli.download_audio")
 @mock.patch("pytube.cli.YouTube.__init__", return_value=None)
 def test_download_audio_args(youtube, download_audio):
@@ -553,3 +713,48 @@ def test_unique_name_counter(path_exists):
     assert (
         cli._unique_name("base", "subtype", "video", "target") == "base_video_1"
     )
+
+
+@mock.patch("pytube.cli.JobQueue")
+def test_queue(job_queue, capsys):
+    parser = argparse.ArgumentParser()
+    args = parse_args(
+        parser,
+        ["https://youtu.be/a", "--queue", "jobs.db", "--itag", "18",
+         "--workers", "2"],
+    )
+    queue = job_queue.return_value.__enter__.return_value
+    queue.counts.return_value = {"pending": 1, "done": 0}
+    queue.jobs.return_value = []
+    with mock.patch("pytube.cli._parse_args", return_value=args):
+        cli.main()
+    job_queue.assert_called_with("jobs.db")
+    queue.add.assert_called_with(
+        "https://youtu.be/a", itags=[18], target=None, priority=0
+    )
+    queue.work.assert_called_with(workers=2)
+    assert "1 jobs to download" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "option",
+    [
+        ["-r", "720p"],
+        ["-a"],
+        ["-f"],
+        ["-c"],
+        ["-c", "en"],
+        ["-l"],
+        ["--build-playback-report"],
+    ],
+)
+@mock.patch("pytube.cli.JobQueue")
+def test_queue_rejects_stream_options(job_queue, option):
+    parser = argparse.ArgumentParser()
+    args = parse_args(
+        parser, ["https://youtu.be/a", "--queue", "jobs.db", *option]
+    )
+    with mock.patch("pytube.cli._parse_args", return_value=args), \
+            pytest.raises(SystemExit):
+        cli.main()
+    job_queue.assert_not_called()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import os
+import struct
+from unittest import mock
+
+import pytest
+
+from pytube import clip
+from pytube.exceptions import ClipError
+from pytube.exceptions import DownloadCancelled
+
+
+def box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def sidx(sizes, duration, timescale=1000):
+    refs = b"".join(struct.pack(">III", size, duration, 0) for size in sizes)
+    payload = (
+        struct.pack(">B3xIIII", 0, 1, timescale, 0, 0)
+        + struct.pack(">2xH", len(sizes))
+        + refs
+    )
+    return box(b"sidx", payload)
+
+
+def element(element_id, payload):
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    size = (1 << 56) | len(payload)  # 8 byte size
+    return id_bytes + size.to_bytes(8, "big") + payload
+
+
+def uint(element_id, value):
+    return element(element_id, value.to_bytes(4, "big"))
+
+
+def make_mp4(fragment_count=10):
+    """An mp4 with 5 second fragments, returned with its byte ranges."""
+    init = box(b"ftyp", b"dash") + box(b"moov", b"\x00" * 32)
+    fragments = [
+        box(b"moof", bytes([i]) * 16) + box(b"mdat", bytes([i]) * 100)
+        for i in range(fragment_count)
+    ]
+    index = sidx([len(f) for f in fragments], duration=5000)
+    data = init + index + b"".join(fragments)
+    return data, init, fragments, (0, len(init) - 1), (
+        len(init),
+        len(init) + len(index) - 1,
+    )
+
+
+def make_webm(cluster_count=10):
+    """A webm with 5 second clusters and its Cues ahead of the clusters."""
+    info = element(
+        clip._EBML_INFO,
+        uint(clip._EBML_TIMECODE_SCALE, 1000000)
+        + element(clip._EBML_DURATION, struct.pack(">d", 5000.0 * cluster_count)),
+    )
+    seek_head = element(clip._EBML_SEEK_HEAD, b"\x01" * 20)
+    tracks = element(0x1654AE6B, b"\x02" * 10)
+    clusters = [
+        element(0x1F43B675, bytes([i]) * 50) for i in range(cluster_count)
+    ]
+
+    def cues(offset):
+        points = b""
+        position = offset
+        for i, cluster in enumerate(clusters):
+            positions = uint(clip._EBML_CUE_CLUSTER_POSITION, position)
+            points += element(
+                clip._EBML_CUE_POINT,
+                uint(clip._EBML_CUE_TIME, i * 5000)
+                + element(clip._EBML_CUE_TRACK_POSITIONS, positions),
+            )
+            position += len(cluster)
+        return element(clip._EBML_CUES, points)
+
+    segment_head = seek_head + info + tracks
+    # Cluster positions are relative to the Segment data, after the Cues.
+    index = cues(len(segment_head) + len(cues(0)))
+    body = segment_head + index + b"".join(clusters)
+    ebml = element(0x1A45DFA3, b"\x42\x82\x84webm")
+    segment = element(clip._EBML_SEGMENT, body)
+    data = ebml + segment
+    init_end = len(ebml) + (len(segment) - len(body)) + len(segment_head)
+    return data, clusters, (0, init_end - 1), (init_end, init_end + len(index) - 1)
+
+
+def mock_stream(data, subtype, init_range, index_range):
+    stream = mock.MagicMock(
+        url="https://example.com/video",
+        itag=137,
+        is_adaptive=True,
+        is_progressive=False,
+        subtype=subtype,
+        init_range=init_range,
+        index_range=index_range,
+        content_length=len(data),
+    )
+    return stream
+
+
+def serve(data):
+    requested = []
+
+    def get_range(url, start, end, proxies=None):
+        requested.append((start, end))
+        return data[start: end + 1]
+
+    return mock.patch.object(clip.request, "get_range", side_effect=get_range), requested
+
+
+def test_parse_sidx():
+    data, _, fragments, _, (index_start, index_end) = make_mp4(3)
+    segments = clip.parse_sidx(data[index_start: index_end + 1], index_start)
+    assert [s.time for s in segments] == [0, 5, 10]
+    assert all(s.duration == 5 for s in segments)
+    first = segments[0]
+    assert data[first.start: first.end + 1] == fragments[0]
+    assert segments[-1].end == len(data) - 1
+
+
+def test_parse_sidx_wrong_box():
+    with pytest.raises(ClipError):
+        clip.parse_sidx(box(b"moof", b"\x00" * 40), 0)
+
+
+def test_select_segments():
+    segments = [clip.Segment(i, i, i * 5.0, 5.0) for i in range(10)]
+    assert [s.start for s in clip.select_segments(segments, 12, 20)] == [2, 3]
+    assert [s.start for s in clip.select_segments(segments, 10, 0.5)] == []
+    assert clip.select_segments(segments, 100, 110) == []
+
+
+def test_download_clip_mp4(tmp_path):
+    data, init, fragments, init_range, index_range = make_mp4()
+    stream = mock_stream(data, "mp4", init_range, index_range)
+    output = str(tmp_path / "clip.mp4")
+    patcher, requested = serve(data)
+    with patcher:
+        # the clip starts on the fragment at 10s
+        assert clip.download_clip(stream, 12, 10, output) == (output, 10)
+
+    with open(output, "rb") as fh:
+        assert fh.read() == init + b"".join(fragments[2:5])
+    # init + index at once, then only the three fragments
+    assert len(requested) == 4
+    assert sum(end - start + 1 for start, end in requested[1:]) == sum(
+        len(f) for f in fragments[2:5]
+    )
+
+
+def test_parse_cues():
+    data, clusters, (_, init_end), (index_start, index_end) = make_webm(3)
+    header, segments = clip.parse_cues(
+        data[: init_end + 1], data[index_start: index_end + 1], len(data)
+    )
+    assert [s.time for s in segments] == [0, 5, 10]
+    assert [s.duration for s in segments] == [5, 5, 5]
+    for segment, cluster in zip(segments, clusters):
+        assert data[segment.start: segment.end + 1] == cluster
+    # the clip header no longer advertises the SeekHead or a Segment size
+    assert len(header) == init_end + 1
+    assert clip._EBML_SEEK_HEAD.to_bytes(4, "big") not in header
+    segment_id = clip._EBML_SEGMENT.to_bytes(4, "big")
+    size_pos = header.index(segment_id) + 4
+    assert header[size_pos: size_pos + 8] == b"\x01" + b"\xff" * 7
+
+
+def test_download_clip_webm(tmp_path):
+    data, clusters, init_range, index_range = make_webm()
+    stream = mock_stream(data, "webm", init_range, index_range)
+    output = str(tmp_path / "clip.webm")
+    patcher, _ = serve(data)
+    with patcher:
+        assert clip.download_clip(stream, 44, 30, output) == (output, 40)
+
+    with open(output, "rb") as fh:
+        clipped = fh.read()
+    assert clipped.endswith(b"".join(clusters[8:]))
+    assert len(clipped) == init_range[1] + 1 + sum(len(c) for c in clusters[8:])
+    # the written header still walks as a Segment holding Info and Tracks
+    segment = list(clip._elements(clipped, 0, len(clipped)))[1]
+    assert segment[0] == clip._EBML_SEGMENT
+    children = [e[0] for e in clip._elements(clipped, segment[1], len(clipped))]
+    assert children[:4] == [clip._EBML_VOID, clip._EBML_INFO, 0x1654AE6B, 0x1F43B675]
+
+
+def test_download_clip_unsupported(tmp_path):
+    stream = mock_stream(b"", "mp4", None, None)
+    with pytest.raises(ClipError):
+        clip.download_clip(stream, 0, 10, str(tmp_path / "clip.mp4"))
+
+
+def test_download_clip_cancelled(tmp_path):
+    data, _, _, init_range, index_range = make_mp4()
+    stream = mock_stream(data, "mp4", init_range, index_range)
+    cancel = mock.Mock()
+    cancel.is_set.return_value = True
+    patcher, _ = serve(data)
+    with patcher, pytest.raises(DownloadCancelled):
+        clip.download_clip(
+            stream, 0, 10, str(tmp_path / "clip.mp4"), cancel=cancel
+        )
+    assert not os.path.exists(tmp_path / "clip.mp4")
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from pytube.context import DownloadContext
+from pytube.context import DownloadToken
+from pytube.exceptions import DeadlineExceeded
+from pytube.exceptions import DownloadCancelled
+
+
+def test_concurrent_downloads_report_separately(cipher_signature, tmp_path):
+    audio = cipher_signature.streams.get_by_itag(140)
+    video = cipher_signature.streams.get_by_itag(18)
+    data = {audio: b"a" * 3000, video: b"v" * 5000}
+    shared_callback = mock.Mock()
+    cipher_signature.register_on_progress_callback(shared_callback)
+
+    def stream(url, **kwargs):
+        stream = audio if url == audio.url else video
+        return iter([data[stream][:1000], data[stream][1000:]])
+
+    progress = {audio: [], video: []}
+    completed = {}
+    with mock.patch(
+        "pytube.streams.request.stream", side_effect=stream
+    ), mock.patch(
+        "pytube.streams.request.filesize",
+        side_effect=lambda url, proxies=None: len(data[audio if url == audio.url else video]),
+    ):
+        contexts = [
+            s.download_context(
+                output_path=str(tmp_path),
+                filename_prefix=str(s.itag),
+                on_progress=lambda s, chunk, remaining: progress[s].append(
+                    remaining
+                ),
+                on_complete=completed.__setitem__,
+            ).start()
+            for s in (audio, video)
+        ]
+        paths = [c.result(timeout=5) for c in contexts]
+
+    assert progress == {audio: [2000, 0], video: [4000, 0]}
+    assert completed == {audio: paths[0], video: paths[1]}
+    assert [c.bytes_done for c in contexts] == [3000, 5000]
+    assert [c.total for c in contexts] == [3000, 5000]
+    for s, path in zip((audio, video), paths):
+        with open(path, "rb") as fh:
+            assert fh.read() == data[s]
+    shared_callback.assert_not_called()
+
+
+def test_cancel_removes_partial_file(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    cancel = threading.Event()
+    closed = []
+
+    def chunks():
+        try:
+            yield b"a" * 1000
+            cancel.set()
+            yield b"b" * 1000
+            yield b"c" * 1000
+        finally:
+            closed.append(True)
+
+    context = stream.download_context(
+        output_path=str(tmp_path), cancel=cancel
+    )
+    with mock.patch(
+        "pytube.streams.request.stream", return_value=chunks()
+    ), mock.patch("pytube.streams.request.filesize", return_value=3000):
+        with pytest.raises(DownloadCancelled):
+            context.run()
+    assert closed == [True]
+    assert context.done()
+    assert not os.path.exists(context.file_path)
+    with pytest.raises(DownloadCancelled):
+        context.result()
+
+
+def test_skip_existing_completes(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    on_complete = mock.Mock()
+    context = stream.download_context(
+        output_path=str(tmp_path), on_complete=on_complete
+    )
+    with mock.patch(
+        "pytube.streams.Stream.exists_at_path", return_value=True
+    ):
+        assert context.run() == context.file_path
+    on_complete.assert_called_once_with(stream, context.file_path)
+    assert context.bytes_done == 0
+
+
+def test_token_pause_and_resume():
+    token = DownloadToken()
+    token.pause()
+    assert token.paused
+    checked = threading.Event()
+
+    def check():
+        token.check()
+        checked.set()
+
+    thread = threading.Thread(target=check)
+    thread.start()
+    assert not checked.wait(0.2)
+    token.resume()
+    thread.join(1)
+    assert checked.is_set()
+
+
+def test_token_cancel_while_paused():
+    token = DownloadToken()
+    token.pause()
+    token.cancel()
+    with pytest.raises(DownloadCancelled):
+        token.check()
+
+
+def test_token_deadline():
+    now = [0.0]
+    token = DownloadToken(timeout=10, clock=lambda: now[0])
+    token.check()
+    now[0] = 10
+    with pytest.raises(DeadlineExceeded):
+        token.check()
+    assert issubclass(DeadlineExceeded, DownloadCancelled)
+
+
+def test_context_deadline_starts_with_the_download(tmp_path):
+    stream = mock.Mock()
+    stream._download.side_effect = lambda context: context.check() or "path"
+    context = DownloadContext(stream, str(tmp_path / "a"), timeout=0.05)
+    # queued for longer than the timeout
+    time.sleep(0.1)
+    assert context.run() == "path"
+
+
+def test_keep_partial_resumes(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    data = os.urandom(3000)
+    context = stream.download_context(
+        output_path=str(tmp_path), keep_partial=True
+    )
+
+    def interrupted(url, start, check, proxies):
+        yield data[:1000]
+        context.cancel()
+        yield data[1000:2000]
+
+    with mock.patch(
+        "pytube.streams.request.stream", side_effect=interrupted
+    ), mock.patch("pytube.streams.request.filesize", return_value=3000):
+        with pytest.raises(DownloadCancelled):
+            context.run()
+    assert os.stat(context.partial_path).st_size == 1000
+    assert os.path.exists(context.journal_path)
+    assert not os.path.exists(context.file_path)
+
+    resumed = stream.download_context(
+        output_path=str(tmp_path), keep_partial=True
+    )
+    with mock.patch(
+        "pytube.streams.request.stream", return_value=iter([data[1000:]])
+    ) as request_stream, mock.patch(
+        "pytube.streams.request.filesize", return_value=3000
+    ):
+        resumed.run()
+    assert request_stream.call_args[1]["start"] == 1000
+    assert resumed.bytes_done == 3000
+    assert resumed.resumed_from == 1000
+    with open(resumed.file_path, "rb") as fh:
+        assert fh.read() == data
+    assert not os.path.exists(resumed.journal_path)
+    assert not os.path.exists(resumed.partial_path)
+
+
+def test_stream_to_buffer_cancelled(cipher_signature):
+    stream = cipher_signature.streams.get_by_itag(18)
+    token = DownloadToken()
+    closed = []
+
+    def chunks():
+        try:
+            yield b"a"
+            token.cancel()
+            yield b"b"
+        finally:
+            closed.append(True)
+
+    buffer = mock.Mock()
+    with mock.patch(
+        "pytube.streams.request.stream", return_value=chunks()
+    ), mock.patch("pytube.streams.request.filesize", return_value=2):
+        with pytest.raises(DownloadCancelled):
+            stream.stream_to_buffer(buffer, token)
+    buffer.write.assert_called_once_with(b"a")
+    assert closed == [True]
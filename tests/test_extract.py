@@ -3,6 +3,7 @@
 import pytest
 
 from pytube import extract
+from pytube.cipher import get_cipher
 from pytube.exceptions import RegexMatchError
 
 
@@ -92,3 +93,14 @@ def test_get_ytplayer_config_with_no_match_should_error():
 def test_signature_cipher_does_not_error(stream_dict):
     extract.apply_descrambler(stream_dict, "url_encoded_fmt_stream_map")
     assert "s" in stream_dict["url_encoded_fmt_stream_map"][0].keys()
+
+
+def test_apply_throttling(throttling_js):
+    c = get_cipher(throttling_js)
+    url = "https://example.com/videoplayback?expire=1&n=abcdefghijklmnop&itag=18"
+    assert extract.apply_throttling(url, c) == (
+        "https://example.com/videoplayback?expire=1&n=4QeKTRYadoxff7ZR&itag=18"
+    )
+    assert extract.apply_throttling("https://example.com/?itag=18", c) == (
+        "https://example.com/?itag=18"
+    )
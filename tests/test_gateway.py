@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from urllib import parse
+from urllib.error import HTTPError
+
+import pytest
+
+from pytube import request
+from pytube.gateway import RangeCache
+from pytube.gateway import RangeGateway
+
+CONTENT = os.urandom(1000)
+
+
+class Origin:
+    """Serves ``CONTENT`` with range support, counting the requests."""
+
+    def __init__(self, delay=0.0):
+        self.requests = []
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                origin.requests.append(self.headers.get("Range"))
+                if "/watch" in self.path:
+                    body = f"page version {len(origin.requests)}".encode()
+                    self.send_response(200)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if "missing" in self.path:
+                    self.send_error(404)
+                    return
+                time.sleep(delay)
+                start, end = map(
+                    int, re.match(r"bytes=(\d+)-(\d+)", self.headers["Range"])
+                    .groups()
+                )
+                end = min(end, len(CONTENT) - 1)
+                body = CONTENT[start: end + 1]
+                self.send_response(206)
+                self.send_header(
+                    "Content-Range", f"bytes {start}-{end}/{len(CONTENT)}"
+                )
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+        self.url = self.base_url + "/videoplayback"
+
+    def __enter__(self):
+        threading.Thread(
+            target=self.httpd.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def origin():
+    with Origin() as origin:
+        yield origin
+
+
+@pytest.fixture
+def gateway(tmp_path):
+    cache = RangeCache(str(tmp_path / "cache"), block_size=100)
+    with RangeGateway(cache) as gateway:
+        yield gateway
+
+
+def test_serves_ranges_from_cache(origin, gateway):
+    client = gateway.client()
+    url = origin.url + "?id=o-abc&itag=18&sig=1"
+    chunks = request.stream(url, chunk_size=64, range_size=300, proxies=client)
+    assert b"".join(chunks) == CONTENT
+    assert gateway.cache.fetches == 10
+
+    # a new signature, an overlapping range: nothing new upstream
+    url = origin.url + "?id=o-abc&itag=18&sig=2"
+    assert request.get_range(url, 150, 549, client) == CONTENT[150:550]
+    assert request.filesize(url, client) == 1000
+    assert gateway.cache.fetches == 10
+    # another stream of the video is cached separately
+    request.get_range(origin.url + "?id=o-abc&itag=22", 0, 9, client)
+    assert gateway.cache.fetches == 11
+
+
+def test_coalesces_concurrent_misses(tmp_path):
+    cache = RangeCache(str(tmp_path / "cache"), block_size=500)
+    with Origin(delay=0.05) as origin, RangeGateway(cache) as gateway:
+        client = gateway.client()
+        url = origin.url + "?id=o-abc&itag=18"
+        results = []
+
+        def fetch():
+            results.append(request.get_range(url, 0, 999, client))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert results == [CONTENT] * 8
+    assert len(origin.requests) == 2
+
+
+def test_upstream_errors(origin, gateway):
+    with pytest.raises(HTTPError) as e:
+        request.get_range(
+            origin.url + "?id=o-abc&itag=18&missing", 0, 9, gateway.client()
+        )
+    assert e.value.code == 404
+    with pytest.raises(HTTPError) as e:
+        request.get_range(
+            origin.url + "?id=o-abc&itag=18", 5000, 5009, gateway.client()
+        )
+    assert e.value.code == 416
+
+
+def test_pages_are_not_cached(origin, gateway):
+    client = gateway.client()
+    url = origin.base_url + "/watch?v=9bZkp7q19f0"
+    assert request.get(url, proxies=client) == "page version 1"
+    assert request.get(url, proxies=client) == "page version 2"
+    assert gateway.cache.fetches == 0
+    assert os.listdir(gateway.cache.cache_dir) == []
+    # nor are they served when asked for directly
+    with pytest.raises(HTTPError) as e:
+        request.get(f"{gateway.url}/range?{parse.urlencode({'url': url})}")
+    assert e.value.code == 400
+
+
+def test_evicts_least_recently_used(origin, tmp_path):
+    cache = RangeCache(str(tmp_path / "cache"), block_size=100, max_bytes=300)
+    url = origin.url + "?id=o-abc&itag=18"
+    assert b"".join(cache.read(url, 0, 999)) == CONTENT
+    blocks = [
+        name
+        for _, _, names in os.walk(cache.cache_dir)
+        for name in names
+        if name.endswith(".block")
+    ]
+    assert len(blocks) == 3
+    # the size survives eviction of the first block
+    assert RangeCache(cache.cache_dir).size(url) == 1000
+
+
+def test_block_size_changes(origin, tmp_path):
+    url = origin.url + "?id=o-abc&itag=18"
+    cache = RangeCache(str(tmp_path / "cache"), block_size=100)
+    assert b"".join(cache.read(url, 0, 299)) == CONTENT[:300]
+    # restarted with larger blocks: the old ones are not read as new ones
+    cache = RangeCache(cache.cache_dir, block_size=300)
+    assert b"".join(cache.read(url, 300, 899)) == CONTENT[300:900]
+    assert cache.fetches == 2
+
+
+def test_size_from_head_is_kept(tmp_path):
+    cache = RangeCache(str(tmp_path / "cache"), block_size=100)
+    url = "https://example.com/videoplayback?id=o-abc&itag=18"
+    with mock.patch(
+        "pytube.gateway.request.get_range_and_size",
+        return_value=(CONTENT[:100], None),
+    ), mock.patch(
+        "pytube.gateway.request.head",
+        return_value={"content-length": "1000"},
+    ) as head:
+        assert cache.size(url) == 1000
+        assert RangeCache(cache.cache_dir).size(url) == 1000
+    head.assert_called_once()
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
 from unittest import mock
 
 import pytest
@@ -89,3 +91,72 @@ def test_setup_logger(logging):
     logging.getLogger.assert_called_with("pytube")
     logger.addHandler.assert_called()
     logger.setLevel.assert_called_with(20)
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = helpers.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return object()
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(flight.do("key", work))
+    )
+    leader.start()
+    started.wait()
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("key", work)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    # give the followers time to join the in-flight call
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert all(r is results[0] for r in results)
+
+
+def test_single_flight_does_not_cache():
+    flight = helpers.SingleFlight()
+    func = mock.Mock(side_effect=[1, 2])
+    assert flight.do("key", func) == 1
+    assert flight.do("key", func) == 2
+
+
+def test_single_flight_propagates_errors():
+    flight = helpers.SingleFlight()
+    with pytest.raises(ValueError):  # noqa: PT011
+        flight.do("key", mock.Mock(side_effect=ValueError))
+    assert flight.do("key", mock.Mock(return_value=3)) == 3
+
+
+def test_run_concurrently():
+    assert helpers.run_concurrently(
+        [lambda cancel: 1, lambda cancel: 2]
+    ) == [1, 2]
+
+
+def test_run_concurrently_cancels_on_failure():
+    cancelled = []
+
+    def failing(cancel):
+        raise ValueError("boom")
+
+    def waiting(cancel):
+        cancelled.append(cancel.wait(timeout=5))
+
+    with pytest.raises(ValueError, match="boom"):
+        helpers.run_concurrently([waiting, failing])
+    assert cancelled == [True]
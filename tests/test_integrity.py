@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import contextlib
+import hashlib
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+from pytube import integrity
+from pytube.exceptions import DownloadCancelled
+from pytube.exceptions import IntegrityError
+from pytube.integrity import StreamHasher
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@contextlib.contextmanager
+def sized(stream, content_length, filesize=None):
+    """Give a stream sizes in the manifest and on the server; the latter is
+    cached by the stream."""
+    with mock.patch.object(
+        stream, "content_length", content_length
+    ), mock.patch.object(stream, "_filesize", filesize or content_length):
+        yield
+
+
+def test_hasher_ranges():
+    data = os.urandom(25)
+    hasher = StreamHasher("sha256", range_size=10)
+    for start in range(0, 25, 7):
+        hasher.update(data[start:start + 7])
+    digest = hasher.result()
+    assert digest.size == 25
+    assert digest.digest == sha256(data)
+    assert [(r.start, r.end) for r in digest.ranges] == [
+        (0, 9),
+        (10, 19),
+        (20, 24),
+    ]
+    assert [r.digest for r in digest.ranges] == [
+        sha256(data[0:10]),
+        sha256(data[10:20]),
+        sha256(data[20:]),
+    ]
+    assert len(hasher.ranges) == 2
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        StreamHasher("nope")
+    with mock.patch.dict(sys.modules, {"xxhash": None}):
+        with pytest.raises(ValueError, match="xxhash package"):
+            StreamHasher("xxh3_64")
+
+
+def test_verify(tmp_path):
+    path = str(tmp_path / "file")
+    with open(path, "wb") as fh:
+        fh.write(b"a" * 25)
+    digest = integrity.hash_file(path, range_size=10)
+    integrity.write_digest(path, digest)
+    assert integrity.read_digest(path) == digest
+    assert integrity.verify(path) == digest
+
+    with open(path, "r+b") as fh:
+        fh.seek(12)
+        fh.write(b"b")
+    with pytest.raises(IntegrityError, match="ranges 10-19"):
+        integrity.verify(path)
+    with open(path, "ab") as fh:
+        fh.write(b"a")
+    with pytest.raises(IntegrityError, match="26 bytes"):
+        integrity.verify(path)
+    os.unlink(integrity.sidecar_path(path))
+    with pytest.raises(IntegrityError, match="no digests"):
+        integrity.verify(path)
+
+
+def test_download_with_checksum(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    data = os.urandom(3000)
+    with sized(stream, 3000), mock.patch(
+        "pytube.streams.request.stream",
+        return_value=iter([data[:1000], data[1000:]]),
+    ):
+        context = stream.download_context(
+            output_path=str(tmp_path), checksum="sha256"
+        )
+        path = context.run()
+        assert context.digest.digest == sha256(data)
+        assert integrity.verify(path) == context.digest
+
+        # A skipped download gets the digests from the sidecar.
+        skipped = stream.download_context(
+            output_path=str(tmp_path), checksum="sha256"
+        )
+        skipped.run()
+        assert skipped.digest == context.digest
+
+
+def test_download_size_mismatch(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    with sized(stream, 3000, 2000), mock.patch(
+        "pytube.streams.request.stream"
+    ) as request_stream:
+        with pytest.raises(IntegrityError, match="2000 bytes served"):
+            stream.download(output_path=str(tmp_path), checksum="sha256")
+    request_stream.assert_not_called()
+
+    with sized(stream, 3000), mock.patch(
+        "pytube.streams.request.stream", return_value=iter([b"a" * 2000])
+    ):
+        with pytest.raises(IntegrityError, match="2000 bytes downloaded"):
+            stream.download(output_path=str(tmp_path), checksum="sha256")
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_resumed_download_hashes_kept_part(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    data = os.urandom(3000)
+    context = stream.download_context(
+        output_path=str(tmp_path), keep_partial=True, checksum="sha256"
+    )
+
+    def interrupted(url, start, check, proxies):
+        yield data[:1000]
+        context.cancel()
+        yield data[1000:2000]
+
+    with sized(stream, 3000):
+        with mock.patch(
+            "pytube.streams.request.stream", side_effect=interrupted
+        ):
+            with pytest.raises(DownloadCancelled):
+                context.run()
+
+        resumed = stream.download_context(
+            output_path=str(tmp_path), keep_partial=True, checksum="sha256"
+        )
+        with mock.patch(
+            "pytube.streams.request.stream", return_value=iter([data[1000:]])
+        ):
+            resumed.run()
+    assert resumed.digest.digest == sha256(data)
+
+
+def test_resume_checks_journal_digests(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    context = stream.download_context(
+        output_path=str(tmp_path), keep_partial=True, checksum="sha256"
+    )
+    context.hasher = StreamHasher("sha256", range_size=10)
+    context.total = 30
+    with open(context.partial_path, "wb") as fh:
+        fh.write(b"a" * 20)
+    context.hasher.update(b"a" * 20)
+    context.bytes_done = 20
+    context.write_journal()
+
+    context.hasher = StreamHasher("sha256", range_size=10)
+    assert context.read_journal() == 20
+    assert context.hasher.size == 20
+
+    with open(context.partial_path, "r+b") as fh:
+        fh.write(b"b")
+    context.hasher = StreamHasher("sha256", range_size=10)
+    assert context.read_journal() == 0
+    assert context.hasher.size == 0
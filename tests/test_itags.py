@@ -10,3 +10,14 @@ def test_get_format_profile():
 def test_get_format_profile_non_existant():
     profile = itags.get_format_profile(2239)
     assert profile["resolution"] is None
+
+
+def test_format_profile_is_shared():
+    assert itags.format_profile(22) is itags.format_profile("22")
+    assert itags.format_profile(22).resolution == "720p"
+    assert itags.format_profile(2239) is itags.format_profile(2240)
+
+
+def test_get_format_profile_returns_copy():
+    itags.get_format_profile(22)["resolution"] = "1080p"
+    assert itags.get_format_profile(22)["resolution"] == "720p"
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import threading
+from unittest import mock
+
+import pytest
+
+from pytube import jobs
+from pytube.exceptions import DownloadCancelled
+from pytube.jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with JobQueue(str(tmp_path / "jobs.db")) as queue:
+        yield queue
+
+
+def test_claim_by_priority(queue):
+    low = queue.add("https://youtu.be/low")
+    high = queue.add("https://youtu.be/high", itags=[18, 140], priority=5)
+    job = queue.claim()
+    assert job.id == high
+    assert job.itags == [18, 140]
+    assert job.state == jobs.RUNNING
+    assert job.attempts == 1
+    assert queue.claim().id == low
+    assert queue.claim() is None
+
+
+def test_add_is_idempotent(queue):
+    job_id = queue.add("https://youtu.be/a", target="/videos")
+    assert queue.add("https://youtu.be/a", target="/videos", priority=3) == (
+        job_id
+    )
+    assert queue.add("https://youtu.be/a") != job_id
+    job = queue.jobs()[0]
+    assert job.priority == 3
+    assert job.target == "/videos"
+    assert queue.jobs()[1].target is None
+
+    queue.complete(queue.claim().id, 100)
+    queue.add("https://youtu.be/a", target="/videos")
+    assert queue.jobs(jobs.DONE)[0].id == job_id
+
+
+def test_failed_jobs_are_retried(tmp_path):
+    with JobQueue(str(tmp_path / "jobs.db"), max_attempts=2) as queue:
+        job_id = queue.add("https://youtu.be/a")
+        queue.fail(queue.claim().id, "boom")
+        assert queue.jobs(jobs.PENDING)[0].error == "boom"
+        queue.fail(queue.claim().id, "boom")
+        assert queue.claim() is None
+        assert queue.counts()[jobs.FAILED] == 1
+        # adding it again gives it a new chance
+        assert queue.add("https://youtu.be/a") == job_id
+        assert queue.claim().attempts == 1
+
+
+def test_interrupted_jobs_resume(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    with JobQueue(path) as queue:
+        queue.add("https://youtu.be/a")
+        queue.claim()
+    with JobQueue(path) as queue:
+        job = queue.claim()
+        assert job.url == "https://youtu.be/a"
+        assert job.attempts == 1
+
+
+def test_work(queue):
+    for n in range(5):
+        queue.add(f"https://youtu.be/{n}")
+    queue.add("https://youtu.be/bad")
+    handled = []
+
+    def handler(job, stop):
+        if job.url.endswith("bad"):
+            raise ValueError("bad")
+        handled.append(job.url)
+        return 1000
+
+    queue.work(handler, workers=3)
+    assert sorted(handled) == [f"https://youtu.be/{n}" for n in range(5)]
+    assert queue.counts() == {
+        jobs.PENDING: 0, jobs.RUNNING: 0, jobs.DONE: 5, jobs.FAILED: 1
+    }
+    done = queue.jobs(jobs.DONE)[0]
+    assert done.bytes == 1000
+    assert done.run_time >= 0
+    assert done.wait_time >= 0
+    assert queue.jobs(jobs.FAILED)[0].attempts == 3
+
+
+def test_work_stops(queue):
+    queue.add("https://youtu.be/a")
+    queue.add("https://youtu.be/b")
+    stop = threading.Event()
+
+    def handler(job, stop):
+        stop.set()
+        raise DownloadCancelled()
+
+    queue.work(handler, workers=1, stop=stop)
+    pending = queue.jobs(jobs.PENDING)
+    assert len(pending) == 2
+    assert pending[0].attempts == 0
+
+
+@mock.patch("pytube.jobs.YouTube")
+def test_download_handler(youtube):
+    stream = youtube.return_value.streams.get_by_itag.return_value
+    stream.download_context.return_value.bytes_done = 500
+    # resumed after 200 bytes: only 300 were downloaded in this run
+    stream.download_context.return_value.resumed_from = 200
+    job = jobs.Job(
+        1, "https://youtu.be/a", [18, 140], "/videos", 0, jobs.RUNNING, 1,
+        None, 0, 0.0, 0.0, None,
+    )
+    stop = threading.Event()
+    assert jobs.download(job, stop) == 600
+    stream.download_context.assert_called_with(
+        output_path="/videos", keep_partial=True, cancel=stop
+    )
+
+    youtube.return_value.streams.get_by_itag.return_value = None
+    with pytest.raises(jobs.PytubeError):
+        jobs.download(job, stop)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from pytube import jsinterp
+from pytube.jsinterp import JSInterpreter
+from pytube.jsinterp import JSInterpreterError
+from tests.conftest import N_FUNCTION
+
+# Expected values were produced by evaluating the same expressions in node.
+EXPRESSIONS = [
+    ("7%-3", 1),
+    ("-7%3", -1),
+    ("5/2", 2.5),
+    ('"a"+1+2', "a12"),
+    ('1+2+"a"', "3a"),
+    ("[1,2]+[3]", "1,23"),
+    ('"3"*"4"', 12),
+    ("1<<31", -2147483648),
+    ("-1>>>28", 15),
+    ("~5", -6),
+    ('"10"=="10.0"', False),
+    ("null==undefined", True),
+    ("null===undefined", False),
+    ("typeof null", "object"),
+    ("typeof function(){}", "function"),
+    ("typeof notDefined", "undefined"),
+    ('"abc".charCodeAt(1)', 98),
+    ("String.fromCharCode(72,105)", "Hi"),
+    ('"a,b,,c".split(",").length', 4),
+    ('[1,2,3,4,5].slice(-2).join("")', "45"),
+    ('"abcdef".substring(4,1)', "bcd"),
+    ('"abcdef".substring(-2,2)', "ab"),
+    ('"abcdef".substring(NaN,3)', "abc"),
+    ("(function(){var a=[1,2,3];a.length=1;return a.length})()", 1),
+    (
+        "(function(){var x=0;for(var i=0;i<10;i++)"
+        "{if(i==3)continue;if(i==7)break;x+=i}return x})()",
+        18,
+    ),
+    ('(function(){var s="";var i=0;do{s+=i}while(++i<3);return s})()', "012"),
+    ('(function(){try{null.x}catch(e){return "caught"}})()', "caught"),
+    ("(function(){function g(){return h()}function h(){return 4}return g()})()", 4),
+    (
+        '(function(a){switch(a){case 1:return "one";default:return "other"}})(1)',
+        "one",
+    ),
+    ('[5,1,4].map(function(x){return x*2}).join("-")', "10-2-8"),
+    ("Math.max(3,9,2)", 9),
+    ("[1,2,3].forEach(function(x){this.push(x*2)},a=[]),a.join()", "2,4,6"),
+]
+
+@pytest.mark.parametrize(("code", "expected"), EXPRESSIONS)
+def test_evaluate(code, expected):
+    assert JSInterpreter().evaluate(code) == expected
+
+
+@pytest.mark.parametrize(
+    ("n", "expected"),
+    [
+        ("abcdefghijklmnop", "4QeKTRYadoxff7ZR"),
+        ("Xy7_-Kq9zz01ab", "OD_e2Ce-7QSVld"),
+        ("aBcDeFgHiJkLmN", "Tff9UkZAfcP5vg"),
+    ],
+)
+def test_n_function(n, expected):
+    function = JSInterpreter().function(N_FUNCTION)
+    assert function(n) == expected
+
+
+def test_step_budget():
+    function = JSInterpreter(max_steps=1000).function(
+        "function(){for(;;){}}"
+    )
+    with pytest.raises(JSInterpreterError):
+        function()
+
+
+def test_step_budget_is_not_catchable():
+    function = JSInterpreter(max_steps=1000).function(
+        "function(){try{for(;;){}}catch(e){return 1}}"
+    )
+    with pytest.raises(JSInterpreterError):
+        function()
+
+
+def test_call_depth():
+    function = JSInterpreter().function("function f(){return f()}")
+    with pytest.raises(JSInterpreterError):
+        function()
+
+
+def test_no_access_to_python():
+    assert JSInterpreter().evaluate("typeof __import__") == "undefined"
+    with pytest.raises(jsinterp.JSThrow):
+        JSInterpreter().evaluate("__import__('os')")
+
+
+@pytest.mark.parametrize(
+    "code", ['"ab".split(/(?<x>a)/)', '"ab".replace(/(?<x>a)/, "")']
+)
+def test_unsupported_regex(code):
+    # valid in JS, rejected by Python's re
+    with pytest.raises(jsinterp.JSThrow):
+        JSInterpreter().evaluate(code)
+
+
+def test_syntax_error():
+    with pytest.raises(JSInterpreterError):
+        JSInterpreter().function("function(a){return a+}")
+
+
+def test_find_function_code():
+    js = 'var x=1;foo=function(a,b){var s="}";return{a:a}[b]};bar=1;'
+    assert jsinterp.find_function_code(js, "foo") == (
+        'function(a,b){var s="}";return{a:a}[b]}'
+    )
+    js = "function foo(a){return /}/}var y;"
+    assert jsinterp.find_function_code(js, "foo") == "function(a){return /}/}"
+
+
+def test_find_function_code_missing():
+    with pytest.raises(JSInterpreterError):
+        jsinterp.find_function_code("var x=1;", "foo")
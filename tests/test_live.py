@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from urllib.error import HTTPError
+
+import pytest
+
+from pytube import extract
+from pytube import live
+from pytube.exceptions import ManifestError
+
+MASTER = """\
+#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360,CODECS="avc1.4d401e,mp4a.40.2"
+low/live.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=3000000,RESOLUTION=1280x720,CODECS="avc1.4d401f,mp4a.40.2"
+high/live.m3u8
+"""
+
+
+class LiveServer:
+    """Stands in for a live HLS origin.
+
+    Every reload of a media playlist moves its window of ``window`` segments
+    ``step`` segments further, until ``total`` segments were published.
+    """
+
+    def __init__(
+        self, total=12, window=3, step=1, missing=(), failed_reloads=()
+    ):
+        self.total = total
+        self.window = window
+        self.step = step
+        self.missing = set(missing)
+        # Media playlist requests (counted from 1) answered with an error.
+        self.failed_reloads = set(failed_reloads)
+        self.reloads = 0
+        self.published = window
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/master.m3u8":
+                    body = MASTER.encode()
+                elif self.path.endswith("/live.m3u8"):
+                    with server.lock:
+                        server.reloads += 1
+                        failed = server.reloads in server.failed_reloads
+                    if failed:
+                        self.send_error(503)
+                        return
+                    body = server.playlist(self.path.split("/")[1]).encode()
+                elif self.path.endswith(".ts"):
+                    n = int(self.path.rsplit("/", 1)[1][:-3])
+                    if n in server.missing:
+                        self.send_error(404)
+                        return
+                    body = b"[%s %d]" % (self.path.split("/")[1].encode(), n)
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d" % self.httpd.server_address[1]
+
+    def playlist(self, rendition):
+        with self.lock:
+            published = self.published
+            self.published = min(self.published + self.step, self.total)
+        first = max(published - self.window, 0)
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-TARGETDURATION:2",
+            "#EXT-X-MEDIA-SEQUENCE:%d" % first,
+        ]
+        for n in range(first, published):
+            lines += ["#EXTINF:2.000,", "%d.ts" % n]
+        if published == self.total:
+            lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines)
+
+    def __enter__(self):
+        threading.Thread(
+            target=self.httpd.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def test_parse_master_playlist():
+    playlist = live.parse_m3u8(MASTER, "https://a.com/hls/master.m3u8")
+    assert playlist.segments == []
+    assert playlist.variants == [
+        live.Variant(800000, "640x360", "https://a.com/hls/low/live.m3u8"),
+        live.Variant(3000000, "1280x720", "https://a.com/hls/high/live.m3u8"),
+    ]
+
+
+def test_parse_media_playlist():
+    text = "\n".join(
+        [
+            "#EXTM3U",
+            "#EXT-X-TARGETDURATION:5",
+            "#EXT-X-MEDIA-SEQUENCE:100",
+            '#EXT-X-MAP:URI="init.mp4"',
+            "#EXTINF:5.005,",
+            "https://cdn.com/seg/100",
+            "#EXTINF:4.9,",
+            "101.ts",
+            "#EXT-X-ENDLIST",
+        ]
+    )
+    playlist = live.parse_m3u8(text, "https://a.com/hls/live.m3u8")
+    assert playlist.target_duration == 5
+    assert playlist.map_url == "https://a.com/hls/init.mp4"
+    assert playlist.ended
+    assert playlist.segments == [
+        live.LiveSegment(100, "https://cdn.com/seg/100", 5.005),
+        live.LiveSegment(101, "https://a.com/hls/101.ts", 4.9),
+    ]
+
+
+def test_parse_invalid_playlist():
+    with pytest.raises(ManifestError):
+        live.parse_m3u8("<html></html>", "https://a.com/live.m3u8")
+    with pytest.raises(ManifestError):
+        live.parse_m3u8("#EXTM3U\n#EXTINF:abc,\n1.ts", "https://a.com/x")
+
+
+def test_live_manifest_urls():
+    player_response = {
+        "streamingData": {"hlsManifestUrl": "https://manifest.googlevideo.com/hls"}
+    }
+    assert extract.live_manifest_urls(player_response) == {
+        "hls": "https://manifest.googlevideo.com/hls"
+    }
+    assert extract.live_manifest_urls({}) == {}
+
+
+def test_manifest_urls_from_watch_html():
+    youtube = mock.Mock(player_response={}, watch_html="<html>")
+    with mock.patch.object(
+        live.extract,
+        "get_ytplayer_config",
+        return_value={
+            "args": {
+                "player_response": '{"streamingData": {"hlsManifestUrl": "h"}}'
+            }
+        },
+    ):
+        assert live.manifest_urls(youtube) == {"hls": "h"}
+
+
+def test_record_until_the_end(tmp_path):
+    output = str(tmp_path / "live.ts")
+    with LiveServer(total=12) as server:
+        recording = live.record(
+            server.url + "/master.m3u8",
+            output,
+            from_start=True,
+            poll_interval=0.01,
+        )
+    assert recording == live.Recording(output, 12, 24.0, [])
+    with open(output, "rb") as fh:
+        assert fh.read() == b"".join(b"[high %d]" % n for n in range(12))
+
+
+def test_record_picks_rendition_and_live_edge(tmp_path):
+    output = str(tmp_path / "live.ts")
+    with LiveServer(total=10, window=6) as server:
+        recording = live.record(
+            server.url + "/master.m3u8",
+            output,
+            bandwidth=1000000,
+            poll_interval=0.01,
+        )
+    # joined 3 segments behind the edge of the first window of 6
+    with open(output, "rb") as fh:
+        assert fh.read() == b"".join(b"[low %d]" % n for n in range(3, 10))
+    assert recording.gaps == []
+
+
+def test_record_duration(tmp_path):
+    output = str(tmp_path / "live.ts")
+    with LiveServer(total=100) as server:
+        recording = live.record(
+            server.url + "/high/live.m3u8",
+            output,
+            duration=7,
+            from_start=True,
+            poll_interval=0.01,
+        )
+    assert recording.segments == 4
+    assert recording.duration == 8
+
+
+def test_record_reports_gaps(tmp_path):
+    output = str(tmp_path / "live.ts")
+    # the playlist skips 2 segments on each reload, one segment is gone
+    with LiveServer(total=11, window=2, step=4, missing=[1]) as server:
+        recording = live.record(
+            server.url + "/high/live.m3u8",
+            output,
+            from_start=True,
+            poll_interval=0.01,
+        )
+    assert recording.gaps == [(1, 3), (6, 7)]
+    with open(output, "rb") as fh:
+        assert fh.read() == b"".join(
+            b"[high %d]" % n for n in (0, 4, 5, 8, 9, 10)
+        )
+
+
+def test_record_stops_on_event(tmp_path):
+    stop = threading.Event()
+    stop.set()
+    with LiveServer(total=100) as server:
+        recording = live.record(
+            server.url + "/high/live.m3u8",
+            str(tmp_path / "live.ts"),
+            poll_interval=0.01,
+            stop=stop,
+        )
+    assert recording.segments == 0
+
+
+def test_record_survives_a_failed_reload(tmp_path):
+    output = str(tmp_path / "live.ts")
+    with LiveServer(total=8, failed_reloads=[2]) as server:
+        recording = live.record(
+            server.url + "/high/live.m3u8",
+            output,
+            from_start=True,
+            max_retries=0,
+            poll_interval=0.01,
+        )
+    assert recording == live.Recording(output, 8, 16.0, [])
+
+
+def test_record_gives_up_on_repeated_failed_reloads(tmp_path):
+    with LiveServer(total=100, failed_reloads=range(2, 100)) as server:
+        with pytest.raises(HTTPError):
+            live.record(
+                server.url + "/high/live.m3u8",
+                str(tmp_path / "live.ts"),
+                max_retries=0,
+                poll_interval=0.01,
+            )
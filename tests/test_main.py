@@ -5,6 +5,7 @@ import pytest
 
 from pytube import YouTube
 from pytube.exceptions import VideoUnavailable
+from tests.conftest import load_playback_file
 
 
 @mock.patch("pytube.__main__.YouTube")
@@ -16,14 +17,16 @@ def test_prefetch_deferred(youtube):
 
 
 @mock.patch("urllib.request.install_opener")
-def test_install_proxy(opener):
+def test_proxies_are_not_global(opener):
     proxies = {"http": "http://www.example.com:3128/"}
-    YouTube(
+    youtube = YouTube(
         "https://www.youtube.com/watch?v=9bZkp7q19f0",
         defer_prefetch_init=True,
         proxies=proxies,
     )
-    opener.assert_called()
+    opener.assert_not_called()
+    assert youtube.proxies.proxies[0].proxies == proxies
+    assert youtube.stream_monostate.proxies is youtube.proxies
 
 
 @mock.patch("pytube.request.get")
@@ -34,3 +37,26 @@ def test_video_unavailable(get):
     )
     with pytest.raises(VideoUnavailable):
         youtube.prefetch()
+
+
+def test_compact(cipher_signature):
+    description = cipher_signature.description
+    urls = [s.url for s in cipher_signature.streams]
+    cipher_signature.compact()
+    assert cipher_signature.watch_html is None
+    assert cipher_signature.js is None
+    assert cipher_signature.vid_info is None
+    assert cipher_signature.description == description
+    assert [s.url for s in cipher_signature.streams] == urls
+
+
+def test_lean_descramble():
+    pb = load_playback_file("yt-video-9bZkp7q19f0.json.gz")
+    youtube = YouTube(pb["url"], defer_prefetch_init=True, lean=True)
+    youtube.watch_html = pb["watch_html"]
+    youtube.js = pb["js"]
+    youtube.descramble()
+    assert youtube.watch_html is None
+    assert youtube.js is None
+    assert youtube.title == "PSY - GANGNAM STYLE(강남스타일) M/V"
+    assert len(youtube.streams) == 22
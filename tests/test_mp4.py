@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import os
+import struct
+from unittest import mock
+
+import pytest
+
+from pytube import clip
+from pytube import mp4
+from pytube.exceptions import ClipError
+from pytube.exceptions import DownloadCancelled
+
+
+def box(box_type, *payload):
+    data = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(data), box_type) + data
+
+
+def full(box_type, body, version=0):
+    return box(box_type, struct.pack(">B3x", version), body)
+
+
+def table(box_type, fmt, rows):
+    return full(
+        box_type,
+        struct.pack(">I", len(rows)) + b"".join(struct.pack(fmt, *r) for r in rows),
+    )
+
+
+def video_sample(i):
+    return struct.pack(">BH", 1, i) * (10 + i % 7)
+
+
+def audio_sample(i):
+    return struct.pack(">BHxxxxx", 2, i)
+
+
+def make_mp4(chunk_offsets=None):
+    """A 10 second mp4: 1 fps keyframes in 30 fps video, 10 audio frames/s.
+
+    Each second is stored as a video chunk followed by an audio chunk.
+    """
+    video = [video_sample(i) for i in range(300)]
+    audio = [audio_sample(i) for i in range(100)]
+    chunks = []
+    for second in range(10):
+        chunks.append((0, video[second * 30: second * 30 + 30]))
+        chunks.append((1, audio[second * 10: second * 10 + 10]))
+
+    def trak(track, handler, timescale, delta, samples, sync):
+        offsets = [o for (t, _), o in zip(chunks, chunk_offsets or repeat0()) if t == track]
+        stbl = [
+            full(b"stsd", struct.pack(">I", 0)),
+            table(b"stts", ">II", [(len(samples), delta)]),
+        ]
+        if sync:
+            stbl.append(table(b"ctts", ">II", [(len(samples), 2)]))
+            stbl.append(table(b"stss", ">I", [(n,) for n in range(1, 301, 30)]))
+        stbl.append(
+            full(
+                b"stsz",
+                struct.pack(">II", 0, len(samples))
+                + b"".join(struct.pack(">I", len(s)) for s in samples),
+            )
+        )
+        stbl.append(table(b"stsc", ">III", [(1, len(samples) // 10, 1)]))
+        stbl.append(table(b"stco", ">I", [(o,) for o in offsets]))
+        return box(
+            b"trak",
+            full(b"tkhd", struct.pack(">IIIII", 0, 0, track + 1, 0, 10000) + bytes(60)),
+            box(b"edts", table(b"elst", ">IIhh", [(10000, 0, 1, 0)])),
+            box(
+                b"mdia",
+                full(b"mdhd", struct.pack(">IIII", 0, 0, timescale, timescale * 10) + bytes(4)),
+                full(b"hdlr", bytes(4) + handler + bytes(13)),
+                box(b"minf", box(b"stbl", *stbl)),
+            ),
+        )
+
+    moov = box(
+        b"moov",
+        full(b"mvhd", struct.pack(">IIII", 0, 0, 1000, 10000) + bytes(80)),
+        trak(0, b"vide", 30, 1, video, sync=True),
+        trak(1, b"soun", 1000, 100, audio, sync=False),
+    )
+    ftyp = box(b"ftyp", b"isom", bytes(4))
+    mdat = box(b"mdat", *(b"".join(samples) for _, samples in chunks))
+    if chunk_offsets is None:
+        # Lay out the chunks now that the size of moov is known.
+        position = len(ftyp) + len(moov) + 8
+        offsets = []
+        for _, samples in chunks:
+            offsets.append(position)
+            position += sum(len(s) for s in samples)
+        return make_mp4(offsets)
+    return ftyp + moov + mdat, video, audio
+
+
+def repeat0():
+    while True:
+        yield 0
+
+
+def serve(data):
+    requested = []
+
+    def get_range(url, start, end, proxies=None):
+        requested.append((start, end))
+        return data[start: end + 1]
+
+    return mock.patch.object(mp4.request, "get_range", side_effect=get_range), requested
+
+
+def read_samples(data):
+    """Parse an mp4 and return its tracks and the bytes of every sample."""
+    moov = next(b for b in mp4.parse_boxes(data) if b.type == b"moov")
+    tracks = [mp4._Track(trak) for trak in moov.findall(b"trak")]
+    return moov, tracks, [
+        [data[o: o + s] for o, s in zip(track.offsets, track.sizes)]
+        for track in tracks
+    ]
+
+
+def test_make_mp4_is_consistent():
+    data, video, audio = make_mp4()
+    _, tracks, samples = read_samples(data)
+    assert samples == [video, audio]
+    assert tracks[0].sync == list(range(0, 300, 30))
+    assert tracks[0].duration == tracks[1].duration == 10
+
+
+def test_download_clip(tmp_path):
+    data, video, audio = make_mp4()
+    output = str(tmp_path / "clip.mp4")
+    patcher, requested = serve(data)
+    with patcher:
+        assert mp4.download_clip(
+            "https://example.com/video", 2.5, 3, output
+        ) == (output, 2)
+
+    with open(output, "rb") as fh:
+        clipped = fh.read()
+    moov, tracks, samples = read_samples(clipped)
+    # starts on the keyframe at 2s, ends at 5.5s
+    assert samples[0] == video[60:165]
+    assert samples[1] == audio[20:55]
+    assert tracks[0].sync == [0, 30, 60, 90]
+    assert tracks[0].composition == [2] * 105
+    assert tracks[0].times[-1] == 105
+    assert tracks[1].times[-1] == 3500
+
+    (movie_duration,) = struct.unpack_from(">I", moov.find(b"mvhd").data, 16)
+    assert movie_duration == 3500
+    trak = moov.findall(b"trak")[0]
+    assert trak.find(b"edts") is None
+    (track_duration,) = struct.unpack_from(">I", trak.find(b"tkhd").data, 20)
+    assert track_duration == 3500
+    (media_duration,) = struct.unpack_from(">I", trak.find(b"mdia", b"mdhd").data, 16)
+    assert media_duration == 105
+
+    # moov comes from the probe, the samples from a single nearby range
+    assert requested[0][0] == 0
+    fetched = sum(end - start + 1 for start, end in requested[1:])
+    assert fetched < len(data) / 2
+
+
+def test_download_clip_fetches_moov_by_range(tmp_path):
+    data, video, _ = make_mp4()
+    patcher, requested = serve(data)
+    with patcher, mock.patch.object(mp4, "_PROBE_SIZE", 16):
+        mp4.download_clip(
+            "https://example.com/video", 0, 1, str(tmp_path / "clip.mp4")
+        )
+    with open(tmp_path / "clip.mp4", "rb") as fh:
+        _, _, samples = read_samples(fh.read())
+    assert samples[0] == video[:30]
+
+
+def test_download_clip_past_the_end(tmp_path):
+    data, _, _ = make_mp4()
+    patcher, _ = serve(data)
+    with patcher, pytest.raises(ClipError):
+        mp4.download_clip("https://example.com/video", 12, 1, str(tmp_path / "x"))
+
+
+def test_download_clip_cancelled(tmp_path):
+    data, _, _ = make_mp4()
+    cancel = mock.Mock()
+    cancel.is_set.return_value = True
+    patcher, _ = serve(data)
+    with patcher, pytest.raises(DownloadCancelled):
+        mp4.download_clip(
+            "https://example.com/video", 0, 1, str(tmp_path / "clip.mp4"),
+            cancel=cancel,
+        )
+    assert not os.path.exists(tmp_path / "clip.mp4")
+
+
+def test_clip_dispatches_progressive_streams(tmp_path):
+    stream = mock.Mock(
+        url="https://example.com/video", is_progressive=True, subtype="mp4"
+    )
+    assert clip.supported(stream)
+    with mock.patch.object(clip.mp4, "download_clip") as download_clip:
+        clip.download_clip(stream, 1, 2, "clip.mp4")
+    download_clip.assert_called_once_with(
+        "https://example.com/video", 1, 2, "clip.mp4", 4, None, stream.proxies
+    )
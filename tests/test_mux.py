@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+import sys
+import textwrap
+from unittest import mock
+
+import pytest
+
+from pytube import mux
+from pytube.exceptions import MuxError
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, "mkfifo"), reason="requires named pipes"
+)
+
+# Stands in for ffmpeg: concatenates its inputs into the output file, reading
+# the inputs concurrently like ffmpeg interleaving packets.
+FAKE_FFMPEG = textwrap.dedent(
+    """\
+    #!{python}
+    import sys
+    import threading
+
+    args = sys.argv[1:]
+    inputs = [args[i + 1] for i, a in enumerate(args) if a == "-i"]
+    if "--fail" in args:
+        sys.exit(3)
+    data = {{}}
+
+    def read(path):
+        with open(path, "rb") as fh:
+            data[path] = fh.read()
+
+    threads = [threading.Thread(target=read, args=(p,)) for p in inputs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with open(args[-1], "wb") as fh:
+        for path in inputs:
+            fh.write(data[path])
+    """
+)
+
+
+@pytest.fixture
+def ffmpeg(tmp_path):
+    path = tmp_path / "ffmpeg"
+    path.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+@pytest.fixture
+def streams(cipher_signature):
+    video = cipher_signature.streams.get_by_itag(137)
+    audio = cipher_signature.streams.get_by_itag(140)
+    content = {
+        video.url: [b"video-" * 1000, b"end"],
+        audio.url: [b"audio-" * 500],
+    }
+    with mock.patch(
+        "pytube.mux.request.stream", side_effect=lambda url, **kwargs: iter(content[url])
+    ), mock.patch(
+        "pytube.request.filesize",
+        side_effect=lambda url, proxies=None: sum(map(len, content[url])),
+    ):
+        yield video, audio
+
+
+def test_supported(ffmpeg):
+    assert mux.supported(ffmpeg)
+    assert not mux.supported("not-an-ffmpeg-binary")
+
+
+def test_mux_streams(ffmpeg, streams, tmp_path):
+    video, audio = streams
+    output = str(tmp_path / "out.mp4")
+    callback = mock.Mock()
+    video._monostate.on_progress = callback
+
+    assert mux.mux_streams(video, audio, output, ffmpeg=ffmpeg) == output
+    with open(output, "rb") as fh:
+        assert fh.read() == b"video-" * 1000 + b"end" + b"audio-" * 500
+    assert callback.call_count == 3
+    assert sorted(c[0][2] for c in callback.call_args_list) == [0, 0, 3]
+    assert sorted(os.listdir(tmp_path)) == ["ffmpeg", "out.mp4"]
+
+
+def test_mux_streams_reports_combined_progress(ffmpeg, streams, tmp_path):
+    video, audio = streams
+    events = []
+    video._monostate.on_progress_event = events.append
+    with mock.patch.object(video._monostate, "progress_interval", 0):
+        mux.mux_streams(video, audio, str(tmp_path / "out.mp4"), ffmpeg=ffmpeg)
+
+    total = 6000 + 3 + 3000
+    # one bar over both streams: a single total, never going backwards
+    assert {event.total for event in events} == {total}
+    done = [event.bytes_done for event in events]
+    assert done == sorted(done)
+    assert done[-1] == total
+
+
+def test_mux_streams_extra_inputs(ffmpeg, streams, tmp_path):
+    video, audio = streams
+    subtitles = tmp_path / "captions.srt"
+    subtitles.write_bytes(b"subs")
+    output = str(tmp_path / "out.mkv")
+    mux.mux_streams(video, audio, output, ffmpeg=ffmpeg, inputs=[str(subtitles)])
+    with open(output, "rb") as fh:
+        assert fh.read().endswith(b"audio-" * 500 + b"subs")
+
+
+def test_mux_streams_ffmpeg_fails(ffmpeg, streams, tmp_path):
+    video, audio = streams
+    output = str(tmp_path / "out.mp4")
+    with pytest.raises(MuxError):
+        mux.mux_streams(
+            video, audio, output, ffmpeg=ffmpeg, output_args=["--fail"]
+        )
+    assert not os.path.exists(output)
+
+
+def test_mux_streams_download_fails(ffmpeg, streams, tmp_path):
+    video, audio = streams
+
+    def broken(url, **kwargs):
+        yield b"video"
+        raise OSError("connection reset")
+
+    output = str(tmp_path / "out.mp4")
+    with mock.patch("pytube.mux.request.stream", side_effect=broken):
+        with pytest.raises(OSError, match="connection reset"):
+            mux.mux_streams(video, audio, output, ffmpeg=ffmpeg)
+    assert not os.path.exists(output)
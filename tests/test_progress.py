@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import threading
+from unittest import mock
+
+import pytest
+
+from pytube.progress import ProgressEvent
+from pytube.progress import ProgressReporter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_updates_are_coalesced_by_time():
+    clock = FakeClock()
+    callback = mock.Mock()
+    reporter = ProgressReporter(callback, total=1000, interval=1, clock=clock)
+    for _ in range(50):
+        reporter.update(10)
+    callback.assert_not_called()
+
+    clock.now += 1
+    reporter.update(10)
+    (event,), _ = callback.call_args
+    assert event.bytes_done == 510
+    assert event.rate == 510
+    assert event.eta == pytest.approx(490 / 510)
+    assert event.percent == 51
+    assert not event.finished
+
+
+def test_updates_are_coalesced_by_bytes():
+    callback = mock.Mock()
+    reporter = ProgressReporter(
+        callback, interval=60, min_bytes=100, clock=FakeClock()
+    )
+    for _ in range(25):
+        reporter.update(10)
+    assert [c[0][0].bytes_done for c in callback.call_args_list] == [100, 200]
+
+
+def test_rate_is_smoothed():
+    clock = FakeClock()
+    callback = mock.Mock()
+    reporter = ProgressReporter(callback, interval=1, clock=clock)
+    clock.now += 1
+    reporter.update(1000)
+    clock.now += 1
+    reporter.update(2000)
+    assert callback.call_args[0][0].rate == pytest.approx(1300)
+
+
+def test_finish():
+    clock = FakeClock()
+    callback = mock.Mock()
+    reporter = ProgressReporter(
+        callback, total=None, stream="stream", interval=1, clock=clock
+    )
+    reporter.update(300, segments=1)
+    clock.now += 2
+    reporter.finish()
+    reporter.finish()
+    callback.assert_called_once_with(
+        ProgressEvent(
+            stream="stream",
+            bytes_done=300,
+            total=None,
+            rate=150,
+            eta=0,
+            elapsed=2,
+            segments_done=1,
+            finished=True,
+        )
+    )
+    assert callback.call_args[0][0].percent is None
+
+
+def test_without_callback():
+    reporter = ProgressReporter(None)
+    reporter.update(10)
+    reporter.finish()
+    assert reporter.bytes_done == 10
+
+
+def test_events_are_delivered_in_order():
+    events = []
+    reporter = ProgressReporter(None, interval=0)
+    second = threading.Thread(target=reporter.update, args=(20,))
+
+    def callback(event):
+        if not events and not second.is_alive():
+            # a second feeder builds a newer event while this one is being
+            # delivered
+            second.start()
+            second.join(0.2)
+        events.append(event)
+
+    reporter.callback = callback
+    reporter.update(10)
+    second.join()
+    reporter.finish()
+    reporter.update(5)
+    assert [(e.bytes_done, e.finished) for e in events] == [
+        (10, False), (30, False), (30, True)
+    ]
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from urllib.error import HTTPError
+from urllib.error import URLError
+
+import pytest
+
+from pytube import request
+from pytube.proxy import Proxy
+from pytube.proxy import ProxyPool
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_weighted_rotation():
+    pool = ProxyPool([("http://a:1", 3), ("http://b:1", 1)])
+    chosen = [pool.choose().url for _ in range(8)]
+    # smooth: b is interleaved rather than picked in a run
+    assert chosen == ["http://a:1", "http://a:1", "http://b:1", "http://a:1"] * 2
+
+
+def test_empty_pool():
+    with pytest.raises(ValueError):
+        ProxyPool([])
+
+
+def test_health_from_latency_and_errors():
+    fast, slow = Proxy("http://fast:1"), Proxy("http://slow:1")
+    pool = ProxyPool([fast, slow])
+    fast.record(0.1)
+    slow.record(0.4)
+    assert pool.health(fast) == 1.0
+    assert pool.health(slow) == pytest.approx(0.25)
+    counts = Counter(pool.choose().url for _ in range(100))
+    assert counts == {"http://fast:1": 80, "http://slow:1": 20}
+
+    fast.record(None)
+    assert pool.health(fast) == pytest.approx(0.8)
+
+
+def test_failing_proxy_is_benched():
+    clock = FakeClock()
+    good, bad = Proxy("http://good:1"), Proxy("http://bad:1")
+    pool = ProxyPool([good, bad], max_failures=2, cooldown=10, clock=clock)
+    bad.opener = mock.Mock()
+    bad.opener.open.side_effect = URLError("refused")
+    good.opener = mock.Mock()
+
+    for _ in range(4):
+        try:
+            pool.open(mock.Mock())
+        except URLError:
+            pass
+    assert bad.benched_until == 10
+    assert {pool.choose().url for _ in range(5)} == {"http://good:1"}
+    clock.now = 10
+    assert "http://bad:1" in {pool.choose().url for _ in range(50)}
+
+
+def test_client_errors_do_not_count():
+    proxy = Proxy("http://a:1")
+    pool = ProxyPool([proxy])
+    proxy.opener = mock.Mock()
+    proxy.opener.open.side_effect = HTTPError("u", 404, "nope", {}, None)
+    with pytest.raises(HTTPError):
+        pool.open(mock.Mock())
+    assert proxy.error_rate == 0
+    proxy.opener.open.side_effect = HTTPError("u", 429, "slow down", {}, None)
+    with pytest.raises(HTTPError):
+        pool.open(mock.Mock())
+    assert proxy.error_rate > 0
+
+
+def test_requests_go_through_the_pool():
+    served = []
+
+    def proxy_server(name):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                served.append((name, self.path))
+                body = name.encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(
+            target=httpd.serve_forever, args=(0.01,), daemon=True
+        ).start()
+        return httpd
+
+    servers = [proxy_server("a"), proxy_server("b")]
+    try:
+        pool = ProxyPool(
+            "http://127.0.0.1:%d" % s.server_address[1] for s in servers
+        )
+        with mock.patch("pytube.request.urlopen") as urlopen:
+            bodies = [
+                request.get("http://example.com/%d" % n, proxies=pool)
+                for n in range(4)
+            ]
+        urlopen.assert_not_called()
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+    # later picks depend on the measured latencies
+    assert bodies[:2] == ["a", "b"]
+    assert served[0] == ("a", "http://example.com/0")
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 """Unit tests for the :class:`StreamQuery <StreamQuery>` class."""
+from unittest import mock
+
 import pytest
 
 
@@ -118,6 +120,18 @@ def test_order_by_with_none_values(cipher_signature):
     assert abrs == ["50kbps", "70kbps", "96kbps", "128kbps", "160kbps"]
 
 
+def test_order_by_filesize_reads_only_the_filtered_streams(cipher_signature):
+    # Each read of an unknown filesize is a HEAD request.
+    with mock.patch(
+        "pytube.streams.Stream.filesize",
+        new_callable=mock.PropertyMock,
+        return_value=100,
+    ) as filesize:
+        streams = cipher_signature.streams.filter(progressive=True)
+        assert [s.itag for s in streams.order_by("filesize")] == [18]
+    assert filesize.call_count == 1
+
+
 def test_get_by_itag(cipher_signature):
     """Ensure :meth:`~pytube.StreamQuery.get_by_itag` returns the expected
     :class:`Stream <Stream>`.
@@ -178,3 +192,47 @@ def test_repr(cipher_signature):
         'res="360p" fps="30fps" vcodec="avc1.42001E" '
         'acodec="mp4a.40.2" progressive="True" type="video">]'
     )
+
+
+@pytest.mark.parametrize(
+    "test_input",
+    [
+        {"only_video": True, "subtype": "webm", "fps": 30},
+        {"type": "video", "resolution": "240p", "is_dash": False},
+        {"adaptive": True, "only_audio": True, "abr": "160kbps"},
+        {"progressive": True, "adaptive": True},
+    ],
+)
+def test_filters_match_scan(test_input, cipher_signature):
+    """Ensure the indexed filters agree with checking each stream."""
+    query = cipher_signature.streams
+    expected = list(query)
+    for name, value in test_input.items():
+        key = {"progressive": "is_progressive", "adaptive": "is_adaptive"}
+        if name == "only_video":
+            expected = [s for s in expected if not s.includes_audio_track]
+        elif name == "only_audio":
+            expected = [s for s in expected if not s.includes_video_track]
+        else:
+            attr = key.get(name, name)
+            expected = [s for s in expected if getattr(s, attr) == value]
+    assert list(query.filter(**test_input)) == expected
+
+
+def test_filter_of_ordered_view(cipher_signature):
+    """Ensure filtering keeps the order of the query it is applied to."""
+    query = cipher_signature.streams.order_by("resolution").desc()
+    expected = [s for s in query if s.subtype == "mp4"]
+    assert list(query.filter(subtype="mp4")) == expected
+
+
+def test_views_share_index(cipher_signature):
+    query = cipher_signature.streams
+    view = query.filter(type="video").order_by("resolution")
+    assert view._index is query._index
+    assert view.get_by_itag(18) is query.get_by_itag(18)
+    assert view.get_by_itag(140) is None
+
+
+def test_streams_query_is_reused(cipher_signature):
+    assert cipher_signature.streams is cipher_signature.streams
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+from unittest import mock
+
+import pytest
+
+from pytube.exceptions import DownloadCancelled
+from pytube.exceptions import PytubeError
+from pytube.remote import RemoteFile
+
+DATA = os.urandom(10000)
+
+
+def serve(data=DATA, honour_range=True):
+    """Fake get_range_and_size, recording the ranges asked for."""
+    ranges = []
+
+    def get_range_and_size(url, start, end, proxies=None):
+        ranges.append((start, end))
+        if not honour_range:
+            return data, None
+        return data[start: end + 1], len(data)
+
+    return mock.patch(
+        "pytube.remote.request.get_range_and_size",
+        side_effect=get_range_and_size,
+    ), ranges
+
+
+def test_header_read_fetches_one_block():
+    patch, ranges = serve()
+    with patch:
+        remote = RemoteFile("url", block_size=100)
+        assert remote.read(10) == DATA[:10]
+        assert remote.read(10) == DATA[10:20]
+    assert ranges == [(0, 99)]
+
+
+def test_sequential_reads_read_ahead():
+    patch, ranges = serve()
+    with patch:
+        remote = RemoteFile(
+            "url", block_size=1000, cache_blocks=4, read_ahead=2
+        )
+        assert remote.read(500) == DATA[:500]
+        assert remote.read() == DATA[500:]
+        assert remote.read() == b""
+    assert ranges == [(0, 999), (1000, 3999), (4000, 7999), (8000, 9999)]
+    assert remote.size == len(DATA)
+
+
+def test_seek():
+    patch, ranges = serve()
+    with patch:
+        remote = RemoteFile("url", size=len(DATA), block_size=1000)
+        assert remote.seek(-10, io.SEEK_END) == len(DATA) - 10
+        assert remote.read(100) == DATA[-10:]
+        remote.seek(5000)
+        assert remote.read(10) == DATA[5000:5010]
+        assert remote.tell() == 5010
+        remote.seek(-5, io.SEEK_CUR)
+        assert remote.read(5) == DATA[5005:5010]
+        remote.seek(len(DATA) + 10)
+        assert remote.read(10) == b""
+        with pytest.raises(ValueError):
+            remote.seek(-1)
+    # Random access reads no more than their block.
+    assert ranges == [(9000, 9999), (5000, 5999)]
+
+
+def test_cache_is_bounded():
+    patch, ranges = serve()
+    with patch:
+        remote = RemoteFile(
+            "url", block_size=100, cache_blocks=2, read_ahead=0
+        )
+        for position in (0, 500, 900, 0):
+            remote.seek(position)
+            remote.read(1)
+        assert len(remote._cache) == 2
+    assert [start for start, _ in ranges] == [0, 500, 900, 0]
+    assert remote.requests == 4
+
+
+def test_range_ignored():
+    patch, _ = serve(honour_range=False)
+    with patch:
+        remote = RemoteFile("url", block_size=1000)
+        remote.seek(2500)
+        assert remote.read(10) == DATA[2500:2510]
+        assert remote.size == len(DATA)
+
+
+def test_buffered_reader():
+    patch, _ = serve()
+    with patch, io.BufferedReader(RemoteFile("url", block_size=1000)) as fh:
+        assert fh.peek(4)[:4] == DATA[:4]
+        fh.seek(9990)
+        assert fh.read() == DATA[9990:]
+    assert fh.closed
+
+
+def test_token():
+    token = mock.Mock(check=mock.Mock(side_effect=DownloadCancelled))
+    with pytest.raises(DownloadCancelled):
+        RemoteFile("url", token=token).read(1)
+
+
+def test_stream_open(cipher_signature):
+    stream = cipher_signature.streams.get_by_itag(18)
+    patch, ranges = serve()
+    with patch, stream.open(block_size=1000) as remote:
+        assert remote.url == stream.url
+        assert remote.size == stream.content_length
+        assert remote.read(10) == DATA[:10]
+    assert ranges == [(0, 999)]
+
+    otf = mock.patch.object(stream, "is_otf", True)
+    with otf, pytest.raises(PytubeError):
+        stream.open()
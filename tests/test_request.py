@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 import os
+import random
+import threading
+import time
 from unittest import mock
+from urllib.error import HTTPError
+from urllib.error import URLError
 
 import pytest
 
 from pytube import request
+from pytube.exceptions import RegexMatchError
 
 
 @mock.patch("pytube.request.urlopen")
@@ -27,6 +33,39 @@ def test_streaming(mock_urlopen):
     assert call_count == 3
 
 
+@mock.patch("pytube.request.urlopen")
+def test_streaming_from_offset(mock_urlopen):
+    response = mock.Mock()
+    response.read.side_effect = [b"a" * 10, b""] * 2
+    response.info.return_value = {"Content-Range": "bytes 100-109/120"}
+    mock_urlopen.return_value = response
+    checks = []
+    chunks = list(
+        request.stream(
+            "http://fakeassurl.gov",
+            range_size=10,
+            start=100,
+            check=lambda: checks.append(True),
+        )
+    )
+    assert chunks == [b"a" * 10] * 2
+    ranges = [c[0][0].headers["Range"] for c in mock_urlopen.call_args_list]
+    assert ranges == ["bytes=100-109", "bytes=110-119"]
+    assert len(checks) == 2
+
+
+@mock.patch("pytube.request.urlopen")
+def test_streaming_closed_early(mock_urlopen):
+    response = mock.Mock()
+    response.read.return_value = b"a"
+    response.info.return_value = {"Content-Range": "bytes 0-9/10"}
+    mock_urlopen.return_value = response
+    chunks = request.stream("http://fakeassurl.gov")
+    next(chunks)
+    chunks.close()
+    response.close.assert_called_once()
+
+
 @mock.patch("pytube.request.urlopen")
 def test_headers(mock_urlopen):
     response = mock.Mock()
@@ -45,6 +84,137 @@ def test_get(mock_urlopen):
     assert response == "<html></html>"
 
 
+@mock.patch("pytube.request.urlopen")
+def test_get_range(mock_urlopen):
+    response = mock.Mock()
+    response.read.return_value = b"\x00" * 10
+    mock_urlopen.return_value = response
+    assert request.get_range("http://fakeassurl.gov", 10, 19) == b"\x00" * 10
+    sent = mock_urlopen.call_args[0][0]
+    assert sent.get_header("Range") == "bytes=10-19"
+
+
+def serve_segments(segments, failures=None):
+    """Answer ``sq`` requests from a list of segments."""
+    failures = failures if failures is not None else {}
+    requested = []
+
+    def execute_request(url, method=None, headers=None, proxies=None):
+        sq = int(url.rsplit("sq=", 1)[1])
+        requested.append(sq)
+        if failures.get(sq):
+            raise failures[sq].pop(0)
+        time.sleep(random.random() / 1000)
+        response = mock.Mock()
+        response.read.return_value = segments[sq]
+        return response
+
+    patcher = mock.patch.object(
+        request, "_execute_request", side_effect=execute_request
+    )
+    return patcher, requested
+
+
+def test_seq_stream():
+    segments = [b"header Segment-Count: 20\r\n"] + [
+        b"segment %d" % i for i in range(1, 21)
+    ]
+    patcher, requested = serve_segments(segments)
+    with patcher:
+        chunks = list(request.seq_stream("https://a.com/videoplayback?x=1&sq=9"))
+    assert chunks == segments
+    assert sorted(requested) == list(range(21))
+
+
+def test_seq_stream_retries_failed_segments():
+    segments = [b"Segment-Count: 2", b"one", b"two"]
+    failures = {2: [URLError("reset"), URLError("reset")]}
+    patcher, requested = serve_segments(segments, failures)
+    with patcher, mock.patch.object(request, "_RETRY_DELAY", 0):
+        assert b"".join(request.seq_stream("https://a.com/v?x=1")) == (
+            b"Segment-Count: 2onetwo"
+        )
+    assert requested.count(2) == 3
+
+
+def test_seq_stream_gives_up():
+    segments = [b"Segment-Count: 1", b"one"]
+    not_found = HTTPError("https://a.com", 404, "Not Found", {}, None)
+    patcher, requested = serve_segments(segments, {1: [not_found]})
+    with patcher, pytest.raises(HTTPError):
+        list(request.seq_stream("https://a.com/v?x=1"))
+    assert requested.count(1) == 1
+
+
+def test_seq_stream_without_segment_count():
+    patcher, _ = serve_segments([b"not an otf header"])
+    with patcher, pytest.raises(RegexMatchError):
+        list(request.seq_stream("https://a.com/v?x=1"))
+
+
 def test_get_non_http():
     with pytest.raises(ValueError):  # noqa: PT011
         request.get("file://bad")
+
+
+@mock.patch("pytube.request._execute_request")
+def test_get_coalesces_concurrent_requests(mock_execute):
+    release = threading.Event()
+
+    def slow_response(*args, **kwargs):
+        release.wait()
+        response = mock.Mock()
+        response.read.return_value = b"<html></html>"
+        return response
+
+    mock_execute.side_effect = slow_response
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(request.get("http://fakeassurl.gov"))
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["<html></html>"] * 5
+    assert mock_execute.call_count == 1
+
+
+@mock.patch("pytube.request._execute_request")
+def test_requests_through_other_proxies_are_not_shared(mock_execute):
+    release = threading.Event()
+
+    def slow_response(url, method="GET", headers=None, proxies=None):
+        release.wait()
+        response = mock.Mock()
+        response.read.return_value = proxies.name.encode()
+        response.info.return_value = {"Content-Length": proxies.name}
+        return response
+
+    mock_execute.side_effect = slow_response
+    pools = [mock.Mock(), mock.Mock()]
+    pools[0].name, pools[1].name = "1", "2"
+    results = {}
+
+    def fetch(pool):
+        results[pool.name] = (
+            request.get("http://fakeassurl.gov", proxies=pool),
+            request.filesize("http://fakeassurl.gov", pool),
+        )
+
+    threads = [threading.Thread(target=fetch, args=(p,)) for p in pools]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == {"1": ("1", 1), "2": ("2", 2)}
+    assert mock_execute.call_count == 4
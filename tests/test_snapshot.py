@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import io
+from unittest import mock
+
+import pytest
+
+from pytube import snapshot
+
+
+def test_round_trip(cipher_signature):
+    data = snapshot.dumps(cipher_signature)
+    with mock.patch("pytube.request.urlopen") as urlopen:
+        youtube = snapshot.loads(data)
+        urlopen.assert_not_called()
+
+    assert youtube.video_id == cipher_signature.video_id
+    assert youtube.title == cipher_signature.title
+    assert youtube.length == cipher_signature.length
+    assert youtube.views == cipher_signature.views
+    assert youtube.description == cipher_signature.description
+    assert [repr(s) for s in youtube.streams] == [
+        repr(s) for s in cipher_signature.streams
+    ]
+    assert [s.url for s in youtube.streams] == [
+        s.url for s in cipher_signature.streams
+    ]
+    assert youtube.js is None
+    assert youtube.watch_html is None
+
+
+def test_round_trip_captions(presigned_video):
+    youtube = snapshot.loads(snapshot.dumps(presigned_video))
+    assert len(youtube.caption_tracks) == len(presigned_video.caption_tracks)
+    assert youtube.captions.lang_code_index.keys() == (
+        presigned_video.captions.lang_code_index.keys()
+    )
+
+
+def test_dump_load_file(cipher_signature):
+    fh = io.BytesIO()
+    snapshot.dump(cipher_signature, fh)
+    fh.seek(0)
+    youtube = snapshot.load(fh)
+    assert len(youtube.streams) == len(cipher_signature.streams)
+
+
+def test_snapshot_excludes_raw_data(cipher_signature):
+    data = snapshot.dumps(cipher_signature)
+    assert len(data) < 20 * 1024
+
+
+def test_callbacks_passed_through(cipher_signature):
+    callback = mock.Mock()
+    youtube = snapshot.loads(
+        snapshot.dumps(cipher_signature), on_progress_callback=callback
+    )
+    assert youtube.stream_monostate.on_progress is callback
+
+
+@pytest.mark.parametrize("data", [b"", b"nope", b"XXXX\x01abc"])
+def test_invalid_snapshot(data):
+    with pytest.raises(ValueError):  # noqa: PT011
+        snapshot.loads(data)
+
+
+def test_unsupported_version(cipher_signature):
+    data = snapshot.dumps(cipher_signature)
+    with pytest.raises(ValueError):  # noqa: PT011
+        snapshot.loads(data[:4] + b"\xff" + data[5:])
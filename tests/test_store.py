@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+from pytube import store
+from pytube.store import MediaStore
+
+
+@pytest.fixture
+def media_store(tmp_path):
+    with MediaStore(str(tmp_path / "store")) as media_store:
+        yield media_store
+
+
+def write(path, data):
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return str(path)
+
+
+def test_add_and_get(media_store, tmp_path):
+    path = write(tmp_path / "a.mp4", b"x" * 10)
+    media = media_store.add("9bZkp7q19f0", 18, path)
+    assert media.size == 10
+    assert media.path.endswith("9bZkp7q19f0-18-10.mp4")
+    assert os.path.samefile(media.path, path)
+
+    assert media_store.get("9bZkp7q19f0", 18) == media
+    assert media_store.get("9bZkp7q19f0", 18, 10) == media
+    assert not media_store.has("9bZkp7q19f0", 18, 11)
+    assert not media_store.has("9bZkp7q19f0", 22)
+    # adding it again keeps the stored file
+    assert media_store.add("9bZkp7q19f0", 18, path) == media
+    assert media_store.media() == [media]
+
+
+def test_damaged_files_are_dropped(media_store, tmp_path):
+    media = media_store.add(
+        "9bZkp7q19f0", 18, write(tmp_path / "a.mp4", b"x" * 10)
+    )
+    os.unlink(media.path)
+    assert media_store.get("9bZkp7q19f0", 18) is None
+    assert media_store.media() == []
+
+
+def test_materialize(media_store, tmp_path):
+    media = media_store.add(
+        "9bZkp7q19f0", 18, write(tmp_path / "a.mp4", b"x" * 10)
+    )
+    other = write(tmp_path / "b.mp4", b"old")
+    assert media_store.materialize(media, other) == other
+    assert os.path.samefile(media.path, other)
+    media_store.materialize(media, other)
+
+
+def test_link_falls_back_to_copy(tmp_path):
+    source = write(tmp_path / "a", b"data")
+    with mock.patch("pytube.store.os.link", side_effect=OSError(18, "xdev")):
+        with mock.patch("pytube.store._reflink", return_value=False):
+            store.link(source, str(tmp_path / "b"))
+    with open(tmp_path / "b", "rb") as fh:
+        assert fh.read() == b"data"
+    assert not os.path.samefile(source, str(tmp_path / "b"))
+
+
+@pytest.mark.parametrize("hard_links", [True, False])
+def test_link_never_overwrites(tmp_path, hard_links):
+    stored = write(tmp_path / "a", b"data")
+    os.link(stored, str(tmp_path / "b"))
+    other = write(tmp_path / "c", b"other")
+    error = None if hard_links else OSError(18, "xdev")
+    with mock.patch("pytube.store.os.link", side_effect=error, wraps=os.link):
+        with pytest.raises(FileExistsError):
+            store.link(other, str(tmp_path / "b"))
+    with open(stored, "rb") as fh:
+        assert fh.read() == b"data"
+
+
+def test_concurrent_adds(media_store, tmp_path):
+    sources = [write(tmp_path / f"{i}.mp4", b"x" * 10) for i in range(2)]
+    barrier = threading.Barrier(2)
+    real_link = store.link
+
+    def link(source, destination):
+        # both adds found the object missing before either links it
+        barrier.wait(timeout=5)
+        real_link(source, destination)
+
+    with mock.patch("pytube.store.link", side_effect=link):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            added = list(
+                executor.map(
+                    lambda path: media_store.add("9bZkp7q19f0", 18, path),
+                    sources,
+                )
+            )
+    for path in sources + [added[0].path]:
+        with open(path, "rb") as fh:
+            assert fh.read() == b"x" * 10
+    assert os.listdir(os.path.dirname(added[0].path)) == [
+        "9bZkp7q19f0-18-10.mp4"
+    ]
+    assert media_store.get("9bZkp7q19f0", 18).path == added[0].path
+
+
+def test_download_dedupes(cipher_signature, media_store, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    assert stream.video_id == "9bZkp7q19f0"
+    # The size from the manifest is what the store is looked up with.
+    with mock.patch.object(stream, "content_length", 100), mock.patch(
+        "pytube.streams.request.stream", return_value=iter([b"a" * 100])
+    ), mock.patch("pytube.streams.request.filesize", return_value=100):
+        first = stream.download(
+            output_path=str(tmp_path), filename="first", store=media_store
+        )
+        assert media_store.has("9bZkp7q19f0", 18, 100)
+
+        on_complete = mock.Mock()
+        stream._monostate.on_complete = on_complete
+        try:
+            with mock.patch("pytube.streams.request") as request:
+                second = stream.download(
+                    output_path=str(tmp_path),
+                    filename="second",
+                    store=media_store,
+                )
+        finally:
+            stream._monostate.on_complete = None
+    request.stream.assert_not_called()
+    request.filesize.assert_not_called()
+    assert os.path.samefile(first, second)
+    on_complete.assert_called_once_with(stream, second)
+
+
+def test_download_over_materialized_file(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    with MediaStore(str(tmp_path / "store")) as media_store:
+        media = media_store.add(
+            "9bZkp7q19f0", 18, write(tmp_path / "a.mp4", b"a" * 100)
+        )
+        path = media_store.materialize(media, str(tmp_path / "b.mp4"))
+        with mock.patch.object(stream, "_filesize", 100), mock.patch(
+            "pytube.streams.request.stream", return_value=iter([b"b" * 100])
+        ):
+            stream.download(
+                output_path=str(tmp_path), filename="b", skip_existing=False
+            )
+        with open(path, "rb") as fh:
+            assert fh.read() == b"b" * 100
+        with open(media.path, "rb") as fh:
+            assert fh.read() == b"a" * 100
+        assert media_store.get("9bZkp7q19f0", 18) == media
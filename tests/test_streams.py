@@ -45,6 +45,15 @@ def test_filesize_approx(cipher_signature):
     assert stream.filesize_approx == 6796391
 
 
+def test_stream_is_compact(cipher_signature):
+    stream = cipher_signature.streams.filter(type="audio", subtype="webm")
+    assert not hasattr(stream[0], "__dict__")
+    assert stream[0].codecs is stream[1].codecs
+    assert stream[0].mime_type == "audio/webm"
+    assert stream[0].audio_codec == "opus"
+    assert stream[0].video_codec is None
+
+
 def test_default_filename(cipher_signature):
     expected = "PSY - GANGNAM STYLE(강남스타일) MV.mp4"
     stream = cipher_signature.streams[0]
@@ -132,7 +141,9 @@ def test_views(cipher_signature):
     MagicMock(return_value=iter([str(random.getrandbits(8 * 1024))])),
 )
 def test_download(cipher_signature):
-    with mock.patch("pytube.streams.open", mock.mock_open(), create=True):
+    with mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
         stream = cipher_signature.streams[0]
         stream.download()
 
@@ -146,7 +157,9 @@ def test_download(cipher_signature):
 )
 @mock.patch("pytube.streams.target_directory", MagicMock(return_value="/target"))
 def test_download_with_prefix(cipher_signature):
-    with mock.patch("pytube.streams.open", mock.mock_open(), create=True):
+    with mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
         stream = cipher_signature.streams[0]
         file_path = stream.download(filename_prefix="prefix")
         assert file_path == "/target/prefixPSY - GANGNAM STYLE(강남스타일) MV.mp4"
@@ -161,7 +174,9 @@ def test_download_with_prefix(cipher_signature):
 )
 @mock.patch("pytube.streams.target_directory", MagicMock(return_value="/target"))
 def test_download_with_filename(cipher_signature):
-    with mock.patch("pytube.streams.open", mock.mock_open(), create=True):
+    with mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
         stream = cipher_signature.streams[0]
         file_path = stream.download(filename="cool name bro")
         assert file_path == "/target/cool name bro.mp4"
@@ -177,7 +192,9 @@ def test_download_with_filename(cipher_signature):
 @mock.patch("pytube.streams.target_directory", MagicMock(return_value="/target"))
 @mock.patch("os.path.isfile", MagicMock(return_value=True))
 def test_download_with_existing(cipher_signature):
-    with mock.patch("pytube.streams.open", mock.mock_open(), create=True):
+    with mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
         stream = cipher_signature.streams[0]
         os.path.getsize = Mock(return_value=stream.filesize)
         file_path = stream.download()
@@ -195,7 +212,9 @@ def test_download_with_existing(cipher_signature):
 @mock.patch("pytube.streams.target_directory", MagicMock(return_value="/target"))
 @mock.patch("os.path.isfile", MagicMock(return_value=True))
 def test_download_with_existing_no_skip(cipher_signature):
-    with mock.patch("pytube.streams.open", mock.mock_open(), create=True):
+    with mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
         stream = cipher_signature.streams[0]
         os.path.getsize = Mock(return_value=stream.filesize)
         file_path = stream.download(skip_existing=False)
@@ -224,7 +243,9 @@ def test_on_progress_hook(cipher_signature):
     callback_fn = mock.MagicMock()
     cipher_signature.register_on_progress_callback(callback_fn)
 
-    with mock.patch("pytube.streams.open", mock.mock_open(), create=True):
+    with mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
         stream = cipher_signature.streams[0]
         stream.download()
     assert callback_fn.called
@@ -245,7 +266,9 @@ def test_on_complete_hook(cipher_signature):
     callback_fn = mock.MagicMock()
     cipher_signature.register_on_complete_callback(callback_fn)
 
-    with mock.patch("pytube.streams.open", mock.mock_open(), create=True):
+    with mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
         stream = cipher_signature.streams[0]
         stream.download()
     assert callback_fn.called
@@ -310,3 +333,65 @@ def test_repr_for_adaptive_streams(cipher_signature):
         'vcodec="avc1.640028" progressive="False" type="video">'
     )
     assert stream == expected
+
+
+def test_segment_index_ranges(cipher_signature):
+    stream = cipher_signature.streams.get_by_itag(137)
+    assert stream.init_range == (0, 740)
+    assert stream.index_range == (741, 1372)
+    assert stream.content_length == 103505563
+    progressive = cipher_signature.streams.get_by_itag(18)
+    assert progressive.init_range is None
+    assert progressive.index_range is None
+
+
+@mock.patch("pytube.streams.target_directory", MagicMock(return_value="/target"))
+def test_download_otf(cipher_signature):
+    stream = cipher_signature.streams.get_by_itag(137)
+    stream.is_otf = True
+    on_progress = MagicMock()
+    stream._monostate.on_progress = on_progress
+    with mock.patch(
+        "pytube.streams.request.seq_stream", return_value=iter([b"a", b"b"])
+    ) as seq_stream, mock.patch(
+        "pytube.streams.request.stream"
+    ) as range_stream, mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
+        stream.download(skip_existing=False)
+    seq_stream.assert_called_once_with(stream.url, proxies=None)
+    range_stream.assert_not_called()
+    assert on_progress.call_count == 2
+
+
+def test_download_write_behind(cipher_signature, tmp_path):
+    stream = cipher_signature.streams.get_by_itag(18)
+    chunks = [os.urandom(5000), os.urandom(3000)]
+    with mock.patch(
+        "pytube.streams.request.stream", return_value=iter(chunks)
+    ), mock.patch("pytube.streams.request.filesize", return_value=8000):
+        file_path = stream.download(
+            output_path=str(tmp_path), write_behind=True
+        )
+    with open(file_path, "rb") as fh:
+        assert fh.read() == b"".join(chunks)
+
+
+@mock.patch("pytube.streams.target_directory", MagicMock(return_value="/target"))
+def test_progress_events(cipher_signature):
+    events = []
+    cipher_signature.register_on_progress_event_callback(events.append, 60)
+    stream = cipher_signature.streams.get_by_itag(18)
+    with mock.patch(
+        "pytube.streams.request.stream", return_value=iter([b"a" * 10] * 100)
+    ), mock.patch(
+        "pytube.streams.request.filesize", return_value=1000
+    ), mock.patch(
+        "pytube.streams.open", mock.mock_open(), create=True
+    ), mock.patch("pytube.streams.os.replace"):
+        stream.download(skip_existing=False)
+    # the interval is never reached, only the final event is delivered
+    assert [e.bytes_done for e in events] == [1000]
+    assert events[0].finished
+    assert events[0].stream is stream
+    assert events[0].total == 1000
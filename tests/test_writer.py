@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from unittest import mock
+
+import pytest
+
+from pytube import writer
+from pytube.exceptions import DownloadCancelled
+from pytube.writer import WriteBehindWriter
+
+
+def test_writes_are_coalesced(tmp_path):
+    path = str(tmp_path / "out")
+    data = os.urandom(10000)
+    real_write = os.write
+    sizes = []
+
+    def recording_write(fd, chunk):
+        sizes.append(len(chunk))
+        return real_write(fd, chunk)
+
+    with mock.patch.object(writer.os, "write", side_effect=recording_write):
+        with WriteBehindWriter(path, buffer_size=4096, buffers=2) as fh:
+            for i in range(0, len(data), 100):
+                assert fh.write(data[i: i + 100]) == len(data[i: i + 100])
+            assert fh.tell() == len(data)
+
+    assert sizes == [4096, 4096, 1808]
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "posix_fallocate"), reason="requires posix_fallocate"
+)
+def test_preallocated_file_is_truncated(tmp_path):
+    path = str(tmp_path / "out")
+    fh = WriteBehindWriter(path, size=1 << 20)
+    if fh._preallocated:
+        assert os.stat(path).st_size == 1 << 20
+    fh.write(b"short")
+    fh.close()
+    assert os.stat(path).st_size == 5
+
+
+def test_write_errors_are_raised(tmp_path):
+    fh = WriteBehindWriter(str(tmp_path / "out"), buffer_size=4, buffers=1)
+    with mock.patch.object(writer.os, "write", side_effect=OSError("full")):
+        with pytest.raises(OSError):
+            for _ in range(10):
+                fh.write(b"12345678")
+        with pytest.raises(OSError):
+            fh.close()
+    assert fh.closed
+
+
+def test_write_errors_do_not_mask_the_block_error(tmp_path):
+    with mock.patch.object(writer.os, "write", side_effect=OSError("full")):
+        with pytest.raises(DownloadCancelled):
+            with WriteBehindWriter(str(tmp_path / "out"), buffer_size=4) as fh:
+                fh.write(b"12345678")
+                raise DownloadCancelled()
+    assert fh.closed
+
+
+def test_slow_disk_holds_back_the_producer(tmp_path):
+    release = threading.Event()
+    real_write = os.write
+
+    def slow_write(fd, chunk):
+        release.wait()
+        return real_write(fd, chunk)
+
+    fh = WriteBehindWriter(str(tmp_path / "out"), buffer_size=4, buffers=2)
+    with mock.patch.object(writer.os, "write", side_effect=slow_write):
+        producer = threading.Thread(target=fh.write, args=(b"x" * 40,))
+        producer.start()
+        producer.join(0.1)
+        # one buffer is being written, one is full: the producer waits
+        assert producer.is_alive()
+        release.set()
+        producer.join()
+        fh.close()
+    with open(str(tmp_path / "out"), "rb") as f:
+        assert f.read() == b"x" * 40